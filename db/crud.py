@@ -1,42 +1,755 @@
 # db/crud.py
+import json
+from datetime import datetime, timedelta
+from io import BytesIO
+import numpy as np
 import pandas as pd
 from db.db import get_connection
-import streamlit as st
+from db.history_storage import guardar_claves, leer_claves, liberar_claves
+from processing.analytics import analitica_de_resultado, analizar_resultado, combinar_analiticas
+from processing.diff_engine import columnas_modificadas_globales, filas_detallados_globales, orden_de_columnas
+from processing.key_matching import COLUMNAS_EMPAREJAMIENTO
+from processing.result import COLUMNA_DETALLES, SUFIJO_ANTERIOR, SUFIJO_NUEVO, columnas_procesada, detalles_de_cambios, resultado_desde_tabla
 
-def insertar_comparacion(fecha, nombre_archivo_ref, nombre_archivo_act, resultado):
-    conn = get_connection()
-    cursor = conn.cursor()
+# Comparaciones por página en el historial
+TAMANO_PAGINA_HISTORIAL = 20
+# Mediciones de rendimiento conservadas en la base de datos; las más antiguas se borran
+MEDICIONES_MAXIMAS = 100_000
+# Cada cuántas filas guardadas se informa el avance de insertar_comparacion
+FILAS_POR_AVISO = 10_000
+
+def _valores_sql(serie):
+    """
+    Convierte una columna a valores que SQLite puede guardar: nulos como None,
+    escalares de numpy como tipos de Python y fechas en formato ISO.
+    """
+    valores = serie.astype(object).where(serie.notna(), None).tolist()
+    if serie.dtype.kind in "iufb":
+        return valores
+    return [
+        valor if valor is None or isinstance(valor, (str, int, float, bytes))
+        else valor.isoformat() if hasattr(valor, "isoformat")
+        else valor.item() if isinstance(valor, np.generic)
+        else str(valor)
+        for valor in valores
+    ]
+
+def _filas_cambios_celda(comparacion_id, plantilla_procesada, claves, posiciones_guardadas=None):
+    """
+    Genera las filas de cambios_celda: una por cada celda con valor anterior o nuevo en el resultado.
+    `posiciones_guardadas` es la posición que se guarda para cada fila (por defecto, la propia fila).
+    """
+    columnas = list(plantilla_procesada.columns)
+    bases = dict.fromkeys(
+        str(columna)[:-len(sufijo)]
+        for columna in columnas
+        for sufijo in (SUFIJO_ANTERIOR, SUFIJO_NUEVO)
+        if str(columna).endswith(sufijo)
+    )
+    vacia = pd.Series([None] * len(plantilla_procesada), index=plantilla_procesada.index, dtype=object)
+    for base in bases:
+        anterior = plantilla_procesada.get(f"{base}{SUFIJO_ANTERIOR}", vacia)
+        nuevo = plantilla_procesada.get(f"{base}{SUFIJO_NUEVO}", vacia)
+        posiciones = np.flatnonzero((anterior.notna() | nuevo.notna()).to_numpy())
+        if not len(posiciones):
+            continue
+        yield from zip(
+            [comparacion_id] * len(posiciones),
+            (posiciones if posiciones_guardadas is None else posiciones_guardadas[posiciones]).tolist(),
+            [claves[posicion] for posicion in posiciones],
+            [base] * len(posiciones),
+            _valores_sql(anterior.iloc[posiciones]),
+            _valores_sql(nuevo.iloc[posiciones])
+        )
+
+def _avisando(filas, progreso, avance):
+    """
+    Entrega las filas de un executemany y llama a progreso(avance(n)) cada FILAS_POR_AVISO filas.
+    """
+    for numero, fila in enumerate(filas, 1):
+        if numero % FILAS_POR_AVISO == 0:
+            progreso(avance(numero))
+        yield fila
+
+def _insertar_filas(cursor, comparacion_id, resultado, claves, posiciones_guardadas=None, progreso=None):
+    """
+    Guarda el estado de las filas con cambios del resultado y sus celdas. `posiciones_guardadas` es
+    la posición en plantilla_procesada de cada fila (por defecto, la propia fila; al guardar por
+    particiones, la posición en el resultado completo).
+    """
+    plantilla_procesada = resultado["plantilla"]
+    # Las filas "Sin cambios" no se guardan en estados_clave: sus claves ya están en los bloques
+    posiciones = np.flatnonzero((plantilla_procesada["Estado"] != "Sin cambios").to_numpy())
+    detalles = detalles_de_cambios(resultado, posiciones)
+    filas_estados = zip(
+        [comparacion_id] * len(posiciones),
+        (posiciones if posiciones_guardadas is None else posiciones_guardadas[posiciones]).tolist(),
+        [claves[posicion] for posicion in posiciones],
+        _valores_sql(plantilla_procesada["Estado"].iloc[posiciones].astype(object)),
+        detalles.tolist()
+    )
+    filas_celdas = _filas_cambios_celda(comparacion_id, plantilla_procesada, claves, posiciones_guardadas)
+    if progreso is not None:
+        # El avance es la posición de la última fila guardada; las celdas se guardan después de todas
+        # las filas: su avance no cambia el total informado
+        filas_estados = _avisando(filas_estados, progreso, lambda numero: int(posiciones[numero - 1]) + 1)
+        filas_celdas = _avisando(filas_celdas, progreso, lambda numero: len(claves))
+
+    cursor.executemany("""
+        INSERT INTO estados_clave (comparacion_id, posicion, clave, estado, detalles) VALUES (?, ?, ?, ?, ?)
+    """, filas_estados)
+    cursor.executemany("""
+        INSERT INTO cambios_celda (comparacion_id, posicion, clave, columna, valor_anterior, valor_nuevo)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, filas_celdas)
+
+def _insertar_resultado(cursor, comparacion_id, resultado, progreso=None):
+    """
+    Guarda el resultado de una comparación ya registrada: las claves en bloques deduplicados (ver
+    db.history_storage), el estado de las filas con cambios y sus celdas, y los emparejamientos.
+    """
+    claves = _valores_sql(resultado["plantilla"].iloc[:, 0])
+    lista_bloques, _ = guardar_claves(cursor, claves)
+    cursor.execute("UPDATE comparaciones SET bloques_claves = ? WHERE id = ?", (lista_bloques, comparacion_id))
+    _insertar_filas(cursor, comparacion_id, resultado, claves, progreso=progreso)
+
+    # Emparejamientos de claves sin coincidencia exacta, si la comparación los usó
+    emparejamientos = resultado.get("emparejamientos")
+    if emparejamientos is not None and len(emparejamientos):
+        cursor.executemany("""
+            INSERT INTO claves_emparejadas (comparacion_id, clave_referencia, clave_actualizada, confianza, metodo)
+            VALUES (?, ?, ?, ?, ?)
+        """, zip(
+            [comparacion_id] * len(emparejamientos),
+            *(_valores_sql(emparejamientos[columna]) for columna in COLUMNAS_EMPAREJAMIENTO)
+        ))
+    if progreso is not None:
+        progreso(len(claves))
+
+def _analitica_json(resultado):
+    return json.dumps(analitica_de_resultado(resultado), ensure_ascii=False, default=str)
+
+def _insertar_comparacion(cursor, fecha, nombre_archivo_ref, nombre_archivo_act, resultado, hoja=None, progreso=None):
+    columnas = [str(columna) for columna in columnas_procesada(resultado)]
+    esquema = resultado.get("esquema")
     cursor.execute("""
-        INSERT INTO comparaciones (fecha, nombre_archivo_ref, nombre_archivo_act, resultado) VALUES (?, ?, ?, ?)
-    """, (fecha, nombre_archivo_ref, nombre_archivo_act, resultado))
-    conn.commit()
-    conn.close()
-    
-    # Incrementar el contador de actualización en session_state
-    if "update_counter" in st.session_state:
-        st.session_state.update_counter += 1
-
-def obtener_comparaciones():
-    conn = get_connection()
-    comparaciones = pd.read_sql_query("SELECT id, fecha, nombre_archivo_ref, nombre_archivo_act FROM comparaciones", conn)
-    conn.close()
-    return comparaciones
+        INSERT INTO comparaciones (fecha, nombre_archivo_ref, nombre_archivo_act, hoja, columnas, esquema, analitica) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (
+        fecha, nombre_archivo_ref, nombre_archivo_act, hoja, json.dumps(columnas),
+        json.dumps(esquema) if esquema is not None else None, _analitica_json(resultado)
+    ))
+    comparacion_id = cursor.lastrowid
+    _insertar_resultado(cursor, comparacion_id, resultado, progreso)
+    return comparacion_id
 
-def eliminar_comparacion(id):
-    conn = get_connection()
-    cursor = conn.cursor()
+def insertar_comparacion(fecha, nombre_archivo_ref, nombre_archivo_act, resultado, progreso=None, hoja=None):
+    """
+    Guarda una comparación con su resultado repartido en bloques de claves deduplicados y en las
+    tablas estados_clave y cambios_celda, en una sola transacción. El xlsx del resultado no se
+    guarda: se genera al descargarlo.
+
+    Parámetros:
+        fecha: Fecha de la comparación.
+        nombre_archivo_ref, nombre_archivo_act: Nombres de los archivos comparados.
+        resultado: Contenedor del resultado de la comparación (ver processing.result).
+        progreso: Función opcional que recibe las claves guardadas a medida que avanza la inserción.
+            Si lanza una excepción, la transacción se revierte y no queda nada guardado.
+        hoja: Hoja comparada, si la comparación es una hoja de un libro de varias hojas.
+
+    Retorna:
+        Id de la comparación guardada.
+    """
+    with get_connection() as conn:
+        return _insertar_comparacion(conn.cursor(), fecha, nombre_archivo_ref, nombre_archivo_act, resultado, hoja, progreso)
+
+def insertar_comparaciones(comparaciones):
+    """
+    Guarda varias comparaciones en una sola transacción (p. ej. un lote del procesamiento por lotes):
+    se guardan todas o ninguna.
+
+    Parámetros:
+        comparaciones: Lista de tuplas (fecha, nombre_archivo_ref, nombre_archivo_act, resultado) o
+            (fecha, nombre_archivo_ref, nombre_archivo_act, resultado, hoja).
+
+    Retorna:
+        Lista con los ids de las comparaciones guardadas, en el mismo orden.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        return [_insertar_comparacion(cursor, *comparacion) for comparacion in comparaciones]
+
+def _posiciones_de_particion(parcial):
+    """
+    Posición en plantilla_procesada de cada fila de una partición: la de su fila en el archivo de
+    referencia. Los registros nuevos van después de todos los de referencia, en el orden del archivo
+    actualizado; hasta conocer los de las demás particiones llevan -(1 + su fila en ese archivo).
+    """
+    seccion, posicion = parcial["orden_procesada"]
+    posiciones = np.empty(len(posicion), dtype=np.int64)
+    de_referencia = seccion == 0
+    posiciones[de_referencia] = parcial["posiciones_plantilla"][posicion[de_referencia]]
+    posiciones[~de_referencia] = -1 - parcial["posiciones_actualizada"][posicion[~de_referencia]]
+    return posiciones
+
+def insertar_comparacion_por_particiones(fecha, nombre_archivo_ref, nombre_archivo_act, parciales, progreso=None):
+    """
+    Guarda una comparación a medida que se comparan sus particiones, sin combinar sus resultados: de
+    cada partición se guardan sus filas y se conservan solo su analítica y sus columnas con cambios.
+    Las claves se acumulan en una tabla temporal y se guardan en bloques al terminar. Todo en una
+    sola transacción: si una partición falla no queda nada guardado.
+
+    Parámetros:
+        fecha: Fecha de la comparación.
+        nombre_archivo_ref, nombre_archivo_act: Nombres de los archivos comparados.
+        parciales: Resultados de comparar_columnar con sus posiciones globales y "columnas_plantilla"
+            (ver processing.streaming.comparar_por_particiones); se consumen de a uno.
+        progreso: Función opcional que recibe las filas guardadas después de cada partición.
+
+    Retorna:
+        Id de la comparación guardada.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO comparaciones (fecha, nombre_archivo_ref, nombre_archivo_act) VALUES (?, ?, ?)",
+            (fecha, nombre_archivo_ref, nombre_archivo_act)
+        )
+        comparacion_id = cursor.lastrowid
+        cursor.execute("CREATE TEMP TABLE claves_particion (posicion INTEGER PRIMARY KEY, clave)")
+        try:
+            analiticas, modificadas = [], []
+            columnas_plantilla = columnas_nuevas = None
+            hay_eliminados = False
+            filas = de_referencia = 0
+            for parcial in parciales:
+                resultado = parcial["resultado"]
+                posiciones = _posiciones_de_particion(parcial)
+                claves = _valores_sql(resultado["plantilla"].iloc[:, 0])
+                cursor.executemany("INSERT INTO temp.claves_particion (posicion, clave) VALUES (?, ?)", zip(posiciones.tolist(), claves))
+                _insertar_filas(cursor, comparacion_id, resultado, claves, posiciones)
+
+                analiticas.append(analizar_resultado(resultado, filas_detallados_globales(parcial)))
+                modificadas += columnas_modificadas_globales(parcial)
+                columnas_plantilla = parcial["columnas_plantilla"]
+                if parcial["hay_nuevas"] and columnas_nuevas is None:
+                    columnas_nuevas = parcial["columnas_actualizada"]
+                hay_eliminados = hay_eliminados or parcial["hay_eliminados"]
+                de_referencia += int((posiciones >= 0).sum())
+                filas += len(posiciones)
+                if progreso is not None:
+                    progreso(filas)
+                # La partición se libera antes de comparar la siguiente
+                del parcial, resultado
+
+            # Posición definitiva de los registros nuevos: a continuación de los de referencia
+            cursor.execute("""
+                CREATE TEMP TABLE posiciones_nuevas AS
+                SELECT posicion AS provisoria, ? + ROW_NUMBER() OVER (ORDER BY posicion DESC) - 1 AS posicion
+                FROM temp.claves_particion WHERE posicion < 0
+            """, (de_referencia,))
+            for tabla in ("estados_clave", "cambios_celda"):
+                cursor.execute(f"""
+                    UPDATE {tabla} SET posicion = (
+                        SELECT nuevas.posicion FROM temp.posiciones_nuevas AS nuevas WHERE nuevas.provisoria = {tabla}.posicion
+                    ) WHERE comparacion_id = ? AND posicion < 0
+                """, (comparacion_id,))
+            claves = [clave for (clave,) in cursor.execute(
+                "SELECT clave FROM temp.claves_particion ORDER BY posicion < 0, abs(posicion)"
+            )]
+            lista_bloques, _ = guardar_claves(cursor, claves)
+
+            columnas = [str(columna) for columna in orden_de_columnas(columnas_plantilla, modificadas, columnas_nuevas, hay_eliminados)]
+            columnas.insert(columnas.index("Estado") + 1, COLUMNA_DETALLES)
+            cursor.execute("UPDATE comparaciones SET columnas = ?, analitica = ?, bloques_claves = ? WHERE id = ?", (
+                json.dumps(columnas),
+                json.dumps(combinar_analiticas(analiticas), ensure_ascii=False, default=str),
+                lista_bloques,
+                comparacion_id,
+            ))
+        finally:
+            cursor.execute("DROP TABLE IF EXISTS temp.claves_particion")
+            cursor.execute("DROP TABLE IF EXISTS temp.posiciones_nuevas")
+    return comparacion_id
+
+def obtener_pagina_comparaciones(limite=TAMANO_PAGINA_HISTORIAL, despues_de=None, fecha_desde=None, fecha_hasta=None, nombre_archivo=None):
+    """
+    Retorna una página del historial, de la comparación más reciente a la más antigua.
+
+    La paginación es por clave (fecha, id): cada página continúa desde la última fila de la anterior,
+    de modo que el costo no depende de cuántas páginas se hayan recorrido.
+
+    Parámetros:
+        limite: Cantidad máxima de comparaciones de la página.
+        despues_de: Tupla (fecha, id) de la última comparación de la página anterior; None para la primera.
+        fecha_desde, fecha_hasta: Texto "AAAA-MM-DD" que limita el rango de fechas (ambos extremos incluidos).
+        nombre_archivo: Comienzo del nombre del archivo de referencia o actualizado (sin distinguir mayúsculas).
+
+    Retorna:
+        Tupla (comparaciones, siguiente): DataFrame de la página y cursor de la página siguiente (None si no hay más).
+    """
+    condiciones, parametros = [], []
+    if despues_de is not None:
+        condiciones.append("(fecha, id) < (?, ?)")
+        parametros += list(despues_de)
+    if fecha_desde:
+        condiciones.append("fecha >= ?")
+        parametros.append(str(fecha_desde))
+    if fecha_hasta:
+        # Las fechas se guardan como "AAAA-MM-DD HH:MM:SS": todo el día hasta pertenece al rango
+        condiciones.append("fecha < date(?, '+1 day')")
+        parametros.append(str(fecha_hasta))
+    if nombre_archivo:
+        # Búsqueda por prefijo con LIKE: aprovecha los índices COLLATE NOCASE de ambas columnas
+        prefijo = nombre_archivo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        condiciones.append("(nombre_archivo_ref LIKE ? ESCAPE '\\' OR nombre_archivo_act LIKE ? ESCAPE '\\')")
+        parametros += [prefijo, prefijo]
+
+    consulta = "SELECT id, fecha, nombre_archivo_ref, nombre_archivo_act, hoja FROM comparaciones"
+    if condiciones:
+        consulta += " WHERE " + " AND ".join(condiciones)
+    consulta += " ORDER BY fecha DESC, id DESC LIMIT ?"
+
+    with get_connection() as conn:
+        comparaciones = pd.read_sql_query(consulta, conn, params=parametros + [limite + 1])
+
+    siguiente = None
+    if len(comparaciones) > limite:
+        comparaciones = comparaciones.iloc[:limite]
+        ultima = comparaciones.iloc[-1]
+        siguiente = (ultima["fecha"], int(ultima["id"]))
+    return comparaciones, siguiente
+
+def obtener_comparaciones(**filtros):
+    """
+    Retorna la primera página del historial (ver obtener_pagina_comparaciones).
+    """
+    return obtener_pagina_comparaciones(**filtros)[0]
+
+def _eliminar_comparacion(cursor, id):
+    fila = cursor.execute("SELECT bloques_claves FROM comparaciones WHERE id = ?", (id,)).fetchone()
+    if fila is not None and fila[0] is not None:
+        liberar_claves(cursor, fila[0])
+    cursor.execute("DELETE FROM huellas WHERE comparacion_id = ?", (id,))
+    cursor.execute("DELETE FROM claves_emparejadas WHERE comparacion_id = ?", (id,))
+    cursor.execute("DELETE FROM cambios_celda WHERE comparacion_id = ?", (id,))
+    cursor.execute("DELETE FROM estados_clave WHERE comparacion_id = ?", (id,))
     cursor.execute("DELETE FROM comparaciones WHERE id = ?", (id,))
-    conn.commit()
-    conn.close()
-    
-    # Incrementar el contador de actualización en session_state
-    if "update_counter" in st.session_state:
-        st.session_state.update_counter += 1
+
+def eliminar_comparacion(id):
+    with get_connection() as conn:
+        _eliminar_comparacion(conn.cursor(), id)
+
+def aplicar_retencion(conservar_ultimas=None, conservar_dias=None):
+    """
+    Elimina las comparaciones que quedan fuera de la política de retención, una transacción por
+    comparación (las demás sesiones pueden seguir guardando mientras tanto). El espacio liberado
+    queda en páginas libres de la base de datos (ver db.db.liberar_espacio).
+
+    Parámetros:
+        conservar_ultimas: Cantidad de comparaciones más recientes que se conservan de cada par de
+            archivos (y hoja); None para no limitar.
+        conservar_dias: Antigüedad máxima en días de las comparaciones conservadas; None para no limitar.
+
+    Retorna:
+        Cantidad de comparaciones eliminadas.
+    """
+    condiciones, parametros = [], []
+    if conservar_ultimas is not None:
+        condiciones.append("orden > ?")
+        parametros.append(int(conservar_ultimas))
+    if conservar_dias is not None:
+        condiciones.append("fecha < ?")
+        parametros.append((datetime.now() - timedelta(days=conservar_dias)).strftime("%Y-%m-%d %H:%M:%S"))
+    if not condiciones:
+        return 0
+
+    with get_connection() as conn:
+        ids = [fila[0] for fila in conn.execute(f"""
+            SELECT id FROM (
+                SELECT id, fecha, ROW_NUMBER() OVER (
+                    PARTITION BY nombre_archivo_ref, nombre_archivo_act, hoja ORDER BY fecha DESC, id DESC
+                ) AS orden
+                FROM comparaciones
+            ) WHERE {" OR ".join(condiciones)}
+        """, parametros)]
+    for id in ids:
+        eliminar_comparacion(id)
+    return len(ids)
+
+def obtener_comparacion(id):
+    """
+    Retorna los datos de una comparación del historial (id, fecha, nombres de archivo y hoja), o None si no existe.
+    """
+    with get_connection() as conn:
+        fila = conn.execute(
+            "SELECT id, fecha, nombre_archivo_ref, nombre_archivo_act, hoja FROM comparaciones WHERE id = ?", (id,)
+        ).fetchone()
+    if fila is None:
+        return None
+    return dict(zip(("id", "fecha", "nombre_archivo_ref", "nombre_archivo_act", "hoja"), fila))
 
 def obtener_resultado_comparacion(id):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT resultado FROM comparaciones WHERE id = ?", (id,))
-    resultado = cursor.fetchone()[0]
-    conn.close()
+    """
+    Retorna el xlsx guardado de una comparación, o None si su resultado está en las tablas normalizadas.
+    """
+    with get_connection() as conn:
+        resultado = conn.execute("SELECT resultado FROM comparaciones WHERE id = ?", (id,)).fetchone()[0]
     return resultado
+
+def obtener_tabla_resultado(id):
+    """
+    Reconstruye el resultado de una comparación (plantilla_procesada) como DataFrame: las claves
+    desde sus bloques, el estado de las filas con cambios y sus celdas. Las comparaciones guardadas
+    antes de las tablas normalizadas se leen desde su xlsx.
+    """
+    with get_connection() as conn:
+        columnas_json, resultado, lista_bloques = conn.execute(
+            "SELECT columnas, resultado, bloques_claves FROM comparaciones WHERE id = ?", (id,)
+        ).fetchone()
+        if columnas_json is None:
+            return pd.read_excel(BytesIO(resultado))
+
+        estados = pd.read_sql_query(
+            "SELECT posicion, clave, estado, detalles FROM estados_clave WHERE comparacion_id = ? ORDER BY posicion",
+            conn, params=(id,)
+        )
+        celdas = pd.read_sql_query(
+            "SELECT posicion, columna, valor_anterior, valor_nuevo FROM cambios_celda WHERE comparacion_id = ?",
+            conn, params=(id,)
+        )
+        # Sin bloques (guardada antes de ellos) estados_clave tiene todas las filas
+        claves = estados["clave"] if lista_bloques is None else pd.Series(leer_claves(conn, lista_bloques))
+
+    total = len(claves)
+    posiciones_estado = estados["posicion"].to_numpy()
+    estado = np.full(total, "Sin cambios", dtype=object)
+    estado[posiciones_estado] = estados["estado"].to_numpy(dtype=object)
+    detalles = np.full(total, "", dtype=object)
+    detalles[posiciones_estado] = estados["detalles"].to_numpy(dtype=object)
+
+    columnas = json.loads(columnas_json)
+    datos = {
+        columnas[0]: claves,
+        "Estado": pd.Series(estado),
+        "Detalles de Cambios": pd.Series(detalles)
+    }
+    for base, grupo in celdas.groupby("columna", sort=False):
+        posiciones = grupo["posicion"].to_numpy()
+        for sufijo, campo in ((SUFIJO_ANTERIOR, "valor_anterior"), (SUFIJO_NUEVO, "valor_nuevo")):
+            valores = np.full(total, None, dtype=object)
+            valores[posiciones] = grupo[campo].to_numpy(dtype=object)
+            datos[f"{base}{sufijo}"] = pd.Series(valores).infer_objects()
+
+    vacia = pd.Series([None] * total, dtype=object)
+    return pd.DataFrame({columna: datos.get(columna, vacia) for columna in columnas})
+
+def compactar_comparacion(id):
+    """
+    Pasa una comparación guardada en un formato anterior al de bloques deduplicados: las que guardan
+    el resultado como xlsx y las que tienen todas sus filas en estados_clave. Se hace en una sola
+    transacción; las comparaciones ya compactadas no cambian. Las que no tienen analítica la reciben.
+
+    Retorna:
+        True si la comparación se compactó.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        columnas_json, con_xlsx, lista_bloques = cursor.execute(
+            "SELECT columnas, resultado IS NOT NULL, bloques_claves FROM comparaciones WHERE id = ?", (id,)
+        ).fetchone()
+        if columnas_json is None and con_xlsx:
+            # Se reconstruye desde el xlsx y se guarda como las comparaciones nuevas
+            resultado = resultado_desde_tabla(obtener_tabla_resultado(id))
+            columnas = [str(columna) for columna in columnas_procesada(resultado)]
+            cursor.execute(
+                "UPDATE comparaciones SET columnas = ?, resultado = NULL, analitica = COALESCE(analitica, ?) WHERE id = ?",
+                (json.dumps(columnas), _analitica_json(resultado), id)
+            )
+            _insertar_resultado(cursor, id, resultado)
+            return True
+        if columnas_json is None or lista_bloques is not None:
+            return False
+        claves = [fila[0] for fila in cursor.execute(
+            "SELECT clave FROM estados_clave WHERE comparacion_id = ? ORDER BY posicion", (id,)
+        )]
+        analitica = _analitica_json(resultado_desde_tabla(obtener_tabla_resultado(id)))
+        lista_bloques, _ = guardar_claves(cursor, claves)
+        cursor.execute(
+            "UPDATE comparaciones SET bloques_claves = ?, analitica = COALESCE(analitica, ?) WHERE id = ?",
+            (lista_bloques, analitica, id)
+        )
+        cursor.execute("DELETE FROM estados_clave WHERE comparacion_id = ? AND estado = 'Sin cambios'", (id,))
+        return True
+
+def comparaciones_por_compactar():
+    """
+    Retorna los ids de las comparaciones guardadas en un formato anterior al de bloques deduplicados.
+    """
+    with get_connection() as conn:
+        return [fila[0] for fila in conn.execute(
+            "SELECT id FROM comparaciones WHERE bloques_claves IS NULL AND (columnas IS NOT NULL OR resultado IS NOT NULL) ORDER BY id"
+        )]
+
+def obtener_emparejamientos(id):
+    """
+    Retorna las claves emparejadas sin coincidencia exacta en una comparación, con su confianza
+    (DataFrame vacío si la comparación no usó el emparejamiento).
+    """
+    with get_connection() as conn:
+        emparejamientos = pd.read_sql_query(
+            "SELECT clave_referencia, clave_actualizada, confianza, metodo FROM claves_emparejadas WHERE comparacion_id = ? ORDER BY rowid",
+            conn, params=(id,)
+        )
+    emparejamientos.columns = COLUMNAS_EMPAREJAMIENTO
+    return emparejamientos
+
+def obtener_analitica(id):
+    """
+    Retorna la analítica de los cambios de una comparación (ver processing.analytics.analizar_resultado),
+    o None si la comparación se guardó sin ella.
+    """
+    with get_connection() as conn:
+        fila = conn.execute("SELECT analitica FROM comparaciones WHERE id = ?", (id,)).fetchone()
+    return json.loads(fila[0]) if fila is not None and fila[0] is not None else None
+
+def guardar_analitica(id, analitica):
+    """
+    Guarda la analítica de una comparación que no la tenía (calculada desde su resultado reconstruido).
+    """
+    with get_connection() as conn:
+        conn.execute(
+            "UPDATE comparaciones SET analitica = ? WHERE id = ? AND analitica IS NULL",
+            (json.dumps(analitica, ensure_ascii=False, default=str), id)
+        )
+
+def obtener_esquema(id):
+    """
+    Retorna la alineación de columnas de una comparación (ver processing.schema.esquema_como_datos),
+    o None si la comparación se guardó sin ella.
+    """
+    with get_connection() as conn:
+        fila = conn.execute("SELECT esquema FROM comparaciones WHERE id = ?", (id,)).fetchone()
+    return json.loads(fila[0]) if fila is not None and fila[0] is not None else None
+
+def _claves_equivalentes(clave):
+    # Una clave escrita como texto también encuentra su equivalente numérico ("100" y 100)
+    equivalentes = [clave]
+    for convertir in (int, float):
+        try:
+            equivalentes.append(convertir(clave))
+            break
+        except (TypeError, ValueError):
+            pass
+    return equivalentes
+
+def obtener_cambios_clave(clave):
+    """
+    Retorna todos los cambios registrados para una clave en el historial de comparaciones.
+    Una clave escrita como texto también encuentra su equivalente numérico ("100" y 100).
+    """
+    equivalentes = _claves_equivalentes(clave)
+    marcadores = ", ".join("?" * len(equivalentes))
+
+    with get_connection() as conn:
+        cambios = pd.read_sql_query(f"""
+            SELECT c.id AS comparacion_id, c.fecha, c.nombre_archivo_ref, c.nombre_archivo_act, c.hoja,
+                   e.estado, cc.columna, cc.valor_anterior, cc.valor_nuevo
+            FROM estados_clave e
+            JOIN comparaciones c ON c.id = e.comparacion_id
+            LEFT JOIN cambios_celda cc ON cc.comparacion_id = e.comparacion_id AND cc.posicion = e.posicion
+            WHERE e.clave IN ({marcadores}) AND e.estado != 'Sin cambios'
+            ORDER BY c.fecha, c.id, e.posicion
+        """, conn, params=equivalentes)
+    return cambios
+
+def insertar_serie_versiones(fecha, nombre, resultado, progreso=None):
+    """
+    Guarda una serie de versiones comparada en una sola pasada (ver processing.snapshots), con la
+    línea de tiempo de cada clave y sus eventos, en una sola transacción.
+
+    Parámetros:
+        fecha: Fecha de la comparación.
+        nombre: Nombre de la serie (p. ej. el de la lista de precios).
+        resultado: Resultado de processing.snapshots.comparar_versiones.
+        progreso: Función opcional que recibe los eventos guardados a medida que avanza la inserción.
+
+    Retorna:
+        Id de la serie guardada.
+    """
+    linea_tiempo = resultado["linea_tiempo"]
+    eventos = resultado["eventos"]
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO series_versiones (fecha, nombre, clave, versiones, columnas, resumen) VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            fecha, nombre, str(resultado["clave"]), json.dumps(resultado["versiones"]),
+            json.dumps([str(columna) for columna in resultado["columnas"]]),
+            resultado["resumen"].to_json(orient="records", force_ascii=False)
+        ))
+        serie_id = cursor.lastrowid
+        cursor.executemany("""
+            INSERT INTO lineas_tiempo (serie_id, clave, primera_version, ultimo_cambio, eliminada_en, versiones_presente, cambios)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, zip([serie_id] * len(linea_tiempo), *(_valores_sql(linea_tiempo[columna]) for columna in linea_tiempo.columns)))
+        filas_eventos = zip(
+            [serie_id] * len(eventos),
+            _valores_sql(eventos["clave"]),
+            _valores_sql(eventos["version"]),
+            _valores_sql(eventos["evento"]),
+            [None if columna is None else str(columna) for columna in eventos["columna"]],
+            _valores_sql(eventos["valor_anterior"]),
+            _valores_sql(eventos["valor_nuevo"]),
+        )
+        if progreso is not None:
+            filas_eventos = _avisando(filas_eventos, progreso, lambda numero: numero)
+        cursor.executemany("""
+            INSERT INTO eventos_version (serie_id, clave, version, evento, columna, valor_anterior, valor_nuevo)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, filas_eventos)
+    return serie_id
+
+def _serie_desde_fila(fila):
+    id, fecha, nombre, clave, versiones, columnas, resumen = fila
+    return {
+        "id": id, "fecha": fecha, "nombre": nombre, "clave": clave,
+        "versiones": json.loads(versiones), "columnas": json.loads(columnas),
+        "resumen": pd.DataFrame(json.loads(resumen)),
+    }
+
+def obtener_series_versiones():
+    """
+    Retorna las series de versiones guardadas (id, fecha, nombre, cantidad de versiones), de la más reciente a la más antigua.
+    """
+    with get_connection() as conn:
+        series = pd.read_sql_query("SELECT id, fecha, nombre, versiones FROM series_versiones ORDER BY fecha DESC, id DESC", conn)
+    series["versiones"] = series["versiones"].map(lambda versiones: len(json.loads(versiones)))
+    return series
+
+def obtener_serie_versiones(id):
+    """
+    Retorna los datos de una serie de versiones (nombres de las versiones, columna clave, columnas
+    comparadas y resumen por versión), o None si no existe.
+    """
+    with get_connection() as conn:
+        fila = conn.execute(
+            "SELECT id, fecha, nombre, clave, versiones, columnas, resumen FROM series_versiones WHERE id = ?", (id,)
+        ).fetchone()
+    return _serie_desde_fila(fila) if fila is not None else None
+
+def obtener_linea_tiempo(serie_id, solo_con_cambios=False, limite=None):
+    """
+    Retorna la línea de tiempo de las claves de una serie de versiones (versiones como posiciones).
+
+    Parámetros:
+        solo_con_cambios: Si es True, solo las claves con algún cambio de valores o eliminadas.
+        limite: Cantidad máxima de claves (None para todas).
+    """
+    condicion = "AND (cambios > 0 OR eliminada_en IS NOT NULL)" if solo_con_cambios else ""
+    with get_connection() as conn:
+        return pd.read_sql_query(f"""
+            SELECT clave, primera_version, ultimo_cambio, eliminada_en, versiones_presente, cambios
+            FROM lineas_tiempo WHERE serie_id = ? {condicion} ORDER BY rowid LIMIT ?
+        """, conn, params=(serie_id, -1 if limite is None else limite), dtype={"ultimo_cambio": "Int64", "eliminada_en": "Int64"})
+
+def obtener_eventos_clave(clave, serie_id=None):
+    """
+    Retorna los eventos de una clave en las series de versiones guardadas (o en una sola serie), en
+    orden de versión. Una clave escrita como texto también encuentra su equivalente numérico.
+    """
+    equivalentes = _claves_equivalentes(clave)
+    marcadores = ", ".join("?" * len(equivalentes))
+    condicion = "AND serie_id = ?" if serie_id is not None else ""
+    with get_connection() as conn:
+        filas = conn.execute(f"""
+            SELECT serie_id, clave, version, evento, columna, valor_anterior, valor_nuevo
+            FROM eventos_version WHERE clave IN ({marcadores}) {condicion}
+            ORDER BY serie_id, version, rowid
+        """, (*equivalentes, *([serie_id] if serie_id is not None else []))).fetchall()
+    # Como objetos: cada valor conserva su tipo (un entero no pasa a decimal por estar junto a uno)
+    eventos = pd.DataFrame(filas, columns=["serie_id", "clave", "version", "evento", "columna", "valor_anterior", "valor_nuevo"], dtype=object)
+    return eventos.astype({"serie_id": "int64", "version": "int64"})
+
+def eliminar_serie_versiones(id):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM eventos_version WHERE serie_id = ?", (id,))
+        cursor.execute("DELETE FROM lineas_tiempo WHERE serie_id = ?", (id,))
+        cursor.execute("DELETE FROM series_versiones WHERE id = ?", (id,))
+
+def insertar_huellas(comparacion_id, hash_archivo, huellas):
+    """
+    Guarda las huellas de un archivo (ver processing.fingerprint) junto a la comparación que las generó.
+    Si ya existen huellas para el mismo contenido y columnas, no se duplican.
+    """
+    with get_connection() as conn:
+        conn.execute("""
+            INSERT OR IGNORE INTO huellas (comparacion_id, hash_archivo, columnas, huellas_filas, huellas_columnas, resumen)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            comparacion_id,
+            hash_archivo,
+            json.dumps([str(columna) for columna in huellas["columnas"]]),
+            huellas["filas"].astype(np.uint64).tobytes(),
+            json.dumps([huellas["columnas_huellas"][columna] for columna in huellas["columnas"]]),
+            huellas["resumen"]
+        ))
+
+def obtener_huellas(hash_archivo, columnas):
+    """
+    Recupera las huellas guardadas para un archivo y un conjunto de columnas, o None si no existen.
+    hash_archivo identifica el contenido y las opciones de lectura (ver fingerprint.hash_contenido).
+    """
+    with get_connection() as conn:
+        fila = conn.execute(
+            "SELECT huellas_filas, huellas_columnas, resumen FROM huellas WHERE hash_archivo = ? AND columnas = ?",
+            (hash_archivo, json.dumps([str(columna) for columna in columnas]))
+        ).fetchone()
+    if fila is None:
+        return None
+
+    huellas_filas, huellas_columnas, resumen = fila
+    columnas = list(columnas)
+    return {
+        "columnas": columnas,
+        "filas": np.frombuffer(huellas_filas, dtype=np.uint64),
+        "columnas_huellas": dict(zip(columnas, json.loads(huellas_columnas))),
+        "resumen": resumen
+    }
+
+def insertar_mediciones(mediciones):
+    """
+    Guarda las mediciones de una etapa raíz del perfilador (ver performance.profiler) y descarta
+    las más antiguas si se supera MEDICIONES_MAXIMAS.
+    """
+    campos = ("fecha", "ruta", "etapa", "detalle", "nivel", "filas", "duracion_s", "filas_por_s", "memoria_mib")
+    with get_connection() as conn:
+        conn.executemany(f"""
+            INSERT INTO mediciones ({", ".join(campos)}) VALUES ({", ".join("?" * len(campos))})
+        """, [tuple(medicion[campo] for campo in campos) for medicion in mediciones])
+        conn.execute("DELETE FROM mediciones WHERE id <= (SELECT MAX(id) FROM mediciones) - ?", (MEDICIONES_MAXIMAS,))
+
+def obtener_estadisticas_mediciones(ultimas=MEDICIONES_MAXIMAS):
+    """
+    Resume las mediciones guardadas por etapa: cantidad, mediana (p50) y percentil 95 de la
+    duración, rendimiento mediano en filas por segundo y pico de memoria.
+
+    Parámetros:
+        ultimas: Cantidad de mediciones más recientes a considerar.
+
+    Retorna:
+        DataFrame con una fila por ruta y detalle de etapa.
+    """
+    with get_connection() as conn:
+        mediciones = pd.read_sql_query("""
+            SELECT ruta, COALESCE(detalle, '') AS detalle, duracion_s, filas_por_s, memoria_mib
+            FROM mediciones ORDER BY id DESC LIMIT ?
+        """, conn, params=(ultimas,))
+    grupos = mediciones.groupby(["ruta", "detalle"], sort=True)
+    return pd.DataFrame({
+        "Mediciones": grupos.size(),
+        "p50 (s)": grupos["duracion_s"].quantile(0.5),
+        "p95 (s)": grupos["duracion_s"].quantile(0.95),
+        "Filas/s (p50)": grupos["filas_por_s"].median(),
+        "Memoria máx. (MiB)": grupos["memoria_mib"].max(),
+    }).reset_index().rename(columns={"ruta": "Etapa", "detalle": "Detalle"})
@@ -1,9 +1,169 @@
 # db/db.py
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Ruta de la base de datos y tamaño del pool de conexiones (configurables por variables de entorno)
+RUTA_BASE_DATOS = os.environ.get("DIFFLY_DB", "comparaciones.db")
+CONEXIONES_MAXIMAS = int(os.environ.get("DIFFLY_DB_CONEXIONES", "8"))
+
+# Ajustes aplicados a cada conexión nueva. Con WAL los lectores no bloquean al escritor ni
+# viceversa; synchronous=NORMAL es seguro con WAL y evita un fsync por transacción.
+PRAGMAS = (
+    # En una base de datos nueva el espacio de las filas eliminadas se devuelve por partes
+    # (liberar_espacio); debe fijarse antes que WAL. En una existente requiere activar_vacuum_incremental.
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",  # 64 MB de caché de páginas
+    "PRAGMA mmap_size=268435456",  # 256 MB mapeados en memoria
+    "PRAGMA temp_store=MEMORY",
+)
+# Espera máxima (s) por el bloqueo de escritura antes de fallar con "database is locked"
+ESPERA_BLOQUEO = 30
+# Sentencias preparadas que cada conexión conserva para reutilizarlas entre llamadas
+SENTENCIAS_EN_CACHE = 256
+
+_pool = queue.LifoQueue()
+_conexiones_abiertas = 0
+_pid_pool = os.getpid()
+_bloqueo = threading.Lock()
+
+
+def _abrir_conexion():
+    conn = sqlite3.connect(
+        RUTA_BASE_DATOS,
+        timeout=ESPERA_BLOQUEO,
+        check_same_thread=False,
+        cached_statements=SENTENCIAS_EN_CACHE,
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _tomar_conexion():
+    global _conexiones_abiertas, _pid_pool
+    with _bloqueo:
+        # Un proceso hijo creado con fork no debe reutilizar las conexiones del padre
+        if _pid_pool != os.getpid():
+            _pool.queue.clear()
+            _conexiones_abiertas = 0
+            _pid_pool = os.getpid()
+        try:
+            return _pool.get_nowait()
+        except queue.Empty:
+            if _conexiones_abiertas < CONEXIONES_MAXIMAS:
+                _conexiones_abiertas += 1
+                nueva = True
+            else:
+                nueva = False
+    if nueva:
+        try:
+            return _abrir_conexion()
+        except Exception:
+            with _bloqueo:
+                _conexiones_abiertas -= 1
+            raise
+    # Pool agotado: se espera a que otra sesión devuelva su conexión
+    return _pool.get()
+
+
+@contextmanager
+def get_connection():
+    """
+    Presta una conexión del pool compartido por todas las sesiones.
+
+    Al salir del bloque se confirma la transacción abierta (o se revierte si hubo una excepción)
+    y la conexión vuelve al pool. Uso:
+
+        with get_connection() as conn:
+            conn.execute(...)
+    """
+    conn = _tomar_conexion()
+    try:
+        yield conn
+        if conn.in_transaction:
+            conn.commit()
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        _pool.put(conn)
+
+
+def configurar_base_datos(ruta):
+    """
+    Cambia la base de datos usada por la aplicación y cierra las conexiones del pool actual.
+    Debe llamarse cuando ninguna conexión está en uso (p. ej. al iniciar un script o benchmark).
+    """
+    global RUTA_BASE_DATOS, _conexiones_abiertas
+    with _bloqueo:
+        RUTA_BASE_DATOS = ruta
+        while True:
+            try:
+                _pool.get_nowait().close()
+            except queue.Empty:
+                break
+            _conexiones_abiertas -= 1
+
 
 def init_db():
-    conn = sqlite3.connect("comparaciones.db")
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        _crear_tablas(conn.cursor())
+
+
+def vacuum_incremental_activo():
+    """
+    Indica si la base de datos libera el espacio de las filas eliminadas con PRAGMA incremental_vacuum.
+    """
+    with get_connection() as conn:
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def activar_vacuum_incremental():
+    """
+    Activa el vacuum incremental en una base de datos creada sin él. Requiere un VACUUM completo,
+    que reescribe todo el archivo y bloquea la base de datos mientras dura: se ejecuta una sola vez,
+    con la aplicación detenida.
+
+    Retorna:
+        True si se activó; False si ya estaba activo.
+    """
+    if vacuum_incremental_activo():
+        return False
+    with get_connection() as conn:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    return True
+
+
+def liberar_espacio(paginas=None):
+    """
+    Devuelve al sistema de archivos las páginas libres (las de filas eliminadas), por partes y sin
+    reescribir el archivo como VACUUM. Sin vacuum incremental activo no libera nada.
+
+    Parámetros:
+        paginas: Cantidad máxima de páginas a liberar (None para todas).
+
+    Retorna:
+        Bytes liberados.
+    """
+    with get_connection() as conn:
+        tamano_pagina = conn.execute("PRAGMA page_size").fetchone()[0]
+        libres_antes = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # Con execute el módulo sqlite3 avanza la sentencia un solo paso (una página); executescript la completa
+        conn.executescript(f"PRAGMA incremental_vacuum({int(paginas) if paginas else 0});")
+        libres_despues = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # Con WAL el archivo se achica recién al pasar las páginas al archivo principal
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return (libres_antes - libres_despues) * tamano_pagina
+
+
+def _crear_tablas(cursor):
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS comparaciones (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -13,8 +173,146 @@ def init_db():
             resultado BLOB
         )
     """)
-    conn.commit()
-    conn.close()
+    # Columnas del resultado (JSON), para reconstruirlo desde las tablas normalizadas.
+    # Las comparaciones anteriores a estas tablas conservan el resultado como xlsx en "resultado".
+    columnas_existentes = [fila[1] for fila in cursor.execute("PRAGMA table_info(comparaciones)")]
+    if "columnas" not in columnas_existentes:
+        cursor.execute("ALTER TABLE comparaciones ADD COLUMN columnas TEXT")
+    # Hoja comparada, en los libros de varias hojas (una comparación por hoja); NULL en los demás
+    if "hoja" not in columnas_existentes:
+        cursor.execute("ALTER TABLE comparaciones ADD COLUMN hoja TEXT")
+    # Hashes de los bloques con las claves del resultado (db/history_storage.py). En las comparaciones
+    # guardadas antes de los bloques es NULL y estados_clave tiene todas las filas, incluidas las sin cambios.
+    if "bloques_claves" not in columnas_existentes:
+        cursor.execute("ALTER TABLE comparaciones ADD COLUMN bloques_claves BLOB")
+    # Alineación de columnas antes de comparar (JSON, ver processing/schema.py): renombradas, agregadas,
+    # eliminadas y tipos convertidos; NULL en las comparaciones sin alineación
+    if "esquema" not in columnas_existentes:
+        cursor.execute("ALTER TABLE comparaciones ADD COLUMN esquema TEXT")
+    # Analítica de los cambios (JSON de tamaño fijo, ver processing/analytics.py) con la que se dibujan
+    # los gráficos sin leer el resultado; NULL en las comparaciones guardadas antes de ella
+    if "analitica" not in columnas_existentes:
+        cursor.execute("ALTER TABLE comparaciones ADD COLUMN analitica TEXT")
+    # Índices del historial: orden por fecha (paginación) y búsqueda por prefijo del nombre de archivo
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comparaciones_fecha ON comparaciones (fecha)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comparaciones_archivo_ref ON comparaciones (nombre_archivo_ref COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comparaciones_archivo_act ON comparaciones (nombre_archivo_act COLLATE NOCASE)")
 
-def get_connection():
-    return sqlite3.connect("comparaciones.db")
+    # Bloques comprimidos de claves, identificados por el hash de su contenido y compartidos entre comparaciones
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bloques (
+            hash BLOB PRIMARY KEY,
+            datos BLOB,
+            tamano INTEGER,
+            referencias INTEGER
+        )
+    """)
+
+    # Estado de cada fila con cambios del resultado (las demás están "Sin cambios"), por su posición
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estados_clave (
+            comparacion_id INTEGER REFERENCES comparaciones(id),
+            posicion INTEGER,
+            clave,
+            estado TEXT,
+            detalles TEXT,
+            PRIMARY KEY (comparacion_id, posicion)
+        )
+    """)
+    # Valores anterior y nuevo de cada celda con cambios (o de los registros nuevos y eliminados)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cambios_celda (
+            comparacion_id INTEGER REFERENCES comparaciones(id),
+            posicion INTEGER,
+            clave,
+            columna TEXT,
+            valor_anterior,
+            valor_nuevo,
+            PRIMARY KEY (comparacion_id, posicion, columna)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_estados_clave_clave ON estados_clave (clave)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cambios_celda_clave ON cambios_celda (clave)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cambios_celda_columna ON cambios_celda (columna)")
+
+    # Claves emparejadas sin coincidencia exacta (processing/key_matching.py), con su confianza
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS claves_emparejadas (
+            comparacion_id INTEGER REFERENCES comparaciones(id),
+            clave_referencia,
+            clave_actualizada,
+            confianza REAL,
+            metodo TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_claves_emparejadas_comparacion ON claves_emparejadas (comparacion_id)")
+
+    # Series de versiones comparadas en una sola pasada (processing/snapshots.py): línea de tiempo de
+    # cada clave y eventos por versión, para consultar la historia de una clave sin recalcularla
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS series_versiones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT,
+            nombre TEXT,
+            clave TEXT,
+            versiones TEXT,
+            columnas TEXT,
+            resumen TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lineas_tiempo (
+            serie_id INTEGER REFERENCES series_versiones(id),
+            clave,
+            primera_version INTEGER,
+            ultimo_cambio INTEGER,
+            eliminada_en INTEGER,
+            versiones_presente INTEGER,
+            cambios INTEGER
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS eventos_version (
+            serie_id INTEGER REFERENCES series_versiones(id),
+            clave,
+            version INTEGER,
+            evento TEXT,
+            columna TEXT,
+            valor_anterior,
+            valor_nuevo
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lineas_tiempo_serie ON lineas_tiempo (serie_id, clave)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_eventos_version_clave ON eventos_version (clave, serie_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_eventos_version_serie ON eventos_version (serie_id)")
+
+    # Huellas de los archivos comparados, identificadas por el hash de su contenido
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS huellas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            comparacion_id INTEGER REFERENCES comparaciones(id),
+            hash_archivo TEXT,
+            columnas TEXT,
+            huellas_filas BLOB,
+            huellas_columnas TEXT,
+            resumen TEXT,
+            UNIQUE (hash_archivo, columnas)
+        )
+    """)
+
+    # Mediciones del perfilador (performance/profiler.py), para calcular tendencias entre reinicios
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mediciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT,
+            ruta TEXT,
+            etapa TEXT,
+            detalle TEXT,
+            nivel INTEGER,
+            filas INTEGER,
+            duracion_s REAL,
+            filas_por_s REAL,
+            memoria_mib REAL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mediciones_ruta ON mediciones (ruta, detalle)")
@@ -0,0 +1,146 @@
+# db/history_storage.py
+"""
+Almacenamiento deduplicado de las claves de cada resultado guardado.
+
+La columna de claves de un resultado (una fila por clave, incluidas las "Sin cambios") es casi igual
+entre comparaciones sucesivas del mismo par de archivos. Se corta en bloques según su contenido
+(el corte depende de la clave, no de su posición, de modo que insertar o quitar filas solo cambia
+los bloques vecinos), y cada bloque se guarda comprimido una sola vez en la tabla bloques,
+identificado por el hash de su contenido. Cada comparación guarda la lista de hashes de sus bloques:
+frente a la comparación anterior del mismo par solo se agregan los bloques que cambiaron.
+
+Los bloques llevan un contador de referencias; al eliminar una comparación se descuentan y se
+borran los que ya no usa ninguna, sin cadenas de diferencias que reconstruir.
+"""
+import hashlib
+import json
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Claves por bloque: en promedio (potencia de 2, define el corte por contenido) y como máximo
+CLAVES_POR_BLOQUE = 1024
+CLAVES_POR_BLOQUE_MAXIMO = 8 * CLAVES_POR_BLOQUE
+# Nivel de compresión zlib de cada bloque
+NIVEL_COMPRESION = 6
+# Tamaño en bytes de cada hash en la lista de bloques de una comparación (sha256)
+TAMANO_HASH = 32
+
+
+def _cortes(claves):
+    """
+    Posiciones donde termina cada bloque: después de cada clave cuyo hash es múltiplo de
+    CLAVES_POR_BLOQUE, sin superar CLAVES_POR_BLOQUE_MAXIMO claves por bloque.
+    """
+    if not len(claves):
+        return []
+    hashes = pd.util.hash_pandas_object(pd.Series(claves, dtype=object), index=False).to_numpy()
+    cortes = np.flatnonzero(hashes % np.uint64(CLAVES_POR_BLOQUE) == 0) + 1
+    limites = []
+    inicio = 0
+    for corte in [*cortes.tolist(), len(claves)]:
+        while corte - inicio > CLAVES_POR_BLOQUE_MAXIMO:
+            inicio += CLAVES_POR_BLOQUE_MAXIMO
+            limites.append(inicio)
+        if corte > inicio:
+            limites.append(corte)
+            inicio = corte
+    return limites
+
+
+def guardar_claves(cursor, claves):
+    """
+    Guarda las claves de un resultado en bloques deduplicados, dentro de la transacción del cursor.
+
+    Parámetros:
+        cursor: Cursor de la transacción que guarda la comparación.
+        claves: Lista de claves en el orden del resultado (valores aptos para SQLite, ver crud._valores_sql).
+
+    Retorna:
+        Tupla (lista_bloques, bytes_nuevos): hashes concatenados de los bloques, para guardar en la
+        comparación, y bytes comprimidos que se agregaron a la tabla bloques.
+    """
+    hashes = []
+    bytes_nuevos = 0
+    inicio = 0
+    for fin in _cortes(claves):
+        datos = json.dumps(claves[inicio:fin], ensure_ascii=False, separators=(",", ":"), default=str).encode()
+        inicio = fin
+        digest = hashlib.sha256(datos).digest()
+        hashes.append(digest)
+        cursor.execute("UPDATE bloques SET referencias = referencias + 1 WHERE hash = ?", (digest,))
+        if cursor.rowcount == 0:
+            comprimido = zlib.compress(datos, NIVEL_COMPRESION)
+            cursor.execute(
+                "INSERT INTO bloques (hash, datos, tamano, referencias) VALUES (?, ?, ?, 1)",
+                (digest, comprimido, len(datos))
+            )
+            bytes_nuevos += len(comprimido)
+    return b"".join(hashes), bytes_nuevos
+
+
+def _hashes(lista_bloques):
+    return [lista_bloques[inicio:inicio + TAMANO_HASH] for inicio in range(0, len(lista_bloques), TAMANO_HASH)]
+
+
+def leer_claves(conn, lista_bloques):
+    """
+    Reconstruye las claves de un resultado a partir de la lista de bloques de su comparación.
+    """
+    hashes = _hashes(lista_bloques)
+    datos = {}
+    # Una consulta por grupo de hashes (SQLite limita los parámetros por sentencia)
+    for inicio in range(0, len(hashes), 500):
+        grupo = list(dict.fromkeys(hashes[inicio:inicio + 500]))
+        datos.update(conn.execute(
+            f"SELECT hash, datos FROM bloques WHERE hash IN ({', '.join('?' * len(grupo))})", grupo
+        ).fetchall())
+    claves = []
+    for digest in hashes:
+        claves.extend(json.loads(zlib.decompress(datos[digest])))
+    return claves
+
+
+def liberar_claves(cursor, lista_bloques):
+    """
+    Descuenta las referencias de los bloques de una comparación eliminada y borra los que quedan sin uso.
+    """
+    hashes = _hashes(lista_bloques)
+    cursor.executemany("UPDATE bloques SET referencias = referencias - 1 WHERE hash = ?", [(digest,) for digest in hashes])
+    cursor.executemany(
+        "DELETE FROM bloques WHERE hash = ? AND referencias <= 0", [(digest,) for digest in dict.fromkeys(hashes)]
+    )
+
+
+def estadisticas_almacenamiento(conn):
+    """
+    Tamaño del historial en la base de datos.
+
+    Retorna:
+        Diccionario con el tamaño del archivo y de las páginas libres (bytes), la cantidad de
+        comparaciones (y las que aún guardan el resultado como xlsx, con su tamaño), los bloques de
+        claves con su tamaño original y comprimido, y el tamaño que ocuparían sin deduplicar.
+    """
+    tamano_pagina = conn.execute("PRAGMA page_size").fetchone()[0]
+    paginas = conn.execute("PRAGMA page_count").fetchone()[0]
+    paginas_libres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    comparaciones, con_xlsx, bytes_xlsx = conn.execute(
+        "SELECT COUNT(*), COUNT(resultado), COALESCE(SUM(LENGTH(resultado)), 0) FROM comparaciones"
+    ).fetchone()
+    bloques, bytes_bloques, bytes_originales, bytes_sin_deduplicar = conn.execute("""
+        SELECT COUNT(*), COALESCE(SUM(LENGTH(datos)), 0), COALESCE(SUM(tamano), 0),
+               COALESCE(SUM(LENGTH(datos) * referencias), 0)
+        FROM bloques
+    """).fetchone()
+    return {
+        "bytes_archivo": tamano_pagina * paginas,
+        "bytes_libres": tamano_pagina * paginas_libres,
+        "comparaciones": comparaciones,
+        "comparaciones_xlsx": con_xlsx,
+        "bytes_xlsx": bytes_xlsx,
+        "bloques": bloques,
+        "bytes_bloques": bytes_bloques,
+        "bytes_claves_originales": bytes_originales,
+        "bytes_bloques_sin_deduplicar": bytes_sin_deduplicar,
+    }
@@ -0,0 +1,126 @@
+# db/maintenance.py
+"""
+Mantenimiento del historial de comparaciones: política de retención, compactación de las
+comparaciones guardadas en formatos anteriores, liberación de espacio (vacuum incremental) y
+tamaño del almacenamiento con la latencia de reconstrucción de los resultados.
+
+Uso:
+    python -m db.maintenance --informe
+    python -m db.maintenance --conservar-ultimas 10 --conservar-dias 90
+    python -m db.maintenance --compactar --activar-vacuum-incremental
+
+La retención también se aplica al iniciar la aplicación si se configuran las variables
+DIFFLY_RETENCION_ULTIMAS (comparaciones conservadas por par de archivos) y DIFFLY_RETENCION_DIAS.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from db.crud import aplicar_retencion, compactar_comparacion, comparaciones_por_compactar, obtener_tabla_resultado
+from db.db import RUTA_BASE_DATOS, activar_vacuum_incremental, configurar_base_datos, get_connection, init_db, liberar_espacio, vacuum_incremental_activo
+from db.history_storage import estadisticas_almacenamiento
+
+# Política de retención configurada (None: sin límite)
+RETENCION_ULTIMAS = int(os.environ["DIFFLY_RETENCION_ULTIMAS"]) if os.environ.get("DIFFLY_RETENCION_ULTIMAS") else None
+RETENCION_DIAS = float(os.environ["DIFFLY_RETENCION_DIAS"]) if os.environ.get("DIFFLY_RETENCION_DIAS") else None
+# Páginas liberadas por llamada a liberar_espacio al mantener el historial (4 KiB cada una: 256 MiB)
+PAGINAS_POR_VACUUM = 65_536
+# Comparaciones más recientes cuya reconstrucción se mide en el informe
+COMPARACIONES_MEDIDAS = 5
+
+
+def mantener_historial(conservar_ultimas=RETENCION_ULTIMAS, conservar_dias=RETENCION_DIAS, paginas=PAGINAS_POR_VACUUM):
+    """
+    Aplica la política de retención y libera por partes el espacio de las comparaciones eliminadas.
+
+    Retorna:
+        Diccionario con las comparaciones eliminadas y los bytes liberados.
+    """
+    eliminadas = aplicar_retencion(conservar_ultimas, conservar_dias)
+    return {"eliminadas": eliminadas, "bytes_liberados": liberar_espacio(paginas)}
+
+
+def medir_reconstruccion(cantidad=COMPARACIONES_MEDIDAS):
+    """
+    Mide cuánto tarda en reconstruirse el resultado de las comparaciones más recientes (como al
+    pulsar "Ver Resultado").
+
+    Retorna:
+        Diccionario con las comparaciones medidas, las filas reconstruidas y la mediana (p50) y el
+        máximo de la duración en segundos.
+    """
+    with get_connection() as conn:
+        ids = [fila[0] for fila in conn.execute("SELECT id FROM comparaciones ORDER BY id DESC LIMIT ?", (cantidad,))]
+    duraciones, filas = [], 0
+    for id in ids:
+        inicio = time.perf_counter()
+        filas += len(obtener_tabla_resultado(id))
+        duraciones.append(time.perf_counter() - inicio)
+    return {
+        "comparaciones": len(ids),
+        "filas": filas,
+        "p50_s": float(np.median(duraciones)) if duraciones else None,
+        "maximo_s": max(duraciones) if duraciones else None,
+    }
+
+
+def informe_almacenamiento(medir=COMPARACIONES_MEDIDAS):
+    """
+    Tamaño del historial (ver db.history_storage.estadisticas_almacenamiento), si el vacuum
+    incremental está activo y la latencia de reconstrucción de las comparaciones más recientes.
+    """
+    with get_connection() as conn:
+        informe = estadisticas_almacenamiento(conn)
+    informe["vacuum_incremental"] = vacuum_incremental_activo()
+    informe["reconstruccion"] = medir_reconstruccion(medir) if medir else None
+    return informe
+
+
+def _mib(bytes_):
+    return f"{bytes_ / 2**20:,.1f} MiB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retención, compactación y tamaño del historial de comparaciones.")
+    parser.add_argument("--conservar-ultimas", type=int, default=RETENCION_ULTIMAS, help="Comparaciones conservadas por par de archivos.")
+    parser.add_argument("--conservar-dias", type=float, default=RETENCION_DIAS, help="Antigüedad máxima en días de las comparaciones.")
+    parser.add_argument("--compactar", action="store_true", help="Pasa las comparaciones de formatos anteriores a bloques deduplicados.")
+    parser.add_argument("--activar-vacuum-incremental", action="store_true", help="Activa el vacuum incremental (VACUUM completo, una sola vez).")
+    parser.add_argument("--paginas", type=int, default=None, help="Páginas liberadas como máximo (por defecto, todas).")
+    parser.add_argument("--informe", action="store_true", help="Solo muestra el tamaño del historial y la latencia de reconstrucción.")
+    parser.add_argument("--base-datos", default=RUTA_BASE_DATOS, help="Base de datos de comparaciones.")
+    args = parser.parse_args()
+
+    configurar_base_datos(args.base_datos)
+    init_db()
+    if not args.informe:
+        if args.compactar:
+            pendientes = comparaciones_por_compactar()
+            compactadas = sum(compactar_comparacion(id) for id in pendientes)
+            print(f"Comparaciones compactadas: {compactadas} de {len(pendientes)}")
+        if args.activar_vacuum_incremental:
+            print("Vacuum incremental activado." if activar_vacuum_incremental() else "El vacuum incremental ya estaba activo.")
+        resultado = mantener_historial(args.conservar_ultimas, args.conservar_dias, args.paginas)
+        print(f"Comparaciones eliminadas: {resultado['eliminadas']}; espacio liberado: {_mib(resultado['bytes_liberados'])}")
+
+    informe = informe_almacenamiento()
+    print(f"Base de datos: {_mib(informe['bytes_archivo'])} ({_mib(informe['bytes_libres'])} en páginas libres)")
+    if not informe["vacuum_incremental"]:
+        print("  Vacuum incremental inactivo: el espacio libre se reutiliza, pero el archivo no se achica (--activar-vacuum-incremental).")
+    print(f"Comparaciones: {informe['comparaciones']:,} ({informe['comparaciones_xlsx']:,} con xlsx, {_mib(informe['bytes_xlsx'])})")
+    print(
+        f"Bloques de claves: {informe['bloques']:,}, {_mib(informe['bytes_bloques'])} comprimidos "
+        f"({_mib(informe['bytes_claves_originales'])} sin comprimir, {_mib(informe['bytes_bloques_sin_deduplicar'])} sin deduplicar)"
+    )
+    reconstruccion = informe["reconstruccion"]
+    if reconstruccion["comparaciones"]:
+        print(
+            f"Reconstrucción de las últimas {reconstruccion['comparaciones']} comparaciones ({reconstruccion['filas']:,} filas): "
+            f"p50 {reconstruccion['p50_s']:.3f} s, máximo {reconstruccion['maximo_s']:.3f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# interface/background_jobs.py
+
+import streamlit as st
+
+from processing.jobs import ESTADOS_ACTIVOS, avance_de_trabajo, cancelar_trabajo, obtener_trabajo
+
+# Segundos entre actualizaciones del panel mientras hay trabajos en curso
+INTERVALO_ACTUALIZACION = 1.0
+
+def _texto_avance(trabajo):
+    if trabajo["fase"] is None:
+        return f"{trabajo['descripcion']}: {trabajo['estado']}"
+    fraccion, restante = avance_de_trabajo(trabajo)
+    texto = f"{trabajo['descripcion']}: {trabajo['fase']}, {trabajo['filas_procesadas']:,} {trabajo['unidad']}"
+    if trabajo["filas_totales"]:
+        texto += f" de {trabajo['filas_totales']:,}"
+    if restante is not None:
+        texto += f" (~{restante:.0f} s restantes)"
+    return texto
+
+def _panel_trabajos(ids):
+    for id in ids:
+        trabajo = obtener_trabajo(id)
+        if trabajo is None or trabajo["estado"] not in ESTADOS_ACTIVOS:
+            # Terminó: se recarga la página completa para recoger el resultado
+            st.rerun()
+
+        col_avance, col_cancelar = st.columns([5, 1])
+        with col_avance:
+            fraccion, _ = avance_de_trabajo(trabajo)
+            st.progress(fraccion or 0.0, text=_texto_avance(trabajo))
+        with col_cancelar:
+            if trabajo["cancelar"].is_set():
+                st.caption("Cancelando...")
+            elif st.button("Cancelar", key=f"cancelar_trabajo_{id}"):
+                cancelar_trabajo(id)
+
+def mostrar_trabajos(ids):
+    """
+    Muestra el avance de los trabajos en segundo plano de la sesión, con un botón para cancelar cada uno.
+    Mientras haya trabajos activos, el panel se actualiza solo (sin recargar el resto de la página)
+    y, cuando alguno termina, recarga la página para mostrar su resultado.
+
+    Parámetros:
+        ids: Ids de los trabajos de la sesión (ver processing.jobs.enviar_trabajo).
+    """
+    activos = [id for id in ids if (trabajo := obtener_trabajo(id)) is not None and trabajo["estado"] in ESTADOS_ACTIVOS]
+    if activos:
+        st.fragment(_panel_trabajos, run_every=INTERVALO_ACTUALIZACION)(activos)
@@ -1,19 +1,21 @@
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd 
+import pandas as pd
 
-def visualizar_cambios(cambios):
+from processing.analytics import intervalos_variacion
+
+def visualizar_cambios(analitica, clave_vista="reciente"):
     """
-    Genera gráficos para visualizar los tipos de cambios detectados.
+    Genera gráficos para visualizar los tipos de cambios detectados, los cambios por columna y la
+    variación de las columnas numéricas.
+    Se dibujan desde la analítica guardada con la comparación (ver processing.analytics), sin recorrer
+    el resultado: el costo no depende de la cantidad de filas.
     """
-    # Convertir la lista de cambios en un DataFrame
-    cambios_df = pd.DataFrame(cambios, columns=["SKU", "Estado"])
-    
     # Contar los tipos de cambios y crear un gráfico de pastel
-    conteo_cambios = cambios_df['Estado'].value_counts().reset_index()
-    conteo_cambios.columns = ["Estado", "Cantidad"]
-    
+    conteo_cambios = pd.DataFrame(list(analitica["estados"].items()), columns=["Estado", "Cantidad"])
+    conteo_cambios = conteo_cambios[conteo_cambios["Cantidad"] > 0].sort_values("Cantidad", ascending=False)
+
     fig_pie = px.pie(conteo_cambios, names='Estado', values='Cantidad', title="Distribución de Cambios", hole=0.4)
     fig_pie.update_traces(textinfo='percent+label')
 
@@ -34,3 +36,61 @@ def visualizar_cambios(cambios):
     # Mostrar ambos gráficos
     st.plotly_chart(fig_pie, use_container_width=True)
     st.plotly_chart(fig_bar, use_container_width=True)
+
+    columnas = analitica["columnas"]
+    if not columnas:
+        return
+
+    # Celdas cambiadas por columna, de la columna con más cambios a la de menos
+    por_columna = pd.DataFrame(
+        [(columna, datos["cambios"]) for columna, datos in columnas.items()], columns=["Columna", "Cambios"]
+    ).sort_values("Cambios", ascending=False)
+    fig_columnas = go.Figure(go.Bar(
+        x=por_columna["Columna"],
+        y=por_columna["Cambios"],
+        text=por_columna["Cambios"],
+        textposition='auto'
+    ))
+    fig_columnas.update_layout(
+        title="Cambios por Columna",
+        xaxis_title="Columna",
+        yaxis_title="Celdas cambiadas",
+        template="plotly_white"
+    )
+    st.plotly_chart(fig_columnas, use_container_width=True)
+
+    if analitica["claves_mas_cambios"]:
+        st.write("**Claves con más columnas cambiadas**")
+        st.dataframe(
+            pd.DataFrame(analitica["claves_mas_cambios"], columns=["Clave", "Columnas cambiadas"]),
+            use_container_width=True, hide_index=True
+        )
+
+    # Variación de una columna numérica: histograma de la variación relativa y mayores variaciones
+    numericas = [columna for columna, datos in columnas.items() if "histograma" in datos]
+    if not numericas:
+        return
+    columna = st.selectbox("Variación de la columna", numericas, key=f"{clave_vista}_variacion")
+    datos = columnas[columna]
+    fig_variacion = go.Figure(go.Bar(
+        x=intervalos_variacion(),
+        y=datos["histograma"],
+        text=datos["histograma"],
+        textposition='auto'
+    ))
+    fig_variacion.update_layout(
+        title=f"Variación Relativa de {columna}",
+        xaxis_title="Variación",
+        yaxis_title="Celdas",
+        template="plotly_white"
+    )
+    st.plotly_chart(fig_variacion, use_container_width=True)
+    if datos["variacion_media"] is not None:
+        st.caption(
+            f"{datos['aumentos']:,} aumentos y {datos['disminuciones']:,} disminuciones; variación mínima "
+            f"{datos['variacion_minima']:,.4g}, máxima {datos['variacion_maxima']:,.4g} y media {datos['variacion_media']:,.4g}."
+        )
+    st.dataframe(
+        pd.DataFrame(datos["mayores_variaciones"], columns=["Clave", "Valor Anterior", "Valor Nuevo", "Variación"]),
+        use_container_width=True, hide_index=True
+    )
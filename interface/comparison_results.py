@@ -1,22 +1,178 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 
-def mostrar_resultados_comparacion(cambios, cambios_detallados, plantilla_procesada):
+from processing.result import COLUMNAS_DE_REGISTRO, conteo_estados, tabla_cambios, tabla_detallados, tabla_procesada
+
+# Filas enviadas al navegador por cada tabla de resultados
+FILAS_POR_PAGINA = 100
+
+ESTADO_SIN_CAMBIOS = "Sin cambios"
+
+
+def _claves_buscadas(texto):
+    # El texto buscado se prueba también como número: "100" encuentra tanto 100 como "100"
+    claves = [texto]
+    for tipo in (int, float):
+        try:
+            claves.append(tipo(texto))
+        except ValueError:
+            pass
+    return claves
+
+
+def indexar_resultado(resultado):
+    """
+    Prepara un resultado para mostrarlo por páginas: construye, sobre el contenedor compacto,
+    índices por Estado, columna y clave, sin convertir sus valores a objetos Python.
+
+    El resultado indexado se conserva en el servidor (en st.session_state); el navegador recibe
+    solo la página visible de cada tabla, que es lo único que se materializa.
+
+    Parámetros:
+        resultado: Contenedor del resultado de la comparación (ver processing.result).
+
+    Retorna:
+        Diccionario con el contenedor, sus índices y el resumen por Estado y por columna.
+    """
+    cambios = resultado["cambios"]
+    detallados = resultado["detallados"]
+    plantilla = resultado["plantilla"]
+
+    conteo_columnas = detallados["Columna"].value_counts()
+    conteo_columnas = conteo_columnas[(conteo_columnas > 0) & ~conteo_columnas.index.isin(COLUMNAS_DE_REGISTRO)]
+
+    return {
+        "resultado": resultado,
+        "cambios_por_estado": cambios.groupby("Estado", observed=True, sort=False).indices,
+        "plantilla_por_estado": plantilla.groupby("Estado", observed=True, sort=False).indices,
+        "detallados_por_columna": detallados.groupby("Columna", observed=True, sort=False).indices,
+        "cambios_por_clave": pd.Index(cambios["SKU"]),
+        "plantilla_por_clave": pd.Index(plantilla.iloc[:, 0]),
+        "detallados_por_clave": pd.Index(detallados["SKU"]),
+        "resumen_estados": conteo_estados(resultado).rename_axis("Estado").reset_index(name="Cantidad"),
+        "resumen_columnas": conteo_columnas.astype(int).rename_axis("Columna").reset_index(name="Cambios"),
+    }
+
+
+def _posiciones(total, por_grupo=None, grupos=None, por_clave=None, clave=None):
+    """
+    Posiciones (ordenadas) de las filas que cumplen los filtros, sin construir las filas.
+    """
+    posiciones = np.arange(total)
+    if grupos is not None:
+        partes = [por_grupo[grupo] for grupo in grupos if grupo in por_grupo]
+        posiciones = np.sort(np.concatenate(partes)) if partes else posiciones[:0]
+    if clave:
+        encontradas = por_clave.get_indexer_for(_claves_buscadas(clave))
+        posiciones = np.intersect1d(posiciones, encontradas[encontradas >= 0])
+    return posiciones
+
+
+def _para_mostrar(tabla):
+    """
+    Convierte a texto las columnas que mezclan tipos (los valores de "Valor Anterior" y "Valor Nuevo"
+    vienen de distintas columnas). Streamlit haría lo mismo, pero solo después de fallar la conversión
+    a Arrow y registrar el error, en cada recarga.
+    """
+    mixtas = [
+        columna for columna, serie in tabla.items()
+        if serie.dtype == object and pd.api.types.infer_dtype(serie, skipna=True) in ("mixed", "mixed-integer")
+    ]
+    return tabla.astype({columna: "string" for columna in mixtas}) if mixtas else tabla
+
+
+def _mostrar_pagina(construir_filas, posiciones, titulo, clave_widget, construidas):
+    """
+    Muestra una tabla por páginas: solo las filas de la página elegida se construyen
+    (con construir_filas(posiciones)) y llegan al navegador. La última página construida de cada
+    tabla se conserva en `construidas`, de modo que las recargas que no cambian la página no la rehacen.
+    """
+    st.write(f"### {titulo}")
+    total = len(posiciones)
+    if not total:
+        st.info("No hay filas que cumplan los filtros.")
+        return
+    paginas = (total - 1) // FILAS_POR_PAGINA + 1
+    pagina = 1
+    if paginas > 1:
+        pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, key=clave_widget)
+    inicio = (pagina - 1) * FILAS_POR_PAGINA
+    st.caption(f"Filas {inicio + 1}–{min(inicio + FILAS_POR_PAGINA, total)} de {total}")
+    filas = posiciones[inicio:inicio + FILAS_POR_PAGINA]
+    firma = filas.tobytes()
+    if construidas.get(titulo, (None,))[0] != firma:
+        construidas[titulo] = (firma, _para_mostrar(construir_filas(filas)))
+    st.dataframe(construidas[titulo][1], use_container_width=True)
+
+
+def mostrar_resultados_comparacion(resultado_indexado, clave_vista="resultado"):
     """
     Muestra el resumen y los detalles de los cambios detectados, incluyendo una vista de la planilla procesada.
+
+    Primero se muestra el resumen por Estado y por columna; las tablas se filtran por Estado,
+    columna o clave y se envían por páginas. Las filas "Sin cambios" solo se muestran si se piden.
+
+    Parámetros:
+        resultado_indexado: Resultado de indexar_resultado.
+        clave_vista: Prefijo de las claves de los widgets, para mostrar varios resultados en la misma página.
     """
     st.subheader("🔍 Resumen Detallado de Cambios Detectados")
-    
+
+    # Resumen: cantidad de claves por Estado y de celdas modificadas por columna
+    resumen_estados = resultado_indexado["resumen_estados"]
+    metricas = st.columns(max(len(resumen_estados), 1))
+    for metrica, (estado, cantidad) in zip(metricas, resumen_estados.itertuples(index=False)):
+        metrica.metric(estado, f"{cantidad:,}")
+    if not resultado_indexado["resumen_columnas"].empty:
+        st.write("**Celdas modificadas por columna**")
+        st.dataframe(resultado_indexado["resumen_columnas"], use_container_width=True, hide_index=True)
+
+    # Filtros
+    estados = list(resumen_estados["Estado"])
+    columnas = list(resultado_indexado["detallados_por_columna"])
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        estados_elegidos = st.multiselect(
+            "Estado", estados, default=[estado for estado in estados if estado != ESTADO_SIN_CAMBIOS], key=f"{clave_vista}_estados"
+        )
+    with col2:
+        columna_elegida = st.selectbox("Columna", ["(todas)"] + columnas, key=f"{clave_vista}_columna")
+    with col3:
+        clave_buscada = st.text_input("Clave", key=f"{clave_vista}_clave").strip()
+
+    resultado = resultado_indexado["resultado"]
+    construidas = resultado_indexado.setdefault("paginas_construidas", {})
+
     # Mostrar resumen de cambios generales por SKU
-    st.write("### Cambios Generales por SKU")
-    cambios_df = pd.DataFrame(cambios, columns=["SKU", "Estado"])
-    st.dataframe(cambios_df, use_container_width=True)
-    
+    _mostrar_pagina(
+        lambda filas: tabla_cambios(resultado, filas),
+        _posiciones(len(resultado["cambios"]), resultado_indexado["cambios_por_estado"], estados_elegidos, resultado_indexado["cambios_por_clave"], clave_buscada),
+        "Cambios Generales por SKU",
+        f"{clave_vista}_pagina_cambios",
+        construidas,
+    )
+
     # Mostrar detalles específicos de cada cambio en columnas separadas
-    st.write("### Cambios Detallados por Columna")
-    cambios_detallados_df = pd.DataFrame(cambios_detallados)
-    st.dataframe(cambios_detallados_df, use_container_width=True)
-    
-    # Vista previa del DataFrame procesado con columnas adicionales para valor anterior y valor nuevo
-    st.write("### Vista Completa de la Planilla Procesada")
-    st.dataframe(plantilla_procesada, use_container_width=True)
+    _mostrar_pagina(
+        lambda filas: tabla_detallados(resultado, filas),
+        _posiciones(
+            len(resultado["detallados"]),
+            resultado_indexado["detallados_por_columna"],
+            None if columna_elegida == "(todas)" else [columna_elegida],
+            resultado_indexado["detallados_por_clave"],
+            clave_buscada,
+        ),
+        "Cambios Detallados por Columna",
+        f"{clave_vista}_pagina_detallados",
+        construidas,
+    )
+
+    # Vista del DataFrame procesado con columnas adicionales para valor anterior y valor nuevo
+    _mostrar_pagina(
+        lambda filas: tabla_procesada(resultado, filas),
+        _posiciones(len(resultado["plantilla"]), resultado_indexado["plantilla_por_estado"], estados_elegidos, resultado_indexado["plantilla_por_clave"], clave_buscada),
+        "Vista Completa de la Planilla Procesada",
+        f"{clave_vista}_pagina_plantilla",
+        construidas,
+    )
@@ -1,21 +1,131 @@
 # interface/cargar_archivo.py
 
+from io import BytesIO
+
 import streamlit as st
 import pandas as pd
 
-def cargar_archivo(file):
+from performance.profiler import ETAPA_LECTURA, etapa
+from processing.ingest import detectar_formato, leer_tabla, listar_hojas, motor_excel, variante_de_lectura
+from processing.key_matching import UMBRAL_CONFIANZA
+from processing.parse_cache import leer_con_cache
+from processing.sheets import emparejar_hojas
+
+def _leer_midiendo(file, columnas, tipos, detalle, registro):
+    with etapa(ETAPA_LECTURA, detalle=detalle, registro=registro) as medicion:
+        df = leer_tabla(file, file.name, columnas, tipos)
+        medicion["filas"] = len(df)
+    return df
+
+def cargar_archivo(file, columnas=None, tipos=None, registro=None):
     """
-    Carga un archivo Excel en un DataFrame de Pandas.
+    Carga un archivo Excel, CSV, Parquet o Feather en un DataFrame de Pandas.
+    El resultado se guarda en caché según el contenido del archivo, por lo que volver a subir
+    el mismo archivo (o volver a ejecutar la página) no lo interpreta de nuevo.
     
     Parámetros:
         file: Archivo subido por el usuario.
+        columnas: Lista opcional de columnas a leer.
+        tipos: Diccionario opcional columna -> tipo.
+        registro: Registro de rendimiento de la sesión (ver performance.profiler), para medir la lectura.
         
     Retorna:
         DataFrame con los datos del archivo, o None si ocurre un error.
     """
     try:
-        df = pd.read_excel(file)
+        formato = detectar_formato(file.name)
+        motor = motor_excel() if formato in ("xls", "xlsx") else None
+        detalle = f"{formato}{f', {motor}' if motor else ''}"
+        df = leer_con_cache(
+            file.getvalue(),
+            lambda: _leer_midiendo(file, columnas, tipos, detalle, registro),
+            variante_de_lectura(file.name, columnas, tipos)
+        )
         return df
     except Exception as e:
         st.error(f"Error al cargar el archivo: {e}")
         return None
+
+def opciones_de_lectura():
+    """
+    Muestra los controles opcionales de lectura y retorna (columnas, tipos) para cargar_archivo.
+    Las columnas se indican separadas por coma y los tipos como "columna:tipo".
+    """
+    with st.expander("Opciones de lectura"):
+        texto_columnas = st.text_input("Columnas a leer (separadas por coma, vacío para todas)")
+        texto_tipos = st.text_input("Tipos por columna (por ejemplo: SKU:str, Precio:float64)")
+
+    columnas = [columna.strip() for columna in texto_columnas.split(",") if columna.strip()] or None
+    tipos = {}
+    for par in texto_tipos.split(","):
+        if ":" in par:
+            columna, tipo = par.rsplit(":", 1)
+            tipos[columna.strip()] = tipo.strip()
+    return columnas, tipos or None
+
+def opciones_de_clave(columnas):
+    """
+    Muestra los controles de la clave de comparación y retorna las opciones para comparar_y_guardar:
+    columnas de la clave (por defecto, la primera columna) y emparejamiento de claves reformateadas.
+    """
+    with st.expander("Clave de comparación"):
+        columnas_clave = st.multiselect("Columnas que forman la clave", columnas, default=columnas[:1])
+        clave_difusa = st.checkbox(
+            "Emparejar claves reformateadas (p. ej. AB-001 y AB001)",
+            help="Las claves sin coincidencia exacta se emparejan por su forma normalizada y por similitud de texto."
+        )
+        umbral_clave = st.slider("Confianza mínima del emparejamiento", 0.3, 1.0, UMBRAL_CONFIANZA, 0.05, disabled=not clave_difusa)
+    return {"columnas_clave": columnas_clave or None, "clave_difusa": clave_difusa, "umbral_clave": umbral_clave}
+
+def opciones_de_alineacion(plantilla_df, actualizada_df):
+    """
+    Muestra los controles de la alineación de columnas y retorna las opciones para comparar_y_guardar:
+    si se quitan los espacios sobrantes de los textos y la tolerancia de las columnas numéricas.
+    """
+    numericas = [
+        columna for columna in plantilla_df.columns[1:]
+        if columna in actualizada_df.columns and pd.api.types.is_numeric_dtype(plantilla_df[columna])
+    ]
+    with st.expander("Alineación de columnas y tolerancias"):
+        recortar_textos = st.checkbox("Quitar espacios al inicio y al final de los textos", value=True)
+        columnas = st.multiselect(
+            "Columnas numéricas con tolerancia", numericas,
+            help="Las diferencias menores o iguales a la tolerancia no cuentan como cambio."
+        )
+        tolerancias = {
+            columna: st.number_input(f"Tolerancia de {columna}", min_value=0.0, value=0.01, format="%g", key=f"tolerancia_{columna}")
+            for columna in columnas
+        }
+    return {"tolerancias": tolerancias or None, "recortar_textos": recortar_textos}
+
+def hojas_de_archivo(file):
+    """
+    Retorna los nombres de las hojas de un libro de Excel subido (lista vacía para los demás formatos).
+    Se leen una sola vez por archivo subido: las recargas de la página no vuelven a abrir el libro.
+    """
+    hojas = st.session_state.setdefault("hojas_por_archivo", {})
+    if file.file_id not in hojas:
+        try:
+            hojas[file.file_id] = listar_hojas(BytesIO(file.getvalue()), file.name)
+        except Exception as e:
+            st.error(f"Error al leer las hojas del archivo: {e}")
+            return []
+    return hojas[file.file_id]
+
+def elegir_hojas(hojas_plantilla, hojas_actualizada):
+    """
+    Muestra cómo se emparejan por nombre las hojas de ambos libros y permite elegir cuáles comparar.
+
+    Retorna:
+        Lista de pares (hoja_referencia, hoja_actualizado) elegidos.
+    """
+    emparejamiento = emparejar_hojas(hojas_plantilla, hojas_actualizada)
+    st.write("### Hojas de los Libros")
+    if emparejamiento["solo_referencia"]:
+        st.warning(f"Hojas sin pareja en el archivo actualizado: {', '.join(emparejamiento['solo_referencia'])}")
+    if emparejamiento["solo_actualizado"]:
+        st.warning(f"Hojas sin pareja en el archivo de referencia: {', '.join(emparejamiento['solo_actualizado'])}")
+    pares = dict(emparejamiento["pares"])
+    # Solo se leen las hojas elegidas, al comparar
+    elegidas = st.multiselect("Hojas a comparar", list(pares), default=list(pares))
+    return [(hoja, pares[hoja]) for hoja in elegidas]
@@ -0,0 +1,42 @@
+# interface/version_timeline.py
+
+import streamlit as st
+
+from db.crud import obtener_eventos_clave, obtener_linea_tiempo
+from processing.snapshots import con_nombres_de_version, valores_por_version
+
+# Claves con cambios que se muestran de la línea de tiempo de una serie (las demás se consultan por clave)
+CLAVES_MOSTRADAS = 1_000
+
+def mostrar_serie_versiones(serie):
+    """
+    Muestra una serie de versiones guardada: resumen por versión, línea de tiempo de las claves con
+    cambios y la historia de una clave (valores en cada versión), leída de la base de datos.
+
+    Parámetros:
+        serie: Datos de la serie (ver db.crud.obtener_serie_versiones).
+    """
+    st.write(f"### Versiones de {serie['nombre']} (ID {serie['id']}, {len(serie['versiones'])} versiones)")
+    st.dataframe(serie["resumen"], use_container_width=True, hide_index=True)
+
+    linea_tiempo = obtener_linea_tiempo(serie["id"], solo_con_cambios=True, limite=CLAVES_MOSTRADAS + 1)
+    st.write("**Claves con cambios o eliminadas**")
+    st.dataframe(
+        con_nombres_de_version(linea_tiempo.head(CLAVES_MOSTRADAS), serie["versiones"]).rename(columns={
+            "clave": serie["clave"], "primera_version": "Primera versión", "ultimo_cambio": "Último cambio",
+            "eliminada_en": "Eliminada en", "versiones_presente": "Versiones presente", "cambios": "Versiones con cambios",
+        }),
+        use_container_width=True, hide_index=True
+    )
+    if len(linea_tiempo) > CLAVES_MOSTRADAS:
+        st.caption(f"Se muestran las primeras {CLAVES_MOSTRADAS:,} claves; las demás se consultan por clave.")
+
+    clave = st.text_input("Historia de una clave en las versiones:", key=f"serie_clave_{serie['id']}")
+    if clave:
+        eventos = obtener_eventos_clave(clave.strip(), serie["id"])
+        if eventos.empty:
+            st.info("La clave no aparece en ninguna versión de la serie.")
+            return
+        st.dataframe(valores_por_version(eventos, serie["versiones"], serie["columnas"]), use_container_width=True, hide_index=True)
+        eventos = eventos.assign(version=eventos["version"].map(lambda version: serie["versiones"][version]))
+        st.dataframe(eventos.drop(columns=["serie_id", "clave"]), use_container_width=True, hide_index=True)
@@ -1,134 +1,476 @@
+import os
 import streamlit as st
 import pandas as pd
-from io import BytesIO
 from datetime import datetime
-from streamlit.components.v1 import html
+from io import BytesIO
 
-from db.db import init_db
-from db.crud import insertar_comparacion, obtener_comparaciones, eliminar_comparacion, obtener_resultado_comparacion
-from interface.chart_visualization import visualizar_cambios
-from interface.comparison_results import mostrar_resultados_comparacion
-from interface.file_upload import cargar_archivo
-from performance.performance_test import medir_tiempo_ejecucion, mostrar_datos_rendimiento
+from db.db import RUTA_BASE_DATOS, init_db
+from db.maintenance import informe_almacenamiento, mantener_historial
+from db.crud import insertar_comparacion, insertar_comparaciones, obtener_pagina_comparaciones, eliminar_comparacion, obtener_resultado_comparacion, obtener_tabla_resultado, obtener_cambios_clave, obtener_emparejamientos, obtener_esquema, obtener_analitica, guardar_analitica, insertar_serie_versiones, obtener_series_versiones, obtener_serie_versiones, insertar_huellas, obtener_huellas, insertar_mediciones, obtener_estadisticas_mediciones
+from interface.comparison_results import mostrar_resultados_comparacion, indexar_resultado
+from interface.file_upload import cargar_archivo, opciones_de_lectura, opciones_de_clave, opciones_de_alineacion, hojas_de_archivo, elegir_hojas
+from interface.background_jobs import mostrar_trabajos
+from processing.analytics import analitica_de_resultado
+from processing.diff_engine import comparar_listas_dinamico, MOTORES, MOTOR_VECTORIZADO
+from processing.fingerprint import calcular_huellas, hash_contenido
+from processing.ingest import EXTENSIONES_ADMITIDAS, detectar_formato, leer_tabla, variante_de_lectura
+from processing.key_matching import UMBRAL_CONFIANZA, preparar_claves
+from processing.schema import COLUMNAS_TIPOS, alinear_esquemas, esquema_como_datos
+from processing.result import resultado_desde_tabla
+from processing.sheets import comparar_hojas, resumen_por_hoja
+from processing.snapshots import comparar_versiones
+from processing.parse_cache import leer_con_cache
+from processing.export import FORMATOS_EXPORTACION, bytes_exportados, bytes_libro_por_hojas
+from processing.jobs import ESTADO_TERMINADO, ESTADO_CANCELADO, ESTADOS_ACTIVOS, enviar_trabajo, obtener_trabajo, iniciar_fase, avanzar
+from performance.profiler import ETAPA_COMPARAR, ETAPA_EXPORTACION, ETAPA_GUARDADO, ETAPA_LECTURA, ETAPA_RECONSTRUCCION, ETAPA_VISUALIZACION, crear_registro, etapa
 
-# Configuración de la base de datos
-st.set_page_config(page_title="Diffly", page_icon="📊", layout="wide")
-init_db()
+# Las tablas se crean una sola vez por proceso (y base de datos), no en cada recarga de la página
+@st.cache_resource(show_spinner=False)
+def preparar_base_datos(ruta):
+    init_db()
+    # Retención configurada por variables de entorno (DIFFLY_RETENCION_ULTIMAS, DIFFLY_RETENCION_DIAS)
+    mantener_historial()
+    return ruta
 
 # Inicializar estados en session_state
-if "reload_count" not in st.session_state:
-    st.session_state.reload_count = 0
-if "show_download_dialog" not in st.session_state:
-    st.session_state.show_download_dialog = False
-if "resultado_bytes" not in st.session_state:
-    st.session_state.resultado_bytes = None
-if "id_seleccionado" not in st.session_state:
-    st.session_state.id_seleccionado = None
-if "tiempos_registro" not in st.session_state:
-    st.session_state.tiempos_registro = {}
-
-# Función para convertir DataFrame en BytesIO para almacenamiento en la DB
-def convertir_a_bytes(df):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
-    output.seek(0)
-    return output.read()
-
-# Función para comparar listas y detectar cambios
-def comparar_listas_dinamico(plantilla_df, actualizada_df):
-    plantilla_procesada = plantilla_df.copy()
-    plantilla_procesada["Estado"] = "Sin cambios"
-    plantilla_procesada["Detalles de Cambios"] = ""
-    
-    cambios = []
-    cambios_detallados = []
-
-    clave_identificacion = plantilla_df.columns[0]
-    plantilla_dict = plantilla_df.set_index(clave_identificacion).to_dict("index")
-    
-    for _, row_actualizada in actualizada_df.iterrows():
-        id_valor = row_actualizada[clave_identificacion]
-        
-        if id_valor in plantilla_dict:
-            fila_original = plantilla_dict[id_valor]
-            cambios_en_fila = False
-            detalles_cambios = []
-
-            for columna in plantilla_df.columns:
-                valor_anterior = fila_original.get(columna, None)
-                valor_nuevo = row_actualizada[columna]
-                
-                if pd.notnull(valor_anterior) and pd.notnull(valor_nuevo) and valor_anterior != valor_nuevo:
-                    cambios_en_fila = True
-                    detalles_cambios.append(f"{columna}: {valor_anterior} -> {valor_nuevo}")
-                    
-                    plantilla_procesada.loc[plantilla_procesada[clave_identificacion] == id_valor, f"{columna} (Valor Anterior)"] = valor_anterior
-                    plantilla_procesada.loc[plantilla_procesada[clave_identificacion] == id_valor, f"{columna} (Valor Nuevo)"] = valor_nuevo
-                    cambios_detallados.append({
-                        "SKU": id_valor,
-                        "Columna": columna,
-                        "Valor Anterior": valor_anterior,
-                        "Valor Nuevo": valor_nuevo
-                    })
-            
-            if cambios_en_fila:
-                plantilla_procesada.loc[plantilla_procesada[clave_identificacion] == id_valor, "Estado"] = "Actualizado"
-                plantilla_procesada.loc[plantilla_procesada[clave_identificacion] == id_valor, "Detalles de Cambios"] = "; ".join(detalles_cambios)
-                cambios.append((id_valor, "Actualizado"))
-            else:
-                cambios.append((id_valor, "Sin cambios"))
+def inicializar_sesion():
+    if "reload_count" not in st.session_state:
+        st.session_state.reload_count = 0
+    if "show_download_dialog" not in st.session_state:
+        st.session_state.show_download_dialog = False
+    if "id_seleccionado" not in st.session_state:
+        st.session_state.id_seleccionado = None
+    if "registro_rendimiento" not in st.session_state:
+        # Mediciones de la sesión (acotadas); cada etapa raíz también se guarda en la base de datos
+        st.session_state.registro_rendimiento = crear_registro(persistir=insertar_mediciones)
+    if "historial_cursores" not in st.session_state:
+        st.session_state.historial_cursores = [None]
+    if "historial_filtros" not in st.session_state:
+        st.session_state.historial_filtros = None
+    if "resultado_reciente" not in st.session_state:
+        st.session_state.resultado_reciente = None
+    if "resultado_historial" not in st.session_state:
+        st.session_state.resultado_historial = None
+    if "serie_versiones" not in st.session_state:
+        # Serie de versiones abierta (ver interface/version_timeline.py)
+        st.session_state.serie_versiones = None
+    if "trabajos" not in st.session_state:
+        # Ids de las comparaciones en segundo plano de la sesión que todavía no se recogieron
+        st.session_state.trabajos = []
+
+# Función para exportar el resultado de una comparación (xlsx, CSV o Parquet) como etapa medida.
+# Se ejecuta al pulsar la descarga, fuera del script de la sesión: el registro se recibe como argumento.
+def exportar_con_medicion(resultado, formato, registro):
+    with etapa(ETAPA_EXPORTACION, filas=len(resultado["plantilla"]), detalle=formato, registro=registro):
+        return bytes_exportados(resultado, formato)
+
+# Función para obtener el archivo de una comparación guardada; se genera solo al descargarlo
+def bytes_de_comparacion(id, formato, registro):
+    resultado_bytes = obtener_resultado_comparacion(id) if formato == "xlsx" else None
+    if resultado_bytes is None:
+        resultado_bytes = exportar_con_medicion(resultado_desde_tabla(obtener_tabla_resultado(id)), formato, registro)
+    return resultado_bytes
+
+# Función para obtener las huellas de un archivo, reutilizando las guardadas en la base de datos.
+# Se identifican por el contenido y las opciones de lectura, igual que la tabla en la caché de cargar_archivo.
+def obtener_o_calcular_huellas(archivo, df, columnas, columnas_lectura=None, tipos_lectura=None):
+    hash_archivo = hash_contenido(archivo.getvalue(), variante_de_lectura(archivo.name, columnas_lectura, tipos_lectura))
+    huellas = obtener_huellas(hash_archivo, columnas)
+    if huellas is None or len(huellas["filas"]) != len(df):
+        huellas = calcular_huellas(df, columnas)
+    return hash_archivo, huellas
+
+# Copia de un archivo subido para leerlo desde un trabajo en segundo plano sin compartir su posición con el script
+def copiar_archivo(archivo):
+    copia = BytesIO(archivo.getvalue())
+    copia.name = archivo.name
+    return copia
+
+# Función para guardar el resultado de una comparación en la base de datos (dentro de un trabajo)
+def guardar_resultado(trabajo, resultado, plantilla_file, actualizada_file, huellas=None):
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    iniciar_fase(trabajo, "guardado", len(resultado["plantilla"]))
+    with etapa(ETAPA_GUARDADO, filas=len(resultado["plantilla"])):
+        comparacion_id = insertar_comparacion(
+            fecha, plantilla_file.name, actualizada_file.name, resultado,
+            progreso=lambda filas: avanzar(trabajo, filas)
+        )
+        for hash_archivo, huellas_archivo in (huellas or {}).values():
+            insertar_huellas(comparacion_id, hash_archivo, huellas_archivo)
+    return comparacion_id
+
+# Comparación y guardado en segundo plano; retorna el id de la comparación guardada.
+# Se ejecuta en un hilo del grupo de processing/jobs.py: no debe usar funciones de Streamlit.
+def comparar_y_guardar(trabajo, plantilla_file, actualizada_file, plantilla_df=None, actualizada_df=None, motor=MOTOR_VECTORIZADO, trabajadores=1,
+                       columnas_clave=None, clave_difusa=False, umbral_clave=UMBRAL_CONFIANZA, tolerancias=None, recortar_textos=True,
+                       columnas_lectura=None, tipos_lectura=None):
+    registro = trabajo["registro"]
+    if plantilla_df is None:
+        # Archivos xlsx muy grandes: lectura por bloques y comparación por particiones en disco
+        from processing.streaming import comparar_archivos_por_bloques
+        # Cada partición se guarda al compararla: el resultado completo no se arma en memoria
+        iniciar_fase(trabajo, "comparación y guardado")
+        with etapa(ETAPA_COMPARAR, detalle="por bloques", registro=registro) as medicion:
+            def guardadas(filas):
+                medicion["filas"] = filas
+                avanzar(trabajo, filas)
+            fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            return comparar_archivos_por_bloques(plantilla_file, actualizada_file, fecha, progreso=guardadas)
+
+    huellas = {}
+    iniciar_fase(trabajo, "comparación", len(plantilla_df) + len(actualizada_df))
+    # Etapa medida: comparación (con sus subetapas) y guardado del resultado
+    detalle = f"en paralelo, {trabajadores} procesos" if trabajadores > 1 else motor
+    with etapa(ETAPA_COMPARAR, filas=len(plantilla_df) + len(actualizada_df), detalle=detalle, registro=registro):
+        # Columnas emparejadas por nombre y cada par convertido a un tipo común antes de comparar
+        esquema = alinear_esquemas(plantilla_df, actualizada_df, tolerancias, recortar_textos)
+        # Las huellas se calculan sobre los archivos tal como se leyeron: sirven si las columnas coinciden
+        mismas_columnas = not (esquema["renombradas"] or esquema["agregadas"] or esquema["eliminadas"])
+        archivos_df = {"plantilla": plantilla_df, "actualizada": actualizada_df}
+
+        # Clave compuesta o emparejamiento de claves reformateadas: se agrega una primera columna de clave
+        plantilla_preparada, actualizada_df, emparejamientos = preparar_claves(
+            esquema["plantilla"], esquema["actualizada"], columnas_clave, clave_difusa, umbral_clave
+        )
+        clave_propia = plantilla_preparada is not esquema["plantilla"]
+        plantilla_df = plantilla_preparada
+        if trabajadores > 1:
+            # Comparación repartida por clave entre varios procesos
+            from processing.parallel import comparar_en_paralelo
+            resultado = comparar_en_paralelo(plantilla_df, actualizada_df, trabajadores=trabajadores, tolerancias=tolerancias)
         else:
-            nueva_fila = row_actualizada.to_dict()
-            nueva_fila["Estado"] = "Nuevo"
-            nueva_fila["Detalles de Cambios"] = "Nuevo registro"
-            
-            for columna in plantilla_df.columns:
-                nueva_fila[f"{columna} (Valor Anterior)"] = None
-                nueva_fila[f"{columna} (Valor Nuevo)"] = nueva_fila[columna]
-            
-            plantilla_procesada = pd.concat([plantilla_procesada, pd.DataFrame([nueva_fila])], ignore_index=True)
-            cambios.append((id_valor, "Nuevo"))
-            cambios_detallados.append({
-                "SKU": id_valor,
-                "Columna": "Nuevo registro",
-                "Valor Anterior": None,
-                "Valor Nuevo": "Nuevo registro"
-            })
-    
-    columnas_finales = [col for col in plantilla_procesada.columns if "(Valor Anterior)" in col or "(Valor Nuevo)" in col or col in [clave_identificacion, "Estado", "Detalles de Cambios"]]
-    plantilla_procesada = plantilla_procesada[columnas_finales]
-    
-    return plantilla_procesada, cambios, cambios_detallados
+            # Huellas de ambos archivos para omitir filas y columnas sin cambios (solo si las tablas
+            # son las de los archivos: la clave emparejada depende también del otro archivo)
+            if motor == MOTOR_VECTORIZADO and not clave_propia and mismas_columnas:
+                columnas = list(plantilla_df.columns)
+                huellas["plantilla"] = obtener_o_calcular_huellas(
+                    plantilla_file, archivos_df["plantilla"], columnas, columnas_lectura, tipos_lectura
+                )
+                huellas["actualizada"] = obtener_o_calcular_huellas(
+                    actualizada_file, archivos_df["actualizada"], columnas, columnas_lectura, tipos_lectura
+                )
+
+            resultado = comparar_listas_dinamico(
+                plantilla_df,
+                actualizada_df,
+                motor=motor,
+                huellas_plantilla=huellas["plantilla"][1] if huellas else None,
+                huellas_actualizada=huellas["actualizada"][1] if huellas else None,
+                tolerancias=tolerancias
+            )
+        resultado["emparejamientos"] = emparejamientos
+        resultado["esquema"] = esquema_como_datos(esquema)
+        avanzar(trabajo, len(plantilla_df) + len(actualizada_df))
+
+        return guardar_resultado(trabajo, resultado, plantilla_file, actualizada_file, huellas)
+
+# Comparación de las hojas elegidas de dos libros, en varios procesos, y guardado de una comparación
+# por hoja en una sola transacción; retorna los ids guardados por hoja y los errores por hoja.
+# Se ejecuta en un hilo del grupo de processing/jobs.py: no debe usar funciones de Streamlit.
+def comparar_hojas_y_guardar(trabajo, plantilla_file, actualizada_file, pares, motor=MOTOR_VECTORIZADO, trabajadores=1, columnas=None, tipos=None):
+    registro = trabajo["registro"]
+    iniciar_fase(trabajo, "comparación por hojas", len(pares), unidad="hojas")
+    terminadas = []
+
+    def al_terminar(salida):
+        # Las etapas de cada hoja se midieron en su proceso
+        registro["mediciones"].extend(salida["mediciones"])
+        if registro["persistir"] is not None and salida["mediciones"]:
+            registro["persistir"](salida["mediciones"])
+        terminadas.append(salida["hoja"])
+        avanzar(trabajo, len(terminadas))
+
+    # Cada hoja registra sus propias etapas de lectura y comparación (ver processing/sheets.py)
+    salidas = comparar_hojas(
+        plantilla_file.getvalue(), plantilla_file.name, actualizada_file.getvalue(), actualizada_file.name, pares,
+        trabajadores=trabajadores, motor=motor, columnas=columnas, tipos=tipos, al_terminar=al_terminar
+    )
+    correctas = [salida for salida in salidas if salida["resultado"] is not None]
+    filas = sum(len(salida["resultado"]["plantilla"]) for salida in correctas)
+
+    ids = []
+    if correctas:
+        iniciar_fase(trabajo, "guardado", filas)
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with etapa(ETAPA_GUARDADO, filas=filas, detalle=f"{len(correctas)} hojas", registro=registro):
+            ids = insertar_comparaciones([
+                (fecha, plantilla_file.name, actualizada_file.name, salida["resultado"], salida["hoja"]) for salida in correctas
+            ])
+        avanzar(trabajo, filas)
+    return {
+        "hojas": {salida["hoja"]: comparacion_id for salida, comparacion_id in zip(correctas, ids)},
+        "errores": {salida["hoja"]: salida["error"] for salida in salidas if salida["error"] is not None},
+    }
+
+# Comparación de N versiones ordenadas en una sola pasada y guardado de la serie; cada archivo se lee
+# una sola vez (y se reutiliza de la caché si ya se leyó). Se ejecuta en un hilo del grupo de trabajos.
+def comparar_versiones_y_guardar(trabajo, archivos, nombre, columnas=None, tipos=None):
+    registro = trabajo["registro"]
+    iniciar_fase(trabajo, "lectura", len(archivos), unidad="versiones")
+    tablas = []
+    for numero, archivo in enumerate(archivos, 1):
+        with etapa(ETAPA_LECTURA, detalle=f"versión, {detectar_formato(archivo.name)}", registro=registro) as medicion:
+            tablas.append(leer_con_cache(
+                archivo.getvalue(), lambda: leer_tabla(archivo, archivo.name, columnas, tipos), repr(("versión", columnas, tipos))
+            ))
+            medicion["filas"] = len(tablas[-1])
+        avanzar(trabajo, numero)
+
+    filas = sum(len(tabla) for tabla in tablas)
+    iniciar_fase(trabajo, "comparación", filas)
+    with etapa(ETAPA_COMPARAR, filas=filas, detalle=f"{len(tablas)} versiones", registro=registro):
+        resultado = comparar_versiones(tablas, [archivo.name for archivo in archivos])
+
+    iniciar_fase(trabajo, "guardado", len(resultado["eventos"]), unidad="eventos")
+    with etapa(ETAPA_GUARDADO, filas=len(resultado["eventos"]), detalle="versiones", registro=registro):
+        serie_id = insertar_serie_versiones(
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"), nombre, resultado, progreso=lambda eventos: avanzar(trabajo, eventos)
+        )
+    return {"serie_id": serie_id}
+
+# Función para enviar una comparación a segundo plano; el avance se muestra con mostrar_trabajos
+def enviar_comparacion(plantilla_file, actualizada_file, funcion=comparar_y_guardar, **opciones):
+    try:
+        id_trabajo = enviar_trabajo(
+            funcion,
+            f"{plantilla_file.name} → {actualizada_file.name}",
+            copiar_archivo(plantilla_file),
+            copiar_archivo(actualizada_file),
+            registro=st.session_state.registro_rendimiento,
+            **opciones
+        )
+        st.session_state.trabajos.append(id_trabajo)
+    except RuntimeError as e:
+        st.error(str(e))
+
+# Función para recoger las comparaciones terminadas: el resultado se lee por id del historial
+def recoger_trabajos_terminados():
+    for id_trabajo in list(st.session_state.trabajos):
+        trabajo = obtener_trabajo(id_trabajo)
+        if trabajo is not None and trabajo["estado"] in ESTADOS_ACTIVOS:
+            continue
+        st.session_state.trabajos.remove(id_trabajo)
+        if trabajo is None:
+            continue
+        if trabajo["estado"] == ESTADO_TERMINADO and isinstance(trabajo["resultado"], dict) and "serie_id" in trabajo["resultado"]:
+            st.session_state.serie_versiones = trabajo["resultado"]["serie_id"]
+            st.success(f"Serie de versiones guardada en la base de datos (ID {trabajo['resultado']['serie_id']}).")
+        elif trabajo["estado"] == ESTADO_TERMINADO and isinstance(trabajo["resultado"], dict):
+            recoger_hojas(trabajo)
+            st.session_state.reload_count += 1  # Incrementar contador para recarga
+        elif trabajo["estado"] == ESTADO_TERMINADO:
+            comparacion_id = trabajo["resultado"]
+            try:
+                # El resultado queda en el servidor: cada recarga muestra solo las páginas visibles
+                st.session_state.resultado_reciente = {
+                    "fecha": datetime.fromtimestamp(trabajo["fin"]).strftime("%Y-%m-%d %H:%M:%S"),
+                    "id": comparacion_id,
+                    "indexado": indexar_resultado(resultado_desde_tabla(obtener_tabla_resultado(comparacion_id))),
+                    "emparejamientos": obtener_emparejamientos(comparacion_id),
+                    "esquema": obtener_esquema(comparacion_id),
+                    "analitica": obtener_analitica(comparacion_id),
+                }
+                st.success(f"Resultados guardados en la base de datos (ID {comparacion_id}).")
+            except Exception as e:
+                st.error(f"Error al cargar el resultado de la comparación: {e}")
+            st.session_state.reload_count += 1  # Incrementar contador para recarga
+        elif trabajo["estado"] == ESTADO_CANCELADO:
+            st.warning(f"Comparación cancelada: {trabajo['descripcion']}")
+        else:
+            st.error(f"Error al comparar los archivos: {trabajo['error']}")
+
+# Función para recoger una comparación por hojas terminada: una comparación guardada por hoja
+def recoger_hojas(trabajo):
+    salida = trabajo["resultado"]
+    for hoja, error in salida["errores"].items():
+        st.error(f"Error al comparar la hoja {hoja}: {error}")
+    if not salida["hojas"]:
+        return
+    try:
+        st.session_state.resultado_reciente = {
+            "fecha": datetime.fromtimestamp(trabajo["fin"]).strftime("%Y-%m-%d %H:%M:%S"),
+            "hojas": {
+                hoja: {
+                    "id": comparacion_id,
+                    "indexado": indexar_resultado(resultado_desde_tabla(obtener_tabla_resultado(comparacion_id))),
+                    "esquema": obtener_esquema(comparacion_id),
+                    "analitica": obtener_analitica(comparacion_id),
+                }
+                for hoja, comparacion_id in salida["hojas"].items()
+            },
+        }
+        ids = ", ".join(str(comparacion_id) for comparacion_id in salida["hojas"].values())
+        st.success(f"Resultados de {len(salida['hojas'])} hojas guardados en la base de datos (IDs {ids}).")
+    except Exception as e:
+        st.error(f"Error al cargar el resultado de la comparación: {e}")
+
+# Función para mostrar las claves emparejadas sin coincidencia exacta, con su confianza
+def mostrar_emparejamientos(emparejamientos):
+    if emparejamientos is None or emparejamientos.empty:
+        return
+    with st.expander(f"Claves emparejadas sin coincidencia exacta ({len(emparejamientos)})"):
+        st.dataframe(emparejamientos, use_container_width=True, hide_index=True)
+
+# Función para mostrar la alineación de columnas de una comparación: columnas renombradas,
+# agregadas y eliminadas entre los archivos, y tipos convertidos a uno común
+def mostrar_esquema(esquema):
+    if not esquema:
+        return
+    if esquema["agregadas"]:
+        st.warning(f"Columnas solo en el archivo actualizado: {', '.join(esquema['agregadas'])}")
+    if esquema["eliminadas"]:
+        st.warning(f"Columnas solo en el archivo de referencia: {', '.join(esquema['eliminadas'])}")
+    if esquema["renombradas"]:
+        st.info("Columnas emparejadas por nombre: " + ", ".join(f"{original} → {columna}" for original, columna in esquema["renombradas"].items()))
+    if esquema["tipos"]:
+        with st.expander(f"Tipos convertidos antes de comparar ({len(esquema['tipos'])})"):
+            st.dataframe(pd.DataFrame(esquema["tipos"], columns=COLUMNAS_TIPOS), use_container_width=True, hide_index=True)
+
+# Función para exportar un libro comparado por hojas (una hoja del xlsx por hoja comparada)
+def exportar_hojas_con_medicion(resultados, registro):
+    filas = sum(len(resultado["plantilla"]) for resultado in resultados.values())
+    with etapa(ETAPA_EXPORTACION, filas=filas, detalle=f"xlsx, {len(resultados)} hojas", registro=registro):
+        return bytes_libro_por_hojas(resultados)
+
+# Función para obtener la analítica de una comparación mostrada: la guardada con ella o, en las
+# guardadas antes de la analítica, la calculada desde su resultado reconstruido (y se guarda)
+def analitica_de_comparacion(comparacion, resultado):
+    if comparacion.get("analitica") is None:
+        comparacion["analitica"] = analitica_de_resultado(resultado)
+        guardar_analitica(comparacion["id"], comparacion["analitica"])
+    return comparacion["analitica"]
+
+# Función para mostrar el resultado de la comparación reciente
+def mostrar_graficos_historial():
+    """
+    Gráficos del resultado abierto del historial. Se dibujan solo si se pide "Mostrar gráficos", y en
+    un fragmento: las recargas de la página no reconstruyen las figuras de plotly.
+    """
+    if not st.toggle("Mostrar gráficos", key="historial_graficos"):
+        return
+    # plotly se importa solo cuando hay un resultado que graficar
+    from interface.chart_visualization import visualizar_cambios
+    comparacion = st.session_state.resultado_historial
+    visualizar_cambios(analitica_de_comparacion(comparacion, comparacion["indexado"]["resultado"]), "historial")
+
+
+def mostrar_resultado_reciente():
+    # plotly se importa solo cuando hay un resultado que graficar
+    from interface.chart_visualization import visualizar_cambios
+
+    resultado_reciente = st.session_state.resultado_reciente
+    registro = st.session_state.registro_rendimiento
+    nombre_descarga = f"comparacion_{resultado_reciente['fecha']}"
+    clave_vista = "reciente"
+
+    if "hojas" in resultado_reciente:
+        # Libro comparado por hojas: resumen de todas y el detalle de la hoja elegida
+        hojas = resultado_reciente["hojas"]
+        resultados = {hoja: datos["indexado"]["resultado"] for hoja, datos in hojas.items()}
+        st.write("### Resumen por Hoja")
+        st.dataframe(resumen_por_hoja(resultados), use_container_width=True, hide_index=True)
+        st.download_button(
+            label="📅 Descargar Libro Comparado (una hoja por hoja comparada)",
+            data=lambda: exportar_hojas_con_medicion(resultados, registro),
+            file_name=f"{nombre_descarga}.xlsx",
+            mime=FORMATOS_EXPORTACION["xlsx"]
+        )
+        hoja = st.selectbox("Hoja", list(hojas), key="reciente_hoja")
+        resultado_indexado = hojas[hoja]["indexado"]
+        nombre_descarga = f"{nombre_descarga}_{hoja}"
+        clave_vista = f"reciente_{list(hojas).index(hoja)}"
+        comparacion = hojas[hoja]
+        mostrar_esquema(comparacion.get("esquema"))
+    else:
+        resultado_indexado = resultado_reciente["indexado"]
+        comparacion = resultado_reciente
+        mostrar_esquema(resultado_reciente.get("esquema"))
+        mostrar_emparejamientos(resultado_reciente.get("emparejamientos"))
+
+    # Mostrar resultados
+    with etapa(ETAPA_VISUALIZACION, filas=len(resultado_indexado["resultado"]["plantilla"]), detalle="reciente", registro=registro):
+        # Fragmento: los filtros y la paginación del resultado recargan solo esta parte de la página
+        st.fragment(mostrar_resultados_comparacion)(resultado_indexado, clave_vista=clave_vista)
+        visualizar_cambios(analitica_de_comparacion(comparacion, resultado_indexado["resultado"]), clave_vista)
+
+    # Botón para descargar el resultado de la comparación reciente (el archivo se genera al pulsarlo)
+    formato = st.selectbox("Formato de descarga", list(FORMATOS_EXPORTACION), key="reciente_formato")
+    st.download_button(
+        label="📅 Descargar Comparación Reciente",
+        data=lambda: exportar_con_medicion(resultado_indexado["resultado"], formato, registro),
+        file_name=f"{nombre_descarga}.{formato}",
+        mime=FORMATOS_EXPORTACION[formato]
+    )
 
 # Función principal
 def main():
+    # Configuración de la página y de la base de datos (en main: importar el módulo no ejecuta nada)
+    st.set_page_config(page_title="Diffly", page_icon="📊", layout="wide")
+    preparar_base_datos(RUTA_BASE_DATOS)
+    inicializar_sesion()
+
     st.title("📊 Diffly")
     st.subheader("Detecta automáticamente cambios en inventarios o listas de proveedores utilizando archivos de Excel.")
 
     # Checkbox para mostrar los datos de rendimiento
     mostrar_rendimiento = st.checkbox("Mostrar datos de rendimiento")
+    registro = st.session_state.registro_rendimiento
+    if mostrar_rendimiento:
+        registro["memoria"] = st.checkbox("Medir memoria de cada etapa (tracemalloc, más lento)", value=registro["memoria"])
+
+    # Selector del motor de comparación para contrastar tiempos entre ambas implementaciones
+    motor = st.radio("Motor de comparación", MOTORES, horizontal=True)
+    trabajadores = 1
+    if motor == MOTOR_VECTORIZADO:
+        trabajadores = st.number_input("Procesos en paralelo", min_value=1, max_value=os.cpu_count() or 1, value=1)
 
     # Panel lateral para historial
     with st.sidebar:
         st.header("📜 Historial de Comparaciones")
         
-        # Recargar historial si reload_count cambia
-        comparaciones = obtener_comparaciones()
+        # Filtros del historial; al cambiarlos se vuelve a la primera página
+        nombre_filtro = st.text_input("Filtrar por nombre de archivo (comienzo):")
+        rango_fechas = st.date_input("Rango de fechas:", value=())
+        fecha_desde = rango_fechas[0] if len(rango_fechas) > 0 else None
+        fecha_hasta = rango_fechas[1] if len(rango_fechas) > 1 else fecha_desde
+        filtros = {"nombre_archivo": nombre_filtro.strip() or None, "fecha_desde": fecha_desde, "fecha_hasta": fecha_hasta}
+        if st.session_state.historial_filtros != filtros:
+            st.session_state.historial_filtros = filtros
+            st.session_state.historial_cursores = [None]
+
+        # Solo se consulta la página visible; la pila de cursores permite volver a las anteriores
+        comparaciones, siguiente = obtener_pagina_comparaciones(despues_de=st.session_state.historial_cursores[-1], **filtros)
         st.dataframe(comparaciones, use_container_width=True)
+
+        col_anterior, col_pagina, col_siguiente = st.columns(3)
+        with col_anterior:
+            if st.button("◀", disabled=len(st.session_state.historial_cursores) == 1, key="historial_anterior"):
+                st.session_state.historial_cursores.pop()
+                st.rerun()
+        with col_pagina:
+            st.caption(f"Página {len(st.session_state.historial_cursores)}")
+        with col_siguiente:
+            if st.button("▶", disabled=siguiente is None, key="historial_siguiente"):
+                st.session_state.historial_cursores.append(siguiente)
+                st.rerun()
         
         if not comparaciones.empty:
             id_seleccionado = st.selectbox("Selecciona una comparación por ID:", comparaciones["id"], key="comparacion_select")
             
             if st.button("Ver Resultado"):
                 try:
-                    resultado_bytes = obtener_resultado_comparacion(id_seleccionado)
-                    resultado_df = pd.read_excel(BytesIO(resultado_bytes))
-                    st.write("### Resultado de la Comparación Seleccionada")
-                    st.dataframe(resultado_df)
+                    with etapa(ETAPA_RECONSTRUCCION, detalle="historial", registro=registro) as medicion:
+                        tabla_resultado = obtener_tabla_resultado(id_seleccionado)
+                        medicion["filas"] = len(tabla_resultado)
+                    st.session_state.resultado_historial = {
+                        "id": id_seleccionado,
+                        "indexado": indexar_resultado(resultado_desde_tabla(tabla_resultado)),
+                        "emparejamientos": obtener_emparejamientos(id_seleccionado),
+                        "esquema": obtener_esquema(id_seleccionado),
+                        "analitica": obtener_analitica(id_seleccionado),
+                    }
                     
-                    # Guardar resultado en el estado de la sesión para ser descargado
-                    st.session_state.resultado_bytes = resultado_bytes
+                    # Guardar la comparación en el estado de la sesión para ser descargada
                     st.session_state.id_seleccionado = id_seleccionado
                     st.session_state.show_download_dialog = True
                 except Exception as e:
@@ -150,29 +492,85 @@ def main():
             if st.button("Eliminar Comparación"):
                 eliminar_dialog()
 
+            # Consulta de todos los cambios de una clave a lo largo del historial
+            clave_buscada = st.text_input("Buscar cambios de una clave:")
+            if clave_buscada:
+                st.dataframe(obtener_cambios_clave(clave_buscada.strip()), use_container_width=True)
+
+        # Series de versiones comparadas en una sola pasada
+        series = obtener_series_versiones()
+        if not series.empty:
+            st.header("🗂️ Series de Versiones")
+            st.dataframe(series, use_container_width=True, hide_index=True)
+            serie_seleccionada = st.selectbox("Selecciona una serie por ID:", series["id"], key="serie_select")
+            if st.button("Ver Serie"):
+                st.session_state.serie_versiones = serie_seleccionada
+
     # Mostrar diálogo de descarga si se ha activado
     if st.session_state.show_download_dialog:
         @st.dialog("Descargar Resultado", width="small")
         def descargar_dialog():
             nombre_archivo = st.text_input("Nombre del archivo (sin extensión):", value=f"resultado_comparacion_{st.session_state.id_seleccionado}")
+            formato = st.selectbox("Formato:", list(FORMATOS_EXPORTACION), key="descarga_formato")
+            id_descarga = st.session_state.id_seleccionado
+            registro_descarga = st.session_state.registro_rendimiento
             if st.button("Descargar", key="descargar_boton"):
                 st.download_button(
                     label="📁 Descargar Archivo",
-                    data=st.session_state.resultado_bytes,
-                    file_name=f"{nombre_archivo}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    data=lambda: bytes_de_comparacion(id_descarga, formato, registro_descarga),
+                    file_name=f"{nombre_archivo}.{formato}",
+                    mime=FORMATOS_EXPORTACION[formato]
                 )
                 st.session_state.show_download_dialog = False
         descargar_dialog()
 
+    # Resultado de una comparación del historial, por páginas
+    if st.session_state.resultado_historial is not None:
+        st.write(f"### Resultado de la Comparación Seleccionada (ID {st.session_state.resultado_historial['id']})")
+        if st.button("Cerrar resultado", key="cerrar_historial"):
+            st.session_state.resultado_historial = None
+            st.rerun()
+        indexado_historial = st.session_state.resultado_historial["indexado"]
+        mostrar_esquema(st.session_state.resultado_historial.get("esquema"))
+        mostrar_emparejamientos(st.session_state.resultado_historial.get("emparejamientos"))
+        with etapa(ETAPA_VISUALIZACION, filas=len(indexado_historial["resultado"]["plantilla"]), detalle="historial", registro=registro):
+            st.fragment(mostrar_resultados_comparacion)(indexado_historial, clave_vista="historial")
+            st.fragment(mostrar_graficos_historial)()
+
     # Cargar Archivos y Comparar
     st.write("### Cargar y Comparar Archivos")
-    plantilla_file = st.file_uploader("Archivo de referencia (plantilla)", type=["xls", "xlsx"])
-    actualizada_file = st.file_uploader("Archivo actualizado", type=["xls", "xlsx"])
+    plantilla_file = st.file_uploader("Archivo de referencia (plantilla)", type=EXTENSIONES_ADMITIDAS)
+    actualizada_file = st.file_uploader("Archivo actualizado", type=EXTENSIONES_ADMITIDAS)
+    columnas_lectura, tipos_lectura = opciones_de_lectura()
+
+    # Para archivos xlsx que no caben en memoria: lectura por bloques y comparación por particiones en disco
+    por_bloques = st.checkbox("Procesar por bloques en disco (archivos xlsx muy grandes)")
 
-    if plantilla_file and actualizada_file:
-        plantilla_df = cargar_archivo(plantilla_file)
-        actualizada_df = cargar_archivo(actualizada_file)
+    # Libros de Excel con más de una hoja: se comparan hoja por hoja
+    varias_hojas = False
+    if plantilla_file and actualizada_file and not por_bloques:
+        hojas_plantilla = hojas_de_archivo(plantilla_file)
+        hojas_actualizada = hojas_de_archivo(actualizada_file)
+        varias_hojas = len(hojas_plantilla) > 1 or len(hojas_actualizada) > 1
+
+    if plantilla_file and actualizada_file and por_bloques:
+        if any(detectar_formato(archivo.name) != "xlsx" for archivo in (plantilla_file, actualizada_file)):
+            st.error("El procesamiento por bloques solo admite archivos xlsx.")
+        elif st.button("Comparar Archivos"):
+            enviar_comparacion(plantilla_file, actualizada_file)
+
+    elif varias_hojas:
+        pares = elegir_hojas(hojas_plantilla, hojas_actualizada)
+        if st.button("Comparar Hojas", disabled=not pares):
+            # Cada hoja se lee y se compara en su propio proceso, sin leer antes los libros completos
+            enviar_comparacion(
+                plantilla_file, actualizada_file, funcion=comparar_hojas_y_guardar,
+                pares=pares, motor=motor, trabajadores=trabajadores, columnas=columnas_lectura, tipos=tipos_lectura
+            )
+
+    elif plantilla_file and actualizada_file:
+        plantilla_df = cargar_archivo(plantilla_file, columnas_lectura, tipos_lectura, registro)
+        actualizada_df = cargar_archivo(actualizada_file, columnas_lectura, tipos_lectura, registro)
 
         if plantilla_df is not None and actualizada_df is not None:
             st.write("### Vista previa de Archivos")
@@ -184,46 +582,65 @@ def main():
                 st.write("**Archivo Actualizado:**")
                 st.dataframe(actualizada_df.head())
 
+            opciones_clave = opciones_de_clave(list(plantilla_df.columns))
+            opciones_alineacion = opciones_de_alineacion(plantilla_df, actualizada_df)
             if st.button("Comparar Archivos"):
-                with st.spinner("🔍 Comparando archivos..."):
-                    try:
-                        # Medir el tiempo de ejecución de la comparación
-                        resultado, tiempo_comparacion = medir_tiempo_ejecucion(
-                            comparar_listas_dinamico, 
-                            "comparar_listas_dinamico", 
-                            plantilla_df, 
-                            actualizada_df
-                        )
-                        plantilla_procesada, cambios, cambios_detallados = resultado
-                        
-                        # Guardar el tiempo de la comparación
-                        st.session_state.tiempos_registro["comparar_listas_dinamico"] = tiempo_comparacion
-                        
-                        # Mostrar resultados
-                        mostrar_resultados_comparacion(cambios, cambios_detallados, plantilla_procesada)
-                        visualizar_cambios(cambios)
-
-                        # Guardar en la base de datos
-                        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        resultado_bytes = convertir_a_bytes(plantilla_procesada)
-                        insertar_comparacion(fecha, plantilla_file.name, actualizada_file.name, resultado_bytes)
-                        
-                        st.success("Resultados guardados en la base de datos.")
-                        st.session_state.reload_count += 1  # Incrementar contador para recarga
+                # La comparación sigue en segundo plano aunque se interactúe con la página
+                enviar_comparacion(
+                    plantilla_file, actualizada_file,
+                    plantilla_df=plantilla_df, actualizada_df=actualizada_df, motor=motor, trabajadores=trabajadores,
+                    columnas_lectura=columnas_lectura, tipos_lectura=tipos_lectura, **opciones_clave, **opciones_alineacion
+                )
 
-                        # Botón para descargar el resultado de la comparación reciente
-                        st.download_button(
-                            label="📅 Descargar Comparación Reciente",
-                            data=resultado_bytes,
-                            file_name=f"comparacion_{fecha}.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-                    except Exception as e:
-                        st.error(f"Error al comparar los archivos: {e}")
+    # Varias versiones de la misma lista (p. ej. semanales): una sola pasada con un índice de claves común
+    with st.expander("Comparar varias versiones de una lista"):
+        archivos_versiones = st.file_uploader(
+            "Versiones (de la más antigua a la más reciente)", type=EXTENSIONES_ADMITIDAS, accept_multiple_files=True, key="versiones_archivos"
+        )
+        ordenar_por_nombre = st.checkbox("Ordenar las versiones por nombre de archivo", value=True)
+        if ordenar_por_nombre:
+            archivos_versiones = sorted(archivos_versiones, key=lambda archivo: archivo.name)
+        if archivos_versiones:
+            st.caption(" → ".join(archivo.name for archivo in archivos_versiones))
+        nombre_serie = st.text_input("Nombre de la serie", value=archivos_versiones[-1].name if archivos_versiones else "")
+        if st.button("Comparar Versiones", disabled=len(archivos_versiones) < 2):
+            try:
+                st.session_state.trabajos.append(enviar_trabajo(
+                    comparar_versiones_y_guardar,
+                    f"{len(archivos_versiones)} versiones de {nombre_serie}",
+                    [copiar_archivo(archivo) for archivo in archivos_versiones],
+                    nombre_serie,
+                    registro=registro,
+                    columnas=columnas_lectura,
+                    tipos=tipos_lectura
+                ))
+            except RuntimeError as e:
+                st.error(str(e))
+
+    # Avance de las comparaciones en curso; al terminar, su resultado se recoge del historial
+    recoger_trabajos_terminados()
+    mostrar_trabajos(st.session_state.trabajos)
+
+    # El resultado de la última comparación se sigue mostrando al interactuar con sus filtros y páginas
+    if st.session_state.resultado_reciente is not None:
+        mostrar_resultado_reciente()
+
+    # Serie de versiones abierta: se lee de la base de datos, sin recalcular
+    if st.session_state.serie_versiones is not None:
+        from interface.version_timeline import mostrar_serie_versiones
+        serie = obtener_serie_versiones(st.session_state.serie_versiones)
+        if serie is None:
+            st.session_state.serie_versiones = None
+        else:
+            if st.button("Cerrar serie", key="cerrar_serie"):
+                st.session_state.serie_versiones = None
+                st.rerun()
+            mostrar_serie_versiones(serie)
 
-                    # Mostrar los datos de rendimiento si el checkbox está activado
-                    if mostrar_rendimiento:
-                        mostrar_datos_rendimiento(st.session_state.tiempos_registro)
+    # Mostrar los datos de rendimiento si el checkbox está activado (incluye las exportaciones descargadas)
+    if mostrar_rendimiento:
+        from performance.performance_test import mostrar_datos_rendimiento
+        mostrar_datos_rendimiento(registro["mediciones"], obtener_estadisticas_mediciones(), informe_almacenamiento(medir=0))
 
 if __name__ == "__main__":
     main()
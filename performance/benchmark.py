@@ -0,0 +1,237 @@
+# performance/benchmark.py
+"""
+Benchmark reproducible del flujo completo, sin Streamlit: genera pares sintéticos de archivos
+(performance/synthetic.py) y mide con el perfilador (performance/profiler.py) cada etapa:
+lectura, comparación (índice de claves, comparación y armado del resultado), exportación y guardado.
+
+Uso:
+    python -m performance.benchmark --filas 10000 100000 1000000 --salida resultados.json
+    python -m performance.benchmark --filas 10000 100000 --linea-base linea_base.json --actualizar-linea-base
+    python -m performance.benchmark --filas 10000 100000 --linea-base linea_base.json --tolerancia 0.2
+
+Con --linea-base (y sin --actualizar-linea-base) el proceso termina con código 1 si alguna etapa
+tarda más que la línea base en más de la tolerancia indicada.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow
+
+from db.db import configurar_base_datos, init_db
+from db.crud import insertar_comparacion
+from performance.profiler import ETAPA_COMPARAR, ETAPA_EXPORTACION, ETAPA_GUARDADO, ETAPA_LECTURA, crear_registro, etapa
+from performance.synthetic import FILAS_MAXIMAS_XLSX, agregar_argumentos, escribir_par, generar_par, opciones_generador
+from processing.diff_engine import MOTOR_VECTORIZADO, MOTORES, comparar_listas_dinamico
+from processing.export import FORMATOS_EXPORTACION, exportar_resultado
+from processing.ingest import leer_tabla
+
+FORMATOS_ENTRADA = ("xlsx", "csv", "parquet", "feather")
+# Una etapa es una regresión si supera la línea base en esta fracción...
+TOLERANCIA = 0.2
+# ...y además en esta cantidad de segundos (evita falsas alarmas en etapas muy cortas)
+DIFERENCIA_MINIMA_S = 0.05
+
+
+def _metadatos():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pyarrow.__version__,
+        "plataforma": platform.platform(),
+        "procesadores": os.cpu_count(),
+    }
+
+
+def medir_tamano(filas, opciones, entradas, motores, exportaciones, guardar, repeticiones, registro, carpeta):
+    """
+    Genera un par sintético de `filas` filas y mide el flujo completo `repeticiones` veces por
+    cada formato de entrada y motor.
+
+    Retorna:
+        Lista de mediciones del perfilador, cada una con las claves "tamano" y "entrada" agregadas.
+    """
+    plantilla, actualizada = generar_par(filas, **opciones)
+    rutas = {}
+    for formato in entradas:
+        if formato == "xlsx" and max(len(plantilla), len(actualizada)) > FILAS_MAXIMAS_XLSX:
+            print(f"[{filas:,} filas] se omite xlsx: supera el límite de filas de una hoja de Excel", file=sys.stderr)
+            continue
+        rutas[formato] = escribir_par(plantilla, actualizada, carpeta, formato, prefijo=f"sintetico_{filas}")
+    del plantilla, actualizada
+
+    mediciones = []
+    for formato, (ruta_plantilla, ruta_actualizada) in rutas.items():
+        for motor in motores:
+            for _ in range(repeticiones):
+                desde = len(registro["mediciones"])
+                with etapa(ETAPA_LECTURA, detalle=formato, registro=registro) as medicion:
+                    plantilla_df = leer_tabla(ruta_plantilla)
+                    actualizada_df = leer_tabla(ruta_actualizada)
+                    medicion["filas"] = len(plantilla_df) + len(actualizada_df)
+
+                with etapa(ETAPA_COMPARAR, filas=len(plantilla_df) + len(actualizada_df), detalle=motor, registro=registro):
+                    resultado = comparar_listas_dinamico(plantilla_df, actualizada_df, motor=motor)
+                del plantilla_df, actualizada_df
+
+                for exportacion in exportaciones:
+                    with tempfile.TemporaryFile(dir=carpeta) as destino:
+                        with etapa(ETAPA_EXPORTACION, filas=len(resultado["plantilla"]), detalle=exportacion, registro=registro):
+                            exportar_resultado(resultado, exportacion, destino)
+
+                if guardar:
+                    with etapa(ETAPA_GUARDADO, filas=len(resultado["plantilla"]), registro=registro):
+                        insertar_comparacion(
+                            datetime.now().strftime("%Y-%m-%d %H:%M:%S"), os.path.basename(ruta_plantilla),
+                            os.path.basename(ruta_actualizada), resultado,
+                        )
+                del resultado
+
+                # El registro es un buffer circular: se copian las mediciones de esta repetición
+                for medicion in list(registro["mediciones"])[desde:]:
+                    mediciones.append({"tamano": filas, "entrada": formato, **medicion})
+                registro["mediciones"].clear()
+    return mediciones
+
+
+def resumir(mediciones):
+    """
+    Agrupa las mediciones por tamaño, formato de entrada, etapa (ruta) y detalle.
+
+    Retorna:
+        Lista de diccionarios con la mediana de la duración y de las filas por segundo, y la
+        memoria máxima (si se midió) de cada grupo.
+    """
+    if not mediciones:
+        return []
+    df = pd.DataFrame(mediciones)
+    df["detalle"] = df["detalle"].fillna("")
+    grupos = df.groupby(["tamano", "entrada", "ruta", "detalle"], sort=False)
+    resumen = pd.DataFrame({
+        "mediciones": grupos.size(),
+        "duracion_s": grupos["duracion_s"].median(),
+        "filas_por_s": grupos["filas_por_s"].median(),
+        "memoria_mib": grupos["memoria_mib"].max(),
+    }).reset_index()
+    resumen = resumen.astype(object).where(resumen.notna(), None)
+    return resumen.to_dict(orient="records")
+
+
+def _clave(fila):
+    return (fila["tamano"], fila["entrada"], fila["ruta"], fila["detalle"])
+
+
+def comparar_con_linea_base(resumen, linea_base, tolerancia=TOLERANCIA, diferencia_minima=DIFERENCIA_MINIMA_S):
+    """
+    Compara el resumen actual con el de la línea base.
+
+    Parámetros:
+        resumen: Resumen de esta ejecución (ver resumir).
+        linea_base: Resumen guardado de una ejecución anterior.
+        tolerancia: Fracción de aumento de la duración admitida (0.2 = 20 %).
+        diferencia_minima: Aumento en segundos por debajo del cual no se considera regresión.
+
+    Retorna:
+        DataFrame con una fila por etapa presente en ambos resúmenes y la columna "regresion".
+    """
+    base = {_clave(fila): fila for fila in linea_base}
+    filas = []
+    for fila in resumen:
+        anterior = base.get(_clave(fila))
+        if anterior is None or not anterior["duracion_s"]:
+            continue
+        variacion = fila["duracion_s"] / anterior["duracion_s"] - 1
+        filas.append({
+            "tamano": fila["tamano"],
+            "entrada": fila["entrada"],
+            "ruta": fila["ruta"],
+            "detalle": fila["detalle"],
+            "base_s": anterior["duracion_s"],
+            "actual_s": fila["duracion_s"],
+            "variacion": variacion,
+            "regresion": variacion > tolerancia and fila["duracion_s"] - anterior["duracion_s"] > diferencia_minima,
+        })
+    return pd.DataFrame(filas, columns=["tamano", "entrada", "ruta", "detalle", "base_s", "actual_s", "variacion", "regresion"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del flujo de comparación con archivos sintéticos.")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000], help="Tamaños (filas de referencia) a medir.")
+    parser.add_argument("--entrada", nargs="+", choices=FORMATOS_ENTRADA, default=["xlsx"], help="Formatos de los archivos leídos.")
+    parser.add_argument("--motores", nargs="+", choices=MOTORES, default=[MOTOR_VECTORIZADO], help="Motores de comparación.")
+    parser.add_argument("--exportar", nargs="*", choices=list(FORMATOS_EXPORTACION), default=list(FORMATOS_EXPORTACION), help="Formatos de exportación (ninguno para omitir la etapa).")
+    parser.add_argument("--sin-guardado", action="store_true", help="Omite la etapa de guardado en la base de datos.")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Repeticiones por tamaño, formato y motor.")
+    parser.add_argument("--memoria", action="store_true", help="Mide el pico de memoria de cada etapa (tracemalloc, más lento).")
+    parser.add_argument("--salida", help="Archivo JSON con los resultados.")
+    parser.add_argument("--linea-base", help="Archivo JSON de línea base (resultados de una ejecución anterior).")
+    parser.add_argument("--actualizar-linea-base", action="store_true", help="Guarda esta ejecución como línea base en lugar de compararla.")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA, help="Aumento admitido respecto de la línea base (0.2 = 20 %%).")
+    parser.add_argument("--diferencia-minima", type=float, default=DIFERENCIA_MINIMA_S, help="Aumento en segundos por debajo del cual no hay regresión.")
+    agregar_argumentos(parser)
+    args = parser.parse_args()
+
+    registro = crear_registro(memoria=args.memoria)
+    mediciones = []
+    with tempfile.TemporaryDirectory(prefix="diffly_bench_") as carpeta:
+        configurar_base_datos(os.path.join(carpeta, "benchmark.db"))
+        init_db()
+        try:
+            for filas in args.filas:
+                mediciones.extend(medir_tamano(
+                    filas, opciones_generador(args), args.entrada, args.motores, args.exportar,
+                    not args.sin_guardado, args.repeticiones, registro, carpeta,
+                ))
+        finally:
+            configurar_base_datos(os.environ.get("DIFFLY_DB", "comparaciones.db"))
+
+    resultados = {
+        "metadatos": _metadatos(),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("salida", "linea_base", "actualizar_linea_base")},
+        "resumen": resumir(mediciones),
+        "mediciones": mediciones,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+
+    resumen_df = pd.DataFrame(resultados["resumen"])
+    if not resumen_df.empty:
+        print(resumen_df.to_string(index=False, float_format=lambda valor: f"{valor:,.3f}"))
+
+    if args.linea_base and args.actualizar_linea_base:
+        with open(args.linea_base, "w", encoding="utf-8") as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+        print(f"Línea base guardada en {args.linea_base}")
+    elif args.linea_base:
+        with open(args.linea_base, encoding="utf-8") as archivo:
+            linea_base = json.load(archivo)["resumen"]
+        comparacion = comparar_con_linea_base(resultados["resumen"], linea_base, args.tolerancia, args.diferencia_minima)
+        print()
+        print(comparacion.to_string(index=False, float_format=lambda valor: f"{valor:,.3f}"))
+        regresiones = comparacion[comparacion["regresion"]]
+        if not regresiones.empty:
+            print(f"\n{len(regresiones)} etapa(s) más lentas que la línea base (tolerancia {args.tolerancia:.0%}).", file=sys.stderr)
+            sys.exit(1)
+        print("\nSin regresiones respecto de la línea base.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# performance/benchmark_db.py
+"""
+Benchmark de concurrencia de la base de datos: varias sesiones simultáneas (hilos, como las
+sesiones de Streamlit) guardan y leen comparaciones a la vez sobre el pool de db/db.py.
+
+Uso:
+    python -m performance.benchmark_db --sesiones 1 2 4 8 --filas 20000 --operaciones 5
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from db.db import configurar_base_datos, init_db
+from db.crud import insertar_comparacion, obtener_cambios_clave, obtener_comparaciones, obtener_tabla_resultado
+from processing.diff_engine import comparar_listas_dinamico
+
+
+def generar_resultado(filas, semilla=0):
+    """
+    Genera el resultado de una comparación sintética con cambios, altas y bajas.
+    """
+    rng = np.random.default_rng(semilla)
+    plantilla = pd.DataFrame({
+        "SKU": np.arange(filas),
+        "precio": rng.random(filas).round(2),
+        "stock": rng.integers(0, 100, filas),
+        "nombre": [f"producto {i}" for i in range(filas)],
+    })
+    actualizada = plantilla.copy()
+    actualizada.loc[::10, "precio"] += 1
+    actualizada.loc[::25, "nombre"] = "renombrado"
+    actualizada = actualizada.drop(index=range(5, filas, 50))
+    nuevas = pd.DataFrame({"SKU": np.arange(filas, filas + filas // 50), "precio": 1.0, "stock": 1, "nombre": "nuevo"})
+    actualizada = pd.concat([actualizada, nuevas], ignore_index=True)
+    return comparar_listas_dinamico(plantilla, actualizada)
+
+
+def _sesion(resultado, operaciones, tiempos, errores):
+    try:
+        for _ in range(operaciones):
+            inicio = time.perf_counter()
+            comparacion_id = insertar_comparacion("2024-01-01 00:00:00", "referencia.xlsx", "actualizada.xlsx", resultado)
+            tiempos["insercion"].append(time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            obtener_comparaciones()
+            obtener_tabla_resultado(comparacion_id)
+            obtener_cambios_clave("10")
+            tiempos["lectura"].append(time.perf_counter() - inicio)
+    except Exception as e:
+        errores.append(repr(e))
+
+
+def medir_concurrencia(sesiones, resultado, operaciones):
+    """
+    Ejecuta `sesiones` hilos simultáneos, cada uno con `operaciones` inserciones y lecturas.
+
+    Retorna:
+        Diccionario con el rendimiento obtenido (operaciones y filas por segundo) y los errores.
+    """
+    tiempos = {"insercion": [], "lectura": []}
+    errores = []
+    hilos = [threading.Thread(target=_sesion, args=(resultado, operaciones, tiempos, errores)) for _ in range(sesiones)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    total = time.perf_counter() - inicio
+
+    inserciones = len(tiempos["insercion"])
+    return {
+        "sesiones": sesiones,
+        "tiempo_total_s": round(total, 3),
+        "inserciones_por_s": round(inserciones / total, 2),
+        "filas_insertadas_por_s": round(inserciones * len(resultado["plantilla"]) / total),
+        "lecturas_por_s": round(len(tiempos["lectura"]) / total, 2),
+        "insercion_p95_s": round(float(np.percentile(tiempos["insercion"], 95)), 3) if inserciones else None,
+        "lectura_p95_s": round(float(np.percentile(tiempos["lectura"], 95)), 3) if tiempos["lectura"] else None,
+        "errores": errores,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia de la base de datos de comparaciones.")
+    parser.add_argument("--sesiones", type=int, nargs="+", default=[1, 2, 4, 8], help="Sesiones simultáneas a medir.")
+    parser.add_argument("--filas", type=int, default=20_000, help="Filas del resultado de cada comparación.")
+    parser.add_argument("--operaciones", type=int, default=5, help="Inserciones y lecturas por sesión.")
+    parser.add_argument("--json", action="store_true", help="Imprime los resultados en JSON.")
+    args = parser.parse_args()
+
+    resultado = generar_resultado(args.filas)
+    mediciones = []
+    with tempfile.TemporaryDirectory(prefix="diffly_bench_") as carpeta:
+        configurar_base_datos(os.path.join(carpeta, "benchmark.db"))
+        init_db()
+        for sesiones in args.sesiones:
+            mediciones.append(medir_concurrencia(sesiones, resultado, args.operaciones))
+        configurar_base_datos(os.environ.get("DIFFLY_DB", "comparaciones.db"))
+
+    if args.json:
+        print(json.dumps(mediciones, indent=2))
+    else:
+        print(pd.DataFrame(mediciones).drop(columns="errores").to_string(index=False))
+        for medicion in mediciones:
+            for error in medicion["errores"]:
+                print(f"[{medicion['sesiones']} sesiones] {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,60 @@
 import streamlit as st
-import time
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-# Diccionario global para almacenar los tiempos de ejecución
-tiempos_registro = {}
-
-# Función para monitorear el tiempo de ejecución
-def medir_tiempo_ejecucion(funcion, nombre_funcion, *args, **kwargs):
-    start_time = time.time()
-    resultado = funcion(*args, **kwargs)
-    end_time = time.time()
-    tiempo_ejecucion = end_time - start_time
-    
-    # Guardar el tiempo en el registro global
-    if nombre_funcion not in tiempos_registro:
-        tiempos_registro[nombre_funcion] = []
-    tiempos_registro[nombre_funcion].append(tiempo_ejecucion)
-    
-    return resultado, tiempo_ejecucion
+# Función para convertir las mediciones del perfilador (performance/profiler.py) en un DataFrame
+def mediciones_a_dataframe(mediciones):
+    mediciones_df = pd.DataFrame(list(mediciones), columns=["fecha", "etapa", "detalle", "ruta", "nivel", "filas", "duracion_s", "filas_por_s", "memoria_mib"])
+    mediciones_df["nombre"] = mediciones_df["ruta"] + mediciones_df["detalle"].map(lambda detalle: f" ({detalle})" if detalle else "")
+    return mediciones_df
 
 # Función para mostrar los datos de rendimiento en texto y gráficos mejorados
-def mostrar_datos_rendimiento(tiempos):
+def mostrar_datos_rendimiento(mediciones, estadisticas=None, almacenamiento=None):
+    """
+    Muestra las mediciones de la sesión (etapas y subetapas) y, si se reciben, las estadísticas
+    guardadas en la base de datos (p50 y p95 de cada etapa entre reinicios) y el tamaño del historial.
+
+    Parámetros:
+        mediciones: Mediciones del registro de la sesión (ver performance.profiler.crear_registro).
+        estadisticas: DataFrame opcional de obtener_estadisticas_mediciones.
+        almacenamiento: Diccionario opcional de db.maintenance.informe_almacenamiento.
+    """
     st.markdown("## 📊 Desempeño de Ejecución", unsafe_allow_html=True)
-    
-    if tiempos:
-        # Mostrar una tabla de resumen con la última ejecución y el promedio
-        ultimos_tiempos = {funcion: tiempos[-1] for funcion, tiempos in tiempos_registro.items()}
-        promedios_tiempos = {funcion: sum(tiempos)/len(tiempos) for funcion, tiempos in tiempos_registro.items()}
-        
+
+    if mediciones:
+        mediciones_df = mediciones_a_dataframe(mediciones)
+
+        # Mostrar una tabla de resumen con la última ejecución y el promedio de cada etapa
+        grupos = mediciones_df.groupby("nombre", sort=False)
         resumen_df = pd.DataFrame({
-            "Función": ultimos_tiempos.keys(),
-            "Última Ejecución (s)": ultimos_tiempos.values(),
-            "Promedio (s)": promedios_tiempos.values()
-        })
-        st.table(resumen_df.style.format({"Última Ejecución (s)": "{:.2f}", "Promedio (s)": "{:.2f}"}).set_caption("Resumen de tiempos de ejecución").set_table_styles(
+            "Última Ejecución (s)": grupos["duracion_s"].last(),
+            "Promedio (s)": grupos["duracion_s"].mean(),
+            "Filas": grupos["filas"].last(),
+            "Filas/s": grupos["filas_por_s"].last(),
+            "Memoria (MiB)": grupos["memoria_mib"].last(),
+        }).rename_axis("Etapa").reset_index()
+        st.table(resumen_df.style.format({
+            "Última Ejecución (s)": "{:.3f}", "Promedio (s)": "{:.3f}", "Filas": "{:,.0f}", "Filas/s": "{:,.0f}", "Memoria (MiB)": "{:.1f}"
+        }, na_rep="–").set_caption("Resumen de tiempos de ejecución").set_table_styles(
             [{"selector": "caption", "props": [("font-size", "18px"), ("font-weight", "bold"), ("color", "#4CAF50")]}]
         ))
 
-        # Convertir el registro en un DataFrame para visualización
-        registros_df = pd.DataFrame(tiempos_registro)
+        # Evolución del tiempo de las etapas principales (cada etapa puede tener distinta cantidad de ejecuciones)
+        raices = mediciones_df[mediciones_df["nivel"] == 0]
+        registros_df = pd.DataFrame({
+            nombre: grupo["duracion_s"].reset_index(drop=True) for nombre, grupo in raices.groupby("nombre", sort=False)
+        })
 
-        # Gráfico de líneas para mostrar la evolución del tiempo de cada función
+        # Gráfico de líneas para mostrar la evolución del tiempo de cada etapa
         fig_line = px.line(
-            registros_df, 
-            markers=True, 
-            title="⏱ Evolución del Tiempo de Ejecución por Función",
-            labels={"index": "Ejecuciones", "value": "Tiempo (segundos)", "variable": "Función"}
+            registros_df,
+            markers=True,
+            title="⏱ Evolución del Tiempo de Ejecución por Etapa",
+            labels={"index": "Ejecuciones", "value": "Tiempo (segundos)", "variable": "Etapa"}
         )
         fig_line.update_layout(
-            title_x=0.5, 
+            title_x=0.5,
             xaxis=dict(showgrid=True, gridcolor="LightGray"),
             yaxis=dict(showgrid=True, gridcolor="LightGray"),
             margin=dict(l=40, r=40, t=60, b=40)
@@ -58,14 +62,17 @@ def mostrar_datos_rendimiento(tiempos):
         fig_line.update_traces(marker=dict(size=8, line=dict(width=2, color="DarkSlateGray")))
         st.plotly_chart(fig_line, use_container_width=True)
 
-        # Gráfico de barras de la última ejecución para comparación
+        # Gráfico de barras con las subetapas de la última ejecución (sus mediciones la preceden en el registro)
+        posiciones_raiz = list(raices.index)
+        desde = posiciones_raiz[-2] + 1 if len(posiciones_raiz) > 1 else 0
+        ultima = mediciones_df.loc[desde:posiciones_raiz[-1]]
         fig_bar = go.Figure(data=[
-            go.Bar(name=funcion, x=[funcion], y=[tiempo], text=f"{tiempo:.2f} s", textposition="outside")
-            for funcion, tiempo in ultimos_tiempos.items()
+            go.Bar(name=nombre, x=[nombre], y=[tiempo], text=f"{tiempo:.3f} s", textposition="outside")
+            for nombre, tiempo in zip(ultima["nombre"], ultima["duracion_s"])
         ])
         fig_bar.update_layout(
-            title="📉 Comparación de Tiempos en la Última Ejecución",
-            xaxis_title="Función",
+            title=f"📉 Etapas de la Última Ejecución: {ultima['nombre'].iloc[-1]}",
+            xaxis_title="Etapa",
             yaxis_title="Tiempo (segundos)",
             title_x=0.5,
             template="plotly_white",
@@ -78,3 +85,20 @@ def mostrar_datos_rendimiento(tiempos):
         st.plotly_chart(fig_bar, use_container_width=True)
     else:
         st.write("No hay datos de rendimiento disponibles. Realiza una ejecución para visualizar el rendimiento.")
+
+    # Tendencias guardadas en la base de datos, de esta y de sesiones anteriores
+    if estadisticas is not None and not estadisticas.empty:
+        st.write("**Histórico de todas las sesiones (p50 / p95)**")
+        st.dataframe(estadisticas, use_container_width=True, hide_index=True)
+
+    # Tamaño del historial; la latencia de reconstrucción aparece arriba como etapa "reconstrucción del resultado"
+    if almacenamiento is not None:
+        st.write("**Almacenamiento del historial**")
+        col_archivo, col_bloques, col_xlsx = st.columns(3)
+        col_archivo.metric("Base de datos", f"{almacenamiento['bytes_archivo'] / 2**20:,.1f} MiB",
+                           help=f"{almacenamiento['bytes_libres'] / 2**20:,.1f} MiB en páginas libres")
+        col_bloques.metric("Claves (comprimidas)", f"{almacenamiento['bytes_bloques'] / 2**20:,.1f} MiB",
+                           help=f"{almacenamiento['bytes_bloques_sin_deduplicar'] / 2**20:,.1f} MiB sin deduplicar, "
+                                f"{almacenamiento['bytes_claves_originales'] / 2**20:,.1f} MiB sin comprimir")
+        col_xlsx.metric("Resultados en xlsx", f"{almacenamiento['bytes_xlsx'] / 2**20:,.1f} MiB",
+                        help=f"{almacenamiento['comparaciones_xlsx']:,} de {almacenamiento['comparaciones']:,} comparaciones (python -m db.maintenance --compactar)")
@@ -0,0 +1,152 @@
+# performance/profiler.py
+"""
+Perfilador por etapas: cada etapa (lectura, alineación de columnas, índice de claves, comparación, armado del resultado,
+analítica de cambios, exportación, guardado, visualización, reconstrucción) se mide con time.perf_counter y puede contener otras etapas.
+
+Uso:
+    registro = crear_registro(persistir=insertar_mediciones)
+    with etapa("comparar", detalle="vectorizado", registro=registro) as medicion:
+        ...
+        medicion["filas"] = len(df)
+
+Las etapas anidadas se registran en la etapa abierta del mismo hilo; las mediciones terminadas
+se guardan en el registro de la sesión (de tamaño acotado) y, al cerrar la etapa raíz, se
+entregan juntas a la función persistir del registro.
+"""
+import contextvars
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Etapas instrumentadas en la aplicación
+ETAPA_LECTURA = "lectura"
+ETAPA_COMPARAR = "comparar"
+ETAPA_ALINEACION = "alineación de columnas"
+ETAPA_INDICE = "índice de claves"
+ETAPA_EMPAREJAMIENTO = "emparejamiento de claves"
+ETAPA_COMPARACION = "comparación"
+ETAPA_RESULTADO = "armado del resultado"
+ETAPA_ANALITICA = "analítica de cambios"
+ETAPA_EXPORTACION = "exportación"
+ETAPA_GUARDADO = "guardado"
+ETAPA_VISUALIZACION = "visualización"
+ETAPA_RECONSTRUCCION = "reconstrucción del resultado"
+
+# Mediciones que conserva cada sesión; las más antiguas se descartan
+MEDICIONES_POR_SESION = 500
+
+# Etapa abierta en el hilo (o contexto) actual
+_etapa_actual = contextvars.ContextVar("etapa_actual", default=None)
+
+
+def crear_registro(maximo=MEDICIONES_POR_SESION, persistir=None, memoria=False, avisar=None):
+    """
+    Crea el registro de mediciones de una sesión.
+
+    Parámetros:
+        maximo: Cantidad máxima de mediciones conservadas (buffer circular).
+        persistir: Función opcional que recibe la lista de mediciones de cada etapa raíz terminada.
+        memoria: Si es True, las etapas raíz activan tracemalloc para medir el pico de memoria
+            (más preciso, pero el código Python se ejecuta bastante más lento).
+        avisar: Función opcional que se llama como avisar(medicion, terminada) al abrir y al cerrar cada
+            etapa del registro, incluidas las anidadas. Al abrir puede lanzar una excepción para
+            interrumpir la operación (p. ej. al cancelar un trabajo en segundo plano).
+    """
+    return {"mediciones": deque(maxlen=maximo), "persistir": persistir, "memoria": memoria, "avisar": avisar}
+
+
+def _memoria_actual():
+    return tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+
+
+@contextmanager
+def etapa(nombre, filas=None, detalle=None, registro=None):
+    """
+    Mide una etapa. Se puede anidar: la ruta de la medición ("comparar/índice de claves") refleja
+    las etapas abiertas al entrar.
+
+    Parámetros:
+        nombre: Nombre de la etapa (ver las constantes ETAPA_*).
+        filas: Filas procesadas, si se conocen al empezar; también se puede asignar medicion["filas"].
+        detalle: Texto opcional que distingue variantes de la etapa (motor, formato...).
+        registro: Registro de la sesión; por defecto, el de la etapa que la contiene. Una etapa sin
+            registro se mide igual, pero no se guarda.
+
+    Retorna (con `as`):
+        Diccionario de la medición, que se completa al salir del bloque.
+    """
+    padre = _etapa_actual.get()
+    registro = registro if registro is not None else (padre["registro"] if padre else None)
+    avisar = registro.get("avisar") if registro is not None else None
+
+    medicion = {
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "etapa": nombre,
+        "detalle": detalle,
+        "ruta": f"{padre['medicion']['ruta']}/{nombre}" if padre else nombre,
+        "nivel": padre["medicion"]["nivel"] + 1 if padre else 0,
+        "filas": filas,
+        "duracion_s": None,
+        "filas_por_s": None,
+        "memoria_mib": None,
+    }
+    if avisar is not None:
+        avisar(medicion, False)
+
+    iniciar_memoria = padre is None and registro is not None and registro["memoria"] and not tracemalloc.is_tracing()
+    if iniciar_memoria:
+        tracemalloc.start()
+
+    actual, pico = _memoria_actual()
+    if padre is not None and pico is not None:
+        padre["pico"] = max(padre["pico"] or 0, pico)
+    if pico is not None:
+        tracemalloc.reset_peak()
+
+    abierta = {"medicion": medicion, "registro": registro, "pico": None, "hijas": [], "memoria_inicial": actual}
+    token = _etapa_actual.set(abierta)
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    finally:
+        duracion = time.perf_counter() - inicio
+        _etapa_actual.reset(token)
+
+        _, pico = _memoria_actual()
+        if pico is not None and abierta["memoria_inicial"] is not None:
+            pico = max(abierta["pico"] or 0, pico)
+            medicion["memoria_mib"] = round(max(pico - abierta["memoria_inicial"], 0) / (1024 * 1024), 3)
+            tracemalloc.reset_peak()
+            if padre is not None:
+                padre["pico"] = max(padre["pico"] or 0, pico)
+        if iniciar_memoria:
+            tracemalloc.stop()
+
+        medicion["duracion_s"] = duracion
+        if medicion["filas"] and duracion > 0:
+            medicion["filas_por_s"] = medicion["filas"] / duracion
+
+        # Las hijas terminan antes que su etapa: el orden de la lista es el de cierre
+        if padre is not None:
+            padre["hijas"].extend(abierta["hijas"] + [medicion])
+        elif registro is not None:
+            mediciones = abierta["hijas"] + [medicion]
+            registro["mediciones"].extend(mediciones)
+            if registro["persistir"] is not None:
+                try:
+                    registro["persistir"](mediciones)
+                except Exception:
+                    # Una falla al guardar las mediciones no debe interrumpir la operación medida
+                    pass
+        if avisar is not None:
+            avisar(medicion, True)
+
+
+def medir(nombre, funcion, *args, filas=None, detalle=None, registro=None, **kwargs):
+    """
+    Ejecuta funcion(*args, **kwargs) dentro de una etapa y retorna su resultado.
+    """
+    with etapa(nombre, filas=filas, detalle=detalle, registro=registro):
+        return funcion(*args, **kwargs)
@@ -0,0 +1,130 @@
+# performance/rerun_benchmark.py
+"""
+Costo de recarga de la interfaz: Streamlit vuelve a ejecutar main.py completo en cada interacción.
+Ejecuta la aplicación sin navegador (streamlit.testing) sobre una base de datos temporal y mide:
+
+- el arranque en frío: la primera ejecución de main.py en un proceso nuevo, con sus importaciones;
+- las recargas siguientes de la página inicial y con un resultado del historial abierto.
+
+Uso:
+    python -m performance.rerun_benchmark --recargas 30 --limite-ms 50 --salida recargas.json
+
+El proceso termina con código 1 si la mediana de las recargas de algún escenario supera --limite-ms.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+RUTA_APLICACION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+# Mediana admitida de una recarga (ms)
+LIMITE_RECARGA_MS = 50
+ESPERA_EJECUCION_S = 120
+
+
+def _compilar_una_vez():
+    # El servidor de Streamlit compila main.py una sola vez y reutiliza el código en cada recarga;
+    # AppTest crea un caché nuevo en cada ejecución. Se comparte uno para medir lo mismo que el servidor.
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    compartido = ScriptCache()
+    obtener_codigo = ScriptCache.get_bytecode
+    ScriptCache.get_bytecode = lambda _, ruta: obtener_codigo(compartido, ruta)
+
+
+def _ejecutar(app):
+    inicio = time.perf_counter()
+    app.run()
+    duracion_ms = (time.perf_counter() - inicio) * 1_000
+    if app.exception:
+        raise RuntimeError(f"La aplicación falló: {app.exception[0].value}")
+    return duracion_ms
+
+
+def _resumen(duraciones_ms):
+    p50, p95 = np.percentile(duraciones_ms, [50, 95])
+    return {"recargas": len(duraciones_ms), "p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "max_ms": round(max(duraciones_ms), 2)}
+
+
+def poblar_historial(comparaciones, filas):
+    """
+    Guarda `comparaciones` comparaciones sintéticas de `filas` filas en la base de datos configurada.
+    """
+    from db.crud import insertar_comparaciones
+    from performance.synthetic import generar_par
+    from processing.diff_engine import comparar_listas_dinamico
+
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    resultado = comparar_listas_dinamico(*generar_par(filas))
+    insertar_comparaciones([
+        (fecha, f"referencia_{i}.xlsx", f"actualizado_{i}.xlsx", resultado) for i in range(comparaciones)
+    ])
+
+
+def medir_recargas(recargas, comparaciones, filas):
+    """
+    Mide el arranque en frío y las recargas de la aplicación. Debe llamarse en un proceso que todavía no
+    haya importado los módulos de la aplicación (para que el arranque incluya sus importaciones).
+
+    Retorna:
+        Diccionario con "arranque_ms" y, por escenario ("inicio", "resultado"), el resumen de sus recargas.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    _compilar_una_vez()
+    app = AppTest.from_file(RUTA_APLICACION, default_timeout=ESPERA_EJECUCION_S)
+    resultados = {"arranque_ms": round(_ejecutar(app), 2)}
+
+    if comparaciones:
+        poblar_historial(comparaciones, filas)
+    resultados["inicio"] = _resumen([_ejecutar(app) for _ in range(recargas)])
+
+    if comparaciones:
+        # Resultado del historial abierto: tablas por páginas y diálogo de descarga en cada recarga
+        next(boton for boton in app.sidebar.button if boton.label == "Ver Resultado").click()
+        _ejecutar(app)
+        resultados["resultado"] = _resumen([_ejecutar(app) for _ in range(recargas)])
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el arranque y las recargas de la interfaz de Streamlit.")
+    parser.add_argument("--recargas", type=int, default=30, help="Recargas medidas por escenario.")
+    parser.add_argument("--comparaciones", type=int, default=25, help="Comparaciones guardadas en el historial de prueba.")
+    parser.add_argument("--filas", type=int, default=1_000, help="Filas de cada comparación del historial de prueba.")
+    parser.add_argument("--limite-ms", type=float, default=LIMITE_RECARGA_MS, help="Mediana admitida de una recarga (ms).")
+    parser.add_argument("--salida", help="Archivo JSON con los resultados.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="diffly_recargas_") as carpeta:
+        # La aplicación lee la ruta de la base de datos al importar db/db.py
+        os.environ["DIFFLY_DB"] = os.path.join(carpeta, "recargas.db")
+        resultados = medir_recargas(args.recargas, args.comparaciones, args.filas)
+        from db.db import configurar_base_datos
+        configurar_base_datos(os.environ["DIFFLY_DB"])  # cierra las conexiones antes de borrar la carpeta
+
+    print(f"Arranque en frío: {resultados['arranque_ms']:,.1f} ms")
+    excedidos = []
+    for escenario in ("inicio", "resultado"):
+        if escenario not in resultados:
+            continue
+        resumen = resultados[escenario]
+        print(f"Recarga ({escenario}): p50 {resumen['p50_ms']:,.1f} ms, p95 {resumen['p95_ms']:,.1f} ms, máx. {resumen['max_ms']:,.1f} ms")
+        if resumen["p50_ms"] > args.limite_ms:
+            excedidos.append(escenario)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump({"parametros": vars(args), **resultados}, archivo, indent=2, ensure_ascii=False)
+    if excedidos:
+        print(f"\nLa mediana de las recargas supera {args.limite_ms:g} ms en: {', '.join(excedidos)}.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
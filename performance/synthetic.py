@@ -0,0 +1,183 @@
+# performance/synthetic.py
+"""
+Generador de pares de archivos sintéticos (referencia y actualizado) para benchmarks y pruebas.
+
+Uso:
+    python -m performance.synthetic --filas 100000 --columnas 8 --tasa-cambios 0.05 --carpeta datos --formato xlsx
+"""
+import argparse
+import os
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+# Tipos de columna admitidos; las columnas (salvo la clave) los recorren en orden
+TIPOS_COLUMNA = ("int", "float", "str", "fecha", "bool")
+# Filas de datos que admite una hoja de Excel (sin contar el encabezado)
+FILAS_MAXIMAS_XLSX = 1_048_575
+FORMATOS_SINTETICOS = ("xlsx", "csv", "parquet", "feather")
+
+
+def _columna(tipo, filas, rng):
+    if tipo == "int":
+        return rng.integers(0, 1_000, filas)
+    if tipo == "float":
+        return rng.random(filas).round(2) * 1_000
+    if tipo == "str":
+        return pd.Series(rng.integers(0, 50_000, filas)).map("producto {}".format).astype("str")
+    if tipo == "fecha":
+        return pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 3_650, filas), unit="D")
+    if tipo == "bool":
+        return rng.random(filas) < 0.5
+    raise ValueError(f"Tipo de columna desconocido: {tipo}")
+
+
+def _modificar(serie, filas):
+    # Cambio distinguible según el tipo de la columna
+    valores = serie.iloc[filas]
+    if pd.api.types.is_bool_dtype(serie):
+        return ~valores
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return valores + pd.Timedelta(days=1)
+    if pd.api.types.is_numeric_dtype(serie):
+        return valores + 1
+    return valores + " (modificado)"
+
+
+def generar_par(filas, columnas=8, tipos=TIPOS_COLUMNA, tasa_cambios=0.05, tasa_nuevas=0.01,
+                tasa_eliminadas=0.01, desordenar=False, semilla=0):
+    """
+    Genera un par (plantilla_df, actualizada_df) con una clave única "SKU" en la primera columna.
+
+    Parámetros:
+        filas: Filas del archivo de referencia.
+        columnas: Columnas además de la clave; sus tipos recorren `tipos` en orden.
+        tipos: Tipos de columna (ver TIPOS_COLUMNA).
+        tasa_cambios: Fracción de las filas conservadas con una celda modificada.
+        tasa_nuevas: Filas nuevas en el archivo actualizado, como fracción de `filas`.
+        tasa_eliminadas: Fracción de las filas de referencia que no aparecen en el archivo actualizado.
+        desordenar: Si es True, el archivo actualizado tiene sus filas en otro orden.
+        semilla: Semilla del generador aleatorio (el mismo valor produce los mismos archivos).
+
+    Retorna:
+        Tupla (plantilla_df, actualizada_df).
+    """
+    rng = np.random.default_rng(semilla)
+    tipos = list(tipos)
+    nombres = [f"{tipos[i % len(tipos)]}_{i}" for i in range(columnas)]
+
+    def tabla(claves):
+        datos = {"SKU": claves}
+        for i, nombre in enumerate(nombres):
+            datos[nombre] = _columna(tipos[i % len(tipos)], len(claves), rng)
+        return pd.DataFrame(datos)
+
+    plantilla = tabla(np.arange(filas))
+
+    # Filas eliminadas y celdas modificadas (una columna al azar por fila modificada)
+    conservadas = np.flatnonzero(rng.random(filas) >= tasa_eliminadas)
+    actualizada = plantilla.iloc[conservadas].reset_index(drop=True)
+    if nombres:
+        modificadas = np.flatnonzero(rng.random(len(actualizada)) < tasa_cambios)
+        columna_modificada = rng.integers(0, len(nombres), len(modificadas))
+        for i, nombre in enumerate(nombres):
+            filas_columna = modificadas[columna_modificada == i]
+            valores = actualizada[nombre].copy()
+            valores.iloc[filas_columna] = _modificar(valores, filas_columna).to_numpy()
+            actualizada[nombre] = valores
+
+    nuevas = tabla(np.arange(filas, filas + int(round(filas * tasa_nuevas))))
+    actualizada = pd.concat([actualizada, nuevas], ignore_index=True)
+    if desordenar:
+        actualizada = actualizada.iloc[rng.permutation(len(actualizada))].reset_index(drop=True)
+    return plantilla, actualizada
+
+
+def _escribir_xlsx(df, ruta):
+    # Modo de solo escritura: no se arma la hoja completa en memoria
+    if len(df) > FILAS_MAXIMAS_XLSX:
+        raise ValueError(f"Una hoja de Excel admite hasta {FILAS_MAXIMAS_XLSX:,} filas; use csv o parquet.")
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    hoja.append(list(df.columns))
+    for fila in df.astype(object).itertuples(index=False, name=None):
+        hoja.append(fila)
+    libro.save(ruta)
+
+
+def escribir_tabla(df, ruta):
+    """
+    Escribe un DataFrame en el formato indicado por la extensión de `ruta` (xlsx, csv, parquet o feather).
+    """
+    formato = os.path.splitext(ruta)[1].lower().lstrip(".")
+    if formato == "xlsx":
+        _escribir_xlsx(df, ruta)
+    elif formato == "csv":
+        df.to_csv(ruta, index=False)
+    elif formato == "parquet":
+        df.to_parquet(ruta, index=False)
+    elif formato == "feather":
+        df.to_feather(ruta)
+    else:
+        raise ValueError(f"Formato no admitido: {formato}")
+
+
+def escribir_par(plantilla, actualizada, carpeta, formato="xlsx", prefijo="sintetico"):
+    """
+    Escribe el par en `carpeta` y retorna las rutas (referencia, actualizada).
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    rutas = (
+        os.path.join(carpeta, f"{prefijo}.{formato}"),
+        os.path.join(carpeta, f"{prefijo}_actualizada.{formato}"),
+    )
+    for df, ruta in zip((plantilla, actualizada), rutas):
+        escribir_tabla(df, ruta)
+    return rutas
+
+
+def agregar_argumentos(parser):
+    """
+    Agrega al parser las opciones del generador (compartidas con performance.benchmark).
+    """
+    parser.add_argument("--columnas", type=int, default=8, help="Columnas además de la clave.")
+    parser.add_argument("--tipos", nargs="+", choices=TIPOS_COLUMNA, default=list(TIPOS_COLUMNA), help="Tipos de las columnas, en orden.")
+    parser.add_argument("--tasa-cambios", type=float, default=0.05, help="Fracción de filas con una celda modificada.")
+    parser.add_argument("--tasa-nuevas", type=float, default=0.01, help="Filas nuevas, como fracción de las filas.")
+    parser.add_argument("--tasa-eliminadas", type=float, default=0.01, help="Fracción de filas eliminadas.")
+    parser.add_argument("--desordenar", action="store_true", help="Cambia el orden de las filas del archivo actualizado.")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla del generador aleatorio.")
+
+
+def opciones_generador(args):
+    """
+    Opciones de generar_par a partir de los argumentos de agregar_argumentos.
+    """
+    return {
+        "columnas": args.columnas,
+        "tipos": args.tipos,
+        "tasa_cambios": args.tasa_cambios,
+        "tasa_nuevas": args.tasa_nuevas,
+        "tasa_eliminadas": args.tasa_eliminadas,
+        "desordenar": args.desordenar,
+        "semilla": args.semilla,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un par de archivos sintéticos (referencia y actualizado).")
+    parser.add_argument("--filas", type=int, default=100_000, help="Filas del archivo de referencia.")
+    parser.add_argument("--carpeta", default=".", help="Carpeta de salida.")
+    parser.add_argument("--formato", choices=FORMATOS_SINTETICOS, default="xlsx", help="Formato de los archivos.")
+    parser.add_argument("--prefijo", default="sintetico", help="Prefijo del nombre de los archivos.")
+    agregar_argumentos(parser)
+    args = parser.parse_args()
+
+    plantilla, actualizada = generar_par(args.filas, **opciones_generador(args))
+    for ruta in escribir_par(plantilla, actualizada, args.carpeta, args.formato, args.prefijo):
+        print(ruta)
+
+
+if __name__ == "__main__":
+    main()
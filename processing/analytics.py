@@ -0,0 +1,235 @@
+# processing/analytics.py
+"""
+Analítica de los cambios de una comparación en agregados de tamaño fijo: claves por Estado, celdas
+cambiadas por columna, distribución de la variación de las columnas numéricas y claves destacadas
+(las de más columnas cambiadas y las de mayor variación en cada columna numérica).
+
+Los motores la calculan al terminar la comparación, a partir de los valores de las celdas cambiadas
+que ya tienen en memoria, sin construir cambios_detallados. Se guarda con la comparación, y los
+gráficos se dibujan desde estos agregados sin volver a leer el resultado, también en el historial.
+"""
+import numpy as np
+import pandas as pd
+
+from performance.profiler import ETAPA_ANALITICA, etapa
+from processing.result import COLUMNAS_DE_REGISTRO, conteo_estados
+
+# Claves destacadas que se conservan, en total y por columna numérica
+CLAVES_DESTACADAS = 10
+# Límites (en %) de los intervalos del histograma de variación relativa de las columnas numéricas
+LIMITES_VARIACION = [-50, -20, -10, -5, -1, 0, 1, 5, 10, 20, 50]
+
+
+def intervalos_variacion():
+    """
+    Etiquetas de los intervalos del histograma de variación relativa (uno más que LIMITES_VARIACION).
+    """
+    limites = LIMITES_VARIACION
+    return [f"< {limites[0]} %"] + [f"{inicio} a {fin} %" for inicio, fin in zip(limites[:-1], limites[1:])] + [f"≥ {limites[-1]} %"]
+
+
+def _mayores(medida, desempate=None):
+    """
+    Posiciones de los CLAVES_DESTACADAS mayores valores de `medida`, de mayor a menor. Los empates se
+    resuelven por el menor valor de `desempate` (por defecto, por el orden de las posiciones). Solo se
+    ordenan los candidatos, no todas las celdas.
+    """
+    medida = np.asarray(medida)
+    if len(medida) > CLAVES_DESTACADAS:
+        umbral = np.partition(medida, len(medida) - CLAVES_DESTACADAS)[len(medida) - CLAVES_DESTACADAS]
+        candidatos = np.flatnonzero(medida >= umbral)
+    else:
+        candidatos = np.arange(len(medida))
+    desempate = candidatos if desempate is None else np.asarray(desempate)[candidatos]
+    return candidatos[np.lexsort((desempate, -medida[candidatos]))][:CLAVES_DESTACADAS]
+
+
+def _numeros(serie):
+    """
+    Valores de la columna como decimales, o None si no es numérica. Las columnas de objetos (motor
+    iterativo) se toman como numéricas si todos sus valores son números.
+    """
+    if pd.api.types.is_bool_dtype(serie.dtype):
+        return None
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        return serie.to_numpy(dtype=np.float64, na_value=np.nan)
+    if serie.dtype == object and pd.api.types.infer_dtype(serie, skipna=True) in ("integer", "floating", "mixed-integer-float"):
+        return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return None
+
+
+def _analizar_columna(claves, anteriores, nuevos, filas, con_filas=False):
+    """
+    Agregados de las celdas cambiadas de una columna: cantidad y, si es numérica, aumentos,
+    disminuciones, variación mínima, máxima y media, histograma de variación relativa (solo celdas
+    con valor anterior distinto de cero) y las claves de mayor variación absoluta; entre variaciones
+    iguales queda primero la de menor fila en `filas`, que se agrega a cada una si `con_filas`.
+    """
+    analitica = {"cambios": len(anteriores)}
+    numeros_anteriores, numeros_nuevos = _numeros(anteriores), _numeros(nuevos)
+    if numeros_anteriores is None or numeros_nuevos is None:
+        return analitica
+
+    variacion = numeros_nuevos - numeros_anteriores
+    validas = np.flatnonzero(np.isfinite(variacion))
+    diferencias = variacion[validas]
+    con_base = validas[numeros_anteriores[validas] != 0]
+    relativas = variacion[con_base] / np.abs(numeros_anteriores[con_base]) * 100
+    mayores = validas[_mayores(np.abs(diferencias), filas[validas])]
+    analitica.update({
+        "variaciones": len(diferencias),
+        "aumentos": int((diferencias > 0).sum()),
+        "disminuciones": int((diferencias < 0).sum()),
+        "variacion_minima": float(diferencias.min()) if len(diferencias) else None,
+        "variacion_maxima": float(diferencias.max()) if len(diferencias) else None,
+        "variacion_media": float(diferencias.mean()) if len(diferencias) else None,
+        "histograma": np.bincount(
+            np.searchsorted(LIMITES_VARIACION, relativas, side="right"), minlength=len(LIMITES_VARIACION) + 1
+        ).tolist(),
+        "mayores_variaciones": [
+            list(fila) for fila in zip(
+                claves[mayores].tolist(), anteriores.iloc[mayores].tolist(), nuevos.iloc[mayores].tolist(), variacion[mayores].tolist(),
+                *([filas[mayores].tolist()] if con_filas else []),
+            )
+        ],
+    })
+    return analitica
+
+
+def analizar_resultado(resultado, filas=None):
+    """
+    Calcula la analítica de un contenedor del resultado (ver processing.result.crear_resultado).
+    Recorre solo las celdas cambiadas, con operaciones sobre arreglos.
+
+    Parámetros:
+        resultado: Contenedor del resultado.
+        filas: Fila del archivo actualizado de cada fila de cambios_detallados, para analizar una
+            partición (ver diff_engine.filas_detallados_globales). Las claves destacadas empatadas se
+            ordenan por su primera fila, que se agrega al final de cada una para que
+            combinar_analiticas las ordene igual que una comparación sin particiones. Por defecto,
+            el orden de cambios_detallados, que es el de las filas del archivo.
+
+    Retorna:
+        Diccionario de tipos de Python (se guarda como JSON) con:
+            "estados": Estado -> cantidad de claves.
+            "columnas": columna -> agregados de sus celdas cambiadas (ver _analizar_columna).
+            "claves_mas_cambios": lista de [clave, columnas cambiadas], de mayor a menor. Las filas
+                repetidas de una clave en el archivo actualizado cuentan juntas: cada columna
+                cambiada en alguna de ellas cuenta una vez.
+    """
+    detallados = resultado["detallados"]
+    con_filas = filas is not None
+    filas = np.arange(len(detallados)) if filas is None else np.asarray(filas)
+    with etapa(ETAPA_ANALITICA, filas=len(detallados)):
+        categorias = detallados["Columna"].cat.categories
+        codigos = detallados["Columna"].cat.codes.to_numpy()
+        claves = detallados["SKU"].to_numpy(dtype=object)
+
+        # Filas de cambios_detallados agrupadas por columna, conservando su orden
+        orden = np.argsort(codigos, kind="stable")
+        limites = np.searchsorted(codigos[orden], np.arange(len(categorias) + 1))
+        columnas = {}
+        for codigo, columna in enumerate(categorias):
+            if columna in COLUMNAS_DE_REGISTRO or columna not in resultado["valores"]:
+                continue
+            seleccion = orden[limites[codigo]:limites[codigo + 1]]
+            anteriores, nuevos = resultado["valores"][columna]
+            # Valores en el orden de cambios_detallados (al combinar particiones quedan por partición)
+            posiciones = resultado["indice_valor"][seleccion]
+            if np.any(np.diff(posiciones) < 0):
+                anteriores, nuevos = anteriores.iloc[posiciones], nuevos.iloc[posiciones]
+            columnas[str(columna)] = _analizar_columna(claves[seleccion], anteriores, nuevos, filas[seleccion], con_filas)
+
+        # Columnas distintas cambiadas por clave, en el orden en que aparece cada clave
+        de_registro = np.isin(np.asarray(categorias, dtype=object), COLUMNAS_DE_REGISTRO)
+        celdas = np.flatnonzero((codigos >= 0) & ~np.append(de_registro, False)[codigos])
+        codigo_clave, unicas = pd.factorize(detallados["SKU"].iloc[celdas], sort=False)
+        pares = np.unique(codigo_clave * max(len(categorias), 1) + codigos[celdas])
+        por_clave = np.bincount(pares // max(len(categorias), 1), minlength=len(unicas))
+        primeras = celdas[np.unique(codigo_clave, return_index=True)[1]]
+        destacadas = _mayores(por_clave, filas[primeras])
+
+        return {
+            "estados": {str(estado): int(cantidad) for estado, cantidad in conteo_estados(resultado).items()},
+            "columnas": columnas,
+            "claves_mas_cambios": [
+                [clave, int(cantidad), *([int(fila)] if con_filas else [])]
+                for clave, cantidad, fila in zip(
+                    detallados["SKU"].iloc[primeras[destacadas]].tolist(), por_clave[destacadas].tolist(), filas[primeras[destacadas]].tolist()
+                )
+            ],
+        }
+
+
+def _combinar_columna(combinada, datos):
+    """
+    Une los agregados de una columna de dos resultados parciales (ver _analizar_columna), cuyas
+    mayores variaciones llevan al final su fila en el archivo actualizado.
+    """
+    if combinada is None:
+        return dict(datos)
+    union = {"cambios": combinada["cambios"] + datos["cambios"]}
+    # Si en alguna parte la columna no es numérica, solo se conserva la cantidad de cambios
+    if "histograma" not in combinada or "histograma" not in datos:
+        return union
+    variaciones = combinada["variaciones"] + datos["variaciones"]
+    minimas = [parte["variacion_minima"] for parte in (combinada, datos) if parte["variacion_minima"] is not None]
+    maximas = [parte["variacion_maxima"] for parte in (combinada, datos) if parte["variacion_maxima"] is not None]
+    mayores = combinada["mayores_variaciones"] + datos["mayores_variaciones"]
+    union.update({
+        "variaciones": variaciones,
+        "aumentos": combinada["aumentos"] + datos["aumentos"],
+        "disminuciones": combinada["disminuciones"] + datos["disminuciones"],
+        "variacion_minima": min(minimas) if minimas else None,
+        "variacion_maxima": max(maximas) if maximas else None,
+        "variacion_media": sum(
+            parte["variacion_media"] * parte["variaciones"] for parte in (combinada, datos) if parte["variaciones"]
+        ) / variaciones if variaciones else None,
+        "histograma": [a + b for a, b in zip(combinada["histograma"], datos["histograma"])],
+        "mayores_variaciones": [
+            mayores[i] for i in _mayores(np.abs([fila[3] for fila in mayores], dtype=np.float64), [fila[4] for fila in mayores])
+        ],
+    })
+    return union
+
+
+def combinar_analiticas(analiticas):
+    """
+    Une las analíticas de resultados parciales, p. ej. las de cada partición de la comparación por
+    bloques, que se guardan sin combinar sus resultados (ver processing.streaming).
+
+    Las analíticas deben calcularse con las filas globales (ver el parámetro `filas` de
+    analizar_resultado) y las particiones deben repartir las claves, de modo que todas las filas de
+    una clave queden en la misma parte. Las cantidades y los histogramas se suman, la variación media
+    se pondera por las variaciones de cada parte y las claves destacadas se ordenan por su fila, de
+    modo que el resultado es el mismo que el de la comparación sin particiones (salvo el redondeo de
+    la variación media). Las filas agregadas por analizar_resultado se quitan.
+    """
+    estados, columnas, claves_mas_cambios = {}, {}, []
+    for analitica in analiticas:
+        for estado, cantidad in analitica["estados"].items():
+            estados[estado] = estados.get(estado, 0) + cantidad
+        for columna, datos in analitica["columnas"].items():
+            columnas[columna] = _combinar_columna(columnas.get(columna), datos)
+        claves_mas_cambios += analitica["claves_mas_cambios"]
+    destacadas = _mayores(
+        np.array([fila[1] for fila in claves_mas_cambios], dtype=np.int64), [fila[2] for fila in claves_mas_cambios]
+    )
+    for datos in columnas.values():
+        if "mayores_variaciones" in datos:
+            datos["mayores_variaciones"] = [fila[:4] for fila in datos["mayores_variaciones"]]
+    return {
+        "estados": estados,
+        "columnas": columnas,
+        "claves_mas_cambios": [claves_mas_cambios[i][:2] for i in destacadas],
+    }
+
+
+def analitica_de_resultado(resultado):
+    """
+    Retorna la analítica del resultado: la que calculó el motor o, en los contenedores armados sin
+    ella (p. ej. desde el historial), la calcula y la conserva en el contenedor.
+    """
+    if resultado.get("analitica") is None:
+        resultado["analitica"] = analizar_resultado(resultado)
+    return resultado["analitica"]
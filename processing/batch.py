@@ -0,0 +1,332 @@
+# processing/batch.py
+"""
+Procesamiento por lotes sin interfaz: compara muchos pares de archivos (referencia y actualizado)
+en varios procesos y guarda los resultados en la base de datos de comparaciones, varias
+comparaciones por transacción. No importa Streamlit.
+
+Uso:
+    python -m processing.batch --manifiesto pares.csv --procesos 4
+    python -m processing.batch --referencias referencias/ --actualizados actualizados/ --exportar xlsx --carpeta-salida resultados/
+    python -m processing.batch --manifiesto pares.csv --columnas-clave SKU Deposito --clave-difusa
+    python -m processing.batch --manifiesto pares.csv --tolerancia Precio=0.01 --sin-recortar
+
+El manifiesto es un CSV con las columnas "referencia" y "actualizado" (rutas absolutas o relativas
+a la carpeta del manifiesto). Con --referencias y --actualizados, cada archivo de referencia se
+compara con el archivo actualizado del mismo nombre (sin extensión).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import pandas as pd
+
+from db.db import RUTA_BASE_DATOS, configurar_base_datos, init_db
+from db.crud import insertar_comparaciones, insertar_mediciones
+from performance.profiler import ETAPA_COMPARAR, ETAPA_EXPORTACION, ETAPA_GUARDADO, ETAPA_LECTURA, crear_registro, etapa
+from processing.diff_engine import MOTOR_VECTORIZADO, MOTORES, comparar_listas_dinamico
+from processing.export import FORMATOS_EXPORTACION, exportar_resultado
+from processing.ingest import EXTENSIONES_ADMITIDAS, leer_tabla
+from processing.key_matching import UMBRAL_CONFIANZA, preparar_claves
+from processing.result import ESTADOS, conteo_estados
+from processing.schema import alinear_esquemas, esquema_como_datos
+
+# Comparaciones que se guardan por transacción
+COMPARACIONES_POR_LOTE = 10
+
+
+def leer_manifiesto(ruta):
+    """
+    Lee un manifiesto CSV con las columnas "referencia" y "actualizado".
+
+    Retorna:
+        Lista de tuplas (ruta_referencia, ruta_actualizado).
+    """
+    manifiesto = pd.read_csv(ruta, dtype=str, skipinitialspace=True)
+    faltantes = {"referencia", "actualizado"} - set(manifiesto.columns)
+    if faltantes:
+        raise ValueError(f"Al manifiesto le faltan las columnas: {', '.join(sorted(faltantes))}")
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    return [
+        (os.path.join(carpeta, referencia.strip()), os.path.join(carpeta, actualizado.strip()))
+        for referencia, actualizado in zip(manifiesto["referencia"], manifiesto["actualizado"])
+    ]
+
+
+def _archivos_por_nombre(carpeta):
+    archivos = {}
+    for nombre in sorted(os.listdir(carpeta)):
+        base, extension = os.path.splitext(nombre)
+        if extension.lower().lstrip(".") in EXTENSIONES_ADMITIDAS:
+            archivos[base] = os.path.join(carpeta, nombre)
+    return archivos
+
+
+def pares_de_carpetas(referencias, actualizados):
+    """
+    Empareja los archivos de dos carpetas por nombre (sin extensión). Los archivos sin pareja se
+    informan por la salida de errores.
+
+    Retorna:
+        Lista de tuplas (ruta_referencia, ruta_actualizado).
+    """
+    archivos_referencia = _archivos_por_nombre(referencias)
+    archivos_actualizados = _archivos_por_nombre(actualizados)
+    for base in sorted(set(archivos_referencia) ^ set(archivos_actualizados)):
+        ruta = archivos_referencia.get(base) or archivos_actualizados.get(base)
+        print(f"Sin pareja, se omite: {ruta}", file=sys.stderr)
+    return [
+        (archivos_referencia[base], archivos_actualizados[base])
+        for base in archivos_referencia if base in archivos_actualizados
+    ]
+
+
+def comparar_par(referencia, actualizado, motor=MOTOR_VECTORIZADO, formato_exportacion=None, carpeta_salida=None,
+                 columnas_clave=None, clave_difusa=False, umbral_clave=UMBRAL_CONFIANZA, tolerancias=None, recortar_textos=True):
+    """
+    Lee y compara un par de archivos y, si se indica, exporta el resultado. Se ejecuta en los
+    procesos del lote. columnas_clave, clave_difusa y umbral_clave se aplican con
+    processing.key_matching.preparar_claves; tolerancias y recortar_textos, con
+    processing.schema.alinear_esquemas.
+
+    Retorna:
+        Diccionario con las rutas, el resultado (o None si hubo un error), las mediciones de cada
+        etapa, la ruta exportada y el error.
+    """
+    registro = crear_registro()
+    salida = {"referencia": referencia, "actualizado": actualizado, "resultado": None, "exportado": None, "error": None}
+    try:
+        with etapa(ETAPA_LECTURA, detalle="lote", registro=registro) as medicion:
+            plantilla_df = leer_tabla(referencia)
+            actualizada_df = leer_tabla(actualizado)
+            medicion["filas"] = len(plantilla_df) + len(actualizada_df)
+
+        with etapa(ETAPA_COMPARAR, filas=len(plantilla_df) + len(actualizada_df), detalle=f"lote, {motor}", registro=registro):
+            esquema = alinear_esquemas(plantilla_df, actualizada_df, tolerancias, recortar_textos)
+            plantilla_df, actualizada_df, emparejamientos = preparar_claves(
+                esquema["plantilla"], esquema["actualizada"], columnas_clave, clave_difusa, umbral_clave
+            )
+            resultado = comparar_listas_dinamico(plantilla_df, actualizada_df, motor=motor, tolerancias=tolerancias)
+            resultado["emparejamientos"] = emparejamientos
+            resultado["esquema"] = esquema_como_datos(esquema)
+            del esquema
+        del plantilla_df, actualizada_df
+
+        if formato_exportacion:
+            nombre = os.path.splitext(os.path.basename(actualizado))[0]
+            salida["exportado"] = os.path.join(carpeta_salida, f"{nombre}_comparacion.{formato_exportacion}")
+            with etapa(ETAPA_EXPORTACION, filas=len(resultado["plantilla"]), detalle=formato_exportacion, registro=registro):
+                with open(salida["exportado"], "wb") as destino:
+                    exportar_resultado(resultado, formato_exportacion, destino)
+        salida["resultado"] = resultado
+    except Exception as e:
+        salida["error"] = f"{type(e).__name__}: {e}"
+    salida["mediciones"] = list(registro["mediciones"])
+    return salida
+
+
+def _resumen_par(salida, comparacion_id):
+    duraciones = {medicion["etapa"]: medicion["duracion_s"] for medicion in salida["mediciones"] if medicion["nivel"] == 0}
+    resumen = {
+        "referencia": salida["referencia"],
+        "actualizado": salida["actualizado"],
+        "id": comparacion_id,
+        "filas": len(salida["resultado"]["plantilla"]) if salida["resultado"] is not None else None,
+        **dict.fromkeys(ESTADOS[1:]),
+        "emparejadas": None,
+        "columnas_agregadas": None,
+        "columnas_eliminadas": None,
+        "lectura_s": duraciones.get(ETAPA_LECTURA),
+        "comparacion_s": duraciones.get(ETAPA_COMPARAR),
+        "exportacion_s": duraciones.get(ETAPA_EXPORTACION),
+        "exportado": salida["exportado"],
+        "error": salida["error"],
+    }
+    if salida["resultado"] is not None:
+        conteo = conteo_estados(salida["resultado"])
+        for estado in ESTADOS[1:]:
+            resumen[estado] = int(conteo.get(estado, 0))
+        if salida["resultado"].get("emparejamientos") is not None:
+            resumen["emparejadas"] = len(salida["resultado"]["emparejamientos"])
+        esquema = salida["resultado"]["esquema"]
+        resumen["columnas_agregadas"] = ", ".join(esquema["agregadas"]) or None
+        resumen["columnas_eliminadas"] = ", ".join(esquema["eliminadas"]) or None
+    return resumen
+
+
+def _guardar_lote(pendientes, registro):
+    # Una transacción por lote; si falla, se informan como error todas las comparaciones del lote
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    filas = sum(len(salida["resultado"]["plantilla"]) for salida in pendientes)
+    try:
+        with etapa(ETAPA_GUARDADO, filas=filas, detalle=f"lote de {len(pendientes)}", registro=registro):
+            ids = insertar_comparaciones([
+                (fecha, os.path.basename(salida["referencia"]), os.path.basename(salida["actualizado"]), salida["resultado"])
+                for salida in pendientes
+            ])
+    except Exception as e:
+        ids = [None] * len(pendientes)
+        for salida in pendientes:
+            salida["error"] = f"Error al guardar: {type(e).__name__}: {e}"
+    resumenes = [_resumen_par(salida, comparacion_id) for salida, comparacion_id in zip(pendientes, ids)]
+    pendientes.clear()
+    return resumenes
+
+
+def procesar_pares(pares, procesos=1, comparaciones_por_lote=COMPARACIONES_POR_LOTE, motor=MOTOR_VECTORIZADO,
+                   formato_exportacion=None, carpeta_salida=None, registro=None, columnas_clave=None, clave_difusa=False,
+                   umbral_clave=UMBRAL_CONFIANZA, tolerancias=None, recortar_textos=True):
+    """
+    Compara los pares en `procesos` procesos y guarda los resultados por lotes de
+    `comparaciones_por_lote` comparaciones por transacción.
+
+    Parámetros:
+        pares: Lista de tuplas (ruta_referencia, ruta_actualizado).
+        procesos: Comparaciones simultáneas (con 1 se compara en el proceso actual).
+        comparaciones_por_lote: Comparaciones guardadas por transacción.
+        motor: Motor de comparación (ver processing.diff_engine.MOTORES).
+        formato_exportacion: "xlsx", "csv" o "parquet" para exportar cada resultado; None para no exportar.
+        carpeta_salida: Carpeta de los archivos exportados.
+        registro: Registro de rendimiento (ver performance.profiler); recibe las etapas de todos los pares.
+        columnas_clave, clave_difusa, umbral_clave: Clave de comparación (ver processing.key_matching.preparar_claves).
+        tolerancias, recortar_textos: Alineación de columnas (ver processing.schema.alinear_esquemas).
+
+    Retorna:
+        Lista de resúmenes por par, en el orden de `pares` (filas, estados, tiempos de cada etapa,
+        id guardado y error).
+    """
+    registro = registro if registro is not None else crear_registro()
+    opciones = {
+        "motor": motor, "formato_exportacion": formato_exportacion, "carpeta_salida": carpeta_salida,
+        "columnas_clave": columnas_clave, "clave_difusa": clave_difusa, "umbral_clave": umbral_clave,
+        "tolerancias": tolerancias, "recortar_textos": recortar_textos,
+    }
+    resumenes, pendientes = [], []
+
+    def recibir(salida):
+        registro["mediciones"].extend(salida["mediciones"])
+        if registro["persistir"] is not None and salida["mediciones"]:
+            registro["persistir"](salida["mediciones"])
+        if salida["resultado"] is None:
+            resumenes.append(_resumen_par(salida, None))
+            return
+        pendientes.append(salida)
+        if len(pendientes) >= comparaciones_por_lote:
+            resumenes.extend(_guardar_lote(pendientes, registro))
+
+    if procesos <= 1:
+        for referencia, actualizado in pares:
+            recibir(comparar_par(referencia, actualizado, **opciones))
+    else:
+        # Como mucho dos pares por proceso en curso: los resultados no se acumulan en memoria
+        restantes = iter(pares)
+        with ProcessPoolExecutor(procesos) as executor:
+            en_curso = set()
+            while True:
+                for referencia, actualizado in restantes:
+                    en_curso.add(executor.submit(comparar_par, referencia, actualizado, **opciones))
+                    if len(en_curso) >= procesos * 2:
+                        break
+                if not en_curso:
+                    break
+                terminados, en_curso = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    recibir(futuro.result())
+
+    if pendientes:
+        resumenes.extend(_guardar_lote(pendientes, registro))
+    # Los pares terminan en cualquier orden; el resumen sigue el orden de entrada
+    posiciones = {par: posicion for posicion, par in enumerate(pares)}
+    return sorted(resumenes, key=lambda resumen: posiciones[(resumen["referencia"], resumen["actualizado"])])
+
+
+def informe_de_rendimiento(resumenes, duracion):
+    """
+    Rendimiento agregado del lote: pares correctos y con error, filas y pares por segundo.
+    """
+    correctos = [resumen for resumen in resumenes if resumen["error"] is None]
+    filas = sum(resumen["filas"] for resumen in correctos)
+    return {
+        "pares": len(resumenes),
+        "correctos": len(correctos),
+        "errores": len(resumenes) - len(correctos),
+        "filas": filas,
+        "duracion_s": round(duracion, 3),
+        "pares_por_s": round(len(correctos) / duracion, 3) if duracion else None,
+        "filas_por_s": round(filas / duracion) if duracion else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara muchos pares de archivos y guarda los resultados en la base de datos.")
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--manifiesto", help="CSV con las columnas referencia y actualizado.")
+    origen.add_argument("--referencias", help="Carpeta de archivos de referencia (requiere --actualizados).")
+    parser.add_argument("--actualizados", help="Carpeta de archivos actualizados, con los mismos nombres que las referencias.")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1, help="Comparaciones simultáneas.")
+    parser.add_argument("--por-lote", type=int, default=COMPARACIONES_POR_LOTE, help="Comparaciones guardadas por transacción.")
+    parser.add_argument("--motor", choices=MOTORES, default=MOTOR_VECTORIZADO, help="Motor de comparación.")
+    parser.add_argument("--columnas-clave", nargs="+", help="Columnas que forman la clave (por defecto, la primera columna).")
+    parser.add_argument("--clave-difusa", action="store_true", help="Empareja las claves reformateadas sin coincidencia exacta.")
+    parser.add_argument("--umbral-clave", type=float, default=UMBRAL_CONFIANZA, help="Confianza mínima del emparejamiento de claves (0 a 1).")
+    parser.add_argument("--tolerancia", nargs="+", metavar="COLUMNA=VALOR", help="Diferencia máxima que no cuenta como cambio en una columna numérica.")
+    parser.add_argument("--sin-recortar", action="store_true", help="No quita los espacios al inicio y al final de los textos.")
+    parser.add_argument("--exportar", choices=list(FORMATOS_EXPORTACION), help="Exporta cada resultado en este formato.")
+    parser.add_argument("--carpeta-salida", default=".", help="Carpeta de los archivos exportados.")
+    parser.add_argument("--base-datos", default=RUTA_BASE_DATOS, help="Base de datos de comparaciones.")
+    parser.add_argument("--informe", help="Archivo JSON con el resumen de cada par y el rendimiento del lote.")
+    args = parser.parse_args()
+
+    if args.referencias and not args.actualizados:
+        parser.error("--referencias requiere --actualizados")
+    pares = leer_manifiesto(args.manifiesto) if args.manifiesto else pares_de_carpetas(args.referencias, args.actualizados)
+    tolerancias = {}
+    for tolerancia in args.tolerancia or []:
+        columna, separador, valor = tolerancia.rpartition("=")
+        try:
+            tolerancias[columna] = float(valor)
+        except ValueError:
+            separador = ""
+        if not separador or not columna:
+            parser.error(f"--tolerancia espera COLUMNA=VALOR: {tolerancia}")
+    if args.exportar:
+        os.makedirs(args.carpeta_salida, exist_ok=True)
+
+    configurar_base_datos(args.base_datos)
+    init_db()
+    registro = crear_registro(persistir=insertar_mediciones)
+    inicio = time.perf_counter()
+    resumenes = procesar_pares(
+        pares, args.procesos, args.por_lote, args.motor, args.exportar, args.carpeta_salida, registro,
+        args.columnas_clave, args.clave_difusa, args.umbral_clave, tolerancias or None, not args.sin_recortar
+    )
+    rendimiento = informe_de_rendimiento(resumenes, time.perf_counter() - inicio)
+
+    resumen_df = pd.DataFrame(resumenes)
+    if not resumen_df.empty:
+        resumen_df["referencia"] = resumen_df["referencia"].map(os.path.basename)
+        resumen_df["actualizado"] = resumen_df["actualizado"].map(os.path.basename)
+        enteras = ["id", "filas", *ESTADOS[1:], "emparejadas"]
+        resumen_df[enteras] = resumen_df[enteras].astype("Int64")
+        print(resumen_df.drop(columns=["exportado", "error"]).to_string(index=False, float_format=lambda valor: f"{valor:,.3f}"))
+    for resumen in resumenes:
+        if resumen["error"] is not None:
+            print(f"{resumen['referencia']} / {resumen['actualizado']}: {resumen['error']}", file=sys.stderr)
+    print()
+    print(
+        f"{rendimiento['correctos']} de {rendimiento['pares']} pares en {rendimiento['duracion_s']:,.1f} s: "
+        f"{rendimiento['pares_por_s'] or 0:,.2f} pares/s, {rendimiento['filas_por_s'] or 0:,} filas/s"
+    )
+
+    if args.informe:
+        with open(args.informe, "w", encoding="utf-8") as archivo:
+            json.dump({"rendimiento": rendimiento, "pares": resumenes}, archivo, indent=2, ensure_ascii=False)
+    if rendimiento["errores"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,623 @@
+# processing/diff_engine.py
+
+import numpy as np
+import pandas as pd
+
+from performance.profiler import ETAPA_COMPARACION, ETAPA_INDICE, ETAPA_RESULTADO, etapa
+from processing.analytics import analitica_de_resultado
+from processing.fingerprint import filtrar_candidatos
+from processing.result import (
+    COLUMNA_ELIMINADO, COLUMNA_NUEVO, COLUMNAS_DE_REGISTRO, SUFIJO_ANTERIOR, SUFIJO_NUEVO, TIPO_ESTADO,
+    concatenar_series, crear_resultado, resultado_desde_listas,
+)
+
+# Motores disponibles para comparar_listas_dinamico
+MOTOR_VECTORIZADO = "vectorizado"
+MOTOR_ITERATIVO = "iterativo"
+MOTORES = (MOTOR_VECTORIZADO, MOTOR_ITERATIVO)
+
+# Códigos de Estado en el contenedor del resultado (ver processing.result.ESTADOS)
+_CODIGO_SIN_CAMBIOS, _CODIGO_ACTUALIZADO, _CODIGO_NUEVO, _CODIGO_ELIMINADO = range(4)
+
+
+# Función para comparar listas y detectar cambios
+def comparar_listas_dinamico(plantilla_df, actualizada_df, motor=MOTOR_VECTORIZADO, huellas_plantilla=None, huellas_actualizada=None, tolerancias=None):
+    """
+    Compara la planilla de referencia con la actualizada usando la primera columna como clave.
+    Cada clave queda con uno de los estados "Sin cambios", "Actualizado", "Nuevo" o "Eliminado".
+
+    Parámetros:
+        plantilla_df: DataFrame de referencia.
+        actualizada_df: DataFrame actualizado.
+        motor: "vectorizado" (por defecto) o "iterativo" para usar el recorrido fila a fila original.
+        huellas_plantilla, huellas_actualizada: Huellas de processing.fingerprint (opcional, solo motor vectorizado).
+            Permiten omitir las filas y columnas sin cambios.
+        tolerancias: Diccionario opcional columna numérica -> diferencia máxima que no cuenta como
+            cambio (ver processing.schema.alinear_esquemas).
+
+    Retorna:
+        Contenedor compacto del resultado (ver processing.result.crear_resultado), del que se obtienen
+        plantilla_procesada, cambios y cambios_detallados, con su analítica (ver processing.analytics).
+        Ambos motores producen el mismo resultado.
+    """
+    if motor == MOTOR_VECTORIZADO:
+        return comparar_listas_vectorizado(plantilla_df, actualizada_df, huellas_plantilla, huellas_actualizada, tolerancias)
+    if motor == MOTOR_ITERATIVO:
+        resultado = resultado_desde_listas(
+            *comparar_listas_iterativo(plantilla_df, actualizada_df, tolerancias),
+            tipo_clave=concatenar_series([actualizada_df.iloc[:, 0], plantilla_df.iloc[:, 0]]).dtype,
+        )
+        analitica_de_resultado(resultado)
+        return resultado
+    raise ValueError(f"Motor de comparación desconocido: {motor}")
+
+
+# Implementación original, fila a fila. Se conserva para contrastar resultados y tiempos.
+def comparar_listas_iterativo(plantilla_df, actualizada_df, tolerancias=None):
+    tolerancias = tolerancias or {}
+    plantilla_procesada = plantilla_df.copy()
+    plantilla_procesada["Estado"] = "Sin cambios"
+    plantilla_procesada["Detalles de Cambios"] = ""
+
+    cambios = []
+    cambios_detallados = []
+
+    clave_identificacion = plantilla_df.columns[0]
+    plantilla_dict = plantilla_df.set_index(clave_identificacion).to_dict("index")
+
+    # Las filas nuevas se acumulan y se agregan con una sola concatenación al final
+    filas_nuevas = []
+    claves_vistas = set()
+
+    for _, row_actualizada in actualizada_df.iterrows():
+        id_valor = row_actualizada[clave_identificacion]
+
+        if id_valor in plantilla_dict:
+            claves_vistas.add(id_valor)
+            fila_original = plantilla_dict[id_valor]
+            cambios_en_fila = False
+            detalles_cambios = []
+
+            for columna in plantilla_df.columns:
+                valor_anterior = fila_original.get(columna, None)
+                valor_nuevo = row_actualizada[columna]
+
+                if (
+                    pd.notnull(valor_anterior) and pd.notnull(valor_nuevo) and valor_anterior != valor_nuevo
+                    and not (columna in tolerancias and abs(valor_nuevo - valor_anterior) <= tolerancias[columna])
+                ):
+                    cambios_en_fila = True
+                    detalles_cambios.append(f"{columna}: {valor_anterior} -> {valor_nuevo}")
+
+                    plantilla_procesada.loc[plantilla_procesada[clave_identificacion] == id_valor, f"{columna} (Valor Anterior)"] = valor_anterior
+                    plantilla_procesada.loc[plantilla_procesada[clave_identificacion] == id_valor, f"{columna} (Valor Nuevo)"] = valor_nuevo
+                    cambios_detallados.append({
+                        "SKU": id_valor,
+                        "Columna": columna,
+                        "Valor Anterior": valor_anterior,
+                        "Valor Nuevo": valor_nuevo
+                    })
+
+            if cambios_en_fila:
+                plantilla_procesada.loc[plantilla_procesada[clave_identificacion] == id_valor, "Estado"] = "Actualizado"
+                plantilla_procesada.loc[plantilla_procesada[clave_identificacion] == id_valor, "Detalles de Cambios"] = "; ".join(detalles_cambios)
+                cambios.append((id_valor, "Actualizado"))
+            else:
+                cambios.append((id_valor, "Sin cambios"))
+        else:
+            nueva_fila = row_actualizada.to_dict()
+            nueva_fila["Estado"] = "Nuevo"
+            nueva_fila["Detalles de Cambios"] = "Nuevo registro"
+
+            for columna in plantilla_df.columns:
+                nueva_fila[f"{columna} (Valor Anterior)"] = None
+                nueva_fila[f"{columna} (Valor Nuevo)"] = nueva_fila[columna]
+
+            filas_nuevas.append(nueva_fila)
+            cambios.append((id_valor, "Nuevo"))
+            cambios_detallados.append({
+                "SKU": id_valor,
+                "Columna": "Nuevo registro",
+                "Valor Anterior": None,
+                "Valor Nuevo": "Nuevo registro"
+            })
+
+    if filas_nuevas:
+        plantilla_procesada = _agregar_filas(plantilla_procesada, pd.DataFrame(filas_nuevas))
+
+    claves_plantilla = plantilla_df[clave_identificacion]
+    eliminados = (~claves_plantilla.isin(claves_vistas) & claves_plantilla.notna()).to_numpy()
+    plantilla_procesada = _marcar_eliminados(plantilla_procesada, plantilla_df, eliminados, cambios, cambios_detallados)
+
+    columnas_finales = [col for col in plantilla_procesada.columns if "(Valor Anterior)" in col or "(Valor Nuevo)" in col or col in [clave_identificacion, "Estado", "Detalles de Cambios"]]
+    # Mismo tipo y valor de relleno (NaN) en las columnas de pares que el motor vectorizado
+    plantilla_procesada = _normalizar_tipos(plantilla_procesada[columnas_finales])
+
+    return plantilla_procesada, cambios, cambios_detallados
+
+
+def _es_numerico(dtype):
+    return isinstance(dtype, np.dtype) and dtype.kind in "biuf"
+
+
+def mascara_cambios(anterior, nuevo, tolerancia=None):
+    """
+    Compara dos columnas alineadas posición a posición.
+    Retorna un arreglo booleano con True donde ambos valores existen y son distintos (en columnas
+    numéricas con tolerancia, donde difieren en más que la tolerancia).
+    """
+    numericas = _es_numerico(anterior.dtype) and _es_numerico(nuevo.dtype)
+    if isinstance(anterior.dtype, pd.StringDtype) and anterior.dtype == nuevo.dtype:
+        # Textos del mismo tipo (p. ej. tras processing.schema): comparación nativa, sin objetos de Python
+        validos = anterior.notna().to_numpy() & nuevo.notna().to_numpy()
+        return validos & np.asarray(anterior.array != nuevo.array, dtype=bool)
+
+    mismo_temporal = anterior.dtype == nuevo.dtype and isinstance(anterior.dtype, np.dtype) and anterior.dtype.kind in "mM"
+    if numericas or mismo_temporal:
+        valores_anteriores = anterior.to_numpy()
+        valores_nuevos = nuevo.to_numpy()
+    else:
+        valores_anteriores = anterior.astype(object).to_numpy()
+        valores_nuevos = nuevo.astype(object).to_numpy()
+
+    validos = pd.notna(valores_anteriores) & pd.notna(valores_nuevos)
+    cambios = np.zeros(len(valores_anteriores), dtype=bool)
+    cambios[validos] = valores_anteriores[validos] != valores_nuevos[validos]
+    if tolerancia is not None and numericas:
+        cambios[validos] &= np.abs(valores_nuevos[validos].astype(np.float64) - valores_anteriores[validos].astype(np.float64)) > tolerancia
+    return cambios
+
+
+def _ultimo_por_posicion(posiciones, valores):
+    """
+    Conserva el último valor asignado a cada posición, igual que las asignaciones sucesivas con .loc.
+    """
+    serie = pd.Series(valores, index=posiciones, dtype=object)
+    return serie[~serie.index.duplicated(keep="last")]
+
+
+def _normalizar_tipos(df):
+    """
+    Deriva el tipo de las columnas de objetos o sin valores a partir de su contenido, de modo que no
+    dependa del orden en que se concatenaron las partes del resultado.
+    """
+    df = df.copy()
+    for posicion, columna in enumerate(df.columns):
+        serie = df.iloc[:, posicion]
+        if serie.dtype == object or serie.isna().all():
+            df.isetitem(posicion, serie.astype(object).where(serie.notna(), np.nan).infer_objects())
+    return df
+
+
+def _agregar_filas(plantilla_procesada, nuevas):
+    """
+    Agrega los registros nuevos a continuación de las filas de referencia. Sin filas de referencia
+    (p. ej. una partición con solo claves nuevas) estas no intervienen en el tipo de las columnas:
+    pd.concat completaría con NaN las columnas que les faltan y pasaría los enteros a decimales.
+    """
+    if not len(plantilla_procesada):
+        columnas = list(dict.fromkeys([*plantilla_procesada.columns, *nuevas.columns]))
+        return nuevas.reindex(columns=columnas).reset_index(drop=True)
+    return pd.concat([plantilla_procesada, nuevas], ignore_index=True)
+
+
+def _marcar_eliminados(plantilla_procesada, plantilla_df, eliminados, cambios=None, cambios_detallados=None):
+    """
+    Marca como "Eliminado" las filas de referencia cuya clave no aparece en el archivo actualizado.
+
+    Las filas de referencia ocupan las primeras posiciones de plantilla_procesada; sus valores
+    originales quedan en las columnas "(Valor Anterior)". Si se reciben las listas cambios y
+    cambios_detallados (motor iterativo), agrega las entradas correspondientes.
+    """
+    posiciones = np.flatnonzero(eliminados)
+    if not len(posiciones):
+        return plantilla_procesada
+
+    clave_identificacion = plantilla_df.columns[0]
+    plantilla_procesada = plantilla_procesada.copy()
+    for columna, valor in (("Estado", "Eliminado"), ("Detalles de Cambios", "Registro eliminado")):
+        if columna not in plantilla_procesada.columns:
+            continue
+        valores = plantilla_procesada[columna].to_numpy(dtype=object, copy=True)
+        valores[posiciones] = valor
+        plantilla_procesada[columna] = valores
+
+    for columna in plantilla_df.columns:
+        for sufijo in (SUFIJO_ANTERIOR, SUFIJO_NUEVO):
+            if f"{columna}{sufijo}" not in plantilla_procesada.columns:
+                plantilla_procesada[f"{columna}{sufijo}"] = None
+        valores = plantilla_procesada[f"{columna}{SUFIJO_ANTERIOR}"].to_numpy(dtype=object, copy=True)
+        valores[posiciones] = plantilla_df[columna].iloc[posiciones].to_numpy(dtype=object)
+        plantilla_procesada[f"{columna}{SUFIJO_ANTERIOR}"] = pd.Series(valores, index=plantilla_procesada.index).infer_objects()
+
+    if cambios is None:
+        return plantilla_procesada
+    for id_valor in plantilla_df[clave_identificacion].iloc[posiciones].tolist():
+        cambios.append((id_valor, "Eliminado"))
+        cambios_detallados.append({
+            "SKU": id_valor,
+            "Columna": "Registro eliminado",
+            "Valor Anterior": "Registro eliminado",
+            "Valor Nuevo": None
+        })
+
+    return plantilla_procesada
+
+
+def comparar_listas_vectorizado(plantilla_df, actualizada_df, huellas_plantilla=None, huellas_actualizada=None, tolerancias=None):
+    """
+    Versión columnar de comparar_listas_dinamico.
+
+    Resuelve la correspondencia de claves con un único join por índice hash y compara cada columna
+    completa con máscaras vectorizadas. Los valores de las celdas modificadas se conservan con el tipo
+    de su columna; "Detalles de Cambios" se arma solo al pedirlo.
+
+    Si se reciben las huellas de ambas tablas (calculadas sobre las columnas de la plantilla), solo se
+    comparan las filas y columnas cuya huella difiere.
+    """
+    resultado = comparar_columnar(plantilla_df, actualizada_df, huellas_plantilla, huellas_actualizada, tolerancias)["resultado"]
+    analitica_de_resultado(resultado)
+    return resultado
+
+
+def comparar_columnar(plantilla_df, actualizada_df, huellas_plantilla=None, huellas_actualizada=None, tolerancias=None):
+    """
+    Núcleo del motor vectorizado.
+
+    Retorna un diccionario con el contenedor del resultado en "resultado", más las claves de orden
+    que permiten combinar resultados de varias particiones (ver combinar_resultados_parciales):
+        "orden_procesada": (sección, posición) de cada fila procesada; sección 0 = fila de la plantilla,
+            sección 1 = fila nueva del archivo actualizado.
+        "orden_cambios", "orden_detallados": (sección, posición[, columna]); sección 0 = fila del archivo
+            actualizado, sección 1 = fila eliminada de la plantilla.
+        "columnas_modificadas": (primera fila actualizada, orden, nombre) de cada columna con cambios.
+    """
+    clave_identificacion = plantilla_df.columns[0]
+    columnas = list(plantilla_df.columns)
+
+    faltantes = [columna for columna in columnas if columna not in actualizada_df.columns]
+    if faltantes and len(actualizada_df):
+        raise KeyError(faltantes[0])
+
+    # iterrows entrega cada fila con el tipo común de todas las columnas (p. ej. int -> float);
+    # se reproduce esa conversión para que valores y textos coincidan con el motor iterativo.
+    actualizada_original = actualizada_df
+    tipo_fila = actualizada_df.iloc[:0].to_numpy().dtype
+    if tipo_fila != object:
+        actualizada_df = actualizada_df.astype(tipo_fila)
+
+    with etapa(ETAPA_INDICE, filas=len(plantilla_df) + len(actualizada_df)):
+        # Join por clave contra la referencia; al igual que to_dict("index"), las claves deben ser únicas
+        referencia = plantilla_df
+        indice_referencia = pd.Index(referencia[clave_identificacion])
+        if not indice_referencia.is_unique:
+            raise ValueError(f"La columna clave '{clave_identificacion}' de la plantilla tiene valores repetidos.")
+        claves_actualizadas = actualizada_df[clave_identificacion]
+        posiciones = indice_referencia.get_indexer(claves_actualizadas)
+        posiciones[claves_actualizadas.isna().to_numpy()] = -1
+
+        filas_coincidentes = np.flatnonzero(posiciones >= 0)
+        filas_nuevas = np.flatnonzero(posiciones < 0)
+        posiciones_referencia = posiciones[filas_coincidentes]
+
+        # Con huellas, solo se comparan las filas y columnas que difieren
+        filas_comparar = filas_coincidentes
+        columnas_comparar = columnas
+        if (
+            huellas_plantilla is not None and huellas_actualizada is not None
+            and huellas_plantilla["columnas"] == columnas and huellas_actualizada["columnas"] == columnas
+        ):
+            filas_comparar, columnas_comparar = filtrar_candidatos(
+                huellas_plantilla, huellas_actualizada, plantilla_df, actualizada_original, posiciones
+            )
+
+    with etapa(ETAPA_COMPARACION, filas=len(filas_comparar)):
+        # Comparación columna por columna sobre todas las filas coincidentes a la vez
+        celdas_fila, celdas_columna, celdas_indice = [], [], []
+        valores = {}
+        columnas_modificadas = []
+        for orden_columna, columna in enumerate(columnas):
+            if columna == clave_identificacion or columna not in columnas_comparar:
+                continue
+            anterior = referencia[columna].iloc[posiciones[filas_comparar]]
+            nuevo = actualizada_df[columna].iloc[filas_comparar]
+            modificadas = np.flatnonzero(mascara_cambios(anterior, nuevo, (tolerancias or {}).get(columna)))
+            if not len(modificadas):
+                continue
+
+            filas = filas_comparar[modificadas]
+            columnas_modificadas.append((filas[0], orden_columna, columna))
+            celdas_fila.append(filas)
+            celdas_columna.append(np.full(len(filas), orden_columna))
+            celdas_indice.append(np.arange(len(filas)))
+            # Los valores de las celdas modificadas se conservan con el tipo de su columna
+            valores[columna] = (anterior.iloc[modificadas].reset_index(drop=True), nuevo.iloc[modificadas].reset_index(drop=True))
+
+    with etapa(ETAPA_RESULTADO, filas=len(plantilla_df) + len(filas_nuevas)):
+        if celdas_fila:
+            celdas_fila, celdas_columna, celdas_indice = (np.concatenate(partes) for partes in (celdas_fila, celdas_columna, celdas_indice))
+        else:
+            celdas_fila = celdas_columna = celdas_indice = np.empty(0, dtype=np.intp)
+
+        # Orden de recorrido del motor iterativo: fila actualizada y luego columna de la plantilla
+        orden = np.lexsort((celdas_columna, celdas_fila))
+        celdas_fila = celdas_fila[orden]
+        celdas_columna = celdas_columna[orden]
+        celdas_indice = celdas_indice[orden]
+
+        # Estado por fila del archivo actualizado
+        estados = np.full(len(actualizada_df), _CODIGO_SIN_CAMBIOS, dtype=np.int8)
+        estados[celdas_fila] = _CODIGO_ACTUALIZADO
+        estados[filas_nuevas] = _CODIGO_NUEVO
+
+        # cambios_detallados intercalando las filas nuevas en su posición original; cada columna con
+        # cambios recibe un código de categoría y los registros nuevos y eliminados, los dos últimos
+        categorias = [columna for _, _, columna in sorted(columnas_modificadas, key=lambda c: c[1])] + [COLUMNA_NUEVO, COLUMNA_ELIMINADO]
+        codigo_de_columna = np.full(len(columnas), -1)
+        for codigo, (_, orden_columna, _) in enumerate(sorted(columnas_modificadas, key=lambda c: c[1])):
+            codigo_de_columna[orden_columna] = codigo
+        detalle_fila = np.concatenate([celdas_fila, filas_nuevas])
+        detalle_columna = np.concatenate([celdas_columna, np.full(len(filas_nuevas), -1)])
+        detalle_valor = np.concatenate([celdas_indice, np.full(len(filas_nuevas), -1)])
+        orden_detalle = np.argsort(detalle_fila, kind="stable")
+        detalle_fila = detalle_fila[orden_detalle]
+        detalle_columna = detalle_columna[orden_detalle]
+        detalle_valor = detalle_valor[orden_detalle]
+        detalle_codigo = np.where(detalle_columna >= 0, codigo_de_columna[detalle_columna], len(categorias) - 2)
+
+        # Planilla procesada: cada clave de referencia recibe el último cambio registrado en el archivo actualizado
+        plantilla_procesada = plantilla_df.copy()
+        plantilla_procesada["Estado"] = "Sin cambios"
+
+        posiciones_plantilla = indice_referencia.get_indexer(plantilla_df[clave_identificacion])
+        posiciones_plantilla[plantilla_df[clave_identificacion].isna().to_numpy()] = -1
+        referencia_de_celda = posiciones[celdas_fila]
+
+        # "Detalles de Cambios" de cada fila actualizada: rango de sus celdas en cambios_detallados
+        detalles_inicio = np.full(len(plantilla_df) + len(filas_nuevas), -1, dtype=np.int64)
+        detalles_fin = np.full(len(plantilla_df) + len(filas_nuevas), -1, dtype=np.int64)
+        if len(celdas_fila):
+            inicio_fila = np.flatnonzero(np.r_[True, celdas_fila[1:] != celdas_fila[:-1]])
+            ultima_fila = _ultimo_por_posicion(referencia_de_celda[inicio_fila], celdas_fila[inicio_fila])
+            actualizadas = np.isin(posiciones_plantilla, ultima_fila.index.to_numpy())
+            plantilla_procesada.loc[actualizadas, "Estado"] = "Actualizado"
+            filas_detalle = ultima_fila.reindex(posiciones_plantilla[actualizadas]).to_numpy(dtype=np.int64)
+            filas_actualizadas = np.flatnonzero(actualizadas)
+            detalles_inicio[filas_actualizadas] = np.searchsorted(detalle_fila, filas_detalle, side="left")
+            detalles_fin[filas_actualizadas] = np.searchsorted(detalle_fila, filas_detalle, side="right")
+
+        for _, orden_columna, columna in sorted(columnas_modificadas):
+            seleccion = celdas_columna == orden_columna
+            posiciones_columna = referencia_de_celda[seleccion]
+            for sufijo, serie in zip((SUFIJO_ANTERIOR, SUFIJO_NUEVO), valores[columna]):
+                ultimos = _ultimo_por_posicion(posiciones_columna, serie.to_numpy(dtype=object)[celdas_indice[seleccion]])
+                serie = ultimos.reindex(posiciones_plantilla).infer_objects()
+                serie.index = plantilla_procesada.index
+                plantilla_procesada[f"{columna}{sufijo}"] = serie
+
+        if len(filas_nuevas):
+            nuevas = actualizada_df.iloc[filas_nuevas].reset_index(drop=True)
+            nuevas["Estado"] = "Nuevo"
+            for columna in columnas:
+                nuevas[f"{columna}{SUFIJO_ANTERIOR}"] = None
+                nuevas[f"{columna}{SUFIJO_NUEVO}"] = nuevas[columna]
+            plantilla_procesada = _agregar_filas(plantilla_procesada, nuevas)
+
+        # Lado derecho del join: claves de referencia que no aparecen en el archivo actualizado
+        vistas = np.zeros(len(referencia), dtype=bool)
+        vistas[posiciones_referencia] = True
+        eliminados = ~vistas & referencia[clave_identificacion].notna().to_numpy()
+        plantilla_procesada = _marcar_eliminados(plantilla_procesada, plantilla_df, eliminados)
+
+        columnas_finales = [col for col in plantilla_procesada.columns if "(Valor Anterior)" in col or "(Valor Nuevo)" in col or col in [clave_identificacion, "Estado"]]
+        plantilla_procesada = _normalizar_tipos(plantilla_procesada[columnas_finales])
+
+        filas_eliminadas = np.flatnonzero(eliminados)
+        claves_eliminadas = plantilla_df[clave_identificacion].iloc[filas_eliminadas]
+        resultado = crear_resultado(
+            plantilla_procesada,
+            concatenar_series([claves_actualizadas, claves_eliminadas]),
+            pd.Categorical.from_codes(np.r_[estados, np.full(len(filas_eliminadas), _CODIGO_ELIMINADO)], dtype=TIPO_ESTADO),
+            concatenar_series([claves_actualizadas.iloc[detalle_fila], claves_eliminadas]),
+            pd.Categorical.from_codes(np.r_[detalle_codigo, np.full(len(filas_eliminadas), len(categorias) - 1)], categories=categorias),
+            np.r_[detalle_valor, np.full(len(filas_eliminadas), -1)],
+            valores,
+            detalles_rango=(detalles_inicio, detalles_fin),
+        )
+    return {
+        "resultado": resultado,
+        "orden_procesada": (
+            np.repeat([0, 1], [len(plantilla_df), len(filas_nuevas)]),
+            np.r_[np.arange(len(plantilla_df)), filas_nuevas],
+        ),
+        "orden_cambios": (
+            np.repeat([0, 1], [len(actualizada_df), len(filas_eliminadas)]),
+            np.r_[np.arange(len(actualizada_df)), filas_eliminadas],
+        ),
+        "orden_detallados": (
+            np.repeat([0, 1], [len(detalle_fila), len(filas_eliminadas)]),
+            np.r_[detalle_fila, filas_eliminadas],
+            np.r_[detalle_columna, np.full(len(filas_eliminadas), -1)],
+        ),
+        "columnas_modificadas": columnas_modificadas,
+        "columnas_actualizada": list(actualizada_df.columns),
+        "hay_nuevas": bool(len(filas_nuevas)),
+        "hay_eliminados": bool(len(filas_eliminadas)),
+    }
+
+
+def _posiciones_globales(seccion, posicion, posiciones_seccion_0, posiciones_seccion_1):
+    globales = np.empty(len(posicion), dtype=np.int64)
+    en_0 = seccion == 0
+    globales[en_0] = posiciones_seccion_0[posicion[en_0]]
+    globales[~en_0] = posiciones_seccion_1[posicion[~en_0]]
+    return globales
+
+
+def _unir_categorias(partes):
+    """
+    Concatena columnas categóricas con distintas categorías, traduciendo los códigos de cada parte.
+    """
+    categorias = list(dict.fromkeys(categoria for parte in partes for categoria in parte.cat.categories))
+    indice = pd.Index(categorias, dtype=object)
+    codigos = [
+        np.where(parte.cat.codes.to_numpy() >= 0, indice.get_indexer(parte.cat.categories.astype(object))[parte.cat.codes.to_numpy()], -1)
+        for parte in partes
+    ]
+    return pd.Categorical.from_codes(np.concatenate(codigos or [np.empty(0, dtype=np.int64)]), categories=indice)
+
+
+def columnas_modificadas_globales(parcial):
+    """
+    "columnas_modificadas" de un resultado parcial con la primera fila como posición global en el
+    archivo actualizado (ver orden_de_columnas).
+    """
+    return [
+        (int(parcial["posiciones_actualizada"][primera_fila]), orden_columna, columna)
+        for primera_fila, orden_columna, columna in parcial["columnas_modificadas"]
+    ]
+
+
+def filas_detallados_globales(parcial):
+    """
+    Fila global del archivo actualizado de cada fila de cambios_detallados de un resultado parcial
+    (las de registros eliminados llevan su fila de la plantilla), para analizar la partición con
+    analytics.analizar_resultado.
+    """
+    seccion, posicion, _ = parcial["orden_detallados"]
+    return _posiciones_globales(seccion, posicion, parcial["posiciones_actualizada"], parcial["posiciones_plantilla"])
+
+
+def orden_de_columnas(columnas_plantilla, columnas_modificadas, columnas_nuevas=None, hay_eliminados=False):
+    """
+    Orden de las columnas de plantilla_procesada (sin "Detalles de Cambios") que genera
+    comparar_columnar sobre las tablas completas, a partir de lo que informa cada partición.
+
+    Parámetros:
+        columnas_plantilla: Columnas de la plantilla completa.
+        columnas_modificadas: Tuplas (fila global del archivo actualizado, orden, nombre) de cada
+            columna con cambios, de todas las particiones (ver columnas_modificadas_globales).
+        columnas_nuevas: Columnas del archivo actualizado si hay registros nuevos (None si no hay).
+        hay_eliminados: Si alguna partición tiene registros eliminados.
+    """
+    columnas_plantilla = list(columnas_plantilla)
+    clave_identificacion = columnas_plantilla[0]
+    primeras_filas = {}
+    for fila, orden_columna, columna in columnas_modificadas:
+        primeras_filas[orden_columna, columna] = min(fila, primeras_filas.get((orden_columna, columna), fila))
+    pares = [f"{columna}{sufijo}" for columna in columnas_plantilla for sufijo in (SUFIJO_ANTERIOR, SUFIJO_NUEVO)]
+    orden_columnas = columnas_plantilla + ["Estado"]
+    for _, _, columna in sorted((fila, orden, columna) for (orden, columna), fila in primeras_filas.items()):
+        orden_columnas += [f"{columna}{SUFIJO_ANTERIOR}", f"{columna}{SUFIJO_NUEVO}"]
+    if columnas_nuevas is not None:
+        orden_columnas += list(columnas_nuevas) + ["Estado"] + pares
+    if hay_eliminados:
+        orden_columnas += pares
+    return [col for col in dict.fromkeys(orden_columnas) if "(Valor Anterior)" in col or "(Valor Nuevo)" in col or col in [clave_identificacion, "Estado"]]
+
+
+def combinar_resultados_parciales(parciales, columnas_plantilla, indice=None):
+    """
+    Une los resultados de comparar_columnar calculados por partición de clave.
+
+    Parámetros:
+        parciales: Resultados de comparar_columnar, cada uno con "posiciones_plantilla" y
+            "posiciones_actualizada" (posición global de cada fila local de la partición).
+        columnas_plantilla: Columnas de la plantilla completa.
+        indice: Índice de la plantilla original; se conserva si no hay filas nuevas.
+
+    Retorna:
+        Contenedor del resultado con el mismo orden de filas y columnas que una comparación de las
+        tablas completas. La analítica se calcula sobre el resultado combinado: los histogramas y las
+        claves destacadas son los mismos que sin particiones.
+    """
+    parciales = list(parciales)
+    columnas_plantilla = list(columnas_plantilla)
+    resultados = [parcial["resultado"] for parcial in parciales]
+
+    # Orden de columnas: el mismo que genera comparar_columnar sobre las tablas completas
+    con_nuevas = [parcial for parcial in parciales if parcial["hay_nuevas"]]
+    orden_columnas = orden_de_columnas(
+        columnas_plantilla,
+        [modificada for parcial in parciales for modificada in columnas_modificadas_globales(parcial)],
+        con_nuevas[0]["columnas_actualizada"] if con_nuevas else None,
+        any(parcial["hay_eliminados"] for parcial in parciales),
+    )
+
+    def _ordenar(clave_orden, posiciones_0, posiciones_1):
+        secciones, globales, columnas = [], [], []
+        for parcial in parciales:
+            seccion, posicion, *columna = parcial[clave_orden]
+            secciones.append(seccion)
+            globales.append(_posiciones_globales(seccion, posicion, parcial[posiciones_0], parcial[posiciones_1]))
+            columnas.append(columna[0] if columna else np.zeros(len(seccion), dtype=np.int64))
+        secciones, globales, columnas = (np.concatenate(arr) if arr else np.empty(0, dtype=np.int64) for arr in (secciones, globales, columnas))
+        return np.lexsort((columnas, globales, secciones))
+
+    orden_procesada = _ordenar("orden_procesada", "posiciones_plantilla", "posiciones_actualizada")
+    # Las particiones sin filas no influyen en el tipo de las columnas (ver concatenar_series)
+    plantilla_procesada = pd.concat(
+        [resultado["plantilla"] for resultado in resultados if len(resultado["plantilla"])] or [resultados[0]["plantilla"]],
+        ignore_index=True
+    ).reindex(columns=orden_columnas).iloc[orden_procesada].reset_index(drop=True)
+    plantilla_procesada = _normalizar_tipos(plantilla_procesada)
+    if indice is not None and not con_nuevas:
+        plantilla_procesada.index = indice
+
+    orden_cambios = _ordenar("orden_cambios", "posiciones_actualizada", "posiciones_plantilla")
+    claves_cambios = concatenar_series([resultado["cambios"]["SKU"] for resultado in resultados]).iloc[orden_cambios]
+    estados_cambios = np.concatenate(
+        [resultado["cambios"]["Estado"].cat.codes.to_numpy() for resultado in resultados] or [np.empty(0, dtype=np.int8)]
+    )[orden_cambios]
+
+    # cambios_detallados: los índices de cada partición se desplazan según los valores de las anteriores
+    orden_detallados = _ordenar("orden_detallados", "posiciones_actualizada", "posiciones_plantilla")
+    valores_partes = {}
+    indices = []
+    for resultado in resultados:
+        indice_valor = resultado["indice_valor"].copy()
+        columnas_detalle = resultado["detallados"]["Columna"]
+        codigos = columnas_detalle.cat.codes.to_numpy()
+        for codigo, columna in enumerate(columnas_detalle.cat.categories):
+            if columna in COLUMNAS_DE_REGISTRO or columna not in resultado["valores"]:
+                continue
+            partes = valores_partes.setdefault(columna, ([], []))
+            indice_valor[codigos == codigo] += sum(len(parte) for parte in partes[0])
+            for destino, serie in zip(partes, resultado["valores"][columna]):
+                destino.append(serie)
+        indices.append(indice_valor)
+    valores = {columna: tuple(concatenar_series(serie) for serie in partes) for columna, partes in valores_partes.items()}
+    claves_detallados = concatenar_series([resultado["detallados"]["SKU"] for resultado in resultados]).iloc[orden_detallados]
+    columnas_detallados = _unir_categorias([resultado["detallados"]["Columna"] for resultado in resultados])[orden_detallados]
+    indice_valor = np.concatenate(indices or [np.empty(0, dtype=np.int64)])[orden_detallados]
+
+    # Rangos de "Detalles de Cambios": se trasladan a la posición global de las filas de cambios_detallados
+    destino_detalle = np.empty(len(orden_detallados), dtype=np.int64)
+    destino_detalle[orden_detallados] = np.arange(len(orden_detallados))
+    inicios, fines = [], []
+    desplazamiento = 0
+    for resultado in resultados:
+        inicio, fin = resultado["detalles_rango"]
+        con_rango = inicio >= 0
+        inicio_global = np.full(len(inicio), -1, dtype=np.int64)
+        inicio_global[con_rango] = destino_detalle[inicio[con_rango] + desplazamiento]
+        fin_global = np.where(con_rango, inicio_global + (fin - inicio), -1)
+        inicios.append(inicio_global)
+        fines.append(fin_global)
+        desplazamiento += len(resultado["detallados"])
+    detalles_rango = tuple(
+        np.concatenate(partes or [np.empty(0, dtype=np.int64)])[orden_procesada] for partes in (inicios, fines)
+    )
+
+    resultado = crear_resultado(
+        plantilla_procesada,
+        claves_cambios,
+        pd.Categorical.from_codes(estados_cambios, dtype=TIPO_ESTADO),
+        claves_detallados,
+        columnas_detallados,
+        indice_valor,
+        valores,
+        detalles_rango=detalles_rango,
+    )
+    analitica_de_resultado(resultado)
+    return resultado
@@ -0,0 +1,204 @@
+# processing/export.py
+
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from processing.result import COLUMNA_ELIMINADO, COLUMNA_NUEVO, tabla_detallados, tabla_procesada
+
+# Filas de plantilla_procesada que se construyen y escriben por vez
+FILAS_POR_BLOQUE_EXPORTACION = 50_000
+# Tamaño de los trozos en que se entrega un archivo exportado
+BYTES_POR_TROZO = 1024 * 1024
+# Hasta este tamaño el archivo exportado se mantiene en memoria; a partir de ahí pasa a disco
+BYTES_EN_MEMORIA = 8 * 1024 * 1024
+
+FORMATOS_EXPORTACION = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Cambios celda por celda, una línea JSON por cambio (ver trozos_jsonl_cambios)
+FORMATO_JSONL = "jsonl"
+TIPO_JSONL = "application/x-ndjson"
+
+
+def bloques_de_resultado(resultado, filas_por_bloque=FILAS_POR_BLOQUE_EXPORTACION):
+    """
+    Genera plantilla_procesada (con "Detalles de Cambios") por bloques de filas: solo el bloque
+    en curso se convierte a objetos Python.
+    """
+    total = len(resultado["plantilla"])
+    for inicio in range(0, max(total, 1), filas_por_bloque):
+        yield tabla_procesada(resultado, np.arange(inicio, min(inicio + filas_por_bloque, total)))
+
+
+def _agregar_hoja_xlsx(libro, bloques, titulo=None):
+    hoja = libro.create_sheet(titulo)
+    for numero, bloque in enumerate(bloques):
+        if numero == 0:
+            hoja.append([str(columna) for columna in bloque.columns])
+        # Celdas vacías para los nulos, como en DataFrame.to_excel
+        valores = bloque.astype(object).where(bloque.notna(), None)
+        for fila in valores.itertuples(index=False, name=None):
+            hoja.append(fila)
+
+
+def _escribir_xlsx(bloques, destino):
+    # openpyxl se importa al exportar: la interfaz importa este módulo en cada arranque
+    import openpyxl
+
+    # Modo de solo escritura: las filas se vuelcan al archivo a medida que se agregan
+    libro = openpyxl.Workbook(write_only=True)
+    _agregar_hoja_xlsx(libro, bloques)
+    libro.save(destino)
+
+
+def trozos_csv(bloques):
+    """
+    Genera el CSV de los bloques de plantilla_procesada, un trozo de bytes por bloque.
+    """
+    for numero, bloque in enumerate(bloques):
+        yield bloque.to_csv(index=False, header=numero == 0).encode("utf-8")
+
+
+def _escribir_csv(bloques, destino):
+    for trozo in trozos_csv(bloques):
+        destino.write(trozo)
+
+
+def _tipo_arrow(serie):
+    # Las columnas de texto y las de tipos mezclados se guardan como texto
+    if isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype == object or pd.api.types.is_string_dtype(serie.dtype):
+        return pa.string()
+    return pa.Array.from_pandas(serie.iloc[:0]).type
+
+
+def _tabla_arrow(bloque, esquema):
+    columnas = []
+    for campo, (_, serie) in zip(esquema, bloque.items()):
+        if campo.type == pa.string():
+            serie = serie.astype(object)
+            serie = serie.where(serie.isna(), serie.astype(str)).where(serie.notna(), None)
+        columnas.append(pa.array(serie, type=campo.type, from_pandas=True))
+    return pa.Table.from_arrays(columnas, schema=esquema)
+
+
+def _escribir_parquet(bloques, destino):
+    import pyarrow.parquet as pq
+
+    # Cada bloque es un grupo de filas; el esquema se fija con los tipos del primer bloque
+    escritor = None
+    try:
+        for bloque in bloques:
+            if escritor is None:
+                esquema = pa.schema([(str(columna), _tipo_arrow(serie)) for columna, serie in bloque.items()])
+                escritor = pq.ParquetWriter(destino, esquema)
+            escritor.write_table(_tabla_arrow(bloque, esquema))
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+_ESCRITORES = {"xlsx": _escribir_xlsx, "csv": _escribir_csv, "parquet": _escribir_parquet}
+
+
+def exportar_resultado(resultado, formato, destino, filas_por_bloque=FILAS_POR_BLOQUE_EXPORTACION):
+    """
+    Escribe plantilla_procesada en xlsx, CSV o Parquet por bloques de filas, sin armar la tabla
+    completa ni el archivo completo en memoria.
+
+    Parámetros:
+        resultado: Contenedor del resultado de la comparación (ver processing.result).
+        formato: "xlsx", "csv" o "parquet".
+        destino: Archivo binario abierto para escritura.
+        filas_por_bloque: Filas que se construyen y escriben por vez.
+    """
+    if formato not in _ESCRITORES:
+        raise ValueError(f"Formato de exportación no admitido: {formato}")
+    _ESCRITORES[formato](bloques_de_resultado(resultado, filas_por_bloque), destino)
+
+
+def archivo_exportado(resultado, formato, filas_por_bloque=FILAS_POR_BLOQUE_EXPORTACION):
+    """
+    Exporta el resultado a un archivo temporal (en memoria si es chico, en disco si no).
+
+    Retorna:
+        Archivo binario abierto y posicionado al comienzo; se borra al cerrarlo.
+    """
+    archivo = tempfile.SpooledTemporaryFile(max_size=BYTES_EN_MEMORIA, prefix="diffly_export_")
+    try:
+        exportar_resultado(resultado, formato, archivo, filas_por_bloque)
+    except Exception:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    return archivo
+
+
+def exportar_libro_por_hojas(resultados, destino, filas_por_bloque=FILAS_POR_BLOQUE_EXPORTACION):
+    """
+    Escribe un xlsx con una hoja por cada hoja comparada de un libro de varias hojas (ver
+    processing.sheets), con la plantilla_procesada de cada una escrita por bloques.
+
+    Parámetros:
+        resultados: Diccionario hoja -> contenedor del resultado, en el orden de las hojas.
+        destino: Archivo binario abierto para escritura.
+    """
+    import openpyxl
+
+    libro = openpyxl.Workbook(write_only=True)
+    for hoja, resultado in resultados.items():
+        _agregar_hoja_xlsx(libro, bloques_de_resultado(resultado, filas_por_bloque), hoja)
+    libro.save(destino)
+
+
+def bytes_libro_por_hojas(resultados):
+    """
+    Contenido del xlsx de exportar_libro_por_hojas, para entregarlo de una vez.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=BYTES_EN_MEMORIA, prefix="diffly_export_") as archivo:
+        exportar_libro_por_hojas(resultados, archivo)
+        archivo.seek(0)
+        return archivo.read()
+
+
+def trozos_jsonl_cambios(resultado, filas_por_bloque=FILAS_POR_BLOQUE_EXPORTACION):
+    """
+    Genera los cambios del resultado como JSON Lines, un trozo de bytes por bloque de filas de
+    cambios_detallados. Cada línea es {"clave", "estado", "columna", "anterior", "nuevo"}; los
+    registros nuevos y eliminados ocupan una sola línea.
+    """
+    total = len(resultado["detallados"])
+    for inicio in range(0, total, filas_por_bloque):
+        tabla = tabla_detallados(resultado, np.arange(inicio, min(inicio + filas_por_bloque, total)))
+        columna = tabla["Columna"]
+        de_celda = ~columna.isin([COLUMNA_NUEVO, COLUMNA_ELIMINADO])
+        lineas = pd.DataFrame({
+            "clave": tabla["SKU"],
+            "estado": np.select([columna == COLUMNA_NUEVO, columna == COLUMNA_ELIMINADO], ["Nuevo", "Eliminado"], "Actualizado"),
+            "columna": columna.where(de_celda, None),
+            "anterior": tabla["Valor Anterior"].where(de_celda, None),
+            "nuevo": tabla["Valor Nuevo"].where(de_celda, None),
+        })
+        yield lineas.to_json(orient="records", lines=True, date_format="iso", default_handler=str, force_ascii=False).encode("utf-8")
+
+
+def bytes_exportados(resultado, formato):
+    """
+    Contenido del archivo exportado, para entregarlo de una vez (p. ej. a st.download_button).
+    El archivo se escribe por bloques y se lee una sola vez.
+    """
+    with archivo_exportado(resultado, formato) as archivo:
+        return archivo.read()
+
+
+def trozos_de_archivo(archivo, bytes_por_trozo=BYTES_POR_TROZO):
+    """
+    Entrega el contenido de un archivo en trozos de tamaño fijo y lo cierra al terminar.
+    """
+    with archivo:
+        while trozo := archivo.read(bytes_por_trozo):
+            yield trozo
@@ -0,0 +1,105 @@
+# processing/fingerprint.py
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Constantes para mezclar hashes (aritmética uint64 con desborde)
+_MULTIPLICADOR_FILA = np.uint64(1000003)
+_MEZCLA_CLAVE = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash_contenido(datos, variante=""):
+    """
+    Hash SHA-256 del contenido de un archivo subido y de las opciones con que se leyó (ver
+    processing.ingest.variante_de_lectura). Identifica la tabla leída para reutilizar sus huellas:
+    el mismo archivo leído con otros tipos da otras huellas.
+    """
+    h = hashlib.sha256(datos)
+    h.update(variante.encode())
+    return h.hexdigest()
+
+
+def _hash_celdas(serie):
+    hashes = pd.util.hash_pandas_object(serie, index=False).to_numpy()
+    if serie.dtype == object:
+        # hash_pandas_object convierte los objetos a texto: 1 y "1" tendrían el mismo hash
+        tipos = serie.map(lambda valor: type(valor).__name__)
+        hashes = hashes ^ pd.util.hash_pandas_object(tipos, index=False).to_numpy()
+    return hashes
+
+
+def calcular_huellas(df, columnas=None):
+    """
+    Calcula las huellas de una tabla a partir de su columna clave (la primera).
+
+    Parámetros:
+        df: DataFrame a procesar.
+        columnas: Columnas incluidas en la huella; por defecto todas las de df.
+
+    Retorna:
+        Diccionario con:
+            "columnas": lista de columnas usadas,
+            "filas": arreglo uint64 con el hash de cada fila, en el orden de df,
+            "columnas_huellas": hash de cada columna, independiente del orden de las filas,
+            "resumen": hash de la tabla completa; dos tablas idénticas tienen el mismo resumen.
+    """
+    columnas = list(df.columns) if columnas is None else list(columnas)
+    hash_clave = _hash_celdas(df[columnas[0]])
+
+    filas = np.zeros(len(df), dtype=np.uint64)
+    columnas_huellas = {}
+    with np.errstate(over="ignore"):
+        for columna in columnas:
+            celdas = _hash_celdas(df[columna])
+            filas = filas * _MULTIPLICADOR_FILA ^ celdas
+            # Cada celda se asocia a su clave y se suman: la huella no depende del orden de las filas
+            asociadas = pd.util.hash_array(celdas ^ (hash_clave * _MEZCLA_CLAVE))
+            columnas_huellas[columna] = int(asociadas.sum(dtype=np.uint64))
+
+    resumen = hashlib.sha256("\x1f".join(map(str, columnas)).encode() + filas.tobytes()).hexdigest()
+    return {
+        "columnas": columnas,
+        "filas": filas,
+        "columnas_huellas": columnas_huellas,
+        "resumen": resumen,
+    }
+
+
+def filtrar_candidatos(huellas_plantilla, huellas_actualizada, plantilla_df, actualizada_df, posiciones):
+    """
+    Selecciona lo que debe pasar por la comparación celda a celda.
+
+    Parámetros:
+        huellas_plantilla, huellas_actualizada: Resultado de calcular_huellas para cada tabla.
+        plantilla_df, actualizada_df: Tablas comparadas.
+        posiciones: Para cada fila actualizada, posición de su clave en la plantilla (-1 si no existe).
+
+    Retorna:
+        Tupla (filas, columnas): filas actualizadas emparejadas cuya huella difiere de la de referencia
+        y columnas cuya huella difiere entre las filas emparejadas.
+    """
+    emparejadas = np.flatnonzero(posiciones >= 0)
+    if huellas_plantilla["resumen"] == huellas_actualizada["resumen"]:
+        return emparejadas[:0], []
+
+    distintas = huellas_plantilla["filas"][posiciones[emparejadas]] != huellas_actualizada["filas"][emparejadas]
+    filas = emparejadas[distintas]
+    if not len(filas):
+        return filas, []
+
+    # Se descuenta el aporte de las filas sin par para comparar solo las filas emparejadas
+    sin_par_referencia = np.ones(len(plantilla_df), dtype=bool)
+    sin_par_referencia[posiciones[emparejadas]] = False
+    columnas = huellas_plantilla["columnas"]
+    aporte_referencia = calcular_huellas(plantilla_df.iloc[np.flatnonzero(sin_par_referencia)], columnas)["columnas_huellas"]
+    aporte_actualizada = calcular_huellas(actualizada_df.iloc[np.flatnonzero(posiciones < 0)], columnas)["columnas_huellas"]
+
+    mascara = (1 << 64) - 1
+    columnas_distintas = [
+        columna for columna in columnas[1:]
+        if (huellas_plantilla["columnas_huellas"][columna] - aporte_referencia[columna]) & mascara
+        != (huellas_actualizada["columnas_huellas"][columna] - aporte_actualizada[columna]) & mascara
+    ]
+    return filas, columnas_distintas
@@ -0,0 +1,97 @@
+# processing/ingest.py
+
+import importlib.util
+import os
+
+import pandas as pd
+
+# Extensiones aceptadas por la carga de archivos
+EXTENSIONES_ADMITIDAS = ["xls", "xlsx", "csv", "parquet", "feather"]
+
+
+def detectar_formato(nombre):
+    """
+    Retorna el formato de un archivo a partir de su nombre ("xlsx", "csv", ...).
+    """
+    formato = os.path.splitext(str(nombre))[1].lower().lstrip(".")
+    if formato not in EXTENSIONES_ADMITIDAS:
+        raise ValueError(f"Formato de archivo no admitido: {formato or nombre}")
+    return formato
+
+
+def motor_excel():
+    """
+    Motor de lectura para Excel: calamine si está instalado (bastante más rápido), o el de pandas por defecto.
+    """
+    if importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return None
+
+
+def variante_de_lectura(nombre, columnas=None, tipos=None):
+    """
+    Texto con las opciones de lectura que cambian la tabla leída de un archivo (formato, motor de
+    Excel, columnas y tipos). Junto con el contenido identifica la tabla en la caché de lectura y
+    sus huellas en la base de datos.
+    """
+    formato = detectar_formato(nombre)
+    motor = motor_excel() if formato in ("xls", "xlsx") else None
+    return repr((formato, motor, columnas, tipos))
+
+
+def es_excel(nombre):
+    """
+    Indica si el archivo es un libro de Excel (xls o xlsx), que puede tener varias hojas.
+    """
+    return detectar_formato(nombre) in ("xls", "xlsx")
+
+
+def listar_hojas(origen, nombre=None):
+    """
+    Retorna los nombres de las hojas de un libro de Excel, en su orden, sin leer sus celdas.
+    Los demás formatos tienen una sola tabla y retornan una lista vacía.
+    """
+    nombre = nombre or (origen if _es_ruta(origen) else getattr(origen, "name", ""))
+    if not es_excel(nombre):
+        return []
+    with pd.ExcelFile(origen, engine=motor_excel()) as libro:
+        return [str(hoja) for hoja in libro.sheet_names]
+
+
+def _es_ruta(origen):
+    return isinstance(origen, (str, os.PathLike))
+
+
+def _leer_csv(origen, columnas, tipos):
+    # Una sola lectura: el parser arma cada columna una vez, sin copias intermedias por bloque.
+    # Con una ruta, el archivo se mapea en memoria en lugar de leerse a un búfer propio.
+    return pd.read_csv(origen, usecols=columnas, dtype=tipos, memory_map=_es_ruta(origen))
+
+
+def leer_tabla(origen, nombre=None, columnas=None, tipos=None, hoja=None):
+    """
+    Lee un archivo tabular en un DataFrame según su formato.
+
+    Parámetros:
+        origen: Ruta o archivo subido.
+        nombre: Nombre del archivo, para detectar el formato (por defecto, la ruta o el nombre del archivo subido).
+        columnas: Lista de columnas a leer; las demás no se decodifican. None lee todas.
+        tipos: Diccionario columna -> tipo de pandas, aplicado durante la lectura.
+        hoja: Nombre de la hoja a leer de un libro de Excel (por defecto, la primera).
+
+    Retorna:
+        DataFrame con los datos del archivo.
+    """
+    nombre = nombre or (origen if _es_ruta(origen) else getattr(origen, "name", ""))
+    formato = detectar_formato(nombre)
+    columnas = list(columnas) if columnas else None
+
+    if formato == "csv":
+        return _leer_csv(origen, columnas, tipos)
+    if formato == "parquet":
+        df = pd.read_parquet(origen, columns=columnas)
+    elif formato == "feather":
+        df = pd.read_feather(origen, columns=columnas)
+    else:
+        return pd.read_excel(origen, sheet_name=hoja if hoja is not None else 0, engine=motor_excel(), usecols=columnas, dtype=tipos)
+    return df.astype(tipos) if tipos else df
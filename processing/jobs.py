@@ -0,0 +1,201 @@
+# processing/jobs.py
+"""
+Trabajos en segundo plano: las comparaciones se ejecutan en un grupo acotado de hilos, fuera del
+script de Streamlit, de modo que las recargas de la página no las interrumpen ni las repiten.
+
+Cada trabajo es un diccionario con su estado y su avance (fase, filas procesadas y filas totales
+de la fase), que la interfaz consulta en cada recarga. La cancelación es cooperativa: se comprueba
+al abrir cada etapa del perfilador (performance/profiler.py) y cada vez que el trabajo informa su
+avance con avanzar().
+"""
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from performance.profiler import ETAPA_INDICE, ETAPA_RESULTADO
+
+# Trabajos que se ejecutan a la vez (compartidos por todas las sesiones) y trabajos que pueden
+# esperar un hilo libre; más allá se rechazan los nuevos (configurables por variables de entorno)
+TRABAJADORES = int(os.environ.get("DIFFLY_TRABAJADORES", "2"))
+TRABAJOS_EN_ESPERA_MAXIMOS = int(os.environ.get("DIFFLY_TRABAJOS_EN_ESPERA", "8"))
+# Trabajos terminados que se conservan para que su sesión los recoja
+TRABAJOS_CONSERVADOS = 50
+
+ESTADO_EN_ESPERA = "en espera"
+ESTADO_EN_CURSO = "en curso"
+ESTADO_TERMINADO = "terminado"
+ESTADO_CANCELADO = "cancelado"
+ESTADO_ERROR = "error"
+ESTADOS_ACTIVOS = (ESTADO_EN_ESPERA, ESTADO_EN_CURSO)
+
+
+class TrabajoCancelado(Exception):
+    """El trabajo se canceló antes de terminar."""
+
+
+_ejecutor = ThreadPoolExecutor(max_workers=TRABAJADORES, thread_name_prefix="diffly_trabajo")
+_trabajos = {}
+_ids = itertools.count(1)
+_bloqueo = threading.Lock()
+
+
+def _descartar_terminados():
+    terminados = [id for id, trabajo in _trabajos.items() if trabajo["estado"] not in ESTADOS_ACTIVOS]
+    for id in terminados[:max(len(terminados) - TRABAJOS_CONSERVADOS, 0)]:
+        del _trabajos[id]
+
+
+def comprobar_cancelacion(trabajo):
+    """
+    Lanza TrabajoCancelado si se pidió cancelar el trabajo.
+    """
+    if trabajo["cancelar"].is_set():
+        raise TrabajoCancelado()
+
+
+def iniciar_fase(trabajo, fase, filas_totales=None, unidad="filas"):
+    """
+    Comienza una fase del trabajo ("comparación", "guardado"...); su avance se mide en filas (o en
+    la unidad indicada, p. ej. "hojas").
+    """
+    comprobar_cancelacion(trabajo)
+    trabajo["fase"] = fase
+    trabajo["unidad"] = unidad
+    trabajo["filas_procesadas"] = 0
+    trabajo["filas_totales"] = filas_totales
+    trabajo["inicio_fase"] = time.time()
+
+
+def avanzar(trabajo, filas_procesadas):
+    """
+    Informa las filas procesadas en la fase actual y comprueba si se pidió cancelar.
+    """
+    trabajo["filas_procesadas"] = filas_procesadas
+    comprobar_cancelacion(trabajo)
+
+
+def _avisar_etapas(trabajo):
+    # Cada llamada a comparar_columnar (una por partición en los motores por particiones) abre la
+    # etapa de índice con sus filas y termina con el armado del resultado
+    def avisar(medicion, terminada):
+        if not terminada:
+            comprobar_cancelacion(trabajo)
+        elif medicion["etapa"] == ETAPA_INDICE:
+            trabajo["filas_en_curso"] = medicion["filas"] or 0
+        elif medicion["etapa"] == ETAPA_RESULTADO:
+            trabajo["filas_procesadas"] += trabajo.pop("filas_en_curso", 0)
+    return avisar
+
+
+def _ejecutar(trabajo, funcion, args, kwargs):
+    trabajo["inicio"] = time.time()
+    try:
+        comprobar_cancelacion(trabajo)
+        trabajo["estado"] = ESTADO_EN_CURSO
+        trabajo["resultado"] = funcion(trabajo, *args, **kwargs)
+        trabajo["estado"] = ESTADO_TERMINADO
+    except TrabajoCancelado:
+        trabajo["estado"] = ESTADO_CANCELADO
+    except Exception as e:
+        trabajo["error"] = str(e)
+        trabajo["estado"] = ESTADO_ERROR
+    finally:
+        trabajo["fin"] = time.time()
+
+
+def enviar_trabajo(funcion, descripcion, *args, registro=None, **kwargs):
+    """
+    Encola funcion(trabajo, *args, **kwargs) en el grupo de hilos.
+
+    Parámetros:
+        funcion: Recibe el diccionario del trabajo y retorna su resultado (p. ej. el id de la
+            comparación guardada). Informa su avance con iniciar_fase y avanzar.
+        descripcion: Texto que identifica el trabajo en la interfaz.
+        registro: Registro de rendimiento de la sesión (ver performance.profiler.crear_registro);
+            las etapas del trabajo se agregan a sus mediciones.
+
+    Retorna:
+        Id del trabajo.
+
+    Lanza:
+        RuntimeError si ya hay TRABAJOS_EN_ESPERA_MAXIMOS trabajos esperando un hilo libre.
+    """
+    with _bloqueo:
+        en_espera = sum(trabajo["estado"] == ESTADO_EN_ESPERA for trabajo in _trabajos.values())
+        if en_espera >= TRABAJOS_EN_ESPERA_MAXIMOS:
+            raise RuntimeError("Hay demasiadas comparaciones en espera; intenta de nuevo cuando termine alguna.")
+        _descartar_terminados()
+
+        trabajo = {
+            "id": next(_ids),
+            "descripcion": descripcion,
+            "estado": ESTADO_EN_ESPERA,
+            "enviado": time.time(),
+            "fase": None,
+            "unidad": "filas",
+            "filas_procesadas": 0,
+            "filas_totales": None,
+            "inicio": None,
+            "inicio_fase": None,
+            "fin": None,
+            "resultado": None,
+            "error": None,
+            "cancelar": threading.Event(),
+        }
+        # El trabajo comparte las mediciones de la sesión; tracemalloc no se activa desde los hilos
+        trabajo["registro"] = {
+            "mediciones": registro["mediciones"] if registro is not None else [],
+            "persistir": registro["persistir"] if registro is not None else None,
+            "memoria": False,
+            "avisar": _avisar_etapas(trabajo),
+        }
+        _trabajos[trabajo["id"]] = trabajo
+        trabajo["futuro"] = _ejecutor.submit(_ejecutar, trabajo, funcion, args, kwargs)
+    return trabajo["id"]
+
+
+def trabajos_por_estado():
+    """
+    Cantidad de trabajos conservados por estado (los activos y los últimos terminados).
+    """
+    conteo = dict.fromkeys((ESTADO_EN_ESPERA, ESTADO_EN_CURSO, ESTADO_TERMINADO, ESTADO_CANCELADO, ESTADO_ERROR), 0)
+    for trabajo in list(_trabajos.values()):
+        conteo[trabajo["estado"]] += 1
+    return conteo
+
+
+def obtener_trabajo(id):
+    """
+    Retorna el diccionario del trabajo, o None si no existe (o ya se descartó).
+    """
+    return _trabajos.get(id)
+
+
+def cancelar_trabajo(id):
+    """
+    Pide cancelar un trabajo. Si todavía espera un hilo libre, se cancela en el acto; si está en
+    curso, se detiene al llegar a la siguiente etapa o aviso de avance.
+    """
+    trabajo = _trabajos.get(id)
+    if trabajo is None or trabajo["estado"] not in ESTADOS_ACTIVOS:
+        return
+    trabajo["cancelar"].set()
+    if trabajo["futuro"].cancel():
+        trabajo["estado"] = ESTADO_CANCELADO
+        trabajo["fin"] = time.time()
+
+
+def avance_de_trabajo(trabajo):
+    """
+    Retorna (fracción de la fase actual entre 0 y 1, segundos restantes estimados de la fase).
+    Cualquiera de los dos es None si todavía no se puede calcular.
+    """
+    total = trabajo["filas_totales"]
+    fraccion = min(trabajo["filas_procesadas"] / total, 1.0) if total else None
+    restante = None
+    if fraccion and trabajo["inicio_fase"] is not None:
+        transcurrido = time.time() - trabajo["inicio_fase"]
+        restante = transcurrido * (1 - fraccion) / fraccion
+    return fraccion, restante
@@ -0,0 +1,292 @@
+# processing/key_matching.py
+"""
+Claves de comparación: claves compuestas por varias columnas y emparejamiento aproximado de las
+claves sin coincidencia exacta (p. ej. un proveedor que cambia "AB-001" por "AB001").
+
+El emparejamiento se aplica solo a las claves que quedaron sin pareja exacta y evita comparar todos
+los pares entre sí:
+
+1. Clave normalizada (sin mayúsculas, espacios ni signos): join por hash, confianza 1.
+2. Bloqueo por n-gramas con MinHash/LSH: cada clave restante recibe una firma MinHash de sus n-gramas
+   de caracteres poco frecuentes y solo se comparan las claves que comparten alguna banda de la firma.
+   Los n-gramas comunes a muchas claves (p. ej. un prefijo "AB-0" compartido) no sirven para separar
+   claves y se excluyen del bloqueo. La confianza de cada candidato es la similitud de Jaccard exacta
+   entre sus trigramas.
+
+Cada clave se empareja con una sola clave del otro archivo, de mayor a menor confianza.
+"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from performance.profiler import ETAPA_EMPAREJAMIENTO, etapa
+
+# Confianza mínima (similitud de Jaccard entre n-gramas) para emparejar dos claves
+UMBRAL_CONFIANZA = 0.6
+# Longitud de los n-gramas de caracteres con que se mide la confianza y de los usados en el bloqueo
+# (más largos, y por lo tanto menos repetidos entre claves distintas)
+TAMANO_NGRAMA = 3
+TAMANO_NGRAMA_BLOQUEO = 4
+# Firma MinHash: BANDAS bandas de FILAS_POR_BANDA valores. Dos claves cuyos n-gramas de bloqueo
+# tienen similitud s comparten alguna banda con probabilidad 1 - (1 - s**FILAS_POR_BANDA) ** BANDAS
+# (≈ 0,99 con s = 0,25)
+BANDAS = 16
+FILAS_POR_BANDA = 1
+# N-gramas presentes en más claves (por lado) y cubetas con más claves se excluyen del bloqueo: harían
+# crecer los candidatos de forma cuadrática
+CLAVES_POR_CUBETA = 50
+# Semilla de las permutaciones de MinHash, para que el emparejamiento sea reproducible
+SEMILLA = 20240101
+
+METODO_NORMALIZADA = "clave normalizada"
+METODO_SIMILITUD = "similitud de n-gramas"
+COLUMNAS_EMPAREJAMIENTO = ["Clave referencia", "Clave actualizada", "Confianza", "Método"]
+SEPARADOR_COMPUESTA = " | "
+# Parte vacía de una clave compuesta. Las partes escapan "\\" y "|", de modo que ni la marca ni el
+# separador pueden aparecer dentro de una parte
+MARCA_NULO = "\\N"
+
+_PRIMO = np.uint64((1 << 61) - 1)
+
+
+def nombre_clave(columnas_clave):
+    """
+    Nombre de la columna de clave que se agrega a ambas tablas (ver preparar_claves).
+    """
+    if len(columnas_clave) > 1:
+        return " + ".join(str(columna) for columna in columnas_clave)
+    return f"{columnas_clave[0]} (clave)"
+
+
+def _parte_de_clave(valor):
+    if pd.isna(valor):
+        return MARCA_NULO
+    # Los decimales enteros se escriben sin ".0", igual que los enteros del otro archivo
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        valor = int(valor)
+    return str(valor).replace("\\", "\\\\").replace("|", "\\|")
+
+
+def clave_compuesta(df, columnas_clave):
+    """
+    Une varias columnas en una clave de texto ("valor1 | valor2"). En cada parte se escapan "\\" y
+    "|" y una parte vacía se escribe como MARCA_NULO, de modo que dos combinaciones distintas nunca
+    dan la misma clave: ("a | b", "c") y ("a", "b | c") quedan "a \\| b | c" y "a | b \\| c".
+    Solo las filas sin ningún valor en las columnas clave quedan sin clave, igual que una clave
+    simple nula.
+    """
+    partes = [df[columna].astype(object).to_numpy() for columna in columnas_clave]
+    textos = [SEPARADOR_COMPUESTA.join(map(_parte_de_clave, fila)) for fila in zip(*partes)]
+    vacias = np.logical_and.reduce([df[columna].isna().to_numpy() for columna in columnas_clave])
+    return pd.Series(textos, dtype=object).where(~vacias, None)
+
+
+def normalizar_claves(claves):
+    """
+    Forma normalizada de las claves: texto sin mayúsculas, espacios ni signos de puntuación.
+    """
+    return claves.astype(str).str.casefold().str.replace(r"[\W_]+", "", regex=True)
+
+
+def _ngramas(texto, tamano=TAMANO_NGRAMA):
+    # Los bordes marcados permiten distinguir prefijos y sufijos, y dan n-gramas a las claves cortas
+    texto = f"^{texto}$"
+    return {texto[i:i + tamano] for i in range(max(len(texto) - tamano + 1, 1))}
+
+
+def _ngramas_de_bloqueo(textos_referencia, textos_actualizados):
+    """
+    N-gramas de bloqueo de las claves de ambos lados, sin los presentes en más de CLAVES_POR_CUBETA
+    claves de un mismo lado. Retorna las listas de conjuntos y, por lado, las posiciones de las claves
+    que conservan algún n-grama (las demás no se pueden bloquear).
+    """
+    conjuntos = [[_ngramas(texto, TAMANO_NGRAMA_BLOQUEO) for texto in textos] for textos in (textos_referencia, textos_actualizados)]
+    frecuentes = set()
+    for lado in conjuntos:
+        frecuencias = pd.Series([ngrama for conjunto in lado for ngrama in conjunto], dtype=object).value_counts()
+        frecuentes.update(frecuencias.index[frecuencias > CLAVES_POR_CUBETA])
+    filtrados, posiciones = [], []
+    for lado in conjuntos:
+        lado = [conjunto - frecuentes for conjunto in lado]
+        con_ngramas = [posicion for posicion, conjunto in enumerate(lado) if conjunto]
+        filtrados.append([lado[posicion] for posicion in con_ngramas])
+        posiciones.append(np.asarray(con_ngramas, dtype=np.int64))
+    return filtrados, posiciones
+
+
+def _firmas_minhash(conjuntos):
+    """
+    Firma MinHash de cada conjunto de n-gramas: BANDAS * FILAS_POR_BANDA mínimos de funciones hash
+    universales, calculados por lotes con numpy.
+    """
+    permutaciones = BANDAS * FILAS_POR_BANDA
+    generador = np.random.default_rng(SEMILLA)
+    a = generador.integers(1, 1 << 32, size=permutaciones, dtype=np.uint64)
+    b = generador.integers(0, 1 << 32, size=permutaciones, dtype=np.uint64)
+
+    tamanos = np.fromiter((len(conjunto) for conjunto in conjuntos), dtype=np.int64, count=len(conjuntos))
+    hashes = np.fromiter(
+        (zlib.crc32(ngrama.encode()) for conjunto in conjuntos for ngrama in conjunto),
+        dtype=np.uint64, count=int(tamanos.sum())
+    )
+    inicios = np.r_[0, np.cumsum(tamanos)[:-1]]
+    firmas = np.empty((len(conjuntos), permutaciones), dtype=np.uint64)
+    for columna in range(permutaciones):
+        firmas[:, columna] = np.minimum.reduceat((a[columna] * hashes + b[columna]) % _PRIMO, inicios)
+    return firmas
+
+
+def _candidatos(firmas_referencia, firmas_actualizadas):
+    """
+    Pares (posición en referencia, posición en actualizadas) que comparten al menos una banda.
+    """
+    total_referencia = len(firmas_referencia)
+    pares = []
+    for banda in range(BANDAS):
+        columnas = slice(banda * FILAS_POR_BANDA, (banda + 1) * FILAS_POR_BANDA)
+        filas = np.concatenate([firmas_referencia[:, columnas], firmas_actualizadas[:, columnas]])
+        _, cubetas = np.unique(filas, axis=0, return_inverse=True)
+        cubetas = cubetas.ravel()
+        cubetas_referencia = pd.DataFrame({"cubeta": cubetas[:total_referencia], "referencia": np.arange(total_referencia)})
+        cubetas_actualizadas = pd.DataFrame({"cubeta": cubetas[total_referencia:], "actualizada": np.arange(len(firmas_actualizadas))})
+        # Se descartan las cubetas demasiado grandes en alguno de los dos lados
+        for tabla in (cubetas_referencia, cubetas_actualizadas):
+            tamano = tabla.groupby("cubeta")["cubeta"].transform("size")
+            tabla.drop(tabla.index[tamano > CLAVES_POR_CUBETA], inplace=True)
+        pares.append(cubetas_referencia.merge(cubetas_actualizadas, on="cubeta")[["referencia", "actualizada"]])
+    return pd.concat(pares, ignore_index=True).drop_duplicates()
+
+
+def _asignar(candidatos):
+    """
+    Empareja cada clave con una sola del otro lado, de mayor a menor confianza.
+    """
+    candidatos = candidatos.sort_values(["confianza", "referencia", "actualizada"], ascending=[False, True, True], kind="stable")
+    usadas_referencia, usadas_actualizadas, elegidos = set(), set(), []
+    for referencia, actualizada, confianza in candidatos[["referencia", "actualizada", "confianza"]].itertuples(index=False):
+        if referencia in usadas_referencia or actualizada in usadas_actualizadas:
+            continue
+        usadas_referencia.add(referencia)
+        usadas_actualizadas.add(actualizada)
+        elegidos.append((referencia, actualizada, confianza))
+    return elegidos
+
+
+def emparejar_claves(claves_referencia, claves_actualizadas, umbral=UMBRAL_CONFIANZA):
+    """
+    Empareja las claves de ambos archivos que no coinciden exactamente.
+
+    Parámetros:
+        claves_referencia, claves_actualizadas: Series con las claves de cada archivo.
+        umbral: Confianza mínima (0 a 1) de un emparejamiento por similitud.
+
+    Retorna:
+        DataFrame con las columnas "Clave referencia", "Clave actualizada", "Confianza" y "Método",
+        una fila por par emparejado.
+    """
+    # Como objetos: la pertenencia y el acceso por posición son más rápidos que con texto de Arrow
+    claves_referencia = pd.Series(claves_referencia).astype(object)
+    claves_actualizadas = pd.Series(claves_actualizadas).astype(object)
+    referencia = claves_referencia.dropna().drop_duplicates()
+    actualizadas = claves_actualizadas.dropna().drop_duplicates()
+    referencia, actualizadas = (
+        referencia[~referencia.isin(actualizadas)].reset_index(drop=True),
+        actualizadas[~actualizadas.isin(referencia)].reset_index(drop=True),
+    )
+    valores_referencia = referencia.to_numpy()
+    valores_actualizados = actualizadas.to_numpy()
+    emparejamientos = []
+
+    # 1. Join por la clave normalizada; las formas normalizadas repetidas en un lado son ambiguas
+    normalizadas_referencia = normalizar_claves(referencia).astype(object)
+    normalizadas_actualizadas = normalizar_claves(actualizadas).astype(object)
+    unicas_referencia = normalizadas_referencia[~normalizadas_referencia.duplicated(keep=False)]
+    unicas_actualizadas = normalizadas_actualizadas[~normalizadas_actualizadas.duplicated(keep=False)]
+    unidas = pd.DataFrame({"normalizada": unicas_referencia, "referencia": unicas_referencia.index}).merge(
+        pd.DataFrame({"normalizada": unicas_actualizadas, "actualizada": unicas_actualizadas.index}), on="normalizada"
+    )
+    for i, j in zip(unidas["referencia"].to_numpy(), unidas["actualizada"].to_numpy()):
+        emparejamientos.append((valores_referencia[i], valores_actualizados[j], 1.0, METODO_NORMALIZADA))
+
+    # 2. Bloqueo MinHash/LSH sobre las claves que siguen sin pareja
+    restantes_referencia = np.setdiff1d(np.arange(len(referencia)), unidas["referencia"].to_numpy())
+    restantes_actualizadas = np.setdiff1d(np.arange(len(actualizadas)), unidas["actualizada"].to_numpy())
+    if len(restantes_referencia) and len(restantes_actualizadas):
+        textos_referencia = normalizadas_referencia.to_numpy()[restantes_referencia].tolist()
+        textos_actualizados = normalizadas_actualizadas.to_numpy()[restantes_actualizadas].tolist()
+        (bloqueo_referencia, bloqueo_actualizadas), (con_bloqueo_referencia, con_bloqueo_actualizadas) = _ngramas_de_bloqueo(
+            textos_referencia, textos_actualizados
+        )
+        if len(con_bloqueo_referencia) and len(con_bloqueo_actualizadas):
+            candidatos = _candidatos(_firmas_minhash(bloqueo_referencia), _firmas_minhash(bloqueo_actualizadas))
+            # Posiciones dentro de las claves restantes de cada lado
+            candidatos["referencia"] = con_bloqueo_referencia[candidatos["referencia"].to_numpy()]
+            candidatos["actualizada"] = con_bloqueo_actualizadas[candidatos["actualizada"].to_numpy()]
+            # Confianza: similitud de Jaccard exacta entre los trigramas de cada candidato
+            ngramas_referencia = [_ngramas(texto) for texto in textos_referencia]
+            ngramas_actualizadas = [_ngramas(texto) for texto in textos_actualizados]
+            confianzas = []
+            for i, j in zip(candidatos["referencia"].tolist(), candidatos["actualizada"].tolist()):
+                comunes = len(ngramas_referencia[i] & ngramas_actualizadas[j])
+                confianzas.append(comunes / (len(ngramas_referencia[i]) + len(ngramas_actualizadas[j]) - comunes))
+            candidatos["confianza"] = confianzas
+            for i, j, confianza in _asignar(candidatos[candidatos["confianza"] >= umbral]):
+                emparejamientos.append((
+                    valores_referencia[restantes_referencia[i]], valores_actualizados[restantes_actualizadas[j]],
+                    round(confianza, 3), METODO_SIMILITUD
+                ))
+
+    return pd.DataFrame(emparejamientos, columns=COLUMNAS_EMPAREJAMIENTO)
+
+
+def preparar_claves(plantilla_df, actualizada_df, columnas_clave=None, difusa=False, umbral=UMBRAL_CONFIANZA):
+    """
+    Prepara ambas tablas para comparar por una clave compuesta o con emparejamiento aproximado.
+
+    Los motores de comparación usan la primera columna como clave: si se pide una clave compuesta o
+    el emparejamiento aproximado, se agrega a ambas tablas una primera columna con la clave de
+    comparación (ver nombre_clave). Las columnas originales se comparan como las demás, de modo que
+    una clave reformateada aparece como cambio ("AB-001 -> AB001") de una fila "Actualizado".
+
+    Parámetros:
+        columnas_clave: Columnas que forman la clave (por defecto, la primera columna).
+        difusa: Si es True, las claves sin coincidencia exacta se emparejan con emparejar_claves.
+        umbral: Confianza mínima del emparejamiento por similitud.
+
+    Retorna:
+        (plantilla_df, actualizada_df, emparejamientos). Sin clave compuesta ni emparejamiento, las
+        tablas se retornan sin cambios; emparejamientos es None si no se pidió el emparejamiento.
+    """
+    columnas_clave = list(columnas_clave or [plantilla_df.columns[0]])
+    if columnas_clave == [plantilla_df.columns[0]] and not difusa:
+        return plantilla_df, actualizada_df, None
+
+    faltantes = [columna for columna in columnas_clave if columna not in plantilla_df.columns or columna not in actualizada_df.columns]
+    if faltantes:
+        raise KeyError(f"Columnas clave inexistentes en alguno de los archivos: {', '.join(map(str, faltantes))}")
+
+    if len(columnas_clave) > 1:
+        claves_referencia = clave_compuesta(plantilla_df, columnas_clave)
+        claves_actualizadas = clave_compuesta(actualizada_df, columnas_clave)
+    else:
+        claves_referencia = plantilla_df[columnas_clave[0]].reset_index(drop=True)
+        claves_actualizadas = actualizada_df[columnas_clave[0]].reset_index(drop=True)
+
+    emparejamientos = None
+    if difusa:
+        with etapa(ETAPA_EMPAREJAMIENTO, filas=len(claves_referencia) + len(claves_actualizadas)) as medicion:
+            emparejamientos = emparejar_claves(claves_referencia, claves_actualizadas, umbral)
+            medicion["detalle"] = f"{len(emparejamientos)} claves emparejadas"
+        if len(emparejamientos):
+            # Las claves emparejadas del archivo actualizado toman la clave de referencia
+            equivalencias = pd.Series(emparejamientos["Clave referencia"].to_numpy(), index=pd.Index(emparejamientos["Clave actualizada"], dtype=object))
+            reemplazos = claves_actualizadas.astype(object).map(equivalencias)
+            claves_actualizadas = reemplazos.where(reemplazos.notna(), claves_actualizadas.astype(object))
+
+    nombre = nombre_clave(columnas_clave)
+    plantilla_df = plantilla_df.copy(deep=False)
+    actualizada_df = actualizada_df.copy(deep=False)
+    plantilla_df.insert(0, nombre, claves_referencia.to_numpy())
+    actualizada_df.insert(0, nombre, claves_actualizadas.to_numpy())
+    return plantilla_df, actualizada_df, emparejamientos
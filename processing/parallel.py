@@ -0,0 +1,104 @@
+# processing/parallel.py
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from processing.diff_engine import comparar_columnar, combinar_resultados_parciales
+from processing.streaming import particion_de_claves
+
+# Tablas compartidas con los procesos hijos. Con el método "fork" los hijos heredan la memoria del
+# proceso principal (copia en escritura), de modo que las particiones no se serializan al enviarlas.
+_TABLAS = {}
+
+
+def contexto_de_procesos():
+    """
+    Elige el método de inicio de los grupos de procesos.
+
+    "fork" solo se usa si el proceso tiene un único hilo: al bifurcar un proceso con varios hilos (el
+    servidor de Streamlit, los hilos de trabajos de processing.jobs) el hijo hereda los candados que
+    otro hilo tenía tomados y puede quedar bloqueado. En ese caso se usa "forkserver" (o "spawn"),
+    que crea los hijos desde un proceso sin hilos, y los datos se serializan hacia cada hijo.
+
+    Retorna:
+        Tupla (contexto de multiprocessing, si los hijos heredan la memoria del proceso).
+    """
+    metodos = multiprocessing.get_all_start_methods()
+    if "fork" in metodos and threading.active_count() == 1:
+        return multiprocessing.get_context("fork"), True
+    return multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn"), False
+
+
+def _comparar_particion_heredada(posiciones_plantilla, posiciones_actualizada, tolerancias=None):
+    plantilla_df = _TABLAS["plantilla"]
+    actualizada_df = _TABLAS["actualizada"]
+    return comparar_columnar(
+        plantilla_df.iloc[posiciones_plantilla].reset_index(drop=True),
+        actualizada_df.iloc[posiciones_actualizada].reset_index(drop=True),
+        tolerancias=tolerancias,
+    )
+
+
+def _particionar(plantilla_df, actualizada_df, particiones):
+    destino_plantilla = particion_de_claves(plantilla_df.iloc[:, 0], particiones)
+    destino_actualizada = particion_de_claves(actualizada_df[plantilla_df.columns[0]], particiones)
+    return [
+        (np.flatnonzero(destino_plantilla == particion), np.flatnonzero(destino_actualizada == particion))
+        for particion in range(particiones)
+    ]
+
+
+def comparar_en_paralelo(plantilla_df, actualizada_df, trabajadores=None, particiones=None, tolerancias=None):
+    """
+    Compara las tablas repartiendo las claves por hash entre varios procesos.
+
+    Parámetros:
+        plantilla_df: DataFrame de referencia.
+        actualizada_df: DataFrame actualizado.
+        trabajadores: Cantidad de procesos (por defecto, la cantidad de núcleos). Con 1 se compara en serie.
+        particiones: Cantidad de particiones de clave (por defecto, cuatro por proceso).
+        tolerancias: Tolerancias por columna numérica (ver diff_engine.comparar_listas_dinamico).
+
+    Retorna:
+        Contenedor del resultado (ver processing.result), idéntico al del motor vectorizado en serie.
+    """
+    trabajadores = trabajadores or os.cpu_count() or 1
+    particiones = particiones or trabajadores * 4
+    grupos = _particionar(plantilla_df, actualizada_df, particiones)
+    contexto, heredar = contexto_de_procesos()
+
+    if trabajadores <= 1:
+        resultados = [
+            comparar_columnar(
+                plantilla_df.iloc[posiciones_plantilla].reset_index(drop=True),
+                actualizada_df.iloc[posiciones_actualizada].reset_index(drop=True),
+                tolerancias=tolerancias,
+            )
+            for posiciones_plantilla, posiciones_actualizada in grupos
+        ]
+    elif heredar:
+        _TABLAS["plantilla"] = plantilla_df
+        _TABLAS["actualizada"] = actualizada_df
+        try:
+            with ProcessPoolExecutor(trabajadores, mp_context=contexto) as executor:
+                resultados = list(executor.map(_comparar_particion_heredada, *zip(*grupos), [tolerancias] * len(grupos)))
+        finally:
+            _TABLAS.clear()
+    else:
+        # Sin "fork" cada partición se serializa hacia su proceso
+        with ProcessPoolExecutor(trabajadores, mp_context=contexto) as executor:
+            resultados = list(executor.map(
+                comparar_columnar,
+                [plantilla_df.iloc[posiciones].reset_index(drop=True) for posiciones, _ in grupos],
+                [actualizada_df.iloc[posiciones].reset_index(drop=True) for _, posiciones in grupos],
+                [None] * len(grupos), [None] * len(grupos), [tolerancias] * len(grupos),
+            ))
+
+    for parcial, (posiciones_plantilla, posiciones_actualizada) in zip(resultados, grupos):
+        parcial["posiciones_plantilla"] = posiciones_plantilla
+        parcial["posiciones_actualizada"] = posiciones_actualizada
+    return combinar_resultados_parciales(resultados, plantilla_df.columns, plantilla_df.index)
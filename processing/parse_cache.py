@@ -0,0 +1,143 @@
+# processing/parse_cache.py
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Límites de ambos niveles de la caché (configurables por variables de entorno)
+DIRECTORIO_CACHE = os.environ.get("DIFFLY_CACHE_DIR", ".diffly_cache")
+LIMITE_MEMORIA_BYTES = int(os.environ.get("DIFFLY_CACHE_MEMORIA_MB", "512")) * 1024 * 1024
+LIMITE_DISCO_BYTES = int(os.environ.get("DIFFLY_CACHE_DISCO_MB", "2048")) * 1024 * 1024
+
+# Nivel en memoria, compartido por todas las sesiones del proceso: clave -> (DataFrame, tamaño)
+_memoria = OrderedDict()
+_bytes_en_memoria = 0
+_bloqueo = threading.Lock()
+
+
+def clave_cache(datos, variante=""):
+    """
+    Clave de la caché: hash del contenido subido más las opciones de lectura que afectan el resultado.
+    """
+    # Sin concatenar: datos puede ser un archivo grande y no se copia
+    h = hashlib.sha256(datos)
+    h.update(variante.encode())
+    return h.hexdigest()
+
+
+def _guardar_en_memoria(clave, df):
+    global _bytes_en_memoria
+    tamano = int(df.memory_usage(deep=True).sum())
+    if tamano > LIMITE_MEMORIA_BYTES:
+        return
+    with _bloqueo:
+        if clave in _memoria:
+            _memoria.move_to_end(clave)
+            return
+        _memoria[clave] = (df, tamano)
+        _bytes_en_memoria += tamano
+        while _bytes_en_memoria > LIMITE_MEMORIA_BYTES:
+            _, (_, tamano_descartado) = _memoria.popitem(last=False)
+            _bytes_en_memoria -= tamano_descartado
+
+
+def _buscar_en_memoria(clave):
+    with _bloqueo:
+        if clave not in _memoria:
+            return None
+        _memoria.move_to_end(clave)
+        return _memoria[clave][0]
+
+
+def _ruta_disco(clave):
+    return os.path.join(DIRECTORIO_CACHE, f"{clave}.feather")
+
+
+def _buscar_en_disco(clave):
+    ruta = _ruta_disco(clave)
+    try:
+        df = pd.read_feather(ruta)
+        # La fecha de modificación registra el último acceso para el descarte LRU
+        os.utime(ruta)
+        return df
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+
+
+def _guardar_en_disco(clave, df):
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    ruta = _ruta_disco(clave)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        df.to_feather(temporal)
+        os.replace(temporal, ruta)
+    except Exception:
+        # Tablas que Arrow no puede representar (p. ej. columnas con tipos mezclados) quedan solo en memoria
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return
+    _descartar_en_disco()
+
+
+def _descartar_en_disco():
+    archivos = []
+    for nombre in os.listdir(DIRECTORIO_CACHE):
+        if nombre.endswith(".feather"):
+            ruta = os.path.join(DIRECTORIO_CACHE, nombre)
+            try:
+                estado = os.stat(ruta)
+            except FileNotFoundError:
+                continue
+            archivos.append((estado.st_mtime, estado.st_size, ruta))
+    total = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, ruta in sorted(archivos):
+        if total <= LIMITE_DISCO_BYTES:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        total -= tamano
+
+
+def leer_con_cache(datos, leer, variante=""):
+    """
+    Retorna el DataFrame correspondiente al contenido de un archivo, leyéndolo solo si no está en caché.
+
+    Parámetros:
+        datos: Bytes del archivo subido.
+        leer: Función sin argumentos que interpreta el archivo y retorna un DataFrame.
+        variante: Texto que distingue distintas opciones de lectura del mismo contenido.
+
+    Retorna:
+        DataFrame leído o recuperado de la caché. Se comparte entre sesiones: no debe modificarse.
+    """
+    clave = clave_cache(datos, variante)
+
+    df = _buscar_en_memoria(clave)
+    if df is not None:
+        return df
+
+    df = _buscar_en_disco(clave)
+    if df is None:
+        df = leer()
+        _guardar_en_disco(clave, df)
+    _guardar_en_memoria(clave, df)
+    return df
+
+
+def limpiar_cache():
+    """
+    Vacía ambos niveles de la caché.
+    """
+    global _bytes_en_memoria
+    with _bloqueo:
+        _memoria.clear()
+        _bytes_en_memoria = 0
+    if os.path.isdir(DIRECTORIO_CACHE):
+        for nombre in os.listdir(DIRECTORIO_CACHE):
+            if nombre.endswith(".feather"):
+                os.remove(os.path.join(DIRECTORIO_CACHE, nombre))
@@ -0,0 +1,286 @@
+# processing/result.py
+
+import numpy as np
+import pandas as pd
+
+# Estados posibles de una clave, guardados como categoría (un código entero por fila)
+ESTADOS = ["Sin cambios", "Actualizado", "Nuevo", "Eliminado"]
+TIPO_ESTADO = pd.CategoricalDtype(ESTADOS)
+
+# Valores de "Columna" en cambios_detallados para los registros nuevos y eliminados
+COLUMNA_NUEVO = "Nuevo registro"
+COLUMNA_ELIMINADO = "Registro eliminado"
+COLUMNAS_DE_REGISTRO = (COLUMNA_NUEVO, COLUMNA_ELIMINADO)
+
+COLUMNA_DETALLES = "Detalles de Cambios"
+# Texto de "Detalles de Cambios" según el Estado; el de "Actualizado" se arma a partir de sus celdas
+_DETALLES_POR_ESTADO = {"Sin cambios": "", "Nuevo": "Nuevo registro", "Eliminado": "Registro eliminado"}
+# Valores anterior y nuevo de las filas de cambios_detallados que representan un registro completo
+_VALORES_DE_REGISTRO = {COLUMNA_NUEVO: (None, "Nuevo registro"), COLUMNA_ELIMINADO: ("Registro eliminado", None)}
+
+# Sufijos de las columnas de plantilla_procesada con los valores anterior y nuevo
+SUFIJO_ANTERIOR = " (Valor Anterior)"
+SUFIJO_NUEVO = " (Valor Nuevo)"
+
+
+def concatenar_series(partes):
+    """
+    Concatena columnas de distintas partes. Si sus tipos difieren se concatenan como objetos,
+    de modo que cada valor conserve el tipo con que se comparó (p. ej. 5 no pasa a 5.0).
+    """
+    partes = [parte.reset_index(drop=True) for parte in partes]
+    if not partes:
+        return pd.Series([], dtype=object)
+    # Las partes vacías no influyen en el tipo del resultado
+    partes = [parte for parte in partes if len(parte)] or partes[:1]
+    if len({str(parte.dtype) for parte in partes}) > 1:
+        partes = [parte.astype(object) for parte in partes]
+    return pd.concat(partes, ignore_index=True)
+
+
+def crear_resultado(plantilla, claves_cambios, estados_cambios, claves_detallados, columnas_detallados,
+                    indice_valor, valores, detalles_rango=None, detalles_texto=None):
+    """
+    Arma el contenedor compacto del resultado de una comparación.
+
+    El contenedor es un diccionario con:
+        "plantilla": plantilla_procesada sin "Detalles de Cambios", con Estado como categoría.
+        "cambios": DataFrame ("SKU", "Estado") con Estado como categoría.
+        "detallados": DataFrame ("SKU", "Columna") con Columna como categoría (un código por fila).
+        "indice_valor": para cada fila de "detallados", posición de sus valores dentro de
+            "valores"[columna] (-1 en los registros nuevos y eliminados).
+        "valores": columna -> (anteriores, nuevos), Series con el tipo de la columna comparada.
+        "detalles_rango": (inicio, fin) por fila de "plantilla": filas de "detallados" con las que se
+            arma "Detalles de Cambios" de una fila actualizada (-1 si no corresponde).
+        "detalles_texto": textos de "Detalles de Cambios" ya armados, si el motor los generó (o None).
+        "analitica": agregados de los cambios (ver processing.analytics); los motores la agregan al
+            terminar la comparación (None hasta entonces).
+
+    Los valores anterior y nuevo y los textos de "Detalles de Cambios" solo se convierten a objetos
+    Python para las filas que se piden (ver tabla_detallados, detalles_de_cambios y tabla_procesada).
+    """
+    plantilla = plantilla.assign(Estado=plantilla["Estado"].astype(TIPO_ESTADO))
+    if not isinstance(estados_cambios, pd.Categorical):
+        estados_cambios = pd.Categorical(list(estados_cambios), dtype=TIPO_ESTADO)
+    cambios = pd.DataFrame({
+        "SKU": pd.Series(claves_cambios).reset_index(drop=True),
+        "Estado": estados_cambios,
+    })
+    detallados = pd.DataFrame({
+        "SKU": pd.Series(claves_detallados).reset_index(drop=True),
+        "Columna": pd.Series(columnas_detallados).reset_index(drop=True).astype("category"),
+    })
+    return {
+        "plantilla": plantilla,
+        "cambios": cambios,
+        "detallados": detallados,
+        "indice_valor": np.asarray(indice_valor, dtype=np.int64),
+        "valores": valores,
+        "detalles_rango": detalles_rango,
+        "detalles_texto": detalles_texto,
+        "analitica": None,
+    }
+
+
+def _posiciones(filas, total):
+    if filas is None:
+        return np.arange(total)
+    return np.asarray(filas, dtype=np.int64)
+
+
+def tabla_cambios(resultado, filas=None):
+    """
+    Retorna las filas pedidas de cambios (todas por defecto) como DataFrame ("SKU", "Estado").
+    """
+    cambios = resultado["cambios"]
+    return cambios if filas is None else cambios.iloc[filas]
+
+
+def tabla_detallados(resultado, filas=None):
+    """
+    Retorna las filas pedidas de cambios_detallados con sus columnas "Valor Anterior" y "Valor Nuevo".
+    Solo se construyen los valores de esas filas.
+    """
+    detallados = resultado["detallados"]
+    filas = _posiciones(filas, len(detallados))
+    tabla = detallados.iloc[filas]
+    anteriores = np.full(len(filas), None, dtype=object)
+    nuevos = np.full(len(filas), None, dtype=object)
+
+    columnas = tabla["Columna"]
+    codigos = columnas.cat.codes.to_numpy()
+    indice_valor = resultado["indice_valor"][filas]
+    for codigo in np.unique(codigos[codigos >= 0]):
+        columna = columnas.cat.categories[codigo]
+        seleccion = codigos == codigo
+        if columna in _VALORES_DE_REGISTRO:
+            anteriores[seleccion], nuevos[seleccion] = _VALORES_DE_REGISTRO[columna]
+            continue
+        valores_anteriores, valores_nuevos = resultado["valores"][columna]
+        posiciones = indice_valor[seleccion]
+        anteriores[seleccion] = valores_anteriores.iloc[posiciones].to_numpy(dtype=object)
+        nuevos[seleccion] = valores_nuevos.iloc[posiciones].to_numpy(dtype=object)
+
+    tabla = tabla.copy()
+    tabla["Columna"] = tabla["Columna"].astype(object)
+    tabla["Valor Anterior"] = pd.Series(anteriores, index=tabla.index, dtype=object)
+    tabla["Valor Nuevo"] = pd.Series(nuevos, index=tabla.index, dtype=object)
+    return tabla
+
+
+def detalles_de_cambios(resultado, filas=None):
+    """
+    Genera el texto de "Detalles de Cambios" ("columna: anterior -> nuevo; ...") de las filas pedidas
+    de plantilla_procesada (todas por defecto).
+
+    Retorna:
+        Arreglo de textos, uno por fila pedida.
+    """
+    plantilla = resultado["plantilla"]
+    filas = _posiciones(filas, len(plantilla))
+    if resultado["detalles_texto"] is not None:
+        return np.asarray(resultado["detalles_texto"], dtype=object)[filas]
+
+    estados = plantilla["Estado"].iloc[filas].astype(object).to_numpy()
+    textos = np.full(len(filas), "", dtype=object)
+    for estado, texto in _DETALLES_POR_ESTADO.items():
+        textos[estados == estado] = texto
+
+    actualizadas = np.flatnonzero(estados == "Actualizado")
+    if len(actualizadas):
+        inicio, fin = (rango[filas[actualizadas]] for rango in resultado["detalles_rango"])
+        largos = fin - inicio
+        # Todas las celdas de las filas pedidas se construyen juntas; luego se arma un texto por fila
+        celdas = np.repeat(inicio - np.r_[0, np.cumsum(largos)[:-1]], largos) + np.arange(largos.sum())
+        tabla = tabla_detallados(resultado, celdas)
+        partes = [
+            f"{columna}: {anterior} -> {nuevo}"
+            for columna, anterior, nuevo in zip(tabla["Columna"].tolist(), tabla["Valor Anterior"].tolist(), tabla["Valor Nuevo"].tolist())
+        ]
+        limites = np.r_[0, np.cumsum(largos)]
+        textos[actualizadas] = ["; ".join(partes[i:j]) for i, j in zip(limites[:-1].tolist(), limites[1:].tolist())]
+    return textos
+
+
+def columnas_procesada(resultado):
+    """
+    Columnas de plantilla_procesada completa: "Detalles de Cambios" va después de "Estado".
+    """
+    columnas = list(resultado["plantilla"].columns)
+    posicion = columnas.index("Estado") + 1
+    return columnas[:posicion] + [COLUMNA_DETALLES] + columnas[posicion:]
+
+
+def tabla_procesada(resultado, filas=None):
+    """
+    Retorna las filas pedidas de plantilla_procesada (todas por defecto) con "Detalles de Cambios".
+    """
+    plantilla = resultado["plantilla"]
+    tabla = plantilla if filas is None else plantilla.iloc[filas]
+    tabla = tabla.copy()
+    tabla[COLUMNA_DETALLES] = pd.Series(detalles_de_cambios(resultado, filas), index=tabla.index, dtype=object).infer_objects()
+    return tabla[columnas_procesada(resultado)]
+
+
+def conteo_estados(resultado):
+    """
+    Cantidad de claves por Estado (solo los estados presentes), sin recorrer filas en Python.
+    """
+    conteo = resultado["cambios"]["Estado"].value_counts(sort=False)
+    return conteo[conteo > 0]
+
+
+def _objetos(valores):
+    arreglo = np.empty(len(valores), dtype=object)
+    arreglo[:] = valores
+    return arreglo
+
+
+def resultado_desde_listas(plantilla_procesada, cambios, cambios_detallados, tipo_clave=object):
+    """
+    Convierte el resultado en listas del motor iterativo al contenedor compacto.
+    Los valores se conservan tal como los generó el motor (como objetos); las claves de cambios y
+    cambios_detallados toman `tipo_clave` (el de la columna clave de los archivos comparados).
+    """
+    campos = {
+        campo: _objetos([detalle[campo] for detalle in cambios_detallados])
+        for campo in ("SKU", "Columna", "Valor Anterior", "Valor Nuevo")
+    }
+    indice_valor = np.full(len(cambios_detallados), -1, dtype=np.int64)
+    valores = {}
+    for columna, posiciones in pd.Series(campos["Columna"], dtype=object).groupby(campos["Columna"], sort=False).indices.items():
+        if columna in COLUMNAS_DE_REGISTRO:
+            continue
+        indice_valor[posiciones] = np.arange(len(posiciones))
+        valores[columna] = tuple(pd.Series(campos[campo][posiciones], dtype=object) for campo in ("Valor Anterior", "Valor Nuevo"))
+
+    return crear_resultado(
+        plantilla_procesada.drop(columns=COLUMNA_DETALLES),
+        pd.Series(_objetos([clave for clave, _ in cambios]), dtype=object).astype(tipo_clave),
+        [estado for _, estado in cambios],
+        pd.Series(campos["SKU"], dtype=object).astype(tipo_clave),
+        pd.Series(campos["Columna"], dtype=object),
+        indice_valor,
+        valores,
+        detalles_texto=plantilla_procesada[COLUMNA_DETALLES].to_numpy(dtype=object),
+    )
+
+
+def resultado_desde_tabla(plantilla_procesada):
+    """
+    Arma el contenedor a partir de una plantilla_procesada guardada (p. ej. en el historial):
+    cambios y cambios_detallados se derivan de su columna Estado y de sus pares de columnas.
+    """
+    claves = plantilla_procesada.iloc[:, 0].reset_index(drop=True)
+    estados = plantilla_procesada["Estado"].astype(object).to_numpy()
+
+    posiciones, orden_columnas, nombres, indices, valores = [], [], [], [], {}
+    actualizadas = estados == "Actualizado"
+    pares = [columna for columna in plantilla_procesada.columns if str(columna).endswith(SUFIJO_ANTERIOR)]
+    for orden, columna in enumerate(pares):
+        base = str(columna)[:-len(SUFIJO_ANTERIOR)]
+        anterior = plantilla_procesada[columna].reset_index(drop=True)
+        nuevo = plantilla_procesada.get(f"{base}{SUFIJO_NUEVO}", pd.Series(np.nan, index=plantilla_procesada.index)).reset_index(drop=True)
+        filas = np.flatnonzero(actualizadas & (anterior.notna() | nuevo.notna()).to_numpy())
+        if not len(filas):
+            continue
+        posiciones.append(filas)
+        orden_columnas.append(np.full(len(filas), orden))
+        nombres.append(np.full(len(filas), base, dtype=object))
+        indices.append(np.arange(len(filas)))
+        valores[base] = (anterior.iloc[filas].reset_index(drop=True), nuevo.iloc[filas].reset_index(drop=True))
+    for orden, (estado, columna) in enumerate((("Nuevo", COLUMNA_NUEVO), ("Eliminado", COLUMNA_ELIMINADO)), start=len(pares)):
+        filas = np.flatnonzero(estados == estado)
+        posiciones.append(filas)
+        orden_columnas.append(np.full(len(filas), orden))
+        nombres.append(np.full(len(filas), columna, dtype=object))
+        indices.append(np.full(len(filas), -1))
+
+    # Cada fila conserva el orden de la planilla; dentro de una fila, el de sus columnas
+    posiciones, orden_columnas, nombres, indices = (np.concatenate(partes) for partes in (posiciones, orden_columnas, nombres, indices))
+    orden = np.lexsort((orden_columnas, posiciones))
+
+    plantilla = plantilla_procesada.reset_index(drop=True)
+    return crear_resultado(
+        plantilla.drop(columns=COLUMNA_DETALLES, errors="ignore"),
+        claves,
+        estados,
+        claves.iloc[posiciones[orden]],
+        nombres[orden],
+        indices[orden],
+        valores,
+        detalles_texto=plantilla[COLUMNA_DETALLES].to_numpy(dtype=object) if COLUMNA_DETALLES in plantilla else np.full(len(plantilla), "", dtype=object),
+    )
+
+
+def resultado_como_tuplas(resultado):
+    """
+    Convierte el contenedor al formato anterior (plantilla_procesada, cambios, cambios_detallados),
+    con listas de tuplas y de diccionarios. Construye todos los objetos: solo para tablas pequeñas o pruebas.
+    """
+    plantilla_procesada = tabla_procesada(resultado)
+    plantilla_procesada["Estado"] = plantilla_procesada["Estado"].astype(object).infer_objects()
+    cambios_df = tabla_cambios(resultado)
+    cambios = list(zip(cambios_df["SKU"].tolist(), cambios_df["Estado"].astype(object).tolist()))
+    cambios_detallados = tabla_detallados(resultado).to_dict("records")
+    return plantilla_procesada, cambios, cambios_detallados
@@ -0,0 +1,232 @@
+# processing/schema.py
+"""
+Alineación de esquemas antes de comparar: las columnas de ambos archivos se emparejan por nombre,
+se informan las agregadas y las eliminadas, y cada par de columnas se convierte una sola vez a un
+tipo común (número, fecha o texto). Así la comparación trabaja sobre arreglos de NumPy en lugar de
+objetos de Python y no informa cambios falsos como "10 -> 10.0" o "ABC -> ABC ".
+"""
+import numpy as np
+import pandas as pd
+
+from performance.profiler import ETAPA_ALINEACION, etapa
+
+# Columnas del informe de tipos convertidos
+COLUMNAS_TIPOS = ["Columna", "Tipo referencia", "Tipo actualizado", "Tipo común"]
+# Clases de tipo de una columna
+_NUMERO, _FECHA, _TEXTO, _OBJETO, _OTRO = "número", "fecha", "texto", "objeto", "otro"
+# Filas con las que se prueba si una columna de texto se puede leer como números o fechas
+FILAS_DE_PRUEBA = 1_000
+
+
+def _nombre_normalizado(columna):
+    return " ".join(str(columna).split()).casefold()
+
+
+def emparejar_columnas(columnas_referencia, columnas_actualizado):
+    """
+    Empareja las columnas de ambos archivos por nombre. Las que no coinciden exactamente se emparejan
+    sin distinguir mayúsculas ni espacios sobrantes ("Precio " y "precio").
+
+    Retorna:
+        Diccionario con "renombradas" (columna del archivo actualizado -> columna de referencia),
+        "agregadas" (solo en el archivo actualizado) y "eliminadas" (solo en el de referencia).
+    """
+    exactas = set(columnas_referencia) & set(columnas_actualizado)
+    por_nombre = {}
+    for columna in columnas_actualizado:
+        if columna not in exactas:
+            por_nombre.setdefault(_nombre_normalizado(columna), columna)
+    renombradas = {}
+    for columna in columnas_referencia:
+        if columna not in exactas and _nombre_normalizado(columna) in por_nombre:
+            renombradas[por_nombre.pop(_nombre_normalizado(columna))] = columna
+    emparejadas = exactas | set(renombradas.values())
+    return {
+        "renombradas": renombradas,
+        "agregadas": [columna for columna in columnas_actualizado if columna not in exactas and columna not in renombradas],
+        "eliminadas": [columna for columna in columnas_referencia if columna not in emparejadas],
+    }
+
+
+def _clase(serie):
+    dtype = serie.dtype
+    if isinstance(dtype, pd.StringDtype):
+        return _TEXTO
+    if not isinstance(dtype, np.dtype):
+        return _OTRO
+    if dtype.kind in "biuf":
+        return _NUMERO
+    if dtype.kind == "M":
+        return _FECHA
+    return _OBJETO if dtype.kind == "O" else _OTRO
+
+
+def _columna_vacia(serie, indice):
+    # Columna sin valores con el tipo de la otra (los enteros no admiten nulos: pasan a decimales)
+    dtype = np.float64 if isinstance(serie.dtype, np.dtype) and serie.dtype.kind in "biu" else serie.dtype
+    return pd.Series(index=indice, dtype=dtype)
+
+
+def _a_texto(serie):
+    # astype("str") conserva los nulos solo desde pandas 3 (antes los escribe como "nan"): se marcan aparte
+    return serie.astype("str").mask(serie.isna())
+
+
+def _textos_sin_vacios(serie):
+    texto = _a_texto(serie).str.strip()
+    return texto.mask(texto == "")
+
+
+def _convertir_todo(serie, convertir):
+    """
+    Aplica convertir (p. ej. pd.to_numeric) a los textos de la columna, o retorna None si algún
+    valor no se convierte. Los textos vacíos (o solo espacios) se toman como nulos. Se prueba antes
+    con las primeras filas, para descartar pronto las columnas de texto.
+    """
+    if not _convertibles(serie.head(FILAS_DE_PRUEBA), convertir):
+        return None
+    texto = _textos_sin_vacios(serie)
+    convertida = convertir(texto)
+    return convertida if (convertida.notna() | texto.isna()).all() else None
+
+
+def _convertibles(serie, convertir):
+    texto = _textos_sin_vacios(serie)
+    return bool((convertir(texto).notna() | texto.isna()).all())
+
+
+def _como_numero(serie):
+    """
+    Convierte una columna de texto u objetos a números, o retorna None si algún valor no lo es.
+    """
+    if _clase(serie) == _NUMERO:
+        return serie
+    return _convertir_todo(serie, lambda texto: pd.to_numeric(texto, errors="coerce"))
+
+
+def _como_fecha(serie):
+    """
+    Convierte una columna de texto u objetos a fechas (formato ISO 8601), o retorna None si algún valor no lo es.
+    """
+    if _clase(serie) == _FECHA:
+        return serie
+    return _convertir_todo(serie, lambda texto: pd.to_datetime(texto, errors="coerce", format="ISO8601"))
+
+
+def _texto_de_valor(valor):
+    # Los decimales enteros se escriben sin ".0", igual que los enteros del otro archivo
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def _como_texto(serie, recortar):
+    if _clase(serie) == _TEXTO:
+        texto = serie
+    elif isinstance(serie.dtype, np.dtype) and serie.dtype.kind == "f":
+        valores = serie.to_numpy()
+        enteros = np.isfinite(valores) & (np.abs(valores) < 2**53) & (valores == np.trunc(valores))
+        texto = _a_texto(serie)
+        texto[enteros] = serie[enteros].astype(np.int64).astype("str")
+    elif _clase(serie) == _OBJETO and pd.api.types.infer_dtype(serie, skipna=True) != "string":
+        texto = _a_texto(serie.map(_texto_de_valor, na_action="ignore"))
+    else:
+        texto = _a_texto(serie)
+    return texto.str.strip() if recortar else texto
+
+
+def _convertir_par(anterior, nuevo, recortar):
+    """
+    Convierte un par de columnas a un tipo común: número si ambas lo son (o la otra es de texto u
+    objetos y se puede leer como números), fecha si ambas lo son (o la otra tiene fechas ISO), y
+    texto en los demás casos.
+    Las columnas de igual tipo que no son texto ni objetos se conservan.
+    """
+    clases = {_clase(anterior), _clase(nuevo)}
+    if clases == {_NUMERO}:
+        comun = np.result_type(anterior.dtype, nuevo.dtype)
+        return anterior.astype(comun), nuevo.astype(comun)
+    # Dos columnas de texto no se leen como números: "001" es un código, no el 1
+    if clases <= {_NUMERO, _TEXTO, _OBJETO} and clases & {_NUMERO, _OBJETO}:
+        numeros = (_como_numero(anterior), _como_numero(nuevo))
+        if numeros[0] is not None and numeros[1] is not None:
+            comun = np.result_type(numeros[0].dtype, numeros[1].dtype)
+            return numeros[0].astype(comun), numeros[1].astype(comun)
+    if clases <= {_FECHA, _TEXTO, _OBJETO} and _FECHA in clases:
+        fechas = (_como_fecha(anterior), _como_fecha(nuevo))
+        if fechas[0] is not None and fechas[1] is not None:
+            comun = np.result_type(fechas[0].dtype, fechas[1].dtype)
+            return fechas[0].astype(comun), fechas[1].astype(comun)
+    if anterior.dtype == nuevo.dtype and clases & {_FECHA, _OTRO}:
+        return anterior, nuevo
+    return _como_texto(anterior, recortar), _como_texto(nuevo, recortar)
+
+
+def alinear_esquemas(plantilla_df, actualizada_df, tolerancias=None, recortar_textos=True):
+    """
+    Alinea las columnas de ambas tablas y convierte cada par a un tipo común antes de comparar.
+
+    Las columnas que solo están en el archivo actualizado se agregan al final de la plantilla sin
+    valores (aparecen en los registros nuevos), y las que solo están en la referencia se agregan
+    vacías al archivo actualizado: ninguna de las dos genera cambios en los registros existentes.
+
+    Parámetros:
+        plantilla_df, actualizada_df: Tablas de referencia y actualizada (la primera columna es la clave).
+        tolerancias: Diccionario opcional columna -> diferencia máxima que no cuenta como cambio
+            (solo columnas numéricas; se aplica al comparar, ver diff_engine.comparar_listas_dinamico).
+        recortar_textos: Si es True, se quitan los espacios al inicio y al final de los textos.
+
+    Retorna:
+        Diccionario con las tablas alineadas ("plantilla" y "actualizada", con las mismas columnas en
+        el mismo orden), "renombradas", "agregadas", "eliminadas" (ver emparejar_columnas) y "tipos"
+        (DataFrame con las columnas cuyo tipo se convirtió).
+    """
+    with etapa(ETAPA_ALINEACION, filas=len(plantilla_df) + len(actualizada_df)):
+        columnas = emparejar_columnas(list(plantilla_df.columns), list(actualizada_df.columns))
+        clave = plantilla_df.columns[0]
+        if clave in columnas["eliminadas"]:
+            raise ValueError(f"El archivo actualizado no tiene la columna clave '{clave}'.")
+
+        actualizada_df = actualizada_df.rename(columns=columnas["renombradas"])
+        plantilla = {columna: plantilla_df[columna] for columna in plantilla_df.columns}
+        actualizada = {columna: actualizada_df[columna] for columna in actualizada_df.columns}
+        for columna in columnas["agregadas"]:
+            plantilla[columna] = _columna_vacia(actualizada[columna], plantilla_df.index)
+        for columna in columnas["eliminadas"]:
+            actualizada[columna] = _columna_vacia(plantilla[columna], actualizada_df.index)
+
+        tipos = []
+        for columna in plantilla:
+            if columna in columnas["agregadas"] or columna in columnas["eliminadas"]:
+                continue
+            anterior, nuevo = _convertir_par(plantilla[columna], actualizada[columna], recortar_textos)
+            if anterior.dtype != plantilla[columna].dtype or nuevo.dtype != actualizada[columna].dtype:
+                tipos.append((columna, str(plantilla[columna].dtype), str(actualizada[columna].dtype), str(anterior.dtype)))
+            plantilla[columna], actualizada[columna] = anterior, nuevo
+
+        for columna in tolerancias or {}:
+            if columna not in plantilla:
+                raise ValueError(f"La columna '{columna}' de las tolerancias no está en los archivos.")
+            if _clase(plantilla[columna]) != _NUMERO:
+                raise ValueError(f"La tolerancia de '{columna}' requiere una columna numérica en ambos archivos.")
+
+        orden = list(plantilla)
+        return {
+            "plantilla": pd.DataFrame(plantilla, index=plantilla_df.index, columns=orden),
+            "actualizada": pd.DataFrame(actualizada, index=actualizada_df.index, columns=orden),
+            **columnas,
+            "tipos": pd.DataFrame(tipos, columns=COLUMNAS_TIPOS),
+        }
+
+
+def esquema_como_datos(esquema):
+    """
+    Retorna el informe de la alineación (columnas renombradas, agregadas y eliminadas, y tipos
+    convertidos) como un diccionario de tipos de Python, para guardarlo con la comparación.
+    """
+    return {
+        "renombradas": {str(original): str(columna) for original, columna in esquema["renombradas"].items()},
+        "agregadas": [str(columna) for columna in esquema["agregadas"]],
+        "eliminadas": [str(columna) for columna in esquema["eliminadas"]],
+        "tipos": esquema["tipos"].astype(str).values.tolist(),
+    }
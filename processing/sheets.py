@@ -0,0 +1,165 @@
+# processing/sheets.py
+"""
+Comparación de libros de Excel con varias hojas (p. ej. una hoja por depósito): las hojas de ambos
+libros se emparejan por nombre y cada par se lee y se compara en un grupo de procesos. Solo se leen
+las hojas elegidas.
+"""
+import itertools
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from io import BytesIO
+
+import pandas as pd
+
+from performance.profiler import ETAPA_COMPARAR, ETAPA_LECTURA, crear_registro, etapa
+from processing.diff_engine import MOTOR_VECTORIZADO, comparar_listas_dinamico
+from processing.ingest import leer_tabla
+from processing.parallel import contexto_de_procesos
+from processing.result import ESTADOS, conteo_estados
+from processing.schema import alinear_esquemas, esquema_como_datos
+
+# Libros compartidos con los procesos hijos. Con el método "fork" (ver
+# processing.parallel.contexto_de_procesos) los hijos heredan la memoria del proceso principal, de
+# modo que el contenido de los libros no se serializa con cada hoja. Cada
+# llamada usa su propia entrada, para que dos comparaciones simultáneas no se mezclen.
+_LIBROS = {}
+_llamadas = itertools.count()
+
+
+def _nombre_normalizado(hoja):
+    return " ".join(str(hoja).split()).casefold()
+
+
+def emparejar_hojas(hojas_referencia, hojas_actualizado):
+    """
+    Empareja las hojas de ambos libros por nombre, sin distinguir mayúsculas ni espacios sobrantes.
+
+    Retorna:
+        Diccionario con "pares" (lista de tuplas (hoja_referencia, hoja_actualizado), en el orden del
+        libro de referencia), "solo_referencia" y "solo_actualizado" (hojas sin pareja).
+    """
+    por_nombre = {}
+    for hoja in hojas_actualizado:
+        por_nombre.setdefault(_nombre_normalizado(hoja), hoja)
+    pares = [(hoja, por_nombre[_nombre_normalizado(hoja)]) for hoja in hojas_referencia if _nombre_normalizado(hoja) in por_nombre]
+    emparejadas = {hoja_actualizado for _, hoja_actualizado in pares}
+    return {
+        "pares": pares,
+        "solo_referencia": [hoja for hoja in hojas_referencia if _nombre_normalizado(hoja) not in por_nombre],
+        "solo_actualizado": [hoja for hoja in hojas_actualizado if hoja not in emparejadas],
+    }
+
+
+def _origen(libro):
+    # Los libros subidos se reciben como bytes; cada lectura usa su propio BytesIO
+    return BytesIO(libro) if isinstance(libro, bytes) else libro
+
+
+def comparar_hoja(referencia, nombre_referencia, hoja_referencia, actualizado, nombre_actualizado, hoja_actualizado,
+                  motor=MOTOR_VECTORIZADO, columnas=None, tipos=None):
+    """
+    Lee y compara una hoja de cada libro. Se ejecuta en los procesos del grupo.
+
+    Parámetros:
+        referencia, actualizado: Ruta o contenido (bytes) de cada libro.
+        nombre_referencia, nombre_actualizado: Nombres de los archivos, para detectar el formato.
+        hoja_referencia, hoja_actualizado: Hojas emparejadas (ver emparejar_hojas).
+
+    Retorna:
+        Diccionario con la hoja (el nombre de la hoja de referencia), el resultado (o None si hubo un
+        error), las mediciones de cada etapa y el error.
+    """
+    registro = crear_registro()
+    salida = {"hoja": hoja_referencia, "resultado": None, "error": None}
+    try:
+        with etapa(ETAPA_LECTURA, detalle=f"hoja {hoja_referencia}", registro=registro) as medicion:
+            plantilla_df = leer_tabla(_origen(referencia), nombre_referencia, columnas, tipos, hoja=hoja_referencia)
+            actualizada_df = leer_tabla(_origen(actualizado), nombre_actualizado, columnas, tipos, hoja=hoja_actualizado)
+            medicion["filas"] = len(plantilla_df) + len(actualizada_df)
+
+        with etapa(ETAPA_COMPARAR, filas=len(plantilla_df) + len(actualizada_df), detalle=f"hoja {hoja_referencia}, {motor}", registro=registro):
+            esquema = alinear_esquemas(plantilla_df, actualizada_df)
+            salida["resultado"] = comparar_listas_dinamico(esquema["plantilla"], esquema["actualizada"], motor=motor)
+            salida["resultado"]["esquema"] = esquema_como_datos(esquema)
+    except Exception as e:
+        salida["error"] = f"{type(e).__name__}: {e}"
+    salida["mediciones"] = list(registro["mediciones"])
+    return salida
+
+
+def _comparar_hoja_heredada(llamada, hoja_referencia, hoja_actualizado, opciones):
+    referencia, nombre_referencia, actualizado, nombre_actualizado = _LIBROS[llamada]
+    return comparar_hoja(referencia, nombre_referencia, hoja_referencia, actualizado, nombre_actualizado, hoja_actualizado, **opciones)
+
+
+def comparar_hojas(referencia, nombre_referencia, actualizado, nombre_actualizado, pares, trabajadores=1,
+                   motor=MOTOR_VECTORIZADO, columnas=None, tipos=None, al_terminar=None):
+    """
+    Compara los pares de hojas de dos libros, cada par en un proceso del grupo.
+
+    Parámetros:
+        referencia, actualizado: Ruta o contenido (bytes) de cada libro.
+        nombre_referencia, nombre_actualizado: Nombres de los archivos, para detectar el formato.
+        pares: Lista de tuplas (hoja_referencia, hoja_actualizado) a comparar (ver emparejar_hojas).
+        trabajadores: Hojas que se comparan a la vez (con 1 se compara en el proceso actual).
+        motor, columnas, tipos: Motor de comparación y opciones de lectura, iguales para todas las hojas.
+        al_terminar: Función opcional que recibe la salida de cada hoja al terminar (ver comparar_hoja).
+            Si lanza una excepción, las hojas pendientes se cancelan y la excepción se propaga.
+
+    Retorna:
+        Lista de salidas de comparar_hoja, en el orden de `pares`.
+    """
+    opciones = {"motor": motor, "columnas": columnas, "tipos": tipos}
+    salidas = {}
+
+    def recibir(salida):
+        salidas[salida["hoja"]] = salida
+        if al_terminar is not None:
+            al_terminar(salida)
+
+    if trabajadores <= 1 or len(pares) <= 1:
+        for hoja_referencia, hoja_actualizado in pares:
+            recibir(comparar_hoja(referencia, nombre_referencia, hoja_referencia, actualizado, nombre_actualizado, hoja_actualizado, **opciones))
+    else:
+        contexto, heredar = contexto_de_procesos()
+        llamada = next(_llamadas)
+        if heredar:
+            _LIBROS[llamada] = (referencia, nombre_referencia, actualizado, nombre_actualizado)
+        try:
+            with ProcessPoolExecutor(min(trabajadores, len(pares)), mp_context=contexto) as executor:
+                if heredar:
+                    en_curso = {executor.submit(_comparar_hoja_heredada, llamada, *par, opciones) for par in pares}
+                else:
+                    # Sin "fork" cada hoja recibe el contenido de ambos libros serializado
+                    en_curso = {
+                        executor.submit(comparar_hoja, referencia, nombre_referencia, hoja_referencia, actualizado, nombre_actualizado, hoja_actualizado, **opciones)
+                        for hoja_referencia, hoja_actualizado in pares
+                    }
+                try:
+                    while en_curso:
+                        terminados, en_curso = wait(en_curso, return_when=FIRST_COMPLETED)
+                        for futuro in terminados:
+                            recibir(futuro.result())
+                except BaseException:
+                    for futuro in en_curso:
+                        futuro.cancel()
+                    raise
+        finally:
+            _LIBROS.pop(llamada, None)
+    return [salidas[hoja_referencia] for hoja_referencia, _ in pares]
+
+
+def resumen_por_hoja(resultados):
+    """
+    Resumen de un libro comparado: filas y cantidad de claves por Estado de cada hoja.
+
+    Parámetros:
+        resultados: Diccionario hoja -> contenedor del resultado.
+
+    Retorna:
+        DataFrame con una fila por hoja y las columnas "Hoja", "Filas" y una por Estado.
+    """
+    filas = []
+    for hoja, resultado in resultados.items():
+        conteo = conteo_estados(resultado)
+        filas.append({"Hoja": hoja, "Filas": len(resultado["plantilla"]), **{estado: int(conteo.get(estado, 0)) for estado in ESTADOS}})
+    return pd.DataFrame(filas, columns=["Hoja", "Filas", *ESTADOS])
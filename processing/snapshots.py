@@ -0,0 +1,254 @@
+# processing/snapshots.py
+"""
+Comparación de varias versiones de una misma lista (p. ej. doce listas de precios semanales) en una
+sola pasada: cada archivo se lee una vez, las claves de todas las versiones se indexan juntas y cada
+versión se compara con la anterior sobre ese índice común.
+
+El resultado es la línea de tiempo de cada clave (primera versión, último cambio, versión en que se
+eliminó) y la lista de eventos por versión ("Nuevo", "Actualizado" por columna, "Eliminado"), a partir
+de la cual se reconstruyen los valores de una clave en cada versión (ver valores_por_version).
+
+Uso sin interfaz:
+    python -m processing.snapshots semana01.xlsx semana02.xlsx semana03.xlsx --nombre "Lista de precios"
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from performance.profiler import ETAPA_COMPARACION, ETAPA_INDICE, ETAPA_RESULTADO, etapa
+from processing.diff_engine import mascara_cambios
+from processing.result import concatenar_series
+
+EVENTO_NUEVO = "Nuevo"
+EVENTO_ACTUALIZADO = "Actualizado"
+EVENTO_ELIMINADO = "Eliminado"
+EVENTOS = [EVENTO_NUEVO, EVENTO_ACTUALIZADO, EVENTO_ELIMINADO]
+COLUMNAS_EVENTOS = ["clave", "version", "evento", "columna", "valor_anterior", "valor_nuevo"]
+COLUMNAS_LINEA_TIEMPO = ["clave", "primera_version", "ultimo_cambio", "eliminada_en", "versiones_presente", "cambios"]
+
+
+def _columnas_de_versiones(tablas):
+    # Columnas de todas las versiones, en orden de aparición; la clave es la primera de la primera versión
+    return list(dict.fromkeys(columna for tabla in tablas for columna in tabla.columns))
+
+
+def _eventos(codigos, version, evento, columna, anteriores, nuevos):
+    return {
+        "clave": codigos,
+        "version": np.full(len(codigos), version, dtype=np.int64),
+        "evento": np.full(len(codigos), evento, dtype=object),
+        "columna": np.full(len(codigos), columna, dtype=object),
+        "valor_anterior": anteriores,
+        "valor_nuevo": nuevos,
+    }
+
+
+def comparar_versiones(tablas, nombres=None):
+    """
+    Compara N versiones ordenadas de una tabla en una sola pasada, usando la primera columna como clave.
+
+    Parámetros:
+        tablas: Lista de DataFrames, de la versión más antigua a la más reciente.
+        nombres: Nombres de las versiones (por defecto "1", "2", ...).
+
+    Retorna:
+        Diccionario con:
+            "versiones": nombres de las versiones.
+            "clave": nombre de la columna clave; "columnas": columnas comparadas (sin la clave).
+            "linea_tiempo": DataFrame con una fila por clave: primera versión en que aparece, última
+                versión con un cambio, versión en que se eliminó (si no está en la última), cantidad
+                de versiones en que está presente y de versiones con cambios. Son cambios los de
+                valores, la eliminación y la reaparición de la clave (no su primera aparición). Las
+                versiones son posiciones (0 = la más antigua).
+            "eventos": DataFrame (clave, version, evento, columna, valor_anterior, valor_nuevo). Los
+                registros nuevos (o que reaparecen) tienen un evento por columna con su valor; los
+                eliminados, un evento sin columna; los cambios, uno por celda modificada.
+            "resumen": DataFrame con la cantidad de claves nuevas, actualizadas y eliminadas por versión.
+    """
+    tablas = list(tablas)
+    if len(tablas) < 2:
+        raise ValueError("Se necesitan al menos dos versiones para comparar.")
+    nombres = [str(nombre) for nombre in (nombres or range(1, len(tablas) + 1))]
+    clave_identificacion = tablas[0].columns[0]
+    columnas = [columna for columna in _columnas_de_versiones(tablas) if columna != clave_identificacion]
+    faltantes = [numero for numero, tabla in enumerate(tablas) if clave_identificacion not in tabla.columns]
+    if faltantes:
+        raise KeyError(f"La versión {nombres[faltantes[0]]} no tiene la columna clave '{clave_identificacion}'.")
+
+    with etapa(ETAPA_INDICE, filas=sum(len(tabla) for tabla in tablas), detalle=f"{len(tablas)} versiones"):
+        # Un solo índice de claves para todas las versiones: cada clave recibe un código
+        codigos_todos, claves = pd.factorize(concatenar_series([tabla[clave_identificacion] for tabla in tablas]))
+        limites = np.cumsum([0] + [len(tabla) for tabla in tablas])
+        # posiciones[clave, version]: fila de la clave en cada versión (-1 si no está)
+        posiciones = np.full((len(claves), len(tablas)), -1, dtype=np.int64)
+        for version, tabla in enumerate(tablas):
+            codigos = codigos_todos[limites[version]:limites[version + 1]]
+            validos = np.flatnonzero(codigos >= 0)
+            if len(np.unique(codigos[validos])) != len(validos):
+                raise ValueError(f"La columna clave '{clave_identificacion}' de la versión {nombres[version]} tiene valores repetidos.")
+            posiciones[codigos[validos], version] = validos
+        presentes = posiciones >= 0
+
+    partes = []
+    conteo = {evento: np.zeros(len(tablas), dtype=np.int64) for evento in EVENTOS}
+    ultimo_cambio = np.full(len(claves), -1, dtype=np.int64)
+    cambios = np.zeros(len(claves), dtype=np.int64)
+    with etapa(ETAPA_COMPARACION, filas=sum(len(tabla) for tabla in tablas)):
+        for version, tabla in enumerate(tablas):
+            anterior_presente = presentes[:, version - 1] if version else np.zeros(len(claves), dtype=bool)
+            # Registros nuevos o que reaparecen: un evento por columna con su valor
+            nuevas = np.flatnonzero(presentes[:, version] & ~anterior_presente)
+            conteo[EVENTO_NUEVO][version] = len(nuevas)
+            filas = posiciones[nuevas, version]
+            for columna in columnas:
+                if columna in tabla.columns:
+                    valores = tabla[columna].iloc[filas].to_numpy(dtype=object)
+                else:
+                    valores = np.full(len(filas), None, dtype=object)
+                partes.append(_eventos(nuevas, version, EVENTO_NUEVO, columna, np.full(len(filas), None, dtype=object), valores))
+            if not version:
+                continue
+
+            # Registros eliminados: estaban en la versión anterior y no en esta
+            eliminadas = np.flatnonzero(anterior_presente & ~presentes[:, version])
+            # Registros que reaparecen: nuevos en esta versión pero presentes en alguna anterior
+            reaparecidas = nuevas[presentes[nuevas, :version].any(axis=1)]
+            conteo[EVENTO_ELIMINADO][version] = len(eliminadas)
+            partes.append(_eventos(eliminadas, version, EVENTO_ELIMINADO, None, np.full(len(eliminadas), None, dtype=object), np.full(len(eliminadas), None, dtype=object)))
+
+            # Cambios de valores entre versiones consecutivas, columna por columna
+            en_ambas = np.flatnonzero(anterior_presente & presentes[:, version])
+            anterior_tabla = tablas[version - 1]
+            modificadas_version = np.zeros(len(claves), dtype=bool)
+            for columna in columnas:
+                if columna not in tabla.columns or columna not in anterior_tabla.columns:
+                    continue
+                anterior = anterior_tabla[columna].iloc[posiciones[en_ambas, version - 1]]
+                nuevo = tabla[columna].iloc[posiciones[en_ambas, version]]
+                modificadas = np.flatnonzero(mascara_cambios(anterior, nuevo))
+                if not len(modificadas):
+                    continue
+                modificadas_version[en_ambas[modificadas]] = True
+                partes.append(_eventos(
+                    en_ambas[modificadas], version, EVENTO_ACTUALIZADO, columna,
+                    anterior.iloc[modificadas].to_numpy(dtype=object), nuevo.iloc[modificadas].to_numpy(dtype=object)
+                ))
+            conteo[EVENTO_ACTUALIZADO][version] = modificadas_version.sum()
+            # Para la línea de tiempo también cambian las claves eliminadas y las que reaparecen
+            cambiadas_version = modificadas_version.copy()
+            cambiadas_version[eliminadas] = True
+            cambiadas_version[reaparecidas] = True
+            ultimo_cambio[cambiadas_version] = version
+            cambios += cambiadas_version
+
+    with etapa(ETAPA_RESULTADO, filas=len(claves)):
+        eventos = pd.DataFrame({
+            campo: np.concatenate([parte[campo] for parte in partes]) if partes else np.empty(0, dtype=object)
+            for campo in COLUMNAS_EVENTOS
+        })
+        # Orden: versión, clave (en orden de aparición) y columna
+        orden_columna = {columna: numero for numero, columna in enumerate(columnas)}
+        eventos["_orden"] = eventos["columna"].map(orden_columna).fillna(-1)
+        eventos = eventos.sort_values(["version", "clave", "_orden"], kind="stable").drop(columns="_orden").reset_index(drop=True)
+        eventos["clave"] = pd.Series(claves).take(eventos["clave"].to_numpy()).to_numpy()
+
+        ultima_presente = len(tablas) - 1 - np.argmax(presentes[:, ::-1], axis=1)
+        linea_tiempo = pd.DataFrame({
+            "clave": claves,
+            "primera_version": np.argmax(presentes, axis=1),
+            "ultimo_cambio": pd.Series(ultimo_cambio).where(ultimo_cambio >= 0).astype("Int64"),
+            "eliminada_en": pd.Series(ultima_presente + 1).where(ultima_presente < len(tablas) - 1).astype("Int64"),
+            "versiones_presente": presentes.sum(axis=1),
+            "cambios": cambios,
+        })
+        resumen = pd.DataFrame({"Versión": nombres, "Claves": presentes.sum(axis=0), **conteo})
+
+    return {
+        "versiones": nombres,
+        "clave": clave_identificacion,
+        "columnas": columnas,
+        "linea_tiempo": linea_tiempo,
+        "eventos": eventos,
+        "resumen": resumen,
+    }
+
+
+def valores_por_version(eventos, versiones, columnas):
+    """
+    Reconstruye los valores de una clave en cada versión a partir de sus eventos.
+
+    Parámetros:
+        eventos: Eventos de una sola clave (columnas "version", "evento", "columna", "valor_nuevo").
+        versiones: Nombres de todas las versiones.
+        columnas: Columnas comparadas.
+
+    Retorna:
+        DataFrame con una fila por versión ("Versión", "Presente", una columna por columna comparada);
+        las versiones en que la clave no está quedan sin valores.
+    """
+    filas = []
+    actuales = None
+    eventos = eventos.sort_values("version", kind="stable")
+    por_version = {version: grupo for version, grupo in eventos.groupby("version", sort=True)}
+    for version, nombre in enumerate(versiones):
+        grupo = por_version.get(version)
+        if grupo is not None:
+            for evento, columna, valor in zip(grupo["evento"], grupo["columna"], grupo["valor_nuevo"]):
+                if evento == EVENTO_ELIMINADO:
+                    actuales = None
+                    continue
+                if actuales is None:
+                    actuales = dict.fromkeys(columnas)
+                actuales[columna] = valor
+        filas.append({"Versión": nombre, "Presente": actuales is not None, **(actuales or dict.fromkeys(columnas))})
+    return pd.DataFrame(filas, columns=["Versión", "Presente", *columnas])
+
+
+def con_nombres_de_version(linea_tiempo, versiones):
+    """
+    Reemplaza las posiciones de versión de la línea de tiempo por los nombres de las versiones.
+    """
+    nombres = pd.Series(versiones, dtype=object)
+    linea_tiempo = linea_tiempo.copy()
+    for columna in ("primera_version", "ultimo_cambio", "eliminada_en"):
+        posiciones = linea_tiempo[columna]
+        linea_tiempo[columna] = posiciones.map(lambda posicion: None if pd.isna(posicion) else nombres[int(posicion)])
+    return linea_tiempo
+
+
+def main():
+    from db.crud import insertar_mediciones, insertar_serie_versiones
+    from db.db import RUTA_BASE_DATOS, configurar_base_datos, init_db
+    from performance.profiler import ETAPA_COMPARAR, ETAPA_GUARDADO, ETAPA_LECTURA, crear_registro
+    from processing.ingest import leer_tabla
+
+    parser = argparse.ArgumentParser(description="Compara varias versiones ordenadas de una lista en una sola pasada.")
+    parser.add_argument("archivos", nargs="+", help="Archivos de las versiones, de la más antigua a la más reciente.")
+    parser.add_argument("--nombre", help="Nombre de la serie de versiones en el historial.")
+    parser.add_argument("--base-datos", default=RUTA_BASE_DATOS, help="Base de datos de comparaciones.")
+    args = parser.parse_args()
+
+    configurar_base_datos(args.base_datos)
+    init_db()
+    registro = crear_registro(persistir=insertar_mediciones)
+    tablas = []
+    for ruta in args.archivos:
+        with etapa(ETAPA_LECTURA, detalle="versión", registro=registro) as medicion:
+            tablas.append(leer_tabla(ruta))
+            medicion["filas"] = len(tablas[-1])
+    nombres = [os.path.basename(ruta) for ruta in args.archivos]
+    with etapa(ETAPA_COMPARAR, filas=sum(len(tabla) for tabla in tablas), detalle=f"{len(tablas)} versiones", registro=registro):
+        resultado = comparar_versiones(tablas, nombres)
+    with etapa(ETAPA_GUARDADO, filas=len(resultado["eventos"]), detalle="versiones", registro=registro):
+        serie_id = insertar_serie_versiones(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), args.nombre or nombres[-1], resultado)
+
+    print(resultado["resumen"].to_string(index=False))
+    print(f"\nSerie guardada con ID {serie_id}: {len(resultado['linea_tiempo'])} claves, {len(resultado['eventos'])} eventos.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# processing/streaming.py
+
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from processing.diff_engine import comparar_columnar
+
+FILAS_POR_BLOQUE = 50_000
+PARTICIONES = 16
+# Filas máximas de cada archivo en una partición; las particiones más grandes se vuelven a repartir
+FILAS_POR_PARTICION = 50_000
+# Veces que se puede volver a repartir una misma partición
+REPARTOS_MAXIMOS = 4
+
+
+def _convertir_celda(valor):
+    # Misma conversión que aplica pandas al leer con openpyxl: celdas vacías como "" y enteros sin decimales
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def leer_excel_por_bloques(origen, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Lee la primera hoja de un archivo xlsx en bloques de filas con openpyxl en modo de solo lectura.
+
+    Parámetros:
+        origen: Ruta o archivo subido.
+        filas_por_bloque: Cantidad máxima de filas por bloque.
+
+    Retorna:
+        Generador de DataFrames con las mismas columnas que produciría pd.read_excel.
+    """
+    libro = openpyxl.load_workbook(origen, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = list(next(filas, ()))
+        while encabezado and encabezado[-1] is None:
+            encabezado.pop()
+        if not encabezado:
+            return
+        columnas = TextParser([[_convertir_celda(valor) for valor in encabezado]], header=0).read().columns
+        ancho = len(columnas)
+
+        bloque = []
+        vacias_pendientes = 0
+        for fila in filas:
+            valores = [_convertir_celda(valor) for valor in fila[:ancho]]
+            valores += [""] * (ancho - len(valores))
+            # Las filas vacías solo se conservan si les sigue una fila con datos, como en pd.read_excel
+            if all(valor == "" for valor in valores):
+                vacias_pendientes += 1
+                continue
+            bloque.extend([[""] * ancho] * vacias_pendientes)
+            vacias_pendientes = 0
+            bloque.append(valores)
+            if len(bloque) >= filas_por_bloque:
+                yield TextParser(bloque, names=columnas, header=None).read()
+                bloque = []
+        if bloque:
+            yield TextParser(bloque, names=columnas, header=None).read()
+    finally:
+        libro.close()
+
+
+def _nombre(origen):
+    return getattr(origen, "name", None) or os.path.basename(str(origen))
+
+
+def particion_de_claves(claves, particiones, nivel=0):
+    """
+    Asigna cada clave a una partición según su hash. Las claves numéricas se normalizan
+    (1 y 1.0 caen en la misma partición) para que ambos archivos coincidan aunque difieran en tipo.
+    Cada `nivel` vuelve a mezclar el hash con otro valor, para volver a repartir las claves de una
+    partición (hash_array no usa hash_key con números, así que no basta con cambiarla).
+    """
+    numericas = pd.to_numeric(pd.Series(claves), errors="coerce")
+    hash_numerico = pd.util.hash_array(numericas.to_numpy(dtype=float, na_value=np.nan))
+    hash_texto = pd.util.hash_pandas_object(pd.Series(claves).astype(str), index=False).to_numpy()
+    hashes = np.where(numericas.notna().to_numpy(), hash_numerico, hash_texto)
+    if nivel:
+        hashes = pd.util.hash_array(hashes + np.uint64(nivel))
+    return (hashes % np.uint64(particiones)).astype(np.intp)
+
+
+def _numerar(bloques):
+    """
+    Acompaña cada bloque leído con la posición de sus filas en el archivo.
+    """
+    inicio = 0
+    for bloque in bloques:
+        yield np.arange(inicio, inicio + len(bloque)), bloque
+        inicio += len(bloque)
+
+
+def _tipo_comun(tipos, con_nulos):
+    """
+    Tipo que toma una columna al leer el archivo completo (como pd.read_excel) a partir del que tomó
+    en cada bloque con valores (ver _volcar_particiones). Los bloques en los que la columna está vacía
+    no cuentan, y si tiene celdas vacías los enteros pasan a decimales y los booleanos a objetos.
+    """
+    if not tipos:
+        return np.dtype(np.float64)
+    tipo = pd.concat([pd.Series([], dtype=tipo) for tipo in tipos]).dtype
+    if con_nulos and tipo.kind in "iu":
+        return np.dtype(np.float64)
+    if con_nulos and tipo.kind == "b":
+        return np.dtype(object)
+    return tipo
+
+
+def _volcar_particiones(bloques, clave, particiones, directorio, prefijo, nivel=0):
+    """
+    Escribe cada bloque (posiciones, filas) repartido por partición en archivos temporales.
+
+    Cada bloque se lee con los tipos que deduce pandas de sus propias filas (p. ej. enteros en un
+    bloque sin celdas vacías y decimales en otro), de modo que también se registra el tipo común de
+    cada columna en todo el archivo, para leer las particiones con él (ver _leer_particion).
+
+    Retorna:
+        Tupla (tipos, rutas, filas): tipo común de cada columna (None si no hubo bloques), las rutas
+        de las particiones y la cantidad de filas de cada una.
+    """
+    rutas = [os.path.join(directorio, f"{prefijo}_{particion}.pkl") for particion in range(particiones)]
+    filas = [0] * particiones
+    archivos = [open(ruta, "wb") for ruta in rutas]
+    columnas = None
+    tipos, con_nulos = {}, set()
+    try:
+        for posiciones, bloque in bloques:
+            columnas = list(bloque.columns) if columnas is None else columnas
+            for columna, serie in bloque.items():
+                nulos = serie.isna()
+                if not nulos.all():
+                    tipos.setdefault(columna, []).append(serie.dtype)
+                if nulos.any():
+                    con_nulos.add(columna)
+            destino = particion_de_claves(bloque[clave] if clave is not None else bloque.iloc[:, 0], particiones, nivel)
+            for particion in np.unique(destino):
+                seleccion = destino == particion
+                pickle.dump((posiciones[seleccion], bloque[seleccion].reset_index(drop=True)), archivos[particion])
+                filas[particion] += int(seleccion.sum())
+    finally:
+        for archivo in archivos:
+            archivo.close()
+    if columnas is None:
+        return None, rutas, filas
+    return {columna: _tipo_comun(tipos.get(columna, []), columna in con_nulos) for columna in columnas}, rutas, filas
+
+
+def _bloques_de_particion(ruta):
+    with open(ruta, "rb") as archivo:
+        while True:
+            try:
+                yield pickle.load(archivo)
+            except EOFError:
+                return
+
+
+def _leer_particion(ruta, tipos):
+    posiciones, partes = [], []
+    for posiciones_bloque, bloque in _bloques_de_particion(ruta):
+        posiciones.append(posiciones_bloque)
+        partes.append(bloque)
+    if not partes:
+        return np.empty(0, dtype=np.intp), pd.DataFrame(columns=list(tipos)).astype(tipos)
+    return np.concatenate(posiciones), pd.concat(partes, ignore_index=True).astype(tipos)
+
+
+def _sin_extension(ruta):
+    return os.path.splitext(os.path.basename(ruta))[0]
+
+
+def _comparar_particion(plantilla, actualizada, tipos_plantilla, tipos_actualizada, filas_por_particion, nivel=0):
+    """
+    Compara una partición, dada como (ruta, filas) de cada archivo, y borra sus archivos temporales.
+    Las filas se leen con el tipo común de cada columna en su archivo (ver _volcar_particiones).
+
+    Si alguno de los dos lados supera filas_por_particion, la partición se vuelve a repartir con la
+    función hash del nivel siguiente, en el doble de partes de las necesarias (para que el azar del
+    hash rara vez deje una parte excedida), y se compara cada parte: así la memoria de cada
+    comparación no depende del tamaño de los archivos. Una partición que sigue excedida tras
+    REPARTOS_MAXIMOS repartos (p. ej. muchas filas con la misma clave) se compara completa.
+    """
+    (ruta_plantilla, filas_plantilla), (ruta_actualizada, filas_actualizada) = plantilla, actualizada
+    filas = max(filas_plantilla, filas_actualizada)
+    if filas > filas_por_particion and nivel < REPARTOS_MAXIMOS:
+        partes = -(-2 * filas // filas_por_particion)
+        carpeta = os.path.dirname(ruta_plantilla)
+        _, rutas_plantilla, filas_partes_plantilla = _volcar_particiones(
+            _bloques_de_particion(ruta_plantilla), None, partes, carpeta, _sin_extension(ruta_plantilla), nivel + 1
+        )
+        _, rutas_actualizada, filas_partes_actualizada = _volcar_particiones(
+            _bloques_de_particion(ruta_actualizada), next(iter(tipos_plantilla)), partes, carpeta, _sin_extension(ruta_actualizada), nivel + 1
+        )
+        os.remove(ruta_plantilla)
+        os.remove(ruta_actualizada)
+        for parte in zip(zip(rutas_plantilla, filas_partes_plantilla), zip(rutas_actualizada, filas_partes_actualizada)):
+            yield from _comparar_particion(*parte, tipos_plantilla, tipos_actualizada, filas_por_particion, nivel + 1)
+        return
+
+    posiciones_plantilla, plantilla_df = _leer_particion(ruta_plantilla, tipos_plantilla)
+    posiciones_actualizada, actualizada_df = _leer_particion(ruta_actualizada, tipos_actualizada)
+    os.remove(ruta_plantilla)
+    os.remove(ruta_actualizada)
+
+    parcial = comparar_columnar(plantilla_df, actualizada_df)
+    parcial["posiciones_plantilla"] = posiciones_plantilla
+    parcial["posiciones_actualizada"] = posiciones_actualizada
+    parcial["columnas_plantilla"] = list(tipos_plantilla)
+    yield parcial
+
+
+def comparar_por_particiones(origen_plantilla, origen_actualizada, particiones=PARTICIONES, filas_por_bloque=FILAS_POR_BLOQUE, directorio=None, filas_por_particion=FILAS_POR_PARTICION):
+    """
+    Compara dos archivos xlsx sin cargarlos completos en memoria.
+
+    Ambos archivos se leen por bloques y se reparten por hash de la clave (primera columna de la
+    plantilla) en archivos temporales; luego se compara una partición a la vez. Las particiones con
+    más de filas_por_particion filas de algún archivo se vuelven a repartir antes de compararlas.
+
+    Parámetros:
+        origen_plantilla, origen_actualizada: Rutas o archivos subidos.
+        particiones: Cantidad inicial de particiones en disco.
+        filas_por_bloque: Filas leídas por bloque.
+        directorio: Carpeta para los archivos temporales (por defecto la del sistema).
+        filas_por_particion: Filas máximas de cada archivo en una partición comparada.
+
+    Retorna:
+        Generador de resultados parciales de comparar_columnar, con "posiciones_plantilla" y
+        "posiciones_actualizada" globales, listos para combinar_resultados_parciales o para guardarse
+        de a uno (ver comparar_archivos_por_bloques).
+    """
+    with tempfile.TemporaryDirectory(prefix="diffly_", dir=directorio) as carpeta:
+        tipos_plantilla, rutas_plantilla, filas_plantilla = _volcar_particiones(
+            _numerar(leer_excel_por_bloques(origen_plantilla, filas_por_bloque)), None, particiones, carpeta, "plantilla"
+        )
+        if tipos_plantilla is None:
+            raise ValueError("El archivo de referencia no contiene datos.")
+        tipos_actualizada, rutas_actualizada, filas_actualizada = _volcar_particiones(
+            _numerar(leer_excel_por_bloques(origen_actualizada, filas_por_bloque)), next(iter(tipos_plantilla)), particiones, carpeta, "actualizada"
+        )
+        # Un archivo actualizado sin filas se compara como una tabla vacía con las columnas de la referencia
+        tipos_actualizada = tipos_actualizada or dict.fromkeys(tipos_plantilla, np.dtype(object))
+
+        for particion in zip(zip(rutas_plantilla, filas_plantilla), zip(rutas_actualizada, filas_actualizada)):
+            yield from _comparar_particion(*particion, tipos_plantilla, tipos_actualizada, filas_por_particion)
+
+
+def comparar_archivos_por_bloques(origen_plantilla, origen_actualizada, fecha, progreso=None, **opciones):
+    """
+    Versión de comparar_listas_dinamico para archivos xlsx que no caben en memoria: compara una
+    partición a la vez y guarda sus filas en el historial antes de pasar a la siguiente (ver
+    db.crud.insertar_comparacion_por_particiones), de modo que la memoria no crece con los archivos.
+    Acepta las mismas opciones que comparar_por_particiones.
+
+    Parámetros:
+        origen_plantilla, origen_actualizada: Archivos subidos (o rutas) con el nombre a guardar.
+        fecha: Fecha de la comparación.
+        progreso: Función opcional que recibe las filas del resultado guardadas.
+
+    Retorna:
+        Id de la comparación guardada; el resultado se lee desde el historial.
+    """
+    from db.crud import insertar_comparacion_por_particiones
+
+    return insertar_comparacion_por_particiones(
+        fecha, _nombre(origen_plantilla), _nombre(origen_actualizada),
+        comparar_por_particiones(origen_plantilla, origen_actualizada, **opciones), progreso,
+    )
@@ -0,0 +1,423 @@
+# service/diff_service.py
+"""
+Servicio HTTP local de comparación, para usar el motor y el historial desde otras herramientas sin
+pasar por la interfaz de Streamlit. Usa la misma base de datos SQLite (db/db.py) y el mismo grupo
+acotado de trabajos en segundo plano (processing/jobs.py).
+
+Uso:
+    python -m service.diff_service --puerto 8600
+
+Rutas:
+    POST   /comparaciones                   Archivos "referencia" y "actualizado" (multipart) y, opcionales, las
+                                            mismas opciones que el lote (processing/batch.py): "motor",
+                                            "columnas_clave" (repetido), "clave_difusa", "umbral_clave",
+                                            "tolerancia" (repetido, COLUMNA=VALOR) y "sin_recortar".
+                                            Responde 202 con el id del trabajo (503 si la cola está llena).
+    GET    /trabajos/{id}                   Estado y avance del trabajo; al terminar, el id de la comparación.
+    DELETE /trabajos/{id}                   Cancela el trabajo.
+    GET    /comparaciones                   Historial por páginas (limite, nombre_archivo, fecha_desde, fecha_hasta,
+                                            despues_fecha y despues_id para la página siguiente).
+    GET    /comparaciones/{id}/resultado    Resultado por trozos: formato=jsonl (cambios), csv, xlsx o parquet.
+    GET    /comparaciones/{id}/analitica    Cambios por Estado y por columna, variación de las columnas numéricas
+                                            y claves destacadas (agregados de tamaño fijo).
+    DELETE /comparaciones/{id}              Elimina la comparación del historial.
+    GET    /claves/{clave}/cambios          Cambios de una clave en todo el historial.
+    GET    /metricas                        Cola de trabajos, latencias (p50/p95/p99) y rendimiento.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import uvicorn
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from db.db import RUTA_BASE_DATOS, configurar_base_datos, init_db
+from db.crud import (
+    eliminar_comparacion, guardar_analitica, insertar_comparacion, insertar_mediciones, obtener_analitica,
+    obtener_cambios_clave, obtener_comparacion, obtener_pagina_comparaciones, obtener_tabla_resultado,
+)
+from performance.profiler import ETAPA_COMPARAR, ETAPA_GUARDADO, ETAPA_LECTURA, ETAPA_RECONSTRUCCION, crear_registro, etapa
+from processing.analytics import analitica_de_resultado
+from processing.diff_engine import MOTOR_VECTORIZADO, MOTORES, comparar_listas_dinamico
+from processing.export import (
+    FORMATO_JSONL, FORMATOS_EXPORTACION, TIPO_JSONL, archivo_exportado, bloques_de_resultado,
+    trozos_csv, trozos_de_archivo, trozos_jsonl_cambios,
+)
+from processing.ingest import detectar_formato, leer_tabla
+from processing.jobs import (
+    ESTADO_TERMINADO, TRABAJADORES, TRABAJOS_EN_ESPERA_MAXIMOS, avanzar, avance_de_trabajo,
+    cancelar_trabajo, enviar_trabajo, iniciar_fase, obtener_trabajo, trabajos_por_estado,
+)
+from processing.key_matching import UMBRAL_CONFIANZA, preparar_claves
+from processing.result import resultado_desde_tabla
+from processing.schema import alinear_esquemas, esquema_como_datos
+
+PUERTO = 8600
+# Tamaño de los trozos en que se copian a disco los archivos subidos
+BYTES_POR_COPIA = 1024 * 1024
+# Muestras que se conservan para las métricas y ventana (s) del rendimiento reciente
+MUESTRAS_METRICAS = 2_000
+VENTANA_METRICAS_S = 300
+# Comparaciones por página del historial: por defecto y máximo
+LIMITE_PAGINA = 20
+LIMITE_PAGINA_MAXIMO = 500
+
+FORMATOS_RESULTADO = {FORMATO_JSONL: TIPO_JSONL, **FORMATOS_EXPORTACION}
+# Valores de los campos de sí/no del formulario que los activan
+VALORES_SI = ("1", "true", "si", "sí")
+
+_estado = {
+    "carpeta_cargas": None,
+    "registro": None,
+    "inicio": time.time(),
+    # (fin, espera_s, duracion_s, filas, estado) de cada comparación terminada
+    "comparaciones": deque(maxlen=MUESTRAS_METRICAS),
+    # (ruta, duracion_s) de cada solicitud HTTP
+    "solicitudes": deque(maxlen=MUESTRAS_METRICAS),
+}
+
+
+def _error(estado_http, mensaje):
+    return JSONResponse({"error": mensaje}, status_code=estado_http)
+
+
+def _percentiles(valores):
+    if not valores:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4), "p99": round(float(p99), 4)}
+
+
+def _datos_trabajo(trabajo):
+    fraccion, restante = avance_de_trabajo(trabajo)
+    datos = {
+        "id": trabajo["id"],
+        "descripcion": trabajo["descripcion"],
+        "estado": trabajo["estado"],
+        "fase": trabajo["fase"],
+        "unidad": trabajo["unidad"],
+        "filas_procesadas": trabajo["filas_procesadas"],
+        "filas_totales": trabajo["filas_totales"],
+        "avance": fraccion,
+        "segundos_restantes": restante,
+        "error": trabajo["error"],
+    }
+    if trabajo["estado"] == ESTADO_TERMINADO:
+        datos["comparacion_id"] = trabajo["resultado"]
+        datos["resultado"] = f"/comparaciones/{trabajo['resultado']}/resultado"
+    return datos
+
+
+def _opciones_de_formulario(formulario):
+    """
+    Lee las opciones de comparación del formulario, con los mismos nombres y valores que las del
+    lote (ver processing.batch.comparar_par). Lanza ValueError si alguna no es válida.
+    """
+    opciones = {
+        "motor": formulario.get("motor") or MOTOR_VECTORIZADO,
+        "columnas_clave": [columna for columna in formulario.getlist("columnas_clave") if columna] or None,
+        "clave_difusa": str(formulario.get("clave_difusa", "")).strip().lower() in VALORES_SI,
+        "umbral_clave": UMBRAL_CONFIANZA,
+        "tolerancias": {},
+        "recortar_textos": str(formulario.get("sin_recortar", "")).strip().lower() not in VALORES_SI,
+    }
+    if opciones["motor"] not in MOTORES:
+        raise ValueError(f"Motor desconocido: {opciones['motor']}")
+    if formulario.get("umbral_clave"):
+        try:
+            opciones["umbral_clave"] = float(formulario.get("umbral_clave"))
+        except ValueError:
+            opciones["umbral_clave"] = None
+        if opciones["umbral_clave"] is None or not 0 <= opciones["umbral_clave"] <= 1:
+            raise ValueError("umbral_clave debe ser un número entre 0 y 1.")
+    for tolerancia in formulario.getlist("tolerancia"):
+        columna, separador, valor = tolerancia.rpartition("=")
+        try:
+            opciones["tolerancias"][columna] = float(valor)
+        except ValueError:
+            separador = ""
+        if not separador or not columna:
+            raise ValueError(f"tolerancia espera COLUMNA=VALOR: {tolerancia}")
+    opciones["tolerancias"] = opciones["tolerancias"] or None
+    return opciones
+
+
+# Comparación de dos archivos subidos; se ejecuta en un hilo del grupo de processing/jobs.py
+def _comparar_archivos(trabajo, ruta_referencia, nombre_referencia, ruta_actualizado, nombre_actualizado, motor=MOTOR_VECTORIZADO,
+                       columnas_clave=None, clave_difusa=False, umbral_clave=UMBRAL_CONFIANZA, tolerancias=None, recortar_textos=True):
+    registro = trabajo["registro"]
+    with etapa(ETAPA_LECTURA, detalle="servicio", registro=registro) as medicion:
+        plantilla_df = leer_tabla(ruta_referencia, nombre_referencia)
+        actualizada_df = leer_tabla(ruta_actualizado, nombre_actualizado)
+        medicion["filas"] = len(plantilla_df) + len(actualizada_df)
+
+    filas = len(plantilla_df) + len(actualizada_df)
+    iniciar_fase(trabajo, "comparación", filas)
+    with etapa(ETAPA_COMPARAR, filas=filas, detalle=f"servicio, {motor}", registro=registro):
+        esquema = alinear_esquemas(plantilla_df, actualizada_df, tolerancias, recortar_textos)
+        plantilla_df, actualizada_df, emparejamientos = preparar_claves(
+            esquema["plantilla"], esquema["actualizada"], columnas_clave, clave_difusa, umbral_clave
+        )
+        resultado = comparar_listas_dinamico(plantilla_df, actualizada_df, motor=motor, tolerancias=tolerancias)
+        resultado["emparejamientos"] = emparejamientos
+        resultado["esquema"] = esquema_como_datos(esquema)
+        del esquema, plantilla_df, actualizada_df
+        avanzar(trabajo, filas)
+
+        iniciar_fase(trabajo, "guardado", len(resultado["plantilla"]))
+        with etapa(ETAPA_GUARDADO, filas=len(resultado["plantilla"])):
+            comparacion_id = insertar_comparacion(
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"), nombre_referencia, nombre_actualizado, resultado,
+                progreso=lambda filas_guardadas: avanzar(trabajo, filas_guardadas)
+            )
+        avanzar(trabajo, len(resultado["plantilla"]))
+    trabajo["filas_comparadas"] = filas
+    return comparacion_id
+
+
+def _al_terminar(trabajo, rutas):
+    # Se llama al terminar el trabajo (también si se canceló antes de empezar)
+    def terminar(_):
+        for ruta in rutas:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+        fin = trabajo["fin"] or time.time()
+        inicio = trabajo["inicio"] or fin
+        _estado["comparaciones"].append(
+            (fin, inicio - trabajo["enviado"], fin - trabajo["enviado"], trabajo.get("filas_comparadas", 0), trabajo["estado"])
+        )
+    return terminar
+
+
+def _guardar_en_disco(archivo_subido):
+    extension = os.path.splitext(archivo_subido.filename)[1]
+    descriptor, ruta = tempfile.mkstemp(suffix=extension, dir=_estado["carpeta_cargas"])
+    with os.fdopen(descriptor, "wb") as destino:
+        shutil.copyfileobj(archivo_subido.file, destino, BYTES_POR_COPIA)
+    return ruta
+
+
+async def crear_comparacion(request):
+    # Los archivos subidos de más de 1 MiB quedan en disco (python-multipart) y se copian a la carpeta de cargas
+    async with request.form() as formulario:
+        archivos = {campo: formulario.get(campo) for campo in ("referencia", "actualizado")}
+        if any(not hasattr(archivo, "filename") or not archivo.filename for archivo in archivos.values()):
+            return _error(400, "Se requieren los archivos 'referencia' y 'actualizado'.")
+        try:
+            opciones = _opciones_de_formulario(formulario)
+            for archivo in archivos.values():
+                detectar_formato(archivo.filename)
+        except ValueError as e:
+            return _error(400, str(e))
+
+        rutas = []
+        try:
+            for archivo in archivos.values():
+                rutas.append(await run_in_threadpool(_guardar_en_disco, archivo))
+        except OSError as e:
+            for ruta in rutas:
+                os.remove(ruta)
+            return _error(500, f"No se pudo guardar el archivo subido: {e}")
+
+    referencia, actualizado = archivos["referencia"].filename, archivos["actualizado"].filename
+    try:
+        id_trabajo = enviar_trabajo(
+            _comparar_archivos, f"{referencia} → {actualizado}",
+            rutas[0], referencia, rutas[1], actualizado,
+            registro=_estado["registro"], **opciones,
+        )
+    except RuntimeError as e:
+        for ruta in rutas:
+            os.remove(ruta)
+        return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": "5"})
+
+    trabajo = obtener_trabajo(id_trabajo)
+    trabajo["futuro"].add_done_callback(_al_terminar(trabajo, rutas))
+    return JSONResponse(_datos_trabajo(trabajo), status_code=202, headers={"Location": f"/trabajos/{id_trabajo}"})
+
+
+def ver_trabajo(request):
+    trabajo = obtener_trabajo(request.path_params["id"])
+    if trabajo is None:
+        return _error(404, "Trabajo inexistente.")
+    if request.method == "DELETE":
+        cancelar_trabajo(trabajo["id"])
+    return JSONResponse(_datos_trabajo(trabajo))
+
+
+def listar_comparaciones(request):
+    parametros = request.query_params
+    try:
+        limite = int(parametros.get("limite", LIMITE_PAGINA))
+        despues_de = None
+        if parametros.get("despues_fecha") and parametros.get("despues_id"):
+            despues_de = (parametros["despues_fecha"], int(parametros["despues_id"]))
+    except ValueError:
+        return _error(400, "limite y despues_id deben ser números enteros.")
+    comparaciones, siguiente = obtener_pagina_comparaciones(
+        limite=min(max(limite, 1), LIMITE_PAGINA_MAXIMO),
+        despues_de=despues_de,
+        fecha_desde=parametros.get("fecha_desde"),
+        fecha_hasta=parametros.get("fecha_hasta"),
+        nombre_archivo=parametros.get("nombre_archivo"),
+    )
+    return JSONResponse({
+        "comparaciones": comparaciones.astype(object).where(comparaciones.notna(), None).to_dict(orient="records"),
+        "siguiente": {"despues_fecha": siguiente[0], "despues_id": siguiente[1]} if siguiente else None,
+    })
+
+
+def _trozos_resultado(id, formato):
+    with etapa(ETAPA_RECONSTRUCCION, detalle="servicio", registro=_estado["registro"]) as medicion:
+        tabla = obtener_tabla_resultado(id)
+        medicion["filas"] = len(tabla)
+    resultado = resultado_desde_tabla(tabla)
+    if formato == FORMATO_JSONL:
+        return trozos_jsonl_cambios(resultado)
+    if formato == "csv":
+        return trozos_csv(bloques_de_resultado(resultado))
+    # xlsx y Parquet se completan en un archivo temporal (en disco si es grande) antes de enviarse
+    return trozos_de_archivo(archivo_exportado(resultado, formato))
+
+
+def resultado_comparacion(request):
+    id = request.path_params["id"]
+    formato = request.query_params.get("formato", FORMATO_JSONL)
+    if formato not in FORMATOS_RESULTADO:
+        return _error(400, f"Formato no admitido: {formato} (use {', '.join(FORMATOS_RESULTADO)})")
+    if obtener_comparacion(id) is None:
+        return _error(404, "Comparación inexistente.")
+    return StreamingResponse(
+        _trozos_resultado(id, formato),
+        media_type=FORMATOS_RESULTADO[formato],
+        headers={"Content-Disposition": f'attachment; filename="comparacion_{id}.{formato}"'},
+    )
+
+
+def analitica_comparacion(request):
+    id = request.path_params["id"]
+    if obtener_comparacion(id) is None:
+        return _error(404, "Comparación inexistente.")
+    if obtener_analitica(id) is None:
+        # Guardada antes de la analítica: se calcula una vez desde el resultado reconstruido
+        with etapa(ETAPA_RECONSTRUCCION, detalle="servicio", registro=_estado["registro"]) as medicion:
+            tabla = obtener_tabla_resultado(id)
+            medicion["filas"] = len(tabla)
+        guardar_analitica(id, analitica_de_resultado(resultado_desde_tabla(tabla)))
+    return JSONResponse(obtener_analitica(id))
+
+
+def borrar_comparacion(request):
+    id = request.path_params["id"]
+    if obtener_comparacion(id) is None:
+        return _error(404, "Comparación inexistente.")
+    eliminar_comparacion(id)
+    return JSONResponse({"id": id, "eliminada": True})
+
+
+def cambios_de_clave(request):
+    cambios = obtener_cambios_clave(request.path_params["clave"])
+    return JSONResponse(cambios.astype(object).where(cambios.notna(), None).to_dict(orient="records"))
+
+
+def metricas(request):
+    ahora = time.time()
+    comparaciones = list(_estado["comparaciones"])
+    terminadas = [muestra for muestra in comparaciones if muestra[4] == ESTADO_TERMINADO]
+    recientes = [muestra for muestra in terminadas if muestra[0] >= ahora - VENTANA_METRICAS_S]
+    ventana = min(VENTANA_METRICAS_S, ahora - _estado["inicio"]) or 1
+
+    solicitudes = {}
+    for ruta, duracion in list(_estado["solicitudes"]):
+        solicitudes.setdefault(ruta, []).append(duracion)
+
+    return JSONResponse({
+        "cola": {
+            **trabajos_por_estado(),
+            "trabajadores": TRABAJADORES,
+            "en_espera_maximos": TRABAJOS_EN_ESPERA_MAXIMOS,
+        },
+        "comparaciones": {
+            "terminadas": len(terminadas),
+            "con_error_o_canceladas": len(comparaciones) - len(terminadas),
+            "espera_s": _percentiles([muestra[1] for muestra in terminadas]),
+            "latencia_s": _percentiles([muestra[2] for muestra in terminadas]),
+        },
+        "rendimiento": {
+            "ventana_s": round(ventana, 1),
+            "comparaciones_por_min": round(len(recientes) * 60 / ventana, 3),
+            "filas_por_s": round(sum(muestra[3] for muestra in recientes) / ventana, 1),
+        },
+        "solicitudes": {
+            ruta: {"cantidad": len(duraciones), **_percentiles(duraciones)} for ruta, duraciones in solicitudes.items()
+        },
+    })
+
+
+def _medir_solicitudes(app):
+    # Mide cada solicitud HTTP hasta el último trozo de la respuesta, agrupada por método y primer segmento de la ruta
+    async def aplicacion(scope, receive, send):
+        if scope["type"] != "http":
+            return await app(scope, receive, send)
+        ruta = f"{scope['method']} /{scope['path'].strip('/').split('/')[0]}"
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            await send(mensaje)
+            if mensaje["type"] == "http.response.body" and not mensaje.get("more_body", False):
+                _estado["solicitudes"].append((ruta, time.perf_counter() - inicio))
+
+        await app(scope, receive, enviar)
+    return aplicacion
+
+
+def crear_aplicacion(carpeta_cargas=None):
+    """
+    Crea la aplicación ASGI del servicio. La base de datos se configura aparte (configurar_base_datos).
+
+    Parámetros:
+        carpeta_cargas: Carpeta para los archivos subidos mientras esperan su comparación
+            (por defecto, una carpeta temporal nueva).
+    """
+    init_db()
+    _estado["carpeta_cargas"] = carpeta_cargas or tempfile.mkdtemp(prefix="diffly_servicio_")
+    os.makedirs(_estado["carpeta_cargas"], exist_ok=True)
+    _estado["registro"] = crear_registro(persistir=insertar_mediciones)
+    _estado["inicio"] = time.time()
+    aplicacion = Starlette(routes=[
+        Route("/comparaciones", crear_comparacion, methods=["POST"]),
+        Route("/comparaciones", listar_comparaciones, methods=["GET"]),
+        Route("/comparaciones/{id:int}/resultado", resultado_comparacion, methods=["GET"]),
+        Route("/comparaciones/{id:int}/analitica", analitica_comparacion, methods=["GET"]),
+        Route("/comparaciones/{id:int}", borrar_comparacion, methods=["DELETE"]),
+        Route("/trabajos/{id:int}", ver_trabajo, methods=["GET", "DELETE"]),
+        Route("/claves/{clave}/cambios", cambios_de_clave, methods=["GET"]),
+        Route("/metricas", metricas, methods=["GET"]),
+    ])
+    return _medir_solicitudes(aplicacion)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de comparación de archivos.")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección en la que escucha (por defecto, solo local).")
+    parser.add_argument("--puerto", type=int, default=PUERTO, help="Puerto.")
+    parser.add_argument("--base-datos", default=RUTA_BASE_DATOS, help="Base de datos de comparaciones.")
+    parser.add_argument("--carpeta-cargas", help="Carpeta para los archivos subidos.")
+    args = parser.parse_args()
+
+    configurar_base_datos(args.base_datos)
+    uvicorn.run(crear_aplicacion(args.carpeta_cargas), host=args.host, port=args.puerto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# tests/casos.py
+"""
+Pares de tablas aleatorias (con semilla) para contrastar los motores de comparación: claves
+eliminadas, nuevas y repetidas en el archivo actualizado, valores nulos y columnas numéricas y de texto.
+"""
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from processing.result import tabla_cambios, tabla_detallados, tabla_procesada
+
+SEMILLAS = range(300)
+
+
+def caso_aleatorio(semilla):
+    """
+    Retorna (plantilla_df, actualizada_df) generados con la semilla. La clave es la primera columna y
+    ambas tablas tienen los mismos tipos, como al leer dos versiones del mismo archivo.
+    """
+    rng = np.random.default_rng(semilla)
+    filas = int(rng.integers(0, 40))
+    plantilla = pd.DataFrame({
+        "SKU": [f"K{i}" for i in rng.choice(200, filas, replace=False)],
+        "Precio": rng.integers(0, 5, filas).astype(float),
+        "Stock": rng.integers(0, 3, filas),
+        "Nombre": rng.choice(["a", "b", "c"], filas),
+    }).astype({"SKU": "str", "Nombre": "str"})
+    plantilla.loc[rng.random(filas) < 0.1, "Precio"] = np.nan
+
+    # Parte de las claves se conserva (en otro orden), con cambios en algunas celdas
+    actualizada = plantilla.sample(frac=rng.random(), random_state=semilla).reset_index(drop=True)
+    conservadas = len(actualizada)
+    actualizada.loc[rng.random(conservadas) < 0.3, "Precio"] = float(rng.integers(0, 5))
+    actualizada.loc[rng.random(conservadas) < 0.2, "Stock"] = int(rng.integers(0, 3))
+    actualizada.loc[rng.random(conservadas) < 0.2, "Nombre"] = "d"
+    actualizada.loc[rng.random(conservadas) < 0.05, "Precio"] = np.nan
+
+    nuevas = int(rng.integers(0, 5))
+    actualizada = pd.concat([actualizada, pd.DataFrame({
+        "SKU": [f"N{i}" for i in range(nuevas)],
+        "Precio": rng.integers(0, 5, nuevas).astype(float),
+        "Stock": rng.integers(0, 3, nuevas),
+        "Nombre": rng.choice(["a", "z"], nuevas),
+    }).astype(plantilla.dtypes.to_dict())], ignore_index=True)
+    # Algunas claves aparecen dos veces en el archivo actualizado: vale el último cambio
+    if conservadas and rng.random() < 0.2:
+        repetida = actualizada.iloc[[int(rng.integers(0, conservadas))]].assign(Stock=int(rng.integers(0, 3)))
+        actualizada = pd.concat([actualizada, repetida], ignore_index=True)
+    return plantilla, actualizada
+
+
+def assert_resultados_iguales(resultado, esperado):
+    """
+    Compara cambios, cambios_detallados y plantilla_procesada (valores y tipos) de dos contenedores.
+    """
+    assert_frame_equal(tabla_cambios(resultado).reset_index(drop=True), tabla_cambios(esperado).reset_index(drop=True))
+    assert_frame_equal(tabla_detallados(resultado).reset_index(drop=True), tabla_detallados(esperado).reset_index(drop=True))
+    assert_frame_equal(tabla_procesada(resultado), tabla_procesada(esperado))
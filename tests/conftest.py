@@ -0,0 +1,19 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# Los módulos del proyecto se importan desde la raíz del repositorio (no hay paquete instalable)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.db import configurar_base_datos, init_db
+
+
+@pytest.fixture
+def base_datos(tmp_path):
+    # Historial vacío en un archivo propio de cada prueba; al terminar se cierran sus conexiones
+    configurar_base_datos(str(tmp_path / "historial.db"))
+    init_db()
+    yield
+    configurar_base_datos(str(tmp_path / "cerrada.db"))
@@ -0,0 +1,53 @@
+# tests/test_analytics.py
+import pandas as pd
+import pytest
+
+from processing.analytics import LIMITES_VARIACION, analitica_de_resultado, intervalos_variacion
+from processing.diff_engine import MOTORES, comparar_listas_dinamico
+from processing.result import resultado_desde_tabla, tabla_procesada
+
+PLANTILLA = pd.DataFrame({
+    "SKU": ["A", "B", "C", "D", "E"],
+    "Precio": [10.0, 20.0, 0.0, 40.0, 50.0],
+    "Color": ["rojo", "azul", "gris", "verde", "rojo"],
+})
+ACTUALIZADA = pd.DataFrame({
+    "SKU": ["A", "B", "C", "E", "F"],
+    "Precio": [12.0, 15.0, 3.0, 50.0, 1.0],
+    "Color": ["rojo", "negro", "gris", "blanco", "azul"],
+})
+
+
+def _intervalo(porcentaje):
+    return intervalos_variacion()[sum(limite <= porcentaje for limite in LIMITES_VARIACION)]
+
+
+@pytest.mark.parametrize("motor", MOTORES)
+def test_agregados_por_columna_y_clave(motor):
+    analitica = comparar_listas_dinamico(PLANTILLA, ACTUALIZADA, motor=motor)["analitica"]
+
+    assert {estado: cantidad for estado, cantidad in analitica["estados"].items() if cantidad} == {
+        "Actualizado": 4, "Eliminado": 1, "Nuevo": 1,
+    }
+    precio = analitica["columnas"]["Precio"]
+    assert {campo: precio[campo] for campo in ("cambios", "variaciones", "aumentos", "disminuciones")} == {
+        "cambios": 3, "variaciones": 3, "aumentos": 2, "disminuciones": 1,
+    }
+    assert (precio["variacion_minima"], precio["variacion_maxima"]) == (-5.0, 3.0)
+    assert precio["variacion_media"] == pytest.approx(0.0)
+    # La variación relativa solo se mide con un valor anterior distinto de cero: +20 % y -25 %
+    histograma = dict(zip(intervalos_variacion(), precio["histograma"]))
+    assert {intervalo: cantidad for intervalo, cantidad in histograma.items() if cantidad} == {_intervalo(20): 1, _intervalo(-25): 1}
+    assert precio["mayores_variaciones"] == [["B", 20.0, 15.0, -5.0], ["C", 0.0, 3.0, 3.0], ["A", 10.0, 12.0, 2.0]]
+
+    # Las columnas de texto solo cuentan sus cambios
+    assert analitica["columnas"]["Color"] == {"cambios": 2}
+    assert analitica["claves_mas_cambios"] == [["B", 2], ["A", 1], ["C", 1], ["E", 1]]
+
+
+def test_calculada_desde_el_historial():
+    resultado = comparar_listas_dinamico(PLANTILLA, ACTUALIZADA)
+    # Un contenedor armado desde la tabla guardada no trae la analítica: se calcula igual
+    desde_tabla = resultado_desde_tabla(tabla_procesada(resultado))
+    assert desde_tabla.get("analitica") is None
+    assert analitica_de_resultado(desde_tabla) == resultado["analitica"]
@@ -0,0 +1,65 @@
+# tests/test_batch.py
+import os
+
+import pandas as pd
+import pytest
+
+from db.crud import obtener_comparaciones
+from processing.batch import leer_manifiesto, pares_de_carpetas, procesar_pares
+
+PLANTILLA = pd.DataFrame({"SKU": ["A", "B", "C"], "Precio": [1.0, 2.0, 3.0]})
+
+
+def _carpetas(tmp_path, cantidad):
+    referencias, actualizados = tmp_path / "referencias", tmp_path / "actualizados"
+    referencias.mkdir()
+    actualizados.mkdir()
+    for numero in range(cantidad):
+        PLANTILLA.to_csv(referencias / f"lista{numero}.csv", index=False)
+        # En cada par cambia un precio más que en el anterior
+        actualizada = PLANTILLA.copy()
+        actualizada.loc[:numero, "Precio"] += 1
+        actualizada.to_parquet(actualizados / f"lista{numero}.parquet")
+    return referencias, actualizados
+
+
+def test_pares_por_nombre_y_manifiesto(tmp_path, capsys):
+    referencias, actualizados = _carpetas(tmp_path, 2)
+    PLANTILLA.to_csv(referencias / "sola.csv", index=False)
+    (referencias / "notas.txt").write_text("no es una tabla")
+
+    pares = pares_de_carpetas(str(referencias), str(actualizados))
+    assert [tuple(map(os.path.basename, par)) for par in pares] == [("lista0.csv", "lista0.parquet"), ("lista1.csv", "lista1.parquet")]
+    assert "sola.csv" in capsys.readouterr().err
+
+    manifiesto = tmp_path / "pares.csv"
+    manifiesto.write_text("referencia, actualizado\nreferencias/lista0.csv, actualizados/lista0.parquet\n")
+    assert leer_manifiesto(str(manifiesto)) == [pares[0]]
+    manifiesto.write_text("referencia\nreferencias/lista0.csv\n")
+    with pytest.raises(ValueError, match="actualizado"):
+        leer_manifiesto(str(manifiesto))
+
+
+@pytest.mark.parametrize("procesos", [1, 2])
+def test_lote_con_un_par_roto(base_datos, tmp_path, procesos):
+    referencias, actualizados = _carpetas(tmp_path, 3)
+    pares = pares_de_carpetas(str(referencias), str(actualizados))
+    # Un par ilegible en el medio no detiene a los demás
+    (tmp_path / "rota.csv").write_bytes(b"")
+    pares.insert(1, (str(tmp_path / "rota.csv"), pares[0][1]))
+    salida = tmp_path / "salida"
+    salida.mkdir()
+
+    resumenes = procesar_pares(pares, procesos, comparaciones_por_lote=2, formato_exportacion="csv", carpeta_salida=str(salida))
+    # En el orden de entrada, sin importar en qué orden terminaron
+    assert [(resumen["referencia"], resumen["actualizado"]) for resumen in resumenes] == pares
+    assert resumenes[1]["error"] is not None and resumenes[1]["id"] is None
+    correctos = [resumenes[0], *resumenes[2:]]
+    assert [resumen["Actualizado"] for resumen in correctos] == [1, 2, 3]
+    assert all(resumen["error"] is None and resumen["filas"] == 3 for resumen in correctos)
+
+    guardadas = obtener_comparaciones()
+    assert sorted(guardadas["id"]) == sorted(resumen["id"] for resumen in correctos)
+    for resumen in correctos:
+        exportada = pd.read_csv(resumen["exportado"])
+        assert (exportada["Estado"] == "Actualizado").sum() == resumen["Actualizado"]
@@ -0,0 +1,34 @@
+# tests/test_crud.py
+import pandas as pd
+
+from db.crud import insertar_comparacion, obtener_cambios_clave, obtener_comparacion, obtener_resultado_comparacion, obtener_tabla_resultado
+from processing.diff_engine import comparar_listas_dinamico
+from processing.result import tabla_procesada
+
+PLANTILLA = pd.DataFrame({"SKU": [100, 200, 300], "Precio": [1.0, 2.0, 3.0], "Color": ["rojo", "azul", "gris"]})
+ACTUALIZADA = pd.DataFrame({"SKU": [100, 200, 400], "Precio": [1.5, 2.0, 4.0], "Color": ["negro", "azul", "gris"]})
+
+
+def test_cambios_guardados_por_clave(base_datos):
+    resultado = comparar_listas_dinamico(PLANTILLA, ACTUALIZADA)
+    id = insertar_comparacion("2024-01-01 10:00:00", "lista.xlsx", "lista_nueva.xlsx", resultado, hoja="Enero")
+
+    assert obtener_comparacion(id) == {
+        "id": id, "fecha": "2024-01-01 10:00:00", "nombre_archivo_ref": "lista.xlsx", "nombre_archivo_act": "lista_nueva.xlsx", "hoja": "Enero",
+    }
+    assert obtener_comparacion(id + 1) is None
+    # El resultado está en las tablas normalizadas, no en un xlsx
+    assert obtener_resultado_comparacion(id) is None
+    esperada = tabla_procesada(resultado)
+    guardada = obtener_tabla_resultado(id)
+    assert guardada["SKU"].tolist() == esperada["SKU"].tolist()
+    assert guardada["Estado"].tolist() == esperada["Estado"].astype(str).tolist()
+
+    # Una clave escrita como texto encuentra su equivalente numérico
+    cambios = obtener_cambios_clave("100")
+    assert sorted(zip(cambios["estado"], cambios["columna"])) == [("Actualizado", "Color"), ("Actualizado", "Precio")]
+    # Un registro eliminado guarda sus valores anteriores
+    eliminada = obtener_cambios_clave(300)
+    assert set(eliminada["estado"]) == {"Eliminado"} and set(eliminada["hoja"]) == {"Enero"}
+    assert dict(zip(eliminada["columna"], eliminada["valor_anterior"]))["Color"] == "gris"
+    assert obtener_cambios_clave("200").empty
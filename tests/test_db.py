@@ -0,0 +1,54 @@
+# tests/test_db.py
+import threading
+
+import pytest
+
+from db.db import get_connection
+
+
+def test_conexion_reutilizada_y_ajustada(base_datos):
+    with get_connection() as conn:
+        primera = conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2  # INCREMENTAL
+    with get_connection() as conn:
+        assert conn is primera
+
+
+def test_confirma_o_revierte_al_salir(base_datos):
+    with get_connection() as conn:
+        conn.execute("CREATE TABLE prueba (valor INTEGER)")
+    with get_connection() as conn:
+        conn.execute("INSERT INTO prueba VALUES (1)")
+    with pytest.raises(RuntimeError):
+        with get_connection() as conn:
+            conn.execute("INSERT INTO prueba VALUES (2)")
+            raise RuntimeError()
+    with get_connection() as conn:
+        assert conn.execute("SELECT valor FROM prueba").fetchall() == [(1,)]
+        assert not conn.in_transaction
+
+
+def test_conexiones_limitadas_entre_hilos(base_datos, monkeypatch):
+    monkeypatch.setattr("db.db.CONEXIONES_MAXIMAS", 2)
+    usadas, errores = set(), []
+    barrera = threading.Barrier(6)
+
+    def consultar():
+        try:
+            barrera.wait(30)
+            for _ in range(20):
+                with get_connection() as conn:
+                    usadas.add(id(conn))
+                    conn.execute("SELECT COUNT(*) FROM comparaciones").fetchone()
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=consultar) for _ in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(30)
+    # Seis hilos comparten las dos conexiones del pool (la de init_db ya estaba abierta)
+    assert errores == []
+    assert len(usadas) <= 2
@@ -0,0 +1,67 @@
+# tests/test_diff_engine.py
+import pandas as pd
+import pytest
+
+from casos import SEMILLAS, assert_resultados_iguales, caso_aleatorio
+from processing.diff_engine import MOTOR_ITERATIVO, MOTOR_VECTORIZADO, comparar_listas_dinamico
+from processing.result import tabla_procesada
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS)
+def test_vectorizado_igual_a_iterativo(semilla):
+    plantilla_df, actualizada_df = caso_aleatorio(semilla)
+    assert_resultados_iguales(
+        comparar_listas_dinamico(plantilla_df, actualizada_df, motor=MOTOR_VECTORIZADO),
+        comparar_listas_dinamico(plantilla_df, actualizada_df, motor=MOTOR_ITERATIVO),
+    )
+
+
+@pytest.mark.parametrize("motor", [MOTOR_VECTORIZADO, MOTOR_ITERATIVO])
+def test_estados_y_detalles(motor):
+    # Claves en otro orden: una actualizada en dos columnas, una eliminada, una sin cambios y una nueva
+    plantilla_df = pd.DataFrame({"SKU": ["A", "B", "C"], "Precio": [1.0, 2.0, 3.0], "Stock": [5, 6, 7]})
+    actualizada_df = pd.DataFrame({"SKU": ["C", "A", "D"], "Precio": [3.0, 1.5, 4.0], "Stock": [7, 4, 1]})
+    resultado = comparar_listas_dinamico(plantilla_df, actualizada_df, motor=motor)
+
+    procesada = tabla_procesada(resultado)
+    assert procesada[["SKU", "Estado", "Detalles de Cambios"]].astype(object).values.tolist() == [
+        ["A", "Actualizado", "Precio: 1.0 -> 1.5; Stock: 5 -> 4"],
+        ["B", "Eliminado", "Registro eliminado"],
+        ["C", "Sin cambios", ""],
+        ["D", "Nuevo", "Nuevo registro"],
+    ]
+    assert procesada.loc[0, ["Precio (Valor Anterior)", "Precio (Valor Nuevo)"]].tolist() == [1.0, 1.5]
+    assert resultado["cambios"].astype(object).values.tolist() == [
+        ["C", "Sin cambios"], ["A", "Actualizado"], ["D", "Nuevo"], ["B", "Eliminado"],
+    ]
+
+
+def test_muchos_registros_nuevos_al_final():
+    # Los registros nuevos se agregan de una vez, en el orden del archivo actualizado
+    plantilla_df = pd.DataFrame({"SKU": ["A", "B"], "Stock": [1, 2]})
+    nuevas = [f"N{i:03d}" for i in range(500)][::-1]
+    actualizada_df = pd.DataFrame({"SKU": ["B", *nuevas, "A"], "Stock": [2, *range(500), 1]})
+    for motor in (MOTOR_VECTORIZADO, MOTOR_ITERATIVO):
+        procesada = tabla_procesada(comparar_listas_dinamico(plantilla_df, actualizada_df, motor=motor))
+        assert procesada["SKU"].tolist() == ["A", "B", *nuevas]
+        assert procesada["Estado"].astype(str).tolist() == ["Sin cambios"] * 2 + ["Nuevo"] * 500
+        assert procesada["Stock (Valor Nuevo)"].iloc[2:].tolist() == list(range(500))
+
+
+def test_columnas_de_pares_vacias_con_el_mismo_tipo():
+    # Solo registros nuevos y eliminados: "SKU (Valor Nuevo)" queda sin valores en las filas de referencia
+    plantilla_df = pd.DataFrame({"SKU": ["A", "B"], "Precio": [1.0, 2.0]})
+    actualizada_df = pd.DataFrame({"SKU": ["C"], "Precio": [3.0]})
+    vectorizado = tabla_procesada(comparar_listas_dinamico(plantilla_df, actualizada_df, motor=MOTOR_VECTORIZADO))
+    iterativo = tabla_procesada(comparar_listas_dinamico(plantilla_df, actualizada_df, motor=MOTOR_ITERATIVO))
+    pd.testing.assert_frame_equal(vectorizado, iterativo)
+    assert vectorizado["SKU (Valor Nuevo)"].iloc[:2].isna().all()
+    assert vectorizado["SKU (Valor Nuevo)"].dtype == iterativo["SKU (Valor Nuevo)"].dtype
+
+
+def test_tolerancia_en_ambos_motores():
+    plantilla_df = pd.DataFrame({"SKU": ["A", "B"], "Precio": [1.0, 2.0]})
+    actualizada_df = pd.DataFrame({"SKU": ["A", "B"], "Precio": [1.004, 2.5]})
+    for motor in (MOTOR_VECTORIZADO, MOTOR_ITERATIVO):
+        resultado = comparar_listas_dinamico(plantilla_df, actualizada_df, motor=motor, tolerancias={"Precio": 0.01})
+        assert resultado["cambios"]["Estado"].astype(str).tolist() == ["Sin cambios", "Actualizado"]
@@ -0,0 +1,82 @@
+# tests/test_diff_service.py
+import json
+import os
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+from starlette.testclient import TestClient
+
+from processing.jobs import ESTADOS_ACTIVOS, ESTADO_TERMINADO
+from service.diff_service import crear_aplicacion
+
+REFERENCIA = "SKU,Dep,Precio,Color\nA,1,10,rojo\nB,1,30,verde\nD,2,20,azul\n"
+ACTUALIZADO = "SKU,Dep,Precio,Color\nA,1,10.004,rojo \nD,2,25,azul\nC,1,5,gris\n"
+
+
+@pytest.fixture
+def cliente(base_datos, tmp_path):
+    with TestClient(crear_aplicacion(str(tmp_path / "cargas"))) as cliente:
+        yield cliente
+
+
+def _enviar(cliente, **campos):
+    return cliente.post("/comparaciones", files={
+        "referencia": ("lista.csv", REFERENCIA.encode(), "text/csv"),
+        "actualizado": ("lista_nueva.csv", ACTUALIZADO.encode(), "text/csv"),
+    }, data=campos)
+
+
+def _esperar(cliente, respuesta):
+    assert respuesta.status_code == 202
+    ubicacion = respuesta.headers["Location"]
+    limite = time.time() + 30
+    while (trabajo := cliente.get(ubicacion).json())["estado"] in ESTADOS_ACTIVOS:
+        assert time.time() < limite
+        time.sleep(0.05)
+    assert trabajo["estado"] == ESTADO_TERMINADO, trabajo["error"]
+    return trabajo
+
+
+def _cambios(cliente, trabajo):
+    with cliente.stream("GET", trabajo["resultado"], params={"formato": "jsonl"}) as respuesta:
+        assert respuesta.status_code == 200
+        lineas = b"".join(respuesta.iter_bytes()).decode().splitlines()
+    return {(cambio["clave"], cambio["estado"], cambio["columna"]) for cambio in map(json.loads, lineas)}
+
+
+def test_subida_trabajo_y_resultado(cliente):
+    trabajo = _esperar(cliente, _enviar(cliente))
+    assert trabajo["comparacion_id"] == 1
+    # Sin opciones: clave de la primera columna, sin tolerancia y con los textos recortados
+    assert _cambios(cliente, trabajo) == {
+        ("A", "Actualizado", "Precio"), ("D", "Actualizado", "Precio"), ("B", "Eliminado", None), ("C", "Nuevo", None),
+    }
+    assert cliente.get("/comparaciones").json()["comparaciones"][0]["nombre_archivo_act"] == "lista_nueva.csv"
+
+
+def test_opciones_como_en_el_lote(cliente):
+    trabajo = _esperar(cliente, _enviar(cliente, columnas_clave=["SKU", "Dep"], tolerancia=["Precio=0.01"]))
+    assert _cambios(cliente, trabajo) == {("D | 2", "Actualizado", "Precio"), ("B | 1", "Eliminado", None), ("C | 1", "Nuevo", None)}
+
+    trabajo = _esperar(cliente, _enviar(cliente, tolerancia="Precio=0.01", sin_recortar="sí"))
+    assert _cambios(cliente, trabajo) == {
+        ("A", "Actualizado", "Color"), ("D", "Actualizado", "Precio"), ("B", "Eliminado", None), ("C", "Nuevo", None),
+    }
+
+
+@pytest.mark.parametrize("campos", [{"motor": "otro"}, {"tolerancia": "Precio"}, {"umbral_clave": "2"}])
+def test_opciones_invalidas(cliente, campos):
+    respuesta = _enviar(cliente, **campos)
+    assert respuesta.status_code == 400
+    assert respuesta.json()["error"]
+
+
+def test_cola_llena(cliente, tmp_path, monkeypatch):
+    monkeypatch.setattr("processing.jobs.TRABAJOS_EN_ESPERA_MAXIMOS", 0)
+    respuesta = _enviar(cliente)
+    assert respuesta.status_code == 503
+    assert respuesta.headers["Retry-After"] == "5"
+    # Los archivos subidos no quedan en la carpeta de cargas
+    assert os.listdir(tmp_path / "cargas") == []
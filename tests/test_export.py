@@ -0,0 +1,66 @@
+# tests/test_export.py
+import io
+import json
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_series_equal
+
+from processing.diff_engine import comparar_listas_dinamico
+from processing.export import exportar_libro_por_hojas, exportar_resultado, trozos_jsonl_cambios
+from processing.result import tabla_procesada
+
+PLANTILLA = pd.DataFrame({"SKU": ["A", "B", "C", "D", "E"], "Precio": [1.0, 2.0, 3.0, 4.0, 5.0], "Color": ["rojo", "azul", None, "gris", "rojo"]})
+ACTUALIZADA = pd.DataFrame({"SKU": ["A", "B", "D", "E", "F"], "Precio": [1.0, 2.5, 4.0, 5.0, 6.0], "Color": ["rojo", "azul", "gris", "verde", "negro"]})
+
+
+def _leer(formato, contenido):
+    if formato == "csv":
+        return pd.read_csv(io.BytesIO(contenido))
+    if formato == "parquet":
+        return pd.read_parquet(io.BytesIO(contenido))
+    return pd.read_excel(io.BytesIO(contenido))
+
+
+@pytest.mark.parametrize("formato", ["csv", "parquet", "xlsx"])
+def test_exportar_por_bloques_igual_a_la_tabla_completa(formato):
+    resultado = comparar_listas_dinamico(PLANTILLA, ACTUALIZADA)
+    esperada = tabla_procesada(resultado)
+    destino = io.BytesIO()
+    # Bloques de 2 filas: el encabezado y los tipos salen del primero
+    exportar_resultado(resultado, formato, destino, filas_por_bloque=2)
+
+    leida = _leer(formato, destino.getvalue())
+    assert leida.columns.tolist() == [str(columna) for columna in esperada.columns]
+    assert leida["SKU"].tolist() == esperada["SKU"].tolist()
+    assert leida["Estado"].astype(str).tolist() == esperada["Estado"].astype(str).tolist()
+    assert leida["Detalles de Cambios"].fillna("").tolist() == esperada["Detalles de Cambios"].tolist()
+    for columna in ("Precio (Valor Anterior)", "Precio (Valor Nuevo)"):
+        assert_series_equal(leida[columna], esperada[columna], check_dtype=False)
+    for columna in ("Color (Valor Anterior)", "Color (Valor Nuevo)"):
+        assert leida[columna].isna().tolist() == esperada[columna].isna().tolist()
+
+
+def test_formato_no_admitido():
+    with pytest.raises(ValueError, match="no admitido"):
+        exportar_resultado(comparar_listas_dinamico(PLANTILLA, ACTUALIZADA), "txt", io.BytesIO())
+
+
+def test_jsonl_una_linea_por_cambio():
+    resultado = comparar_listas_dinamico(PLANTILLA, ACTUALIZADA)
+    lineas = b"".join(trozos_jsonl_cambios(resultado, filas_por_bloque=2)).decode().splitlines()
+    cambios = {(cambio["clave"], cambio["estado"], cambio["columna"]) for cambio in map(json.loads, lineas)}
+    assert len(lineas) == len(cambios)
+    assert cambios == {("B", "Actualizado", "Precio"), ("E", "Actualizado", "Color"), ("C", "Eliminado", None), ("F", "Nuevo", None)}
+
+
+def test_libro_con_una_hoja_por_comparacion():
+    resultados = {
+        "Enero": comparar_listas_dinamico(PLANTILLA, ACTUALIZADA),
+        "Febrero": comparar_listas_dinamico(PLANTILLA, PLANTILLA),
+    }
+    destino = io.BytesIO()
+    exportar_libro_por_hojas(resultados, destino, filas_por_bloque=2)
+    hojas = pd.read_excel(io.BytesIO(destino.getvalue()), sheet_name=None)
+    assert list(hojas) == ["Enero", "Febrero"]
+    assert hojas["Febrero"]["SKU"].tolist() == PLANTILLA["SKU"].tolist()
@@ -0,0 +1,63 @@
+# tests/test_fingerprint.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from casos import SEMILLAS, assert_resultados_iguales, caso_aleatorio
+from db.crud import insertar_huellas, obtener_huellas
+from processing.diff_engine import comparar_listas_dinamico
+from processing.fingerprint import calcular_huellas, filtrar_candidatos, hash_contenido
+from processing.ingest import leer_tabla, variante_de_lectura
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS)
+def test_huellas_igual_a_sin_huellas(semilla):
+    plantilla_df, actualizada_df = caso_aleatorio(semilla)
+    columnas = list(plantilla_df.columns)
+    con_huellas = comparar_listas_dinamico(
+        plantilla_df, actualizada_df,
+        huellas_plantilla=calcular_huellas(plantilla_df, columnas),
+        huellas_actualizada=calcular_huellas(actualizada_df, columnas),
+    )
+    assert_resultados_iguales(con_huellas, comparar_listas_dinamico(plantilla_df, actualizada_df))
+
+
+def test_tablas_identicas_sin_cambios():
+    plantilla_df, _ = caso_aleatorio(1)
+    huellas = calcular_huellas(plantilla_df)
+    resultado = comparar_listas_dinamico(plantilla_df, plantilla_df.copy(), huellas_plantilla=huellas, huellas_actualizada=huellas)
+    assert set(resultado["cambios"]["Estado"].astype(str)) <= {"Sin cambios"}
+
+
+def test_solo_filas_y_columnas_distintas():
+    # Claves en otro orden, una fila sin par en cada tabla y un solo precio cambiado ("B")
+    plantilla_df = pd.DataFrame({"SKU": ["A", "B", "C", "X"], "Precio": [1.0, 2.0, 3.0, 9.0], "Stock": [5, 6, 7, 1]})
+    actualizada_df = pd.DataFrame({"SKU": ["C", "A", "B", "N"], "Precio": [3.0, 1.0, 2.5, 4.0], "Stock": [7, 5, 6, 1]})
+    columnas = list(plantilla_df.columns)
+    filas, columnas_distintas = filtrar_candidatos(
+        calcular_huellas(plantilla_df, columnas), calcular_huellas(actualizada_df, columnas),
+        plantilla_df, actualizada_df, np.array([2, 0, 1, -1]),
+    )
+    assert filas.tolist() == [2]
+    assert columnas_distintas == ["Precio"]
+    # La huella de las filas no depende de su posición en la tabla
+    assert calcular_huellas(actualizada_df.iloc[::-1])["columnas_huellas"] == calcular_huellas(actualizada_df)["columnas_huellas"]
+
+
+def test_huellas_guardadas_por_opciones_de_lectura(base_datos, tmp_path):
+    # El mismo archivo leído con otros tipos es otra tabla: sus huellas no se reutilizan
+    ruta = tmp_path / "lista.csv"
+    ruta.write_text("SKU,Código\nA,001\nB,002\n")
+    datos = ruta.read_bytes()
+    tipos = {"Código": "str"}
+    como_texto = leer_tabla(str(ruta), columnas=None, tipos=tipos)
+    columnas = list(como_texto.columns)
+    hash_texto = hash_contenido(datos, variante_de_lectura(ruta.name, None, tipos))
+    hash_numeros = hash_contenido(datos, variante_de_lectura(ruta.name))
+    assert hash_texto != hash_numeros
+
+    insertar_huellas(None, hash_texto, calcular_huellas(como_texto, columnas))
+    assert obtener_huellas(hash_numeros, columnas) is None
+    guardadas = obtener_huellas(hash_texto, columnas)
+    assert guardadas["filas"].tolist() == calcular_huellas(como_texto, columnas)["filas"].tolist()
+    assert guardadas["filas"].tolist() != calcular_huellas(leer_tabla(str(ruta)), columnas)["filas"].tolist()
@@ -0,0 +1,52 @@
+# tests/test_history_pages.py
+import pandas as pd
+
+from db.crud import insertar_comparacion, obtener_comparaciones, obtener_pagina_comparaciones
+from processing.diff_engine import comparar_listas_dinamico
+
+
+def _guardar(fecha, nombre_ref="lista.xlsx", nombre_act="lista_nueva.xlsx"):
+    resultado = comparar_listas_dinamico(pd.DataFrame({"SKU": ["A"], "Precio": [1.0]}), pd.DataFrame({"SKU": ["A"], "Precio": [2.0]}))
+    return insertar_comparacion(fecha, nombre_ref, nombre_act, resultado)
+
+
+def _todas_las_paginas(limite, **filtros):
+    paginas, siguiente = [], None
+    while True:
+        comparaciones, siguiente = obtener_pagina_comparaciones(limite=limite, despues_de=siguiente, **filtros)
+        paginas.append(comparaciones["id"].tolist())
+        if siguiente is None:
+            return paginas
+
+
+def test_paginas_con_fechas_iguales(base_datos):
+    antigua = _guardar("2024-01-01 10:00:00")
+    iguales = [_guardar("2024-01-02 10:00:00") for _ in range(5)]
+    reciente = _guardar("2024-01-03 10:00:00")
+
+    paginas = _todas_las_paginas(2)
+    # Entre fechas iguales, de la más reciente (mayor id) a la más antigua, sin repetir ni saltear filas
+    assert paginas == [[reciente, iguales[4]], [iguales[3], iguales[2]], [iguales[1], iguales[0]], [antigua]]
+
+
+def test_prefijo_con_comodines(base_datos):
+    porcentaje = _guardar("2024-01-01 10:00:00", "a%b.xlsx")
+    guion_bajo = _guardar("2024-01-01 10:00:00", "a_b.xlsx")
+    _guardar("2024-01-01 10:00:00", "axb.xlsx")
+    barra = _guardar("2024-01-01 10:00:00", "ref.xlsx", "a\\b.xlsx")
+
+    assert obtener_comparaciones(nombre_archivo="a%")["id"].tolist() == [porcentaje]
+    assert obtener_comparaciones(nombre_archivo="A_B")["id"].tolist() == [guion_bajo]
+    assert obtener_comparaciones(nombre_archivo="a\\")["id"].tolist() == [barra]
+    assert len(obtener_comparaciones(nombre_archivo="a")) == 4
+
+
+def test_rango_de_fechas_incluye_ambos_extremos(base_datos):
+    _guardar("2023-12-31 23:59:59")
+    desde = _guardar("2024-01-01 00:00:00")
+    hasta = _guardar("2024-01-31 23:59:59")
+    _guardar("2024-02-01 00:00:00")
+
+    comparaciones = obtener_comparaciones(fecha_desde="2024-01-01", fecha_hasta="2024-01-31")
+    assert comparaciones["id"].tolist() == [hasta, desde]
+    assert _todas_las_paginas(1, fecha_desde="2024-01-01", fecha_hasta="2024-01-31") == [[hasta], [desde]]
@@ -0,0 +1,135 @@
+# tests/test_history_storage.py
+from datetime import datetime, timedelta
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from db.crud import (
+    aplicar_retencion, compactar_comparacion, comparaciones_por_compactar, eliminar_comparacion, insertar_comparacion,
+    obtener_tabla_resultado,
+)
+from db.db import get_connection, liberar_espacio
+from db.history_storage import TAMANO_HASH, estadisticas_almacenamiento
+from processing.diff_engine import comparar_listas_dinamico
+from processing.result import tabla_procesada
+
+CLAVES = 6000
+
+
+def _resultado(cambiar=(), agregar=0):
+    # La misma lista de CLAVES claves con algunos precios cambiados y registros nuevos al final
+    plantilla_df = pd.DataFrame({"SKU": [f"K{i:05d}" for i in range(CLAVES)], "Precio": [1.0] * CLAVES})
+    actualizada_df = plantilla_df.copy()
+    actualizada_df.loc[list(cambiar), "Precio"] = 2.0
+    nuevas = pd.DataFrame({"SKU": [f"N{i}" for i in range(agregar)], "Precio": [3.0] * agregar})
+    return comparar_listas_dinamico(plantilla_df, pd.concat([actualizada_df, nuevas], ignore_index=True))
+
+
+def _fecha(dias_atras=0):
+    return (datetime.now() - timedelta(days=dias_atras)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _hashes(id):
+    with get_connection() as conn:
+        lista = conn.execute("SELECT bloques_claves FROM comparaciones WHERE id = ?", (id,)).fetchone()[0]
+    return [lista[inicio:inicio + TAMANO_HASH] for inicio in range(0, len(lista), TAMANO_HASH)]
+
+
+def _referencias():
+    with get_connection() as conn:
+        return dict(conn.execute("SELECT hash, referencias FROM bloques").fetchall())
+
+
+def _assert_referencias_consistentes(ids):
+    # Cada bloque se cuenta una vez por cada aparición en las comparaciones que quedan
+    esperadas = {}
+    for id in ids:
+        for digest in _hashes(id):
+            esperadas[digest] = esperadas.get(digest, 0) + 1
+    assert _referencias() == esperadas
+
+
+def test_bloques_compartidos_entre_comparaciones(base_datos):
+    primera = insertar_comparacion(_fecha(), "lista.xlsx", "lista_nueva.xlsx", _resultado(cambiar=[10]))
+    esperada = tabla_procesada(_resultado(cambiar=[10, 20], agregar=3))
+    segunda = insertar_comparacion(_fecha(), "lista.xlsx", "lista_nueva.xlsx", _resultado(cambiar=[10, 20], agregar=3))
+
+    hashes_primera, hashes_segunda = _hashes(primera), _hashes(segunda)
+    assert len(hashes_primera) > 2
+    # Solo cambia el último bloque, el que recibe los registros nuevos
+    assert len(set(hashes_primera) & set(hashes_segunda)) == len(hashes_primera) - 1
+    _assert_referencias_consistentes([primera, segunda])
+    assert obtener_tabla_resultado(segunda)["SKU"].tolist() == esperada["SKU"].tolist()
+    assert obtener_tabla_resultado(segunda)["Estado"].tolist() == esperada["Estado"].astype(str).tolist()
+
+    antes = obtener_tabla_resultado(segunda)
+    eliminar_comparacion(primera)
+    _assert_referencias_consistentes([segunda])
+    assert_frame_equal(obtener_tabla_resultado(segunda), antes)
+
+    eliminar_comparacion(segunda)
+    assert _referencias() == {}
+
+
+def test_retencion(base_datos):
+    ids = [
+        insertar_comparacion(_fecha(dias), "lista.xlsx", "lista_nueva.xlsx", _resultado(cambiar=[dias]))
+        for dias in (3, 2, 1)
+    ]
+    otra = insertar_comparacion(_fecha(400), "otra.xlsx", "otra_nueva.xlsx", _resultado(agregar=1))
+    antes = obtener_tabla_resultado(ids[-1])
+
+    # Se conservan las 2 más recientes de cada par de archivos
+    assert aplicar_retencion(conservar_ultimas=2) == 1
+    _assert_referencias_consistentes([*ids[1:], otra])
+    # Y luego solo las del último año
+    assert aplicar_retencion(conservar_dias=365) == 1
+    _assert_referencias_consistentes(ids[1:])
+    assert aplicar_retencion() == 0
+    assert_frame_equal(obtener_tabla_resultado(ids[-1]), antes)
+
+
+def test_vacuum_incremental_libera_lo_eliminado(base_datos):
+    ids = [insertar_comparacion(_fecha(), f"lista{i}.xlsx", "lista_nueva.xlsx", _resultado(cambiar=range(i, CLAVES, 7))) for i in range(3)]
+    antes = obtener_tabla_resultado(ids[-1])
+    for id in ids[:-1]:
+        eliminar_comparacion(id)
+
+    with get_connection() as conn:
+        libres = estadisticas_almacenamiento(conn)["bytes_libres"]
+    assert libres > 0
+    assert liberar_espacio() == libres
+    with get_connection() as conn:
+        assert estadisticas_almacenamiento(conn)["bytes_libres"] == 0
+    _assert_referencias_consistentes(ids[-1:])
+    assert_frame_equal(obtener_tabla_resultado(ids[-1]), antes)
+
+
+def test_compactar_formato_anterior(base_datos):
+    resultado = _resultado(cambiar=[5])
+    nueva = insertar_comparacion(_fecha(), "lista.xlsx", "lista_nueva.xlsx", resultado)
+    anterior = insertar_comparacion(_fecha(), "lista.xlsx", "lista_nueva.xlsx", resultado)
+    antes = obtener_tabla_resultado(anterior)
+    hashes = _hashes(anterior)
+
+    # Formato anterior a los bloques: todas las filas en estados_clave, sin lista de bloques
+    with get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO estados_clave (comparacion_id, posicion, clave, estado, detalles) VALUES (?, ?, ?, 'Sin cambios', '')",
+            [(anterior, posicion, clave) for posicion, clave in enumerate(antes["SKU"]) if antes["Estado"][posicion] == "Sin cambios"],
+        )
+        for digest in hashes:
+            conn.execute("UPDATE bloques SET referencias = referencias - 1 WHERE hash = ?", (digest,))
+        conn.execute("UPDATE comparaciones SET bloques_claves = NULL WHERE id = ?", (anterior,))
+    assert comparaciones_por_compactar() == [anterior]
+    assert_frame_equal(obtener_tabla_resultado(anterior), antes)
+
+    assert compactar_comparacion(anterior)
+    assert not compactar_comparacion(anterior)
+    assert comparaciones_por_compactar() == []
+    # Los bloques de la comparación compactada son los de la otra, que ya estaban guardados
+    assert _hashes(anterior) == _hashes(nueva)
+    _assert_referencias_consistentes([nueva, anterior])
+    assert_frame_equal(obtener_tabla_resultado(anterior), antes)
+    with get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM estados_clave WHERE comparacion_id = ?", (anterior,)).fetchone()[0] == 1
@@ -0,0 +1,53 @@
+# tests/test_ingest.py
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from processing.ingest import detectar_formato, leer_tabla, listar_hojas
+
+TABLA = pd.DataFrame({"SKU": ["A", "B", "C"], "Precio": [1.5, 2.0, 3.25], "Stock": [1, 2, 3]})
+
+
+def _escribir(tabla, ruta):
+    formato = detectar_formato(ruta)
+    if formato == "csv":
+        tabla.to_csv(ruta, index=False)
+    elif formato == "xlsx":
+        tabla.to_excel(ruta, index=False)
+    else:
+        getattr(tabla, f"to_{formato}")(ruta)
+
+
+@pytest.mark.parametrize("formato", ["csv", "xlsx", "parquet", "feather"])
+def test_mismo_contenido_en_todos_los_formatos(tmp_path, formato):
+    ruta = str(tmp_path / f"lista.{formato}")
+    _escribir(TABLA, ruta)
+    assert_frame_equal(leer_tabla(ruta), TABLA)
+    # Solo las columnas pedidas, con los tipos indicados
+    assert_frame_equal(
+        leer_tabla(ruta, columnas=["SKU", "Stock"], tipos={"Stock": "float64"}),
+        TABLA[["SKU", "Stock"]].astype({"Stock": "float64"}),
+    )
+
+    # Archivo subido: el formato sale de su nombre
+    with open(ruta, "rb") as archivo:
+        subido = BytesIO(archivo.read())
+    subido.name = f"Lista.{formato.upper()}"
+    assert_frame_equal(leer_tabla(subido), TABLA)
+
+
+def test_hojas_de_un_libro(tmp_path):
+    ruta = str(tmp_path / "libro.xlsx")
+    with pd.ExcelWriter(ruta) as libro:
+        TABLA.to_excel(libro, sheet_name="Enero", index=False)
+        TABLA.iloc[:1].to_excel(libro, sheet_name="Febrero", index=False)
+    assert listar_hojas(ruta) == ["Enero", "Febrero"]
+    assert len(leer_tabla(ruta, hoja="Febrero")) == 1
+    assert listar_hojas(str(tmp_path / "lista.csv")) == []
+
+
+def test_formato_no_admitido():
+    with pytest.raises(ValueError, match="no admitido"):
+        detectar_formato("lista.txt")
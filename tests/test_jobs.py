@@ -0,0 +1,69 @@
+# tests/test_jobs.py
+import threading
+
+import pytest
+
+from processing.jobs import (
+    ESTADO_CANCELADO, ESTADO_EN_ESPERA, ESTADO_ERROR, ESTADO_TERMINADO, TRABAJADORES, avance_de_trabajo, avanzar,
+    cancelar_trabajo, enviar_trabajo, iniciar_fase, obtener_trabajo,
+)
+
+
+def _terminar(id):
+    obtener_trabajo(id)["futuro"].result(timeout=30)
+    return obtener_trabajo(id)
+
+
+def _sumar(trabajo, valores):
+    iniciar_fase(trabajo, "suma", len(valores))
+    for procesadas in range(1, len(valores) + 1):
+        avanzar(trabajo, procesadas)
+    return sum(valores)
+
+
+def _fallar(trabajo):
+    raise ValueError("archivo ilegible")
+
+
+def test_resultado_y_error():
+    trabajo = _terminar(enviar_trabajo(_sumar, "suma", [1, 2, 3]))
+    assert (trabajo["estado"], trabajo["resultado"], trabajo["fase"]) == (ESTADO_TERMINADO, 6, "suma")
+    assert avance_de_trabajo(trabajo) == (1.0, 0.0)
+
+    trabajo = _terminar(enviar_trabajo(_fallar, "falla"))
+    assert (trabajo["estado"], trabajo["error"]) == (ESTADO_ERROR, "archivo ilegible")
+
+
+def _esperar_permiso(trabajo, iniciado, permiso):
+    iniciar_fase(trabajo, "espera", 1)
+    iniciado.set()
+    permiso.wait(30)
+    avanzar(trabajo, 1)
+    return "sin cancelar"
+
+
+def test_cancelar_en_curso_y_en_espera():
+    permiso = threading.Event()
+    iniciados = [threading.Event() for _ in range(TRABAJADORES)]
+    try:
+        # Todos los hilos ocupados: el trabajo siguiente queda esperando
+        en_curso = [enviar_trabajo(_esperar_permiso, "espera", iniciado, permiso) for iniciado in iniciados]
+        for iniciado in iniciados:
+            assert iniciado.wait(30)
+        en_espera = enviar_trabajo(_sumar, "suma", [1])
+        assert obtener_trabajo(en_espera)["estado"] == ESTADO_EN_ESPERA
+
+        # En espera se cancela en el acto; en curso, al informar su avance
+        cancelar_trabajo(en_espera)
+        assert obtener_trabajo(en_espera)["estado"] == ESTADO_CANCELADO
+        cancelar_trabajo(en_curso[0])
+    finally:
+        permiso.set()
+    assert _terminar(en_curso[0])["estado"] == ESTADO_CANCELADO
+    assert [_terminar(id)["resultado"] for id in en_curso[1:]] == ["sin cancelar"] * (TRABAJADORES - 1)
+
+
+def test_cola_llena(monkeypatch):
+    monkeypatch.setattr("processing.jobs.TRABAJOS_EN_ESPERA_MAXIMOS", 0)
+    with pytest.raises(RuntimeError, match="demasiadas"):
+        enviar_trabajo(_sumar, "suma", [1])
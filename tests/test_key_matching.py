@@ -0,0 +1,51 @@
+# tests/test_key_matching.py
+import pandas as pd
+
+from processing.diff_engine import comparar_listas_dinamico
+from processing.key_matching import METODO_NORMALIZADA, METODO_SIMILITUD, clave_compuesta, emparejar_claves, preparar_claves
+
+
+def _estados(plantilla_df, actualizada_df, **opciones):
+    plantilla_df, actualizada_df, _ = preparar_claves(plantilla_df, actualizada_df, **opciones)
+    cambios = comparar_listas_dinamico(plantilla_df, actualizada_df)["cambios"]
+    return dict(zip(cambios["SKU"], cambios["Estado"].astype(str)))
+
+
+def test_clave_compuesta_con_partes_vacias():
+    plantilla_df = pd.DataFrame({"SKU": [None, None, "A"], "Dep": [2, 3, None], "Stock": [1, 1, 1]})
+    actualizada_df = pd.DataFrame({"SKU": [None, None, "A"], "Dep": [2, 3, None], "Stock": [1, 5, 1]})
+    estados = _estados(plantilla_df, actualizada_df, columnas_clave=["SKU", "Dep"])
+    assert estados == {"\\N | 2": "Sin cambios", "\\N | 3": "Actualizado", "A | \\N": "Sin cambios"}
+
+
+def test_clave_compuesta_sin_colisiones():
+    df = pd.DataFrame({"a": ["a | b", "a", "x\\N", "x"], "b": ["c", "b | c", None, "\\N"]})
+    claves = clave_compuesta(df, ["a", "b"])
+    assert claves.nunique() == 4
+    # Solo una fila sin ningún valor queda sin clave
+    assert clave_compuesta(pd.DataFrame({"a": [None], "b": [float("nan")]}), ["a", "b"]).isna().all()
+
+
+def test_clave_compuesta_enteros_y_decimales():
+    # Una columna con celdas vacías se lee como decimales: 2.0 forma la misma clave que 2
+    enteros = clave_compuesta(pd.DataFrame({"SKU": ["A"], "Dep": [2]}), ["SKU", "Dep"])
+    decimales = clave_compuesta(pd.DataFrame({"SKU": ["A"], "Dep": [2.0]}), ["SKU", "Dep"])
+    assert enteros.tolist() == decimales.tolist() == ["A | 2"]
+
+
+def test_clave_reformateada_emparejada():
+    emparejamientos = emparejar_claves(pd.Series(["AB-001", "CD-002"]), pd.Series(["AB001", "CD-002"]))
+    assert emparejamientos.values.tolist() == [["AB-001", "AB001", 1.0, METODO_NORMALIZADA]]
+
+    plantilla_df = pd.DataFrame({"SKU": ["AB-001"], "Precio": [1.0]})
+    actualizada_df = pd.DataFrame({"SKU": ["AB001"], "Precio": [2.0]})
+    assert _estados(plantilla_df, actualizada_df, difusa=True) == {"AB-001": "Actualizado"}
+    assert _estados(plantilla_df, actualizada_df) == {"AB001": "Nuevo", "AB-001": "Eliminado"}
+
+
+def test_umbral_de_confianza():
+    # Trigramas de "^abcdefgh1$" y "^abcdefgh2$": 7 comunes de 11, confianza 0,636
+    referencia, actualizadas = pd.Series(["ABCDEFGH1"]), pd.Series(["ABCDEFGH2"])
+    emparejamientos = emparejar_claves(referencia, actualizadas, umbral=0.6)
+    assert emparejamientos.values.tolist() == [["ABCDEFGH1", "ABCDEFGH2", 0.636, METODO_SIMILITUD]]
+    assert emparejar_claves(referencia, actualizadas, umbral=0.7).empty
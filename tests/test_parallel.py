@@ -0,0 +1,54 @@
+# tests/test_parallel.py
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from casos import SEMILLAS, assert_resultados_iguales, caso_aleatorio
+from processing.diff_engine import comparar_listas_dinamico
+from processing.export import bytes_exportados
+from processing.parallel import comparar_en_paralelo, contexto_de_procesos
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS)
+def test_particiones_igual_a_serie(semilla):
+    # Con un trabajador las particiones se comparan en este proceso: se contrasta la combinación
+    plantilla_df, actualizada_df = caso_aleatorio(semilla)
+    serie = comparar_listas_dinamico(plantilla_df, actualizada_df)
+    particionado = comparar_en_paralelo(plantilla_df, actualizada_df, trabajadores=1, particiones=1 + semilla % 7)
+    assert_resultados_iguales(particionado, serie)
+    assert particionado["analitica"] == serie["analitica"]
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS[:5])
+def test_procesos_igual_a_serie(semilla):
+    plantilla_df, actualizada_df = caso_aleatorio(semilla)
+    serie = comparar_listas_dinamico(plantilla_df, actualizada_df)
+    paralelo = comparar_en_paralelo(plantilla_df, actualizada_df, trabajadores=2, particiones=4)
+    assert_resultados_iguales(paralelo, serie)
+    assert bytes_exportados(paralelo, "csv") == bytes_exportados(serie, "csv")
+
+
+def test_procesos_desde_un_hilo_igual_a_serie():
+    # Desde un hilo (como en los trabajos de la aplicación) no se usa "fork": las particiones se serializan
+    plantilla_df, actualizada_df = caso_aleatorio(7)
+    with ThreadPoolExecutor(1) as executor:
+        paralelo = executor.submit(comparar_en_paralelo, plantilla_df, actualizada_df, trabajadores=2, particiones=4).result()
+    assert_resultados_iguales(paralelo, comparar_listas_dinamico(plantilla_df, actualizada_df))
+
+
+def test_claves_enteras_y_decimales_en_la_misma_particion():
+    # 1 y 1.0 deben caer en la misma partición para emparejarse; la tolerancia llega a cada partición
+    plantilla_df = pd.DataFrame({"SKU": [1, 2, 3, 4, 5], "Precio": [1.0, 2.0, 3.0, 4.0, 5.0]})
+    actualizada_df = pd.DataFrame({"SKU": [1.0, 2.0, 3.0, 4.0, 6.0], "Precio": [1.004, 2.0, 3.5, 4.0, 6.0]})
+    particionado = comparar_en_paralelo(plantilla_df, actualizada_df, trabajadores=1, particiones=3, tolerancias={"Precio": 0.01})
+    assert particionado["cambios"].astype(object).values.tolist() == [
+        [1.0, "Sin cambios"], [2.0, "Sin cambios"], [3.0, "Actualizado"], [4.0, "Sin cambios"], [6.0, "Nuevo"], [5, "Eliminado"],
+    ]
+
+
+def test_sin_fork_con_varios_hilos():
+    with ThreadPoolExecutor(1) as executor:
+        contexto, heredar = executor.submit(contexto_de_procesos).result()
+    assert contexto.get_start_method() != "fork"
+    assert not heredar
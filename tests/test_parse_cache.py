@@ -0,0 +1,43 @@
+# tests/test_parse_cache.py
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from processing import parse_cache
+from processing.ingest import leer_tabla, variante_de_lectura
+from processing.parse_cache import clave_cache, leer_con_cache
+
+CONTENIDO = (
+    "SKU,Precio,Stock,Nombre,Fecha,Activo\n"
+    "A,1.5,3,uno,2024-01-02,True\n"
+    "B,,4,,2024-02-03,False\n"
+    "C,2,,tres,,True\n"
+)
+
+
+@pytest.fixture
+def solo_disco(tmp_path, monkeypatch):
+    # Sin nivel en memoria: cada lectura repetida sale del archivo Feather
+    monkeypatch.setattr(parse_cache, "DIRECTORIO_CACHE", str(tmp_path / "cache"))
+    monkeypatch.setattr(parse_cache, "LIMITE_MEMORIA_BYTES", 0)
+
+
+def _no_leer():
+    raise AssertionError("Se volvió a interpretar un archivo en caché")
+
+
+@pytest.mark.parametrize("tipos", [None, {"Stock": "str"}])
+def test_lectura_desde_disco_igual_a_interpretar(solo_disco, tmp_path, tipos):
+    ruta = tmp_path / "lista.csv"
+    ruta.write_text(CONTENIDO)
+    datos, variante = ruta.read_bytes(), variante_de_lectura(ruta.name, None, tipos)
+
+    interpretado = leer_con_cache(datos, lambda: leer_tabla(str(ruta), tipos=tipos), variante)
+    desde_disco = leer_con_cache(datos, _no_leer, variante)
+    assert_frame_equal(desde_disco, interpretado)
+    assert_frame_equal(desde_disco, leer_tabla(str(ruta), tipos=tipos))
+
+
+def test_clave_por_contenido_y_variante():
+    assert clave_cache(b"abc", "x") == clave_cache(b"abc", "x")
+    assert clave_cache(b"abc", "x") != clave_cache(b"abc", "y")
@@ -0,0 +1,60 @@
+# tests/test_profiler.py
+import pytest
+
+from performance.profiler import crear_registro, etapa, medir
+
+
+def test_etapas_anidadas():
+    persistidas = []
+    registro = crear_registro(persistir=persistidas.append)
+    with etapa("comparar", detalle="vectorizado", registro=registro) as raiz:
+        with etapa("índice de claves", filas=10):
+            pass
+        assert medir("comparación", sum, [1, 2, 3]) == 6
+        raiz["filas"] = 20
+
+    # Las hijas se registran al cerrar la raíz, antes que ella y con su ruta
+    mediciones = list(registro["mediciones"])
+    assert [(medicion["ruta"], medicion["nivel"], medicion["filas"]) for medicion in mediciones] == [
+        ("comparar/índice de claves", 1, 10), ("comparar/comparación", 1, None), ("comparar", 0, 20),
+    ]
+    assert persistidas == [mediciones]
+    assert all(medicion["duracion_s"] >= 0 for medicion in mediciones)
+    assert mediciones[-1]["duracion_s"] >= mediciones[0]["duracion_s"] + mediciones[1]["duracion_s"]
+
+
+def test_registro_acotado_y_sin_registro():
+    registro = crear_registro(maximo=3)
+    for _ in range(5):
+        with etapa("lectura", registro=registro):
+            pass
+    assert len(registro["mediciones"]) == 3
+    # Sin registro la etapa se mide igual, pero no se guarda
+    with etapa("lectura") as medicion:
+        pass
+    assert medicion["duracion_s"] is not None
+
+
+def test_aviso_interrumpe_y_persistir_no():
+    def avisar(medicion, terminada):
+        if medicion["etapa"] == "guardado" and not terminada:
+            raise RuntimeError("cancelado")
+
+    def persistir(mediciones):
+        raise OSError("base de datos ocupada")
+
+    registro = crear_registro(persistir=persistir, avisar=avisar)
+    with pytest.raises(RuntimeError, match="cancelado"):
+        with etapa("comparar", registro=registro):
+            with etapa("guardado"):
+                pass
+    # La raíz se cierra igual y una falla al persistir no llega al código medido
+    assert [medicion["etapa"] for medicion in registro["mediciones"]] == ["comparar"]
+
+
+def test_memoria_de_la_etapa():
+    registro = crear_registro(memoria=True)
+    with etapa("comparar", registro=registro) as medicion:
+        bloque = bytearray(8 * 1024 * 1024)
+        del bloque
+    assert medicion["memoria_mib"] >= 8
@@ -0,0 +1,34 @@
+# tests/test_result.py
+import pytest
+from pandas.testing import assert_frame_equal
+
+from casos import SEMILLAS, assert_resultados_iguales, caso_aleatorio
+from processing.diff_engine import MOTOR_ITERATIVO, comparar_listas_dinamico
+from processing.result import (
+    conteo_estados, resultado_como_tuplas, resultado_desde_listas, resultado_desde_tabla, tabla_detallados, tabla_procesada,
+)
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS[:50])
+def test_contenedor_desde_la_tabla_guardada(semilla):
+    plantilla_df, actualizada_df = caso_aleatorio(semilla)
+    # Con una clave repetida la tabla guardada conserva solo su último cambio de cada columna
+    actualizada_df = actualizada_df.drop_duplicates("SKU", keep="last")
+    resultado = comparar_listas_dinamico(plantilla_df, actualizada_df)
+    # El historial guarda plantilla_procesada; cambios_detallados se deriva de ella, en el orden de
+    # la planilla en lugar del de la comparación (y sin el tipo de la clave si la tabla está vacía)
+    desde_tabla = resultado_desde_tabla(tabla_procesada(resultado))
+    assert_frame_equal(tabla_procesada(desde_tabla), tabla_procesada(resultado))
+    assert_frame_equal(*(
+        tabla_detallados(contenedor).sort_values(["SKU", "Columna"], kind="stable").reset_index(drop=True)
+        for contenedor in (desde_tabla, resultado)
+    ), check_dtype=False)
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS[:50])
+def test_tuplas_ida_y_vuelta(semilla):
+    plantilla_df, actualizada_df = caso_aleatorio(semilla)
+    resultado = comparar_listas_dinamico(plantilla_df, actualizada_df, motor=MOTOR_ITERATIVO)
+    vuelta = resultado_desde_listas(*resultado_como_tuplas(resultado), tipo_clave=plantilla_df.dtypes.iloc[0])
+    assert_resultados_iguales(vuelta, resultado)
+    assert conteo_estados(vuelta).to_dict() == conteo_estados(resultado).to_dict()
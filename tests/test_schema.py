@@ -0,0 +1,66 @@
+# tests/test_schema.py
+import pandas as pd
+
+from processing.diff_engine import MOTOR_ITERATIVO, MOTOR_VECTORIZADO, comparar_listas_dinamico
+from processing.schema import alinear_esquemas
+
+
+def _estados(plantilla_df, actualizada_df, tolerancias=None, recortar_textos=True):
+    esquema = alinear_esquemas(plantilla_df, actualizada_df, tolerancias, recortar_textos)
+    por_motor = [
+        comparar_listas_dinamico(esquema["plantilla"], esquema["actualizada"], motor=motor, tolerancias=tolerancias)["cambios"]
+        for motor in (MOTOR_VECTORIZADO, MOTOR_ITERATIVO)
+    ]
+    estados = [dict(zip(cambios.iloc[:, 0].tolist(), cambios["Estado"].astype(str))) for cambios in por_motor]
+    assert estados[0] == estados[1]
+    return estados[0]
+
+
+def test_entero_y_decimal_iguales():
+    plantilla_df = pd.DataFrame({"SKU": ["A", "B"], "Precio": [10, 20]})
+    actualizada_df = pd.DataFrame({"SKU": ["A", "B"], "Precio": [10.0, 21.0]})
+    assert _estados(plantilla_df, actualizada_df) == {"A": "Sin cambios", "B": "Actualizado"}
+
+
+def test_numeros_en_columna_de_texto():
+    # Una columna con un texto se lee como objetos: sus números se escriben sin ".0"
+    plantilla_df = pd.DataFrame({"SKU": ["A", "B", "C"], "Código": [10, 20, None]})
+    actualizada_df = pd.DataFrame({"SKU": ["A", "B", "C"], "Código": ["10", "x", None]}, dtype=object)
+    esquema = alinear_esquemas(plantilla_df, actualizada_df)
+    assert esquema["plantilla"]["Código"].tolist()[:2] == ["10", "20"]
+    # Las celdas vacías siguen vacías, no pasan a "nan"
+    assert esquema["plantilla"]["Código"].isna().tolist() == [False, False, True]
+    assert esquema["actualizada"]["Código"].isna().tolist() == [False, False, True]
+    assert _estados(plantilla_df, actualizada_df) == {"A": "Sin cambios", "B": "Actualizado", "C": "Sin cambios"}
+
+
+def test_columnas_agregadas_y_eliminadas():
+    plantilla_df = pd.DataFrame({"SKU": ["A"], "precio ": [1.0], "Stock": [5]})
+    actualizada_df = pd.DataFrame({"SKU": ["A", "B"], "Precio": [1.0, 2.0], "Color": ["rojo", "azul"]})
+    esquema = alinear_esquemas(plantilla_df, actualizada_df)
+    assert esquema["renombradas"] == {"Precio": "precio "}
+    assert esquema["agregadas"] == ["Color"]
+    assert esquema["eliminadas"] == ["Stock"]
+    assert list(esquema["plantilla"].columns) == list(esquema["actualizada"].columns) == ["SKU", "precio ", "Stock", "Color"]
+    # Ni la columna nueva ni la eliminada cambian los registros existentes
+    assert _estados(plantilla_df, actualizada_df) == {"A": "Sin cambios", "B": "Nuevo"}
+
+
+def test_tolerancia():
+    plantilla_df = pd.DataFrame({"SKU": ["A", "B"], "Precio": [1, 2]})
+    actualizada_df = pd.DataFrame({"SKU": ["A", "B"], "Precio": ["1.004", "2.5"]})
+    assert _estados(plantilla_df, actualizada_df, {"Precio": 0.01}) == {"A": "Sin cambios", "B": "Actualizado"}
+    assert _estados(plantilla_df, actualizada_df) == {"A": "Actualizado", "B": "Actualizado"}
+
+
+def test_recortar_textos():
+    plantilla_df = pd.DataFrame({"SKU": ["A"], "Color": ["rojo"]})
+    actualizada_df = pd.DataFrame({"SKU": ["A "], "Color": [" rojo "]})
+    assert _estados(plantilla_df, actualizada_df) == {"A": "Sin cambios"}
+    assert _estados(plantilla_df, actualizada_df, recortar_textos=False) == {"A ": "Nuevo", "A": "Eliminado"}
+
+
+def test_clave_de_texto_y_numerica():
+    plantilla_df = pd.DataFrame({"SKU": ["1", "2"], "Stock": [5, 6]})
+    actualizada_df = pd.DataFrame({"SKU": [1, 2], "Stock": [5, 7]})
+    assert _estados(plantilla_df, actualizada_df) == {1: "Sin cambios", 2: "Actualizado"}
@@ -0,0 +1,53 @@
+# tests/test_sheets.py
+import io
+
+import pandas as pd
+import pytest
+
+from processing.diff_engine import comparar_listas_dinamico
+from processing.result import tabla_cambios
+from processing.sheets import comparar_hojas, emparejar_hojas, resumen_por_hoja
+
+ENERO = pd.DataFrame({"SKU": ["A", "B"], "Precio": [1.0, 2.0]})
+FEBRERO = pd.DataFrame({"SKU": ["C", "D", "E"], "Stock": [1, 2, 3]})
+
+
+def _libro(hojas):
+    destino = io.BytesIO()
+    with pd.ExcelWriter(destino) as libro:
+        for hoja, tabla in hojas.items():
+            tabla.to_excel(libro, sheet_name=hoja, index=False)
+    return destino.getvalue()
+
+
+def test_emparejar_por_nombre():
+    emparejamiento = emparejar_hojas(["Enero", "Febrero ", "Marzo"], ["ABRIL", "febrero", "enero"])
+    assert emparejamiento == {
+        "pares": [("Enero", "enero"), ("Febrero ", "febrero")],
+        "solo_referencia": ["Marzo"],
+        "solo_actualizado": ["ABRIL"],
+    }
+
+
+@pytest.mark.parametrize("trabajadores", [1, 2])
+def test_cada_hoja_igual_que_por_separado(trabajadores):
+    febrero_nuevo = FEBRERO.assign(Stock=[1, 5, 3])
+    referencia = _libro({"Enero": ENERO, "Febrero": FEBRERO, "Rota": ENERO})
+    actualizado = _libro({"febrero": febrero_nuevo, "Enero": ENERO.iloc[:1], "Rota": ENERO.iloc[:0]})
+    recibidas = []
+
+    salidas = comparar_hojas(
+        referencia, "referencia.xlsx", actualizado, "actualizado.xlsx",
+        [("Enero", "Enero"), ("Febrero", "febrero"), ("Rota", "Falta")], trabajadores, al_terminar=recibidas.append,
+    )
+    # En el orden de los pares; una hoja que no se puede leer no detiene a las demás
+    assert [salida["hoja"] for salida in salidas] == ["Enero", "Febrero", "Rota"]
+    assert sorted(salida["hoja"] for salida in recibidas) == ["Enero", "Febrero", "Rota"]
+    assert salidas[2]["resultado"] is None and salidas[2]["error"]
+    for salida, (plantilla_df, actualizada_df) in zip(salidas, [(ENERO, ENERO.iloc[:1]), (FEBRERO, febrero_nuevo)]):
+        assert salida["error"] is None
+        esperado = tabla_cambios(comparar_listas_dinamico(plantilla_df, actualizada_df))
+        assert tabla_cambios(salida["resultado"]).values.tolist() == esperado.values.tolist()
+
+    resumen = resumen_por_hoja({salida["hoja"]: salida["resultado"] for salida in salidas[:2]})
+    assert resumen[["Hoja", "Filas", "Eliminado"]].values.tolist() == [["Enero", 2, 1], ["Febrero", 3, 0]]
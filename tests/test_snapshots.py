@@ -0,0 +1,41 @@
+# tests/test_snapshots.py
+import pandas as pd
+
+from processing.snapshots import EVENTO_ELIMINADO, EVENTO_NUEVO, comparar_versiones, valores_por_version
+
+
+def _versiones(*claves_por_version):
+    return [pd.DataFrame({"SKU": list(claves), "Precio": [1.0] * len(claves)}) for claves in claves_por_version]
+
+
+def _linea(resultado, clave):
+    return resultado["linea_tiempo"].set_index("clave").loc[clave].to_dict()
+
+
+def test_clave_eliminada_y_reaparecida():
+    resultado = comparar_versiones(_versiones("ABC", "ACD", "ABD"))
+    assert _linea(resultado, "B") == {
+        "primera_version": 0, "ultimo_cambio": 2, "eliminada_en": None, "versiones_presente": 2, "cambios": 2,
+    }
+    assert _linea(resultado, "C") == {
+        "primera_version": 0, "ultimo_cambio": 2, "eliminada_en": 2, "versiones_presente": 2, "cambios": 1,
+    }
+    # La primera aparición no es un cambio
+    assert _linea(resultado, "D") == {
+        "primera_version": 1, "ultimo_cambio": None, "eliminada_en": None, "versiones_presente": 2, "cambios": 0,
+    }
+    assert resultado["resumen"][[EVENTO_NUEVO, EVENTO_ELIMINADO]].values.tolist() == [[3, 0], [1, 1], [1, 1]]
+
+    eventos = resultado["eventos"]
+    valores = valores_por_version(eventos[eventos["clave"] == "B"], resultado["versiones"], resultado["columnas"])
+    assert valores["Presente"].tolist() == [True, False, True]
+
+
+def test_cambios_de_valores():
+    tablas = _versiones("AB", "AB", "AB")
+    tablas[1].loc[0, "Precio"] = 2.0
+    resultado = comparar_versiones(tablas)
+    assert _linea(resultado, "A")["ultimo_cambio"] == 2
+    assert _linea(resultado, "A")["cambios"] == 2
+    assert _linea(resultado, "B")["cambios"] == 0
+    assert resultado["resumen"]["Actualizado"].tolist() == [0, 1, 1]
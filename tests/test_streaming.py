@@ -0,0 +1,93 @@
+# tests/test_streaming.py
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from casos import SEMILLAS, assert_resultados_iguales, caso_aleatorio
+from db.crud import insertar_comparacion, obtener_analitica, obtener_tabla_resultado
+from processing.analytics import analizar_resultado, combinar_analiticas
+from processing.diff_engine import combinar_resultados_parciales, comparar_listas_dinamico, filas_detallados_globales
+from processing.streaming import comparar_archivos_por_bloques, comparar_por_particiones
+
+
+def _guardar_caso(tmp_path, plantilla_df, actualizada_df):
+    plantilla_df.to_excel(tmp_path / "referencia.xlsx", index=False)
+    actualizada_df.to_excel(tmp_path / "actualizado.xlsx", index=False)
+    return str(tmp_path / "referencia.xlsx"), str(tmp_path / "actualizado.xlsx")
+
+
+def _assert_analiticas_iguales(analitica, esperada):
+    # La variación media de las particiones se pondera por partes: solo difiere en el redondeo
+    medias, esperadas = ({
+        columna: datos.pop("variacion_media", None) for columna, datos in valor["columnas"].items()
+    } for valor in (analitica, esperada))
+    assert analitica == esperada
+    assert medias == pytest.approx(esperadas)
+
+
+# Las semillas con plantilla vacía no aplican: el modo por bloques rechaza un archivo de referencia sin filas
+SEMILLAS_CON_REFERENCIA = [semilla for semilla in SEMILLAS[:60] if len(caso_aleatorio(semilla)[0])]
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS_CON_REFERENCIA)
+def test_por_bloques_igual_a_lectura_completa(tmp_path, semilla):
+    # Bloques y particiones chicos: los tipos se deducen por bloque y las particiones se vuelven a repartir
+    rutas = _guardar_caso(tmp_path, *caso_aleatorio(semilla))
+    parciales = list(comparar_por_particiones(
+        *rutas, particiones=1 + semilla % 3, filas_por_bloque=1 + semilla % 9, filas_por_particion=4 + semilla % 5
+    ))
+    por_bloques = combinar_resultados_parciales(parciales, parciales[0]["columnas_plantilla"])
+    esperado = comparar_listas_dinamico(pd.read_excel(rutas[0]), pd.read_excel(rutas[1]))
+
+    assert_resultados_iguales(por_bloques, esperado)
+    _assert_analiticas_iguales(por_bloques["analitica"], esperado["analitica"])
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS_CON_REFERENCIA[:30])
+def test_guardado_por_particiones_igual_al_combinado(base_datos, tmp_path, semilla):
+    rutas = _guardar_caso(tmp_path, *caso_aleatorio(semilla))
+    particiones = 1 + semilla % 5
+
+    parciales = list(comparar_por_particiones(*rutas, particiones=particiones))
+    combinado = insertar_comparacion("2024-01-01 00:00:00", "referencia.xlsx", "actualizado.xlsx",
+                                     combinar_resultados_parciales(parciales, parciales[0]["columnas_plantilla"]))
+    por_particiones = comparar_archivos_por_bloques(*rutas, "2024-01-01 00:00:00", particiones=particiones)
+
+    assert_frame_equal(obtener_tabla_resultado(por_particiones), obtener_tabla_resultado(combinado))
+    _assert_analiticas_iguales(obtener_analitica(por_particiones), obtener_analitica(combinado))
+
+
+def test_claves_repetidas_misma_analitica(tmp_path):
+    # "K1" aparece tres veces, separada por otras claves: sus columnas cambiadas se cuentan una vez
+    plantilla_df = pd.DataFrame({"SKU": ["K1", "K2", "K3"], "Precio": [1.0, 2.0, 3.0], "Stock": [1, 1, 1]})
+    actualizada_df = pd.DataFrame({
+        "SKU": ["K1", "K2", "K1", "K3", "K1"], "Precio": [5.0, 2.0, 6.0, 4.0, 1.0], "Stock": [1, 2, 3, 2, 1],
+    })
+    esperado = comparar_listas_dinamico(plantilla_df, actualizada_df)["analitica"]
+    assert esperado["claves_mas_cambios"] == [["K1", 2], ["K3", 2], ["K2", 1]]
+
+    parciales = comparar_por_particiones(*_guardar_caso(tmp_path, plantilla_df, actualizada_df), particiones=3)
+    _assert_analiticas_iguales(
+        combinar_analiticas([analizar_resultado(parcial["resultado"], filas_detallados_globales(parcial)) for parcial in parciales]),
+        esperado,
+    )
+
+
+@pytest.mark.parametrize("numericas", [False, True])
+@pytest.mark.parametrize("filas", [300, 1200, 4800])
+def test_particiones_acotadas_al_crecer_los_archivos(tmp_path, filas, numericas):
+    rng = np.random.default_rng(filas)
+    claves = list(range(filas)) if numericas else [f"K{i}" for i in range(filas)]
+    plantilla_df = pd.DataFrame({"SKU": claves, "Precio": rng.integers(0, 100, filas)})
+    actualizada_df = plantilla_df.assign(Precio=rng.integers(0, 100, filas)).sample(frac=1, random_state=filas)
+    rutas = _guardar_caso(tmp_path, plantilla_df, actualizada_df)
+
+    parciales = list(comparar_por_particiones(*rutas, particiones=2, filas_por_bloque=100, filas_por_particion=200))
+    assert max(len(parcial["posiciones_plantilla"]) for parcial in parciales) <= 200
+    assert max(len(parcial["posiciones_actualizada"]) for parcial in parciales) <= 200
+    assert sum(len(parcial["posiciones_plantilla"]) for parcial in parciales) == filas
+    assert_resultados_iguales(
+        combinar_resultados_parciales(parciales, parciales[0]["columnas_plantilla"]),
+        comparar_listas_dinamico(pd.read_excel(rutas[0]), pd.read_excel(rutas[1])),
+    )
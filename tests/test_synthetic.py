@@ -0,0 +1,38 @@
+# tests/test_synthetic.py
+import pytest
+from pandas.testing import assert_frame_equal
+
+from performance.synthetic import TIPOS_COLUMNA, escribir_par, generar_par
+from processing.diff_engine import comparar_listas_dinamico
+from processing.ingest import leer_tabla
+from processing.result import conteo_estados
+
+
+def test_misma_semilla_mismo_par():
+    for primera, segunda in zip(generar_par(200, semilla=3), generar_par(200, semilla=3)):
+        assert_frame_equal(primera, segunda)
+    assert not generar_par(200, semilla=3)[1].equals(generar_par(200, semilla=4)[1])
+
+
+@pytest.mark.parametrize("desordenar", [False, True])
+def test_cambios_segun_las_tasas(desordenar):
+    filas = 1000
+    plantilla_df, actualizada_df = generar_par(filas, columnas=len(TIPOS_COLUMNA), tasa_cambios=0.1, tasa_nuevas=0.05, tasa_eliminadas=0.02, desordenar=desordenar)
+    assert plantilla_df["SKU"].is_unique and actualizada_df["SKU"].is_unique
+    conteo = conteo_estados(comparar_listas_dinamico(plantilla_df, actualizada_df))
+    assert conteo["Nuevo"] == 50
+    assert conteo["Eliminado"] == filas - (len(actualizada_df) - 50)
+    # Cada fila modificada tiene una celda distinta, en cualquier tipo de columna
+    assert 50 < conteo["Actualizado"] < 150
+
+    # Sin tasas, los dos archivos son iguales
+    conteo = conteo_estados(comparar_listas_dinamico(*generar_par(filas, tasa_cambios=0, tasa_nuevas=0, tasa_eliminadas=0)))
+    assert conteo.to_dict() == {"Sin cambios": filas}
+
+
+@pytest.mark.parametrize("formato", ["xlsx", "csv", "parquet", "feather"])
+def test_escribir_y_leer(tmp_path, formato):
+    plantilla_df, actualizada_df = generar_par(50, columnas=3, tipos=("int", "float", "str"))
+    rutas = escribir_par(plantilla_df, actualizada_df, str(tmp_path / "datos"), formato)
+    for df, ruta in zip((plantilla_df, actualizada_df), rutas):
+        assert_frame_equal(leer_tabla(ruta), df, check_dtype=False)